@@ -1,7 +1,8 @@
-from flask import Flask
+# The calculator modules are plain NumPy / SciPy code; Flask is only imported when an
+# application is created, so "import app.fin_calculator" (or python -m app.bench) stays light.
 
-# Initialize the app
-app = Flask(__name__)
 
-# Import routes after app initialization to avoid circular imports
-from app import app as application
+def create_app(config=None, ready=True):
+    """Creates the Flask application (see app.app.create_app). flask --app app run finds it here."""
+    from app.app import create_app as create_flask_app
+    return create_flask_app(config, ready)
@@ -1,24 +1,115 @@
-from flask import Flask, request, jsonify, render_template
+import json
+import os
+import tempfile
+import time
+import numpy as np
+from flask import Blueprint, Flask, current_app, request, jsonify, render_template, send_file
 from flask import Response # Added Response
-from app.fin_calculator import calculate_rectangular_fin_performance
-from app.composite_wall_calculator import calculate_composite_wall_performance
-from app.heat_exchanger_calculator import calculate_heat_exchanger_performance
+from app.fin_calculator import (
+    calculate_rectangular_fin_performance, calculate_rectangular_fin_performance_batch, ADAPTIVE_MAX_POINTS,
+    MAX_PROFILE_VALUES
+)
+from app.composite_wall_calculator import (
+    calculate_composite_wall_performance, calculate_composite_wall_performance_batch, WALL_ERROR_MESSAGES
+)
+from app.heat_exchanger_calculator import (
+    calculate_heat_exchanger_performance, calculate_heat_exchanger_performance_batch, HX_ERROR_MESSAGES
+)
 from app.pdf_generator import generate_thermal_report_pdf # Added PDF generator
+from app.pdf_report import parse_report_request, iter_report_pdf
+from app.exchanger_configurations import EXCHANGER_CONFIGURATIONS, exchanger_ntu
+from app.properties import get_property_database, PROPERTY_NAMES
+from app.property_solver import (
+    parse_heat_exchanger_properties_request, solve_heat_exchanger_with_properties,
+    parse_composite_wall_properties_request, solve_composite_wall_with_properties
+)
+from app.fin_models import FIN_MODELS, COMMON_PARAMS, parse_fin_model_request, evaluate_fin_model
+from app.cache import create_result_cache, make_cache_key
+from app.instrumentation import create_instrumentation, PROFILE_SORT_KEYS
+from app.response_formats import negotiate_response_format, encode_response, JSON_MIMETYPE
+from app.jobs import create_job_queue, describe_job, spool_response
+from app.sweep import parse_sweep_request, iter_sweep_ndjson
+from app.uncertainty import parse_uncertainty_request, run_uncertainty, iter_uncertainty_ndjson
+from app.sensitivity import parse_sensitivity_request, sensitivity_report
+from app.bulk import parse_bulk_request, run_bulk, BULK_FORMATS, DEFAULT_CHUNK_ROWS
+from app.inverse_solver import parse_solve_request, solve_inverse
+from app.optimizer import parse_optimize_request, optimize
+from app.transient_solver import (
+    simulate_fin_transient, simulate_wall_transient, SCHEMES, MAX_CELLS, MAX_STEPS, MAX_SNAPSHOTS, MAX_SNAPSHOT_VALUES
+)
+from app.conduction_2d import build_plate_fin_2d, build_fin_array_2d, MAX_CELLS_2D
+from app.resistance_network import ResistanceNetwork, RESISTANCE_TYPES, parse_resistance_network_request
+from app.sweep_executor import create_sweep_registry, check_parallel_sweep, iter_parallel_sweep_ndjson
+from app.validation import (
+    validate_fin_columns, validate_heat_exchanger_columns, validate_composite_wall_columns, validate_n_points,
+    validate_transient_settings, validate_exchanger_ntu_columns, HEAT_EXCHANGER_FLOW_TYPES
+)
 
-app = Flask(__name__)
+# The routes live on a blueprint; create_app builds the Flask application around it with its
+# own services: the result cache (serialized responses of the single-point calculator routes,
+# keyed on their validated inputs), the instrumentation (phase timings for /metrics and
+# sampled profiles for /profile, None if disabled), the job queue and the parallel sweep registry.
+bp = Blueprint('thermal', __name__)
 
-@app.route('/')
+# The introspection and probe routes are not timed, so reading them does not show up in the results
+UNTIMED_ENDPOINTS = {'static'} | {f'thermal.{name}' for name in [
+    'metrics_route', 'profile_route', 'configure_profile_route', 'clear_profile_route', 'health_route', 'ready_route'
+]}
+
+def _services():
+    return current_app.extensions["thermal"]
+
+def _mark(phase):
+    """Ends a request phase (see app.instrumentation.PHASES); no-op when instrumentation is off."""
+    instrumentation = current_app.extensions["thermal"]["instrumentation"]
+    if instrumentation is not None:
+        instrumentation.mark(phase)
+
+def _cache_lookup(calculator, inputs, mimetype=None):
+    """Returns (cache_key, cached response or None). cache_key is None when caching is disabled."""
+    result_cache = _services()["result_cache"]
+    if result_cache is None:
+        return None, None
+    cache_key = make_cache_key(calculator, inputs)
+    payload = result_cache.get(cache_key)
+    if payload is None:
+        return cache_key, None
+    return cache_key, _with_vary(Response(payload, mimetype=mimetype or current_app.json.mimetype))
+
+def _cache_store(cache_key, response):
+    if cache_key is not None:
+        _services()["result_cache"].set(cache_key, response.get_data())
+    return response
+
+def _response_format():
+    """(mimetype, dtype, error) negotiated from the Accept header and the ?dtype= argument."""
+    dtype = request.args.get('dtype')
+    mimetype, error = negotiate_response_format(request.accept_mimetypes, dtype)
+    return mimetype, dtype, error
+
+def _with_vary(response):
+    response.vary.add('Accept')
+    return response
+
+def _array_response(mimetype, dtype, arrays, metadata):
+    """JSON, or one of the binary formats written straight from the arrays, for a route result."""
+    if mimetype == JSON_MIMETYPE:
+        return _with_vary(jsonify({**{name: array.tolist() for name, array in arrays.items()}, **metadata}))
+    return _with_vary(Response(encode_response(mimetype, arrays, metadata, dtype), mimetype=mimetype))
+
+@bp.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/fin-calculator')
+@bp.route('/fin-calculator')
 def fin_calculator_page():
     return render_template('fin_calculator.html')
 
-@app.route('/calculate_fin', methods=['POST'])
+@bp.route('/calculate_fin', methods=['POST'])
 def calculate_fin_route():
     try:
         data = request.get_json()
+        _mark('parse')
         if not data:
             return jsonify({"error": "No input data provided"}), 400
 
@@ -45,6 +136,13 @@ def calculate_fin_route():
         if not isinstance(n_points, int) or n_points <= 0:
              return jsonify({"error": "Parameter 'n_points' must be a positive integer."}), 400
 
+        # Optional adaptive profile: fewest points within max_error (K) instead of n_points
+        max_error = data.get('max_error')
+        max_points = data.get('max_points', ADAPTIVE_MAX_POINTS)
+        if max_error is not None and (not isinstance(max_error, (int, float)) or max_error <= 0):
+            return jsonify({"error": "Parameter 'max_error' must be a positive number."}), 400
+        if not isinstance(max_points, int) or not 2 <= max_points <= ADAPTIVE_MAX_POINTS:
+            return jsonify({"error": f"Parameter 'max_points' must be an integer between 2 and {ADAPTIVE_MAX_POINTS}."}), 400
 
         # Add specific constraints based on physical reality if necessary
         if Ac <= 0:
@@ -55,12 +153,35 @@ def calculate_fin_route():
             return jsonify({"error": "Thermal conductivity 'k' must be positive."}), 400
         # L can be 0, h_conv can be 0. T_base and T_inf can be equal.
 
+        mimetype, dtype, error = _response_format()
+        if error:
+            return jsonify({"error": error}), 406
+
+        # The response format is part of the key, JSON entries keep their original key
+        cache_inputs = {**numerical_params, 'n_points': n_points}
+        if max_error is not None:
+            cache_inputs.update({'max_error': max_error, 'max_points': max_points})
+        if mimetype != JSON_MIMETYPE:
+            cache_inputs.update({'mimetype': mimetype, 'dtype': dtype or 'float64'})
+        _mark('validate')
+        cache_key, cached = _cache_lookup('fin', cache_inputs, mimetype)
+        if cached is not None:
+            return cached, 200
+
         results = calculate_rectangular_fin_performance(
             P=float(P), Ac=float(Ac), L=float(L), k=float(k),
             h_conv=float(h_conv), T_base=float(T_base), T_inf=float(T_inf),
-            n_points=int(n_points)
+            n_points=int(n_points), as_arrays=True,
+            max_error=None if max_error is None else float(max_error), max_points=max_points
         )
-        return jsonify(results), 200
+        _mark('compute')
+        if results.get("error"):
+            return jsonify({"error": results["error"]}), 400
+        response = _array_response(
+            mimetype, dtype, {name: results[name] for name in ['x_coords', 'temp_dist']},
+            {name: value for name, value in results.items() if name not in ['x_coords', 'temp_dist']}
+        )
+        return _cache_store(cache_key, response), 200
 
     except TypeError as e: # Catches errors if data is not JSON or other type issues
         return jsonify({"error": f"Invalid input type or data format: {str(e)}"}), 400
@@ -68,19 +189,112 @@ def calculate_fin_route():
         # Log the exception e for debugging
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
 
-@app.route('/composite-wall-calculator')
-def composite_wall_calculator_page():
-    return render_template('composite_wall_calculator.html')
+@bp.route('/calculate_fin/batch', methods=['POST'])
+def calculate_fin_batch_route():
+    try:
+        data = request.get_json()
+        _mark('parse')
+        if not data:
+            return jsonify({"error": "No input data provided"}), 400
 
+        # Each parameter is a column (list) with one entry per fin; scalars apply to every row.
+        columns, row_errors, error = validate_fin_columns(data)
+        if error:
+            return jsonify({"error": error}), 400
+        if row_errors:
+            return jsonify({"error": f"{len(row_errors)} row(s) failed validation.", "row_errors": row_errors}), 400
 
-if __name__ == '__main__':
-    # Note: This typically runs on port 5000 by default
-    app.run(debug=True)
+        n_points = data.get('n_points', 100) # Optional parameter
+        include_profiles = bool(data.get('include_profiles', True))
+        if include_profiles:
+            n_points_error = validate_n_points(n_points, len(columns['L']), MAX_PROFILE_VALUES)
+        else:
+            n_points_error = validate_n_points(n_points)
+        if n_points_error:
+            return jsonify({"error": n_points_error}), 400
+        mimetype, dtype, error = _response_format()
+        if error:
+            return jsonify({"error": error}), 406
 
-@app.route('/export_pdf', methods=['POST'])
+        _mark('validate')
+        results = calculate_rectangular_fin_performance_batch(
+            n_points=n_points, include_profiles=include_profiles, **columns
+        )
+        _mark('compute')
+        if mimetype != JSON_MIMETYPE:
+            arrays = {name: results[name] for name in ['heat_transfer_rate', 'fin_efficiency']}
+            if include_profiles:
+                arrays.update({name: results[name] for name in ['x_coords', 'temp_dist']})
+            return _array_response(mimetype, dtype, arrays, {"count": len(results["heat_transfer_rate"])}), 200
+        return _with_vary(jsonify({
+            "count": len(results["heat_transfer_rate"]),
+            "x_coords": results["x_coords"].tolist() if include_profiles else None,
+            "temp_dist": results["temp_dist"].tolist() if include_profiles else None,
+            "heat_transfer_rate": results["heat_transfer_rate"].tolist(),
+            "fin_efficiency": results["fin_efficiency"].tolist(),
+        })), 200
+
+    except TypeError as e: # Catches errors if data is not JSON or other type issues
+        return jsonify({"error": f"Invalid input type or data format: {str(e)}"}), 400
+    except Exception as e:
+        # Log the exception e for debugging
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+@bp.route('/fin_models', methods=['GET'])
+def fin_models_route():
+    return jsonify({name: {"description": spec["description"], "parameters": spec["parameters"] + COMMON_PARAMS}
+                    for name, spec in FIN_MODELS.items()}), 200
+
+@bp.route('/calculate_fin_model', methods=['POST'])
+def calculate_fin_model_route():
+    try:
+        data = request.get_json()
+        _mark('parse')
+        if not data:
+            return jsonify({"error": "No input data provided"}), 400
+
+        # Parameters are numbers or columns (one entry per fin), as for /calculate_fin/batch
+        problem, row_errors, error = parse_fin_model_request(data)
+        if error:
+            return jsonify({"error": error}), 400
+        if row_errors:
+            return jsonify({"error": f"{len(row_errors)} row(s) failed validation.", "row_errors": row_errors}), 400
+        mimetype, dtype, error = _response_format()
+        if error:
+            return jsonify({"error": error}), 406
+
+        _mark('validate')
+        results = evaluate_fin_model(**problem)
+        _mark('compute')
+        names = ["fin_efficiency", "heat_transfer_rate", "effectiveness", "fin_area", "base_area"]
+        metadata = {"model": problem["model"], "count": len(results["fin_efficiency"]),
+                    "table_rows": results["table_rows"], "table_error_bound": results["table_error_bound"]}
+        if mimetype != JSON_MIMETYPE:
+            return _array_response(mimetype, dtype, {name: results[name] for name in names}, metadata), 200
+
+        # Undefined values (e.g. effectiveness at T_base == T_inf) are NaN in the kernel and null here
+        response = dict(metadata)
+        for name in names:
+            values = results[name].astype(object)
+            values[np.isnan(results[name])] = None
+            response[name] = values.tolist()
+        return _with_vary(jsonify(response)), 200
+
+    except TypeError as e: # Catches errors if data is not JSON or other type issues
+        return jsonify({"error": f"Invalid input type or data format: {str(e)}"}), 400
+    except Exception as e:
+        # Log the exception e for debugging
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+@bp.route('/composite-wall-calculator')
+def composite_wall_calculator_page():
+    return render_template('composite_wall_calculator.html')
+
+@bp.route('/export_pdf', methods=['POST'])
 def export_pdf_route():
     try:
         data = request.get_json()
+        _mark('parse')
         if not data:
             return jsonify({"error": "No data provided for PDF generation."}), 400
 
@@ -97,7 +311,9 @@ def export_pdf_route():
              return jsonify({"error": "'inputs' and 'outputs' must be lists or dictionaries."}), 400
 
 
+        _mark('validate')
         pdf_bytes = generate_thermal_report_pdf(data)
+        _mark('compute')
 
         return Response(
             pdf_bytes,
@@ -111,10 +327,36 @@ def export_pdf_route():
         return jsonify({"error": f"An error occurred during PDF generation: {str(e)}"}), 500
 
 
-@app.route('/calculate_heat_exchanger', methods=['POST'])
+@bp.route('/export_report', methods=['POST'])
+def export_report_route():
+    try:
+        data = request.get_json()
+        _mark('parse')
+        if not data:
+            return jsonify({"error": "No data provided for PDF generation."}), 400
+
+        report, error = parse_report_request(data)
+        if error:
+            return jsonify({"error": error}), 400
+        _mark('validate')
+
+        # Pages are laid out and sent one at a time (generation is not part of the timings)
+        return Response(
+            iter_report_pdf(report),
+            mimetype="application/pdf",
+            headers={"Content-Disposition": "attachment;filename=thermal_report.pdf"}
+        )
+    except TypeError as e: # Catches errors if data is not JSON or other type issues
+        return jsonify({"error": f"Invalid input type or data format: {str(e)}"}), 400
+    except Exception as e:
+        # Log the exception e for debugging
+        return jsonify({"error": f"An error occurred during PDF generation: {str(e)}"}), 500
+
+@bp.route('/calculate_heat_exchanger', methods=['POST'])
 def calculate_heat_exchanger_route():
     try:
         data = request.get_json()
+        _mark('parse')
         if not data:
             return jsonify({"error": "No input data provided"}), 400
 
@@ -143,8 +385,8 @@ def calculate_heat_exchanger_route():
             params[p_name] = float(val)
 
         flow_type = data.get('flow_type')
-        if flow_type not in ["parallel", "counterflow"]:
-            return jsonify({"error": "Parameter 'flow_type' must be 'parallel' or 'counterflow'."}), 400
+        if flow_type not in HEAT_EXCHANGER_FLOW_TYPES:
+            return jsonify({"error": f"Parameter 'flow_type' must be one of: {', '.join(HEAT_EXCHANGER_FLOW_TYPES)}."}), 400
         params['flow_type'] = flow_type
 
         # Specific validation for temperatures if needed, e.g. T_in_hot > T_in_cold
@@ -153,16 +395,22 @@ def calculate_heat_exchanger_route():
         #     return jsonify({"error": "T_in_hot must be strictly greater than T_in_cold for effective heat exchange."}), 400
 
 
+        _mark('validate')
+        cache_key, cached = _cache_lookup('heat_exchanger', params)
+        if cached is not None:
+            return cached, 200
+
         results = calculate_heat_exchanger_performance(
             m_dot_hot=params['m_dot_hot'], Cp_hot=params['Cp_hot'], T_in_hot=params['T_in_hot'],
             m_dot_cold=params['m_dot_cold'], Cp_cold=params['Cp_cold'], T_in_cold=params['T_in_cold'],
             UA=params['UA'], flow_type=params['flow_type']
         )
+        _mark('compute')
 
         if results.get("error"):
             return jsonify({"error": results["error"]}), 400
 
-        return jsonify(results), 200
+        return _cache_store(cache_key, jsonify(results)), 200
 
     except TypeError as e: # Catches errors if data is not JSON or other type issues
         return jsonify({"error": f"Invalid input type or data format: {str(e)}"}), 400
@@ -172,14 +420,110 @@ def calculate_heat_exchanger_route():
         # traceback.print_exc()
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
 
-@app.route('/heat-exchanger-calculator')
+@bp.route('/calculate_heat_exchanger/batch', methods=['POST'])
+def calculate_heat_exchanger_batch_route():
+    try:
+        data = request.get_json()
+        _mark('parse')
+        if not data:
+            return jsonify({"error": "No input data provided"}), 400
+
+        columns, row_errors, error = validate_heat_exchanger_columns(data)
+        if error:
+            return jsonify({"error": error}), 400
+        if row_errors:
+            return jsonify({"error": f"{len(row_errors)} row(s) failed validation.", "row_errors": row_errors}), 400
+
+        _mark('validate')
+        results = calculate_heat_exchanger_performance_batch(**columns)
+        _mark('compute')
+
+        # Calculation errors (e.g. T_in_hot < T_in_cold) are reported per row instead of failing the batch.
+        # Undefined values are NaN in the kernel and null in the response, matching the single-point route.
+        response = {"count": len(results["error_code"])}
+        for name in ["NTU", "effectiveness", "q_actual", "T_out_hot", "T_out_cold"]:
+            values = results[name].astype(object)
+            values[np.isnan(results[name])] = None
+            response[name] = values.tolist()
+        response["error_code"] = results["error_code"].tolist()
+        response["error"] = [HX_ERROR_MESSAGES[code] for code in response["error_code"]]
+        return jsonify(response), 200
+
+    except TypeError as e: # Catches errors if data is not JSON or other type issues
+        return jsonify({"error": f"Invalid input type or data format: {str(e)}"}), 400
+    except Exception as e:
+        # Log the exception e for debugging
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+@bp.route('/heat_exchanger_configurations', methods=['GET'])
+def heat_exchanger_configurations_route():
+    return jsonify({name: spec["description"] for name, spec in EXCHANGER_CONFIGURATIONS.items()}), 200
+
+@bp.route('/calculate_heat_exchanger/ntu', methods=['POST'])
+def calculate_heat_exchanger_ntu_route():
+    try:
+        data = request.get_json()
+        _mark('parse')
+        if not data:
+            return jsonify({"error": "No input data provided"}), 400
+
+        # Sizing: the NTU (and so UA = NTU * C_min) that reaches a target effectiveness
+        columns, row_errors, error = validate_exchanger_ntu_columns(data)
+        if error:
+            return jsonify({"error": error}), 400
+        if row_errors:
+            return jsonify({"error": f"{len(row_errors)} row(s) failed validation.", "row_errors": row_errors}), 400
+
+        _mark('validate')
+        NTU = exchanger_ntu(columns['flow_type'], columns['effectiveness'], columns['Cr'])
+        _mark('compute')
+
+        # Targets the configuration cannot reach at that Cr are null
+        values = NTU.astype(object)
+        values[np.isnan(NTU)] = None
+        return jsonify({"flow_type": columns['flow_type'], "count": len(NTU), "NTU": values.tolist()}), 200
+
+    except TypeError as e: # Catches errors if data is not JSON or other type issues
+        return jsonify({"error": f"Invalid input type or data format: {str(e)}"}), 400
+    except Exception as e:
+        # Log the exception e for debugging
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+@bp.route('/calculate_heat_exchanger/properties', methods=['POST'])
+def calculate_heat_exchanger_properties_route():
+    try:
+        data = request.get_json()
+        _mark('parse')
+        if not data:
+            return jsonify({"error": "No input data provided"}), 400
+
+        # Cp_hot / Cp_cold come from the property database at the mean stream temperatures
+        problem, error = parse_heat_exchanger_properties_request(data)
+        if error:
+            return jsonify({"error": error}), 400
+
+        _mark('validate')
+        results = solve_heat_exchanger_with_properties(**problem)
+        _mark('compute')
+        if results.get("error"):
+            return jsonify({"error": results["error"]}), 400
+        return jsonify(results), 200
+
+    except TypeError as e: # Catches errors if data is not JSON or other type issues
+        return jsonify({"error": f"Invalid input type or data format: {str(e)}"}), 400
+    except Exception as e:
+        # Log the exception e for debugging
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+@bp.route('/heat-exchanger-calculator')
 def heat_exchanger_calculator_page():
     return render_template('heat_exchanger_calculator.html')
 
-@app.route('/calculate_composite_wall', methods=['POST'])
+@bp.route('/calculate_composite_wall', methods=['POST'])
 def calculate_composite_wall_route():
     try:
         data = request.get_json()
+        _mark('parse')
         if not data:
             return jsonify({"error": "No input data provided"}), 400
 
@@ -211,11 +555,18 @@ def calculate_composite_wall_route():
         if not all(isinstance(temp, (int, float)) for temp in [T_inner, T_outer]):
             return jsonify({"error": "'T_inner' and 'T_outer' must be numbers."}), 400
 
+        # Layer order is part of the key (it determines the interface sequence)
+        _mark('validate')
+        cache_key, cached = _cache_lookup('composite_wall', {'layers': validated_layers, 'T_inner': T_inner, 'T_outer': T_outer})
+        if cached is not None:
+            return cached, 200
+
         results = calculate_composite_wall_performance(
             layers=validated_layers,
             T_inner=float(T_inner),
             T_outer=float(T_outer)
         )
+        _mark('compute')
 
         if results.get("error"):
             # Determine status code based on error if needed, otherwise default to 400 for client-side correctable errors
@@ -225,10 +576,899 @@ def calculate_composite_wall_route():
                 status_code = 400
             return jsonify({"error": results["error"]}), status_code
 
+        return _cache_store(cache_key, jsonify(results)), 200
+
+    except TypeError as e: # Catches errors if data is not JSON or other type issues
+        return jsonify({"error": f"Invalid input type or data format: {str(e)}"}), 400
+    except Exception as e:
+        # Log the exception e for debugging
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+@bp.route('/calculate_composite_wall/batch', methods=['POST'])
+def calculate_composite_wall_batch_route():
+    try:
+        data = request.get_json()
+        _mark('parse')
+        if not data:
+            return jsonify({"error": "No input data provided"}), 400
+
+        # Layers of all walls are concatenated; wall i owns layers offsets[i]:offsets[i+1].
+        columns, row_errors, error = validate_composite_wall_columns(data)
+        if error:
+            return jsonify({"error": error}), 400
+        if row_errors:
+            return jsonify({"error": f"{len(row_errors)} wall(s) failed validation.", "row_errors": row_errors}), 400
+
+        _mark('validate')
+        results = calculate_composite_wall_performance_batch(**columns)
+        _mark('compute')
+
+        heat_flux = results["heat_flux"].astype(object)
+        heat_flux[np.isnan(results["heat_flux"])] = None
+        interface_temperatures = results["interface_temperatures"].astype(object)
+        interface_temperatures[np.isnan(results["interface_temperatures"])] = None
+        error_code = results["error_code"].tolist()
+        return jsonify({
+            "count": len(error_code),
+            "total_resistance": results["total_resistance"].tolist(),
+            "heat_flux": heat_flux.tolist(),
+            "individual_resistances": results["individual_resistances"].tolist(),
+            "interface_temperatures": interface_temperatures.tolist(),
+            "interface_offsets": results["interface_offsets"].tolist(),
+            "error_code": error_code,
+            "error": [WALL_ERROR_MESSAGES[code] for code in error_code],
+        }), 200
+
+    except TypeError as e: # Catches errors if data is not JSON or other type issues
+        return jsonify({"error": f"Invalid input type or data format: {str(e)}"}), 400
+    except Exception as e:
+        # Log the exception e for debugging
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+@bp.route('/calculate_composite_wall/properties', methods=['POST'])
+def calculate_composite_wall_properties_route():
+    try:
+        data = request.get_json()
+        _mark('parse')
+        if not data:
+            return jsonify({"error": "No input data provided"}), 400
+
+        # Layers with a 'material' take k from the property database at their mean temperature
+        problem, error = parse_composite_wall_properties_request(data)
+        if error:
+            return jsonify({"error": error}), 400
+
+        _mark('validate')
+        results = solve_composite_wall_with_properties(**problem)
+        _mark('compute')
+        if results.get("error"):
+            return jsonify({"error": results["error"]}), 400
+        return jsonify(results), 200
+
+    except TypeError as e: # Catches errors if data is not JSON or other type issues
+        return jsonify({"error": f"Invalid input type or data format: {str(e)}"}), 400
+    except Exception as e:
+        # Log the exception e for debugging
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+@bp.route('/properties', methods=['GET'])
+def properties_route():
+    return jsonify(get_property_database().materials()), 200
+
+@bp.route('/properties/lookup', methods=['POST'])
+def properties_lookup_route():
+    try:
+        data = request.get_json()
+        _mark('parse')
+        if not data:
+            return jsonify({"error": "No input data provided"}), 400
+
+        database = get_property_database()
+        material, name, T = data.get('material'), data.get('property'), data.get('T')
+        if name not in PROPERTY_NAMES:
+            return jsonify({"error": f"Parameter 'property' must be one of: {', '.join(PROPERTY_NAMES)}."}), 400
+        error = database.check(material, name) if isinstance(material, str) else "Parameter 'material' must be a string."
+        if error:
+            return jsonify({"error": error}), 400
+        temperatures = np.asarray(T if isinstance(T, list) else [T])
+        if temperatures.ndim != 1 or temperatures.dtype.kind not in 'if':
+            return jsonify({"error": "Parameter 'T' must be a number or a list of numbers."}), 400
+
+        _mark('validate')
+        values = database.lookup(material, name, temperatures)
+        _mark('compute')
+
+        # Temperatures outside the material's table are null
+        response = values.astype(object)
+        response[np.isnan(values)] = None
+        T_min, T_max = database.temperature_range(material)
+        return jsonify({"material": material, "property": name, "T_min": T_min, "T_max": T_max,
+                        "values": response.tolist()}), 200
+
+    except TypeError as e: # Catches errors if data is not JSON or other type issues
+        return jsonify({"error": f"Invalid input type or data format: {str(e)}"}), 400
+    except Exception as e:
+        # Log the exception e for debugging
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+@bp.route('/transient-calculator')
+def transient_calculator_page():
+    return render_template('transient_calculator.html')
+
+def _transient_settings(data, default_cells):
+    return validate_transient_settings(data, default_cells, MAX_CELLS, MAX_STEPS, MAX_SNAPSHOTS, SCHEMES,
+                                       MAX_SNAPSHOT_VALUES)
+
+def _transient_response(mimetype, dtype, results):
+    arrays = {name: value for name, value in results.items() if isinstance(value, np.ndarray)}
+    return _array_response(mimetype, dtype, arrays, {name: value for name, value in results.items() if name not in arrays})
+
+@bp.route('/calculate_fin_transient', methods=['POST'])
+def calculate_fin_transient_route():
+    try:
+        data = request.get_json()
+        _mark('parse')
+        if not data:
+            return jsonify({"error": "No input data provided"}), 400
+
+        required_params = ['P', 'Ac', 'L', 'k', 'rho', 'cp', 'h_conv', 'T_base', 'T_inf']
+        missing_params = [param for param in required_params if param not in data]
+        if missing_params:
+            return jsonify({"error": f"Missing parameters: {', '.join(missing_params)}"}), 400
+        for name in required_params:
+            if not isinstance(data[name], (int, float)):
+                return jsonify({"error": f"Parameter '{name}' must be a number."}), 400
+        for name in ['P', 'Ac', 'L', 'k', 'rho', 'cp']:
+            if data[name] <= 0:
+                return jsonify({"error": f"Parameter '{name}' must be positive."}), 400
+        if data['h_conv'] < 0:
+            return jsonify({"error": "Parameter 'h_conv' must be non-negative."}), 400
+
+        settings, error = _transient_settings(data, 100)
+        if error:
+            return jsonify({"error": error}), 400
+        mimetype, dtype, error = _response_format()
+        if error:
+            return jsonify({"error": error}), 406
+
+        _mark('validate')
+        results = simulate_fin_transient(**{name: float(data[name]) for name in required_params}, **settings)
+        _mark('compute')
+        return _transient_response(mimetype, dtype, results), 200
+
+    except TypeError as e: # Catches errors if data is not JSON or other type issues
+        return jsonify({"error": f"Invalid input type or data format: {str(e)}"}), 400
+    except Exception as e:
+        # Log the exception e for debugging
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+@bp.route('/calculate_wall_transient', methods=['POST'])
+def calculate_wall_transient_route():
+    try:
+        data = request.get_json()
+        _mark('parse')
+        if not data:
+            return jsonify({"error": "No input data provided"}), 400
+
+        layers_data = data.get('layers')
+        T_inner = data.get('T_inner')
+        T_outer = data.get('T_outer')
+
+        if not isinstance(layers_data, list) or not layers_data:
+            return jsonify({"error": "Parameter 'layers' must be a non-empty list."}), 400
+        if not all(isinstance(layer, dict) for layer in layers_data):
+            return jsonify({"error": "Each item in 'layers' must be a dictionary."}), 400
+
+        validated_layers = []
+        for i, layer in enumerate(layers_data):
+            values = [layer.get(name) for name in ['thickness', 'k_value', 'area', 'rho', 'cp']]
+            if not all(isinstance(val, (int, float)) for val in values):
+                return jsonify({"error": f"Layer {i+1}: 'thickness', 'k_value', 'area', 'rho' and 'cp' must be numbers."}), 400
+            thickness, k_value, area, rho, cp = values
+            if thickness < 0:
+                return jsonify({"error": f"Layer {i+1}: 'thickness' must be non-negative."}), 400
+            if min(k_value, area, rho, cp) <= 0:
+                return jsonify({"error": f"Layer {i+1}: 'k_value', 'area', 'rho' and 'cp' must be positive."}), 400
+            validated_layers.append({'thickness': float(thickness), 'k_value': float(k_value), 'area': float(area),
+                                     'rho': float(rho), 'cp': float(cp)})
+        if not any(layer['thickness'] > 0 for layer in validated_layers):
+            return jsonify({"error": "At least one layer must have a positive 'thickness'."}), 400
+
+        if not all(isinstance(temp, (int, float)) for temp in [T_inner, T_outer]):
+            return jsonify({"error": "'T_inner' and 'T_outer' must be numbers."}), 400
+
+        settings, error = _transient_settings(data, 200)
+        if error:
+            return jsonify({"error": error}), 400
+        mimetype, dtype, error = _response_format()
+        if error:
+            return jsonify({"error": error}), 406
+
+        _mark('validate')
+        results = simulate_wall_transient(validated_layers, float(T_inner), float(T_outer), **settings)
+        _mark('compute')
+        return _transient_response(mimetype, dtype, results), 200
+
+    except TypeError as e: # Catches errors if data is not JSON or other type issues
+        return jsonify({"error": f"Invalid input type or data format: {str(e)}"}), 400
+    except Exception as e:
+        # Log the exception e for debugging
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+# Geometry parameters of /calculate_conduction_2d; all must be positive numbers
+CONDUCTION_2D_GEOMETRIES = {
+    "plate_fin": ['L', 'thickness'],
+    "fin_array": ['fin_length', 'fin_thickness', 'fin_pitch', 'base_thickness'],
+}
+
+def _conduction_2d_result(results):
+    temperature = results["temperature"].astype(object)
+    temperature[np.isnan(results["temperature"])] = None # Fluid cells
+    return {
+        "temperature": temperature.tolist(),
+        "heat_rates": results["heat_rates"],
+        "heat_transfer_rate": results["heat_transfer_rate"],
+        "efficiency": results["efficiency"],
+    }
+
+@bp.route('/calculate_conduction_2d', methods=['POST'])
+def calculate_conduction_2d_route():
+    try:
+        data = request.get_json()
+        _mark('parse')
+        if not data:
+            return jsonify({"error": "No input data provided"}), 400
+
+        geometry = data.get('geometry')
+        if geometry not in CONDUCTION_2D_GEOMETRIES:
+            return jsonify({"error": f"Parameter 'geometry' must be one of: {', '.join(CONDUCTION_2D_GEOMETRIES)}."}), 400
+
+        required_params = CONDUCTION_2D_GEOMETRIES[geometry] + ['k', 'h_conv', 'T_base', 'T_inf']
+        missing_params = [param for param in required_params if param not in data]
+        if missing_params:
+            return jsonify({"error": f"Missing parameters: {', '.join(missing_params)}"}), 400
+        params = {name: data[name] for name in required_params}
+        params['depth'] = data.get('depth', 1.0)
+        for name, value in params.items():
+            if not isinstance(value, (int, float)):
+                return jsonify({"error": f"Parameter '{name}' must be a number."}), 400
+        for name in CONDUCTION_2D_GEOMETRIES[geometry] + ['k', 'depth']:
+            if params[name] <= 0:
+                return jsonify({"error": f"Parameter '{name}' must be positive."}), 400
+        if params['h_conv'] < 0:
+            return jsonify({"error": "Parameter 'h_conv' must be non-negative."}), 400
+        params = {name: float(value) for name, value in params.items()}
+
+        solver = data.get('solver', 'auto')
+        if solver not in ['auto', 'direct', 'iterative']:
+            return jsonify({"error": "Parameter 'solver' must be 'auto', 'direct' or 'iterative'."}), 400
+        mimetype, dtype, error = _response_format()
+        if error:
+            return jsonify({"error": error}), 406
+
+        # Further boundary temperatures solved with the same factorization
+        cases = data.get('cases', [])
+        if not isinstance(cases, list) or not all(
+            isinstance(case, dict) and set(case) <= {'T_base', 'T_inf'}
+            and all(isinstance(value, (int, float)) for value in case.values()) for case in cases
+        ):
+            return jsonify({"error": "Parameter 'cases' must be a list of dictionaries with numeric 'T_base' and/or 'T_inf'."}), 400
+
+        if geometry == "plate_fin":
+            nx, ny = data.get('nx', 200), data.get('ny', 20)
+            if not all(isinstance(n, int) and n > 0 for n in [nx, ny]):
+                return jsonify({"error": "Parameters 'nx' and 'ny' must be positive integers."}), 400
+            n_cells = nx * ny
+        else:
+            n_fins = data.get('n_fins')
+            if not isinstance(n_fins, int) or n_fins <= 0:
+                return jsonify({"error": "Parameter 'n_fins' must be a positive integer."}), 400
+            if params['fin_thickness'] >= params['fin_pitch']:
+                return jsonify({"error": "'fin_thickness' must be smaller than 'fin_pitch'."}), 400
+            cell_size = data.get('cell_size', params['fin_thickness'] / 4)
+            if not isinstance(cell_size, (int, float)) or cell_size <= 0:
+                return jsonify({"error": "Parameter 'cell_size' must be a positive number."}), 400
+            n_cells = ((n_fins * params['fin_pitch'] / cell_size + 2 * n_fins + 1)
+                       * ((params['base_thickness'] + params['fin_length']) / cell_size + 3))
+        if n_cells > MAX_CELLS_2D:
+            return jsonify({"error": f"The grid must not exceed {MAX_CELLS_2D} cells."}), 400
+
+        _mark('validate')
+        if geometry == "plate_fin":
+            problem = build_plate_fin_2d(
+                **params, nx=nx, ny=ny, tip_convection=bool(data.get('tip_convection', False)), solver=solver
+            )
+        else:
+            problem = build_fin_array_2d(n_fins=n_fins, **params, cell_size=float(cell_size), solver=solver)
+        boundary_names = {"plate_fin": ("left", ["bottom", "top", "right"]), "fin_array": ("bottom", ["exposed"])}
+        base_side, ambient_sides = boundary_names[geometry]
+
+        results = problem.solve()
+        case_results = []
+        for case in cases:
+            temperatures = {base_side: case.get('T_base', params['T_base'])}
+            temperatures.update({side: case.get('T_inf', params['T_inf']) for side in ambient_sides})
+            case_results.append(problem.solve(temperatures))
+
+        metadata = {"solver": problem.solver, "n_cells": problem.n_cells}
+        if geometry == "plate_fin":
+            analytic = calculate_rectangular_fin_performance(
+                2 * params['depth'], params['thickness'] * params['depth'], params['L'], params['k'],
+                params['h_conv'], params['T_base'], params['T_inf'], n_points=2
+            )
+            metadata["analytic_heat_transfer_rate"] = analytic["heat_transfer_rate"]
+            metadata["analytic_fin_efficiency"] = analytic["fin_efficiency"]
+        _mark('compute')
+
+        if mimetype != JSON_MIMETYPE:
+            # Fluid cells stay NaN in the binary formats
+            arrays = {name: results[name] for name in ['x_coords', 'y_coords', 'temperature']}
+            arrays.update({f"cases.{i}.temperature": case["temperature"] for i, case in enumerate(case_results)})
+            scalars = ['heat_rates', 'heat_transfer_rate', 'efficiency']
+            metadata.update({name: results[name] for name in scalars})
+            metadata["cases"] = [{name: case[name] for name in scalars} for case in case_results]
+            return _array_response(mimetype, dtype, arrays, metadata), 200
+
+        response = {
+            "x_coords": results["x_coords"].tolist(),
+            "y_coords": results["y_coords"].tolist(),
+            **_conduction_2d_result(results),
+            **metadata,
+            "cases": [_conduction_2d_result(case) for case in case_results],
+        }
+        return _with_vary(jsonify(response)), 200
+
+    except TypeError as e: # Catches errors if data is not JSON or other type issues
+        return jsonify({"error": f"Invalid input type or data format: {str(e)}"}), 400
+    except Exception as e:
+        # Log the exception e for debugging
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+@bp.route('/solve', methods=['POST'])
+def solve_route():
+    try:
+        data = request.get_json()
+        _mark('parse')
+        if not data:
+            return jsonify({"error": "No input data provided"}), 400
+
+        problem, error = parse_solve_request(data)
+        if error:
+            return jsonify({"error": error}), 400
+        _mark('validate')
+
+        results = solve_inverse(**problem)
+        _mark('compute')
+        # Unsolved targets are NaN in the arrays and null in the response
+        def to_json(array):
+            return [None if np.isnan(v) else v for v in array.tolist()]
+        return jsonify({
+            "variable": problem["variable"],
+            "output": problem["output"],
+            "kind": problem["kind"],
+            "targets": problem["targets"].tolist(),
+            "value": to_json(results["value"]),
+            "outputs": {name: to_json(values) for name, values in results["outputs"].items()},
+            "feasible": results["feasible"],
+            "iterations": results["iterations"].tolist(),
+            "errors": results["errors"],
+        }), 200
+
+    except TypeError as e: # Catches errors if data is not JSON or other type issues
+        return jsonify({"error": f"Invalid input type or data format: {str(e)}"}), 400
+    except Exception as e:
+        # Log the exception e for debugging
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+@bp.route('/optimize', methods=['POST'])
+def optimize_route():
+    try:
+        data = request.get_json()
+        _mark('parse')
+        if not data:
+            return jsonify({"error": "No input data provided"}), 400
+
+        problem, error = parse_optimize_request(data)
+        if error:
+            return jsonify({"error": error}), 400
+        _mark('validate')
+
+        results = optimize(**problem)
+        _mark('compute')
+        return jsonify(results), 200
+
+    except ValueError as e: # Raised by the evaluators for invalid fixed inputs
+        return jsonify({"error": str(e)}), 400
+    except TypeError as e: # Catches errors if data is not JSON or other type issues
+        return jsonify({"error": f"Invalid input type or data format: {str(e)}"}), 400
+    except Exception as e:
+        # Log the exception e for debugging
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+@bp.route('/sweep', methods=['POST'])
+def sweep_route():
+    try:
+        data = request.get_json()
+        _mark('parse')
+        if not data:
+            return jsonify({"error": "No input data provided"}), 400
+
+        plan, error = parse_sweep_request(data)
+        if error:
+            return jsonify({"error": error}), 400
+        _mark('validate')
+
+        # Results are generated chunk by chunk while the response is being sent (not timed)
+        return Response(iter_sweep_ndjson(plan), mimetype="application/x-ndjson")
+
+    except TypeError as e: # Catches errors if data is not JSON or other type issues
+        return jsonify({"error": f"Invalid input type or data format: {str(e)}"}), 400
+    except Exception as e:
+        # Log the exception e for debugging
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+@bp.route('/uncertainty', methods=['POST'])
+def uncertainty_route():
+    try:
+        data = request.get_json()
+        _mark('parse')
+        if not data:
+            return jsonify({"error": "No input data provided"}), 400
+
+        plan, error = parse_uncertainty_request(data)
+        if error:
+            return jsonify({"error": error}), 400
+        _mark('validate')
+
+        if data.get('stream', False):
+            # Statistics every report_every samples, generated while the response is sent (not timed)
+            return Response(iter_uncertainty_ndjson(plan), mimetype="application/x-ndjson")
+        results = run_uncertainty(plan)
+        _mark('compute')
+        return jsonify(results), 200
+
+    except TypeError as e: # Catches errors if data is not JSON or other type issues
+        return jsonify({"error": f"Invalid input type or data format: {str(e)}"}), 400
+    except Exception as e:
+        # Log the exception e for debugging
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+@bp.route('/sensitivity', methods=['POST'])
+def sensitivity_route():
+    try:
+        data = request.get_json()
+        _mark('parse')
+        if not data:
+            return jsonify({"error": "No input data provided"}), 400
+
+        plan, error = parse_sensitivity_request(data)
+        if error:
+            return jsonify({"error": error}), 400
+        _mark('validate')
+
+        results = sensitivity_report(plan)
+        _mark('compute')
         return jsonify(results), 200
 
+    except ValueError as e: # Raised by the evaluators for invalid values in 'points'
+        return jsonify({"error": str(e)}), 400
     except TypeError as e: # Catches errors if data is not JSON or other type issues
         return jsonify({"error": f"Invalid input type or data format: {str(e)}"}), 400
     except Exception as e:
         # Log the exception e for debugging
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+# Mimetypes of the bulk result files
+BULK_MIMETYPES = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+@bp.route('/bulk', methods=['POST'])
+def bulk_route():
+    """
+    Evaluates an uploaded case file (multipart form: 'file', 'calculator' and optionally
+    'base' as a JSON object, 'input_format', 'output_format', 'chunk_rows', 'include_inputs')
+    and returns the results file. The run summary is in the X-Bulk-* response headers.
+    """
+    input_path = None
+    try:
+        upload = request.files.get('file')
+        _mark('parse')
+        if upload is None:
+            return jsonify({"error": "No input data provided"}), 400
+
+        form = request.form
+        try:
+            base = json.loads(form['base']) if form.get('base') else {}
+            chunk_rows = int(form.get('chunk_rows', DEFAULT_CHUNK_ROWS))
+        except ValueError:
+            return jsonify({"error": "Parameter 'base' must be a JSON object and 'chunk_rows' an integer."}), 400
+        output_format = form.get('output_format', 'csv')
+        if output_format not in BULK_FORMATS:
+            return jsonify({"error": f"Parameter 'output_format' must be one of: {', '.join(BULK_FORMATS)}."}), 400
+        # The upload is spooled to a file so it can be memory-mapped; the extension selects its format
+        fd, input_path = tempfile.mkstemp(suffix=os.path.splitext(upload.filename or "")[1].lower())
+        with os.fdopen(fd, "wb") as f:
+            upload.save(f)
+        plan, error = parse_bulk_request(form.get('calculator'), input_path, base, form.get('input_format') or None,
+                                         chunk_rows, form.get('include_inputs', '').lower() in ('1', 'true', 'yes'))
+        if error:
+            return jsonify({"error": error}), 400
+        _mark('validate')
+
+        fd, output_path = tempfile.mkstemp(suffix=f".{output_format}")
+        os.close(fd)
+        try:
+            summary = run_bulk(plan, output_path, output_format)
+            output = open(output_path, "rb") # Stays readable after the unlink below
+        finally:
+            os.remove(output_path)
+        _mark('compute')
+        stem = os.path.splitext(upload.filename or "cases")[0] or "cases"
+        response = send_file(output, mimetype=BULK_MIMETYPES[output_format], as_attachment=True,
+                             download_name=f"{stem}.results.{output_format}")
+        response.headers['X-Bulk-Rows'] = str(summary["rows"])
+        response.headers['X-Bulk-Failed-Rows'] = str(summary["failed_rows"])
+        response.headers['X-Bulk-Seconds'] = f"{summary['seconds']:.6f}"
+        response.headers['X-Bulk-Rows-Per-Second'] = f"{summary['rows_per_second'] or 0:.1f}"
+        return response, 200
+
+    except ValueError as e: # Raised by run_bulk for an unusable output format
+        return jsonify({"error": str(e)}), 400
+    except TypeError as e: # Catches errors if data is not JSON or other type issues
+        return jsonify({"error": f"Invalid input type or data format: {str(e)}"}), 400
+    except Exception as e:
+        # Log the exception e for debugging
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+    finally:
+        if input_path is not None:
+            os.remove(input_path)
+
+@bp.route('/sweep/parallel', methods=['POST'])
+def start_parallel_sweep_route():
+    try:
+        data = request.get_json()
+        _mark('parse')
+        if not data:
+            return jsonify({"error": "No input data provided"}), 400
+
+        workers = data.get('workers')
+        if workers is not None and (not isinstance(workers, int) or workers <= 0):
+            return jsonify({"error": "Parameter 'workers' must be a positive integer."}), 400
+        plan, error = parse_sweep_request(data)
+        if error:
+            return jsonify({"error": error}), 400
+        error = check_parallel_sweep(plan)
+        if error:
+            return jsonify({"error": error}), 400
+
+        sweep = _services()["sweep_registry"].start(plan, workers=workers)
+        return jsonify(sweep.progress()), 202
+
+    except TypeError as e: # Catches errors if data is not JSON or other type issues
+        return jsonify({"error": f"Invalid input type or data format: {str(e)}"}), 400
+    except Exception as e:
+        # Log the exception e for debugging
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+@bp.route('/sweep/parallel/<sweep_id>', methods=['GET'])
+def parallel_sweep_progress_route(sweep_id):
+    sweep = _services()["sweep_registry"].get(sweep_id)
+    if sweep is None:
+        return jsonify({"error": "Unknown sweep id."}), 404
+    return jsonify(sweep.progress()), 200
+
+@bp.route('/sweep/parallel/<sweep_id>/results', methods=['GET'])
+def parallel_sweep_results_route(sweep_id):
+    sweep = _services()["sweep_registry"].get(sweep_id)
+    if sweep is None:
+        return jsonify({"error": "Unknown sweep id."}), 404
+    if sweep.state != "completed" or not sweep.done:
+        return jsonify({"error": f"Sweep is {sweep.state}; results are available once it has completed."}), 409
+    return Response(iter_parallel_sweep_ndjson(sweep), mimetype="application/x-ndjson")
+
+@bp.route('/sweep/parallel/<sweep_id>', methods=['DELETE'])
+def cancel_parallel_sweep_route(sweep_id):
+    sweep = _services()["sweep_registry"].get(sweep_id)
+    if sweep is None:
+        return jsonify({"error": "Unknown sweep id."}), 404
+    progress = sweep.progress()
+    _services()["sweep_registry"].release(sweep_id)
+    progress["state"] = "cancelled" if progress["state"] in ["pending", "running"] else progress["state"]
+    return jsonify(progress), 200
+
+@bp.route('/cache/stats', methods=['GET'])
+def cache_stats_route():
+    result_cache = _services()["result_cache"]
+    if result_cache is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify({"enabled": True, **result_cache.stats()}), 200
+
+@bp.route('/cache', methods=['DELETE'])
+def clear_cache_route():
+    result_cache = _services()["result_cache"]
+    if result_cache is not None:
+        result_cache.clear()
+    return jsonify({"cleared": result_cache is not None}), 200
+
+@bp.route('/metrics', methods=['GET'])
+def metrics_route():
+    instrumentation = _services()["instrumentation"]
+    if instrumentation is None:
+        return jsonify({"error": "Instrumentation is disabled (THERMAL_METRICS=0)."}), 404
+    return Response(instrumentation.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+@bp.route('/profile', methods=['GET'])
+def profile_route():
+    instrumentation = _services()["instrumentation"]
+    if instrumentation is None:
+        return jsonify({"error": "Instrumentation is disabled (THERMAL_METRICS=0)."}), 404
+    if request.args.get('format', 'text') == 'pstats':
+        dump = instrumentation.profile_dump()
+        if dump is None:
+            return jsonify({"error": "No request has been profiled yet."}), 404
+        return Response(dump, mimetype="application/octet-stream",
+                        headers={"Content-Disposition": "attachment;filename=thermal.prof"})
+
+    sort = request.args.get('sort', 'cumulative')
+    if sort not in PROFILE_SORT_KEYS:
+        return jsonify({"error": f"Parameter 'sort' must be one of: {', '.join(PROFILE_SORT_KEYS)}."}), 400
+    limit = request.args.get('limit', 50, type=int)
+    text = instrumentation.profile_text(sort, limit)
+    if text is None:
+        return jsonify({"error": "No request has been profiled yet."}), 404
+    return Response(text, mimetype="text/plain")
+
+@bp.route('/profile', methods=['PUT'])
+def configure_profile_route():
+    instrumentation = _services()["instrumentation"]
+    if instrumentation is None:
+        return jsonify({"error": "Instrumentation is disabled (THERMAL_METRICS=0)."}), 404
+    data = request.get_json(silent=True)
+    rate = data.get('rate') if isinstance(data, dict) else None
+    if not isinstance(rate, (int, float)) or isinstance(rate, bool) or not 0 <= rate <= 1:
+        return jsonify({"error": "Parameter 'rate' must be a number between 0 and 1."}), 400
+    instrumentation.profile_rate = float(rate)
+    return jsonify({"rate": instrumentation.profile_rate, "profiled_requests": instrumentation.profiled_requests}), 200
+
+@bp.route('/profile', methods=['DELETE'])
+def clear_profile_route():
+    instrumentation = _services()["instrumentation"]
+    if instrumentation is None:
+        return jsonify({"error": "Instrumentation is disabled (THERMAL_METRICS=0)."}), 404
+    instrumentation.clear_profile()
+    return jsonify({"cleared": True}), 200
+
+@bp.route('/resistance_types', methods=['GET'])
+def resistance_types_route():
+    return jsonify({"types": RESISTANCE_TYPES}), 200
+
+@bp.route('/calculate_resistance_network', methods=['POST'])
+def calculate_resistance_network_route():
+    try:
+        data = request.get_json()
+        _mark('parse')
+        if not data:
+            return jsonify({"error": "No input data provided"}), 400
+
+        problem, error = parse_resistance_network_request(data)
+        if error:
+            return jsonify({"error": error}), 400
+        mimetype, dtype, error = _response_format()
+        if error:
+            return jsonify({"error": error}), 406
+        try:
+            network = ResistanceNetwork(**problem["network"])
+        except ValueError as e: # Nodes without a path to a fixed temperature
+            return jsonify({"error": str(e)}), 400
+
+        _mark('validate')
+        results = network.solve(problem["temperatures"], problem["sources"])
+        # Further temperatures and sources solved with the same factorization
+        case_results = [network.solve(temperatures, sources) for temperatures, sources in problem["cases"]]
+        _mark('compute')
+
+        names = problem["names"]
+        fixed_names = [names[i] for i in problem["network"]["fixed_nodes"]]
+        def summary(result):
+            return {"fixed_heat_rates": dict(zip(fixed_names, result["fixed_heat_rates"].tolist())),
+                    "energy_balance": result["energy_balance"]}
+
+        if mimetype != JSON_MIMETYPE:
+            arrays = {"temperature": results["temperature"], "heat_flow": results["heat_flow"]}
+            for i, case in enumerate(case_results):
+                arrays.update({f"cases.{i}.temperature": case["temperature"], f"cases.{i}.heat_flow": case["heat_flow"]})
+            metadata = {"nodes": names, **summary(results), "cases": [summary(case) for case in case_results]}
+            return _array_response(mimetype, dtype, arrays, metadata), 200
+
+        def result_json(result):
+            return {"temperature": result["temperature"].tolist(), "heat_flow": result["heat_flow"].tolist(),
+                    **summary(result)}
+        response = {"nodes": names, **result_json(results), "cases": [result_json(case) for case in case_results]}
+        return _with_vary(jsonify(response)), 200
+
+    except TypeError as e: # Catches errors if data is not JSON or other type issues
+        return jsonify({"error": f"Invalid input type or data format: {str(e)}"}), 400
+    except Exception as e:
+        # Log the exception e for debugging
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+# Job kinds accepted by POST /jobs and the routes that run them. A job replays the request
+# through the route in a worker thread, so validation and results match the synchronous call,
+# and spools the response body to a file as the route streams it. The kinds in
+# JOB_PROCESS_KINDS replay it in a job process with its own application instead.
+JOB_ROUTES = {
+    "fin": "/calculate_fin",
+    "fin_batch": "/calculate_fin/batch",
+    "fin_model": "/calculate_fin_model",
+    "heat_exchanger": "/calculate_heat_exchanger",
+    "heat_exchanger_batch": "/calculate_heat_exchanger/batch",
+    "heat_exchanger_properties": "/calculate_heat_exchanger/properties",
+    "composite_wall": "/calculate_composite_wall",
+    "composite_wall_batch": "/calculate_composite_wall/batch",
+    "composite_wall_properties": "/calculate_composite_wall/properties",
+    "fin_transient": "/calculate_fin_transient",
+    "wall_transient": "/calculate_wall_transient",
+    "conduction_2d": "/calculate_conduction_2d",
+    "resistance_network": "/calculate_resistance_network",
+    "solve": "/solve",
+    "optimize": "/optimize",
+    "sweep": "/sweep",
+    "uncertainty": "/uncertainty",
+    "sensitivity": "/sensitivity",
+    "pdf": "/export_pdf",
+    "report": "/export_report",
+}
+
+# Kinds whose work is mostly Python (array-to-JSON encoding, PDF layout, solver loops)
+JOB_PROCESS_KINDS = [
+    "fin_batch", "heat_exchanger_batch", "composite_wall_batch", "fin_transient", "wall_transient",
+    "conduction_2d", "solve", "optimize", "sweep", "uncertainty", "sensitivity", "pdf", "report",
+]
+
+_job_process_app = None # The application of a job process, created on its first job
+
+def _run_job(app, kind, payload, path, max_bytes):
+    with app.test_client() as client:
+        response = client.post(JOB_ROUTES[kind], json=payload)
+        try:
+            size = spool_response(response.iter_encoded(), path, max_bytes)
+        finally:
+            response.close()
+        return response.status_code, response.mimetype, size
+
+def _run_job_in_process(kind, payload, path, max_bytes):
+    """Job process entry point (see JobQueue); jobs never run nested jobs, so it has no process pool."""
+    global _job_process_app
+    if _job_process_app is None:
+        _job_process_app = create_app({"THERMAL_CACHE_BACKEND": "none", "THERMAL_METRICS": "0",
+                                       "THERMAL_JOB_STORE": "memory", "THERMAL_JOB_PROCESSES": "0"})
+    return _run_job(_job_process_app, kind, payload, path, max_bytes)
+
+def _job_links(job):
+    return {**describe_job(job), "status_url": f"/jobs/{job['id']}", "result_url": f"/jobs/{job['id']}/result"}
+
+@bp.route('/jobs', methods=['POST'])
+def submit_job_route():
+    job_queue = _services()["job_queue"]
+    try:
+        data = request.get_json()
+        _mark('parse')
+        if not data:
+            return jsonify({"error": "No input data provided"}), 400
+
+        kind = data.get('kind')
+        if kind not in JOB_ROUTES:
+            return jsonify({"error": f"Parameter 'kind' must be one of: {', '.join(JOB_ROUTES)}."}), 400
+        payload = data.get('payload')
+        if not isinstance(payload, dict):
+            return jsonify({"error": "Parameter 'payload' must be a dictionary (the body of the synchronous request)."}), 400
+
+        job = job_queue.submit(kind, payload)
+        return jsonify(_job_links(job)), 202
+
+    except TypeError as e: # Catches errors if data is not JSON or other type issues
+        return jsonify({"error": f"Invalid input type or data format: {str(e)}"}), 400
+    except Exception as e:
+        # Log the exception e for debugging
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+@bp.route('/jobs/<job_id>', methods=['GET'])
+def job_status_route(job_id):
+    job_queue = _services()["job_queue"]
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job id."}), 404
+    return jsonify(_job_links(job)), 200
+
+@bp.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result_route(job_id):
+    job_queue = _services()["job_queue"]
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job id."}), 404
+    if job["status"] in ["queued", "running"]:
+        return jsonify({"error": f"Job is {job['status']}.", **_job_links(job)}), 409
+    if job["result_path"] is None: # Cancelled, too large, or the worker itself failed
+        return jsonify({"error": job["error"] or f"Job is {job['status']}."}), job["status_code"] or 410
+    try:
+        response = send_file(job["result_path"], mimetype=job["mimetype"], conditional=False)
+    except FileNotFoundError: # Removed with the oldest jobs
+        return jsonify({"error": "The job result is no longer available."}), 410
+
+    response.status_code = job["status_code"]
+    if job["mimetype"] == "application/pdf":
+        response.headers["Content-Disposition"] = "attachment;filename=thermal_report.pdf"
+    return response
+
+@bp.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job_route(job_id):
+    job_queue = _services()["job_queue"]
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job id."}), 404
+    if not job_queue.cancel(job_id):
+        return jsonify({"error": f"Job is {job['status']} and can no longer be cancelled."}), 409
+    return jsonify(_job_links(job_queue.get(job_id))), 200
+
+@bp.route('/healthz', methods=['GET'])
+def health_route():
+    return jsonify({"status": "ok", "pid": os.getpid()}), 200
+
+@bp.route('/readyz', methods=['GET'])
+def ready_route():
+    services = _services()
+    body = {"ready": services["ready"], "pid": os.getpid(), **services["startup"]}
+    return jsonify(body), 200 if services["ready"] else 503
+
+def _register_request_timing(app, instrumentation):
+    @app.before_request
+    def _start_request_timing():
+        if request.endpoint in UNTIMED_ENDPOINTS:
+            return
+        rule = request.url_rule
+        instrumentation.start(rule.rule if rule is not None else "<unmatched>", request.method)
+
+    @app.after_request
+    def _finish_request_timing(response):
+        instrumentation.finish(response.status_code)
+        return response
+
+    @app.teardown_request
+    def _discard_request_timing(exc):
+        instrumentation.discard()
+
+def create_app(config=None, ready=True):
+    """
+    Creates the Flask application with its own result cache, instrumentation, job queue
+    and parallel sweep registry.
+
+    Args:
+        config (Mapping, optional): Configuration read by create_result_cache,
+                                    create_instrumentation, create_job_queue and
+                                    create_sweep_registry (default os.environ).
+        ready (bool, optional): Initial /readyz state. The prefork server (app.server)
+                                passes False and sets it once the worker is warmed up.
+
+    Returns:
+        Flask: The application.
+    """
+    app = Flask(__name__)
+    instrumentation = create_instrumentation(config)
+    app.extensions["thermal"] = {
+        "result_cache": create_result_cache(config),
+        "instrumentation": instrumentation,
+        "job_queue": create_job_queue(lambda *job: _run_job(app, *job), JOB_ROUTES, config,
+                                      process_runner=_run_job_in_process, process_kinds=JOB_PROCESS_KINDS),
+        "sweep_registry": create_sweep_registry(config),
+        "ready": ready,
+        "startup": {}, # Cold-start measurements reported by /readyz
+        "created": time.time(),
+    }
+    if instrumentation is not None:
+        _register_request_timing(app, instrumentation)
+    app.register_blueprint(bp)
+    return app
+
+
+if __name__ == '__main__':
+    # Development server; see app.server for the multi-process production mode
+    create_app().run(debug=True)
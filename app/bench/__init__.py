@@ -0,0 +1,136 @@
+import fnmatch
+import platform
+import statistics
+import time
+import numpy as np
+
+# Micro-benchmark harness for the calculators (python -m app.bench). A benchmark is a
+# setup function returning (callable, items): the callable is timed, items is the number
+# of results one call produces (rows of a batch, points of a profile), so throughput can
+# be compared across batch sizes. Results are plain dicts that are written as JSON and
+# can be stored as a baseline for later runs.
+
+BENCHMARKS = {} # name -> {"group", "setup", "params"}
+DEFAULT_THRESHOLD = 0.25 # Slowdown ratio above baseline reported as a regression
+
+
+def benchmark(name, group, **params):
+    """Registers a benchmark setup function: setup(**params) -> (callable, items)."""
+    def register(setup):
+        BENCHMARKS[name] = {"group": group, "setup": setup, "params": params}
+        return setup
+    return register
+
+
+def matches(name, patterns):
+    """True if the benchmark name or its group matches one of the fnmatch patterns (or none are given)."""
+    if not patterns:
+        return True
+    group = BENCHMARKS[name]["group"] if name in BENCHMARKS else None
+    return any(fnmatch.fnmatch(name, p) or (group and fnmatch.fnmatch(group, p)) for p in patterns)
+
+
+def measure(fn, min_time=0.2, repeat=5):
+    """
+    Times fn() like timeit.Timer.autorange: the call count per repeat is raised until one
+    repeat takes at least min_time / repeat seconds.
+
+    Returns:
+        dict: per_call (median over repeats, s), best (fastest repeat, s), number, repeat.
+    """
+    fn() # Warm-up (imports, caches, first-touch allocations)
+    number = 1
+    target = min_time / repeat
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= target or number >= 1 << 20:
+            break
+        number *= 10 if elapsed < target / 10 else 2
+
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - start) / number)
+    return {"per_call": statistics.median(timings), "best": min(timings), "number": number, "repeat": repeat}
+
+
+def run_benchmarks(patterns=None, min_time=0.2, repeat=5, progress=None):
+    """
+    Runs the registered benchmarks.
+
+    Args:
+        patterns (list, optional): fnmatch patterns on benchmark names or groups; all if empty.
+        min_time (float, optional): Approximate time spent per benchmark (s).
+        repeat (int, optional): Timed repeats per benchmark.
+        progress (callable, optional): progress(name) called before each benchmark.
+
+    Returns:
+        dict: {"environment": {...}, "results": {name: {...}}}.
+    """
+    results = {}
+    for name, spec in BENCHMARKS.items():
+        if not matches(name, patterns):
+            continue
+        if progress:
+            progress(name)
+        fn, items = spec["setup"](**spec["params"])
+        timing = measure(fn, min_time=min_time, repeat=repeat)
+        results[name] = {
+            "group": spec["group"],
+            "params": spec["params"],
+            "items": items,
+            **timing,
+            "items_per_second": items / timing["per_call"] if timing["per_call"] > 0 else None,
+        }
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "timestamp": time.time(),
+        },
+        "results": results,
+    }
+
+
+def compare_to_baseline(report, baseline, threshold=DEFAULT_THRESHOLD, thresholds=None):
+    """
+    Compares per-call times against a stored report.
+
+    Args:
+        report (dict): Output of run_benchmarks.
+        baseline (dict): An earlier output of run_benchmarks.
+        threshold (float, optional): Allowed relative slowdown (0.25 = 25 % slower).
+        thresholds (dict, optional): fnmatch pattern -> threshold overriding the default
+                                     for matching benchmark names (first match wins).
+
+    Returns:
+        list: One entry per benchmark with name, baseline and current per_call, ratio
+              (current / baseline) and status "ok", "regression", "improved", "new" or "missing".
+    """
+    thresholds = thresholds or {}
+    comparison = []
+    current, previous = report["results"], baseline.get("results", {})
+    for name in list(current) + [n for n in previous if n not in current]:
+        if name not in previous or name not in current:
+            comparison.append({"name": name, "status": "new" if name in current else "missing",
+                               "baseline": previous.get(name, {}).get("per_call"),
+                               "current": current.get(name, {}).get("per_call"), "ratio": None})
+            continue
+        limit = next((t for pattern, t in thresholds.items() if fnmatch.fnmatch(name, pattern)), threshold)
+        ratio = current[name]["per_call"] / previous[name]["per_call"]
+        if ratio > 1 + limit:
+            status = "regression"
+        elif ratio < 1 / (1 + limit):
+            status = "improved"
+        else:
+            status = "ok"
+        comparison.append({"name": name, "status": status, "baseline": previous[name]["per_call"],
+                           "current": current[name]["per_call"], "ratio": ratio, "threshold": limit})
+    return comparison
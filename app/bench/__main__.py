@@ -0,0 +1,84 @@
+import argparse
+import json
+import os
+import sys
+
+# Route benchmarks must hit the calculators, not the result cache; set before app.app is imported
+os.environ.setdefault("THERMAL_CACHE_BACKEND", "none")
+
+from app.bench import BENCHMARKS, DEFAULT_THRESHOLD, matches, run_benchmarks, compare_to_baseline # noqa: E402
+import app.bench.cases # noqa: E402,F401 (registers the benchmarks)
+
+
+def _threshold_override(text):
+    pattern, _, value = text.rpartition("=")
+    try:
+        return pattern, float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected PATTERN=RATIO, got '{text}'")
+
+
+def main(argv=None):
+    """Command line entry point: python -m app.bench [--filter PATTERN] [--baseline FILE]."""
+    parser = argparse.ArgumentParser(
+        prog="python -m app.bench",
+        description="Benchmark the calculators, routes and PDF export and compare with a stored baseline."
+    )
+    parser.add_argument("--filter", action="append", default=[],
+                        help="Run benchmarks whose name or group matches this fnmatch pattern (repeatable).")
+    parser.add_argument("--list", action="store_true", help="List the benchmarks and exit.")
+    parser.add_argument("--quick", action="store_true", help="Shorter timing (noisier results).")
+    parser.add_argument("--min-time", type=float, default=None, help="Seconds spent per benchmark (default 0.5).")
+    parser.add_argument("--repeat", type=int, default=None, help="Timed repeats per benchmark (default 5).")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file instead of stdout.")
+    parser.add_argument("--save-baseline", default=None, help="Also write the report to this baseline file.")
+    parser.add_argument("--baseline", default=None, help="Compare with a report written by an earlier run.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Allowed relative slowdown before a regression is reported (default {DEFAULT_THRESHOLD}).")
+    parser.add_argument("--threshold-for", type=_threshold_override, action="append", default=[],
+                        metavar="PATTERN=RATIO", help="Threshold for benchmarks matching PATTERN (repeatable).")
+    parser.add_argument("--quiet", action="store_true", help="Do not print progress to stderr.")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, spec in BENCHMARKS.items():
+            print(f"{spec['group']:10} {name}")
+        return 0
+
+    min_time = args.min_time or (0.1 if args.quick else 0.5)
+    repeat = args.repeat or (3 if args.quick else 5)
+    progress = None if args.quiet else (lambda name: print(f"running {name}", file=sys.stderr))
+    report = run_benchmarks(args.filter, min_time=min_time, repeat=repeat, progress=progress)
+    if not report["results"]:
+        print("error: no benchmark matches the filter", file=sys.stderr)
+        return 2
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        # Benchmarks left out by --filter are not reported as missing
+        baseline["results"] = {name: entry for name, entry in baseline.get("results", {}).items()
+                               if matches(name, args.filter)}
+        report["comparison"] = compare_to_baseline(report, baseline, args.threshold, dict(args.threshold_for))
+        regressions = [entry for entry in report["comparison"] if entry["status"] == "regression"]
+        if not args.quiet:
+            for entry in report["comparison"]:
+                ratio = f"{entry['ratio']:.2f}x" if entry["ratio"] is not None else "-"
+                print(f"{entry['status']:10} {ratio:>8} {entry['name']}", file=sys.stderr)
+        status = 1 if regressions else 0
+
+    text = json.dumps(report, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,332 @@
+import atexit
+import os
+import shutil
+import tempfile
+import numpy as np
+from app.bench import benchmark
+from app.fin_calculator import calculate_rectangular_fin_performance, calculate_rectangular_fin_performance_batch
+from app.heat_exchanger_calculator import (
+    calculate_heat_exchanger_performance, calculate_heat_exchanger_performance_batch
+)
+from app.composite_wall_calculator import (
+    calculate_composite_wall_performance, calculate_composite_wall_performance_batch, layers_to_csr
+)
+from app.exchanger_configurations import get_exchanger_tables, exchanger_effectiveness, exchanger_ntu
+from app.fin_models import get_fin_tables, evaluate_fin_model
+from app.properties import get_property_database
+from app.resistance_network import ResistanceNetwork
+from app.uncertainty import parse_uncertainty_request, run_uncertainty, SAMPLING_METHODS
+from app.bulk import parse_bulk_request, run_bulk
+from app.pdf_generator import generate_thermal_report_pdf
+from app.pdf_report import iter_report_pdf
+
+# The benchmark cases. Inputs are fixed (or drawn from a seeded generator) so runs on the
+# same machine are comparable with a stored baseline. Route benchmarks go through Flask's
+# test client, so they include request parsing, validation and JSON / binary encoding;
+# run them with THERMAL_CACHE_BACKEND=none (the CLI does) or they time cache hits.
+
+FIN_INPUTS = {"P": 0.04, "Ac": 1e-4, "L": 0.05, "k": 200.0, "h_conv": 25.0, "T_base": 373.15, "T_inf": 298.15}
+HX_INPUTS = {"m_dot_hot": 0.5, "Cp_hot": 4180.0, "T_in_hot": 363.15, "m_dot_cold": 0.8, "Cp_cold": 4180.0,
+             "T_in_cold": 288.15, "UA": 2500.0, "flow_type": "counterflow"}
+WALL_INPUTS = {
+    "layers": [{"thickness": 0.012, "k_value": 0.17, "area": 10.0},
+               {"thickness": 0.1, "k_value": 0.04, "area": 10.0},
+               {"thickness": 0.1, "k_value": 0.72, "area": 10.0}],
+    "T_inner": 293.15,
+    "T_outer": 263.15,
+}
+
+BATCH_SIZES = [1, 100, 10000, 100000]
+PROFILE_POINTS = [10, 1000, 100000]
+REPORT_ROWS = [10, 100, 1000]
+TABLE_REPORT_ROWS = [1000, 10000]
+
+
+def _fin_columns(n, rng):
+    return {
+        "P": rng.uniform(0.01, 0.1, n), "Ac": rng.uniform(1e-5, 1e-3, n), "L": rng.uniform(0.01, 0.2, n),
+        "k": rng.uniform(15.0, 400.0, n), "h_conv": rng.uniform(5.0, 200.0, n),
+        "T_base": rng.uniform(320.0, 500.0, n), "T_inf": np.full(n, 298.15),
+    }
+
+
+def _hx_columns(n, rng):
+    return {
+        "m_dot_hot": rng.uniform(0.1, 2.0, n), "Cp_hot": rng.uniform(1000.0, 4200.0, n),
+        "T_in_hot": rng.uniform(340.0, 450.0, n), "m_dot_cold": rng.uniform(0.1, 2.0, n),
+        "Cp_cold": rng.uniform(1000.0, 4200.0, n), "T_in_cold": rng.uniform(280.0, 320.0, n),
+        "UA": rng.uniform(100.0, 10000.0, n), "flow_type": rng.choice(["parallel", "counterflow"], n),
+    }
+
+
+def _walls(n, rng):
+    return [[{"thickness": float(t), "k_value": float(k), "area": 10.0}
+             for t, k in zip(rng.uniform(0.005, 0.2, layers), rng.uniform(0.03, 1.5, layers))]
+            for layers in rng.integers(1, 6, n)]
+
+
+# Per-call latency of the scalar calculators
+
+@benchmark("fin.scalar", "latency")
+def fin_scalar():
+    return lambda: calculate_rectangular_fin_performance(**FIN_INPUTS), 1
+
+
+@benchmark("heat_exchanger.scalar", "latency")
+def heat_exchanger_scalar():
+    return lambda: calculate_heat_exchanger_performance(**HX_INPUTS), 1
+
+
+@benchmark("composite_wall.scalar", "latency")
+def composite_wall_scalar():
+    return lambda: calculate_composite_wall_performance(**WALL_INPUTS), 1
+
+
+# Batch throughput vs. batch size (items = rows)
+
+for _n in BATCH_SIZES:
+    @benchmark(f"fin.batch[n={_n}]", "batch", n=_n)
+    def fin_batch(n):
+        columns = _fin_columns(n, np.random.default_rng(0))
+        return lambda: calculate_rectangular_fin_performance_batch(**columns, include_profiles=False), n
+
+    @benchmark(f"heat_exchanger.batch[n={_n}]", "batch", n=_n)
+    def heat_exchanger_batch(n):
+        columns = _hx_columns(n, np.random.default_rng(0))
+        return lambda: calculate_heat_exchanger_performance_batch(**columns), n
+
+    @benchmark(f"composite_wall.batch[n={_n}]", "batch", n=_n)
+    def composite_wall_batch(n):
+        csr = layers_to_csr(_walls(n, np.random.default_rng(0)))
+        return lambda: calculate_composite_wall_performance_batch(**csr, T_inner=293.15, T_outer=263.15), n
+
+
+# Fin temperature profile vs. n_points (items = profile points)
+
+for _n in PROFILE_POINTS:
+    @benchmark(f"fin.profile[n_points={_n},lists]", "profile", n_points=_n)
+    def fin_profile_lists(n_points):
+        return lambda: calculate_rectangular_fin_performance(**FIN_INPUTS, n_points=n_points), n_points
+
+    @benchmark(f"fin.profile[n_points={_n},arrays]", "profile", n_points=_n)
+    def fin_profile_arrays(n_points):
+        return lambda: calculate_rectangular_fin_performance(**FIN_INPUTS, n_points=n_points, as_arrays=True), n_points
+
+
+@benchmark("fin.profile[adaptive,max_error=0.01]", "profile", max_error=0.01)
+def fin_profile_adaptive(max_error):
+    points = len(calculate_rectangular_fin_performance(**FIN_INPUTS, max_error=max_error)["x_coords"])
+    return lambda: calculate_rectangular_fin_performance(**FIN_INPUTS, max_error=max_error, as_arrays=True), points
+
+
+# Bessel-based fin models: lookup tables vs. exact evaluation (items = fins)
+
+def _annular_columns(n, rng):
+    r_inner = rng.uniform(0.005, 0.02, n)
+    return {
+        "r_inner": r_inner, "r_outer": r_inner * rng.uniform(1.5, 4.0, n), "thickness": rng.uniform(5e-4, 3e-3, n),
+        "k": rng.uniform(15.0, 400.0, n), "h_conv": rng.uniform(5.0, 200.0, n),
+        "T_base": rng.uniform(320.0, 500.0, n), "T_inf": np.full(n, 298.15),
+    }
+
+
+for _exact in [False, True]:
+    @benchmark(f"fin_model.annular[n=10000,{'exact' if _exact else 'table'}]", "batch", exact=_exact)
+    def fin_model_annular(exact):
+        get_fin_tables() # Built once per process; not part of the timing
+        columns = _annular_columns(10000, np.random.default_rng(0))
+        return lambda: evaluate_fin_model("annular", columns, exact=exact), 10000
+
+
+# Cross-flow (both unmixed) effectiveness: lookup table vs. series, and the inverse (items = rows)
+
+for _exact in [False, True]:
+    @benchmark(f"exchanger.crossflow_unmixed[n=10000,{'exact' if _exact else 'table'}]", "batch", exact=_exact)
+    def exchanger_crossflow_unmixed(exact):
+        get_exchanger_tables()
+        rng = np.random.default_rng(0)
+        NTU, Cr = rng.uniform(0.0, 10.0, 10000), rng.uniform(0.0, 1.0, 10000)
+        return lambda: exchanger_effectiveness("crossflow_unmixed", NTU, Cr, exact=exact), 10000
+
+
+@benchmark("exchanger.crossflow_unmixed.ntu[n=10000]", "batch")
+def exchanger_crossflow_unmixed_ntu():
+    get_exchanger_tables()
+    rng = np.random.default_rng(0)
+    effectiveness, Cr = rng.uniform(0.0, 0.9, 10000), rng.uniform(0.0, 1.0, 10000)
+    return lambda: exchanger_ntu("crossflow_unmixed", effectiveness, Cr), 10000
+
+
+# Property lookups on the memory-mapped tables (items = temperatures)
+
+@benchmark("properties.lookup[n=100000]", "batch", n=100000)
+def properties_lookup(n):
+    database = get_property_database()
+    T = np.random.default_rng(0).uniform(250.0, 900.0, n)
+    return lambda: database.lookup("air", "k", T), n
+
+
+# Resistance network on a 316 x 316 grid of nodes, one edge held fixed (items = nodes)
+
+def _grid_network(n):
+    index = np.arange(n * n).reshape(n, n)
+    node_from = np.concatenate([index[:, :-1].ravel(), index[:-1, :].ravel()])
+    node_to = np.concatenate([index[:, 1:].ravel(), index[1:, :].ravel()])
+    resistance = np.random.default_rng(0).uniform(0.5, 2.0, len(node_from))
+    return node_from, node_to, resistance, index[:, 0]
+
+
+@benchmark("network.factorize[n=100000]", "batch")
+def network_factorize():
+    node_from, node_to, resistance, fixed = _grid_network(316)
+    return lambda: ResistanceNetwork(316 * 316, node_from, node_to, resistance, fixed), 316 * 316
+
+
+@benchmark("network.resolve[n=100000]", "batch")
+def network_resolve():
+    node_from, node_to, resistance, fixed = _grid_network(316)
+    network = ResistanceNetwork(316 * 316, node_from, node_to, resistance, fixed)
+    sources = np.full(316 * 316, 0.01)
+    return lambda: network.solve(np.full(len(fixed), 300.0), sources), 316 * 316
+
+
+# Monte Carlo uncertainty propagation through the fin kernel (items = samples)
+
+for _sampling in SAMPLING_METHODS:
+    @benchmark(f"uncertainty.fin[{_sampling},n=1000000]", "batch", sampling=_sampling)
+    def uncertainty_fin(sampling):
+        plan, _ = parse_uncertainty_request({
+            "calculator": "fin", "base": FIN_INPUTS, "samples": 1000000, "sampling": sampling, "seed": 0,
+            "distributions": {"h_conv": {"type": "normal", "mean": 25.0, "std": 3.0},
+                              "k": {"type": "triangular", "low": 180.0, "mode": 200.0, "high": 230.0}},
+        })
+        return lambda: run_uncertainty(plan), 1000000
+
+
+# Batch kernels with analytic gradients of every output (items = rows; compare with *.batch)
+
+@benchmark("fin.gradients[n=100000]", "batch", n=100000)
+def fin_gradients(n):
+    columns = _fin_columns(n, np.random.default_rng(0))
+    return lambda: calculate_rectangular_fin_performance_batch(**columns, include_profiles=False, gradients=True), n
+
+
+@benchmark("heat_exchanger.gradients[n=100000]", "batch", n=100000)
+def heat_exchanger_gradients(n):
+    columns = _hx_columns(n, np.random.default_rng(0))
+    return lambda: calculate_heat_exchanger_performance_batch(**columns, gradients=True), n
+
+
+@benchmark("composite_wall.gradients[n=100000]", "batch", n=100000)
+def composite_wall_gradients(n):
+    csr = layers_to_csr(_walls(n, np.random.default_rng(0)))
+    return lambda: calculate_composite_wall_performance_batch(**csr, T_inner=293.15, T_outer=263.15, gradients=True), n
+
+
+# Bulk case-file pipeline: chunked parse, validation, evaluation and CSV output (items = rows)
+
+@benchmark("bulk.csv[fin,rows=100000]", "batch", rows=100000)
+def bulk_csv_fin(rows):
+    directory = tempfile.mkdtemp(prefix="thermal-bench-")
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    cases = os.path.join(directory, "cases.csv")
+    columns = _fin_columns(rows, np.random.default_rng(0))
+    np.savetxt(cases, np.column_stack(list(columns.values())), delimiter=",", header=",".join(columns), comments="")
+    plan, _ = parse_bulk_request("fin", cases)
+    return lambda: run_bulk(plan, os.path.join(directory, "results.csv")), rows
+
+
+# Route latency through the Flask test client
+
+_app = None
+
+
+def _post(path, body, accept=None):
+    global _app
+    if _app is None:
+        from app import create_app
+        _app = create_app() # Created here so kernel-only runs do not load Flask
+    client = _app.test_client()
+    headers = {"Accept": accept} if accept else None
+
+    def call():
+        response = client.post(path, json=body, headers=headers)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return response.get_data()
+    return call
+
+
+@benchmark("route.calculate_fin[n_points=100]", "route")
+def route_fin():
+    return _post("/calculate_fin", dict(FIN_INPUTS, n_points=100)), 1
+
+
+for _n in [10000, 100000]:
+    @benchmark(f"route.calculate_fin[n_points={_n},json]", "route", n_points=_n)
+    def route_fin_json(n_points):
+        return _post("/calculate_fin", dict(FIN_INPUTS, n_points=n_points)), n_points
+
+    @benchmark(f"route.calculate_fin[n_points={_n},octet]", "route", n_points=_n)
+    def route_fin_octet(n_points):
+        return _post("/calculate_fin", dict(FIN_INPUTS, n_points=n_points), "application/octet-stream"), n_points
+
+
+@benchmark("route.calculate_heat_exchanger", "route")
+def route_heat_exchanger():
+    return _post("/calculate_heat_exchanger", HX_INPUTS), 1
+
+
+@benchmark("route.calculate_composite_wall", "route")
+def route_composite_wall():
+    return _post("/calculate_composite_wall", WALL_INPUTS), 1
+
+
+@benchmark("route.calculate_fin_batch[n=10000]", "route", n=10000)
+def route_fin_batch(n):
+    columns = {name: values.tolist() for name, values in _fin_columns(n, np.random.default_rng(0)).items()}
+    return _post("/calculate_fin/batch", dict(columns, include_profiles=False)), n
+
+
+# PDF report generation vs. report size (items = input + output rows)
+
+def _report(rows):
+    return {
+        "calculator_name": "Benchmark Report",
+        "inputs": [[f"input_{i}", 0.1 * i] for i in range(rows // 2)],
+        "outputs": [[f"output_{i}", 1.5 * i] for i in range(rows - rows // 2)],
+        "notes": "Generated by python -m app.bench.",
+    }
+
+
+for _rows in REPORT_ROWS:
+    @benchmark(f"pdf.report[rows={_rows}]", "pdf", rows=_rows)
+    def pdf_report(rows):
+        report = _report(rows)
+        return lambda: generate_thermal_report_pdf(report), rows
+
+
+# Streaming table report (items = table rows), with a fin profile plot
+
+for _rows in TABLE_REPORT_ROWS:
+    @benchmark(f"pdf.table_report[rows={_rows}]", "pdf", rows=_rows)
+    def pdf_table_report(rows):
+        profile = calculate_rectangular_fin_performance(**FIN_INPUTS, n_points=1000)
+        columns = _fin_columns(rows, np.random.default_rng(0))
+        results = calculate_rectangular_fin_performance_batch(**columns, include_profiles=False)
+        table = [list(row) for row in zip(*(values.tolist() for values in columns.values()),
+                                          results["heat_transfer_rate"].tolist(), results["fin_efficiency"].tolist())]
+
+        def generate():
+            report = {
+                "calculator_name": "Fin Batch Report",
+                "plots": [{"x": profile["x_coords"], "y": profile["temp_dist"], "title": "Fin temperature profile"}],
+                "table": {"columns": list(columns) + ["heat_transfer_rate", "fin_efficiency"], "rows": iter(table)},
+            }
+            return sum(len(chunk) for chunk in iter_report_pdf(report))
+        return generate, rows
+
+
+@benchmark("route.export_pdf[rows=100]", "route", rows=100)
+def route_export_pdf(rows):
+    return _post("/export_pdf", _report(rows)), rows
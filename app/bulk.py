@@ -0,0 +1,501 @@
+import argparse
+import csv
+import json
+import mmap
+import os
+import re
+import sys
+import time
+import numpy as np
+from app.sweep import SWEEP_CALCULATORS, _to_json_column
+from app.composite_wall_calculator import calculate_composite_wall_performance_batch
+from app.validation import FIN_PARAMS, HEAT_EXCHANGER_PARAMS, WALL_LAYER_PARAMS, validate_composite_wall_columns
+
+try: # Optional: Parquet case files
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Bulk evaluation of case files: one row per case, one column per route input (named as in
+# the JSON bodies; composite walls use 'layers.0.thickness', 'layers.0.k_value', ... as in
+# /sweep, and a wall ends at its first empty layer). The file is read chunk by chunk, each
+# chunk is validated column-wise with the rules of the single-point routes and evaluated with
+# one batch kernel call, and its results are appended to the output file before the next
+# chunk is read, so memory depends on the chunk size, not on the file size.
+#
+# CSV input is memory-mapped: chunk boundaries are found by scanning the mapping for line
+# ends, and clean chunks are parsed by one np.loadtxt call into a structured array. A chunk
+# with empty or non-numeric cells is re-read as text and converted per column, and one with
+# a wrong number of fields per row falls back to the csv module, so bad rows get their own
+# error. Parquet files are read by row batches from a memory map (needs pyarrow).
+#
+# The output has the row number (0-based data row), the outputs and an 'error' column (empty
+# for valid rows; outputs are empty for rows with an error), and optionally the inputs. Text
+# output is bound by float formatting (about 1.5 us per value), so the inputs, which are
+# already in the case file, are only written back on request.
+
+BULK_FORMATS = ["csv", "parquet"]
+DEFAULT_CHUNK_ROWS = 65536
+MAX_CHUNK_ROWS = 1048576
+MAX_ERROR_EXAMPLES = 5
+TEXT_WIDTH = 64 # Characters kept per text cell (flow_type names are shorter)
+
+LAYER_COLUMN = re.compile(r"layers\.(\d+)\.(\w+)$")
+
+
+def _evaluate_with_sweep(calculator):
+    def evaluate(plan, columns, missing):
+        return SWEEP_CALCULATORS[calculator]["evaluate"](plan["base"], columns)
+    return evaluate
+
+
+def _evaluate_composite_wall(plan, columns, missing):
+    """Builds the CSR layout from the per-wall layer columns (a wall ends at its first empty
+    layer) and evaluates it with the rules of /calculate_composite_wall."""
+    n_rows = len(columns['T_inner'])
+    n_layers = plan["n_layers"]
+    present = np.zeros((n_rows, n_layers), dtype=bool)
+    for j in range(n_layers):
+        present[:, j] = ~missing[f"layers.{j}.thickness"]
+    counts = present.sum(axis=1)
+    offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+    data = {name: np.stack([columns[f"layers.{j}.{name}"] for j in range(n_layers)], axis=1)[present]
+            for name in WALL_LAYER_PARAMS}
+    data.update({"offsets": offsets, "T_inner": columns['T_inner'], "T_outer": columns['T_outer']})
+    validated, row_errors, error = validate_composite_wall_columns(data)
+    if error:
+        return None, [], error
+    results = calculate_composite_wall_performance_batch(**validated)
+    outputs = {name: results[name] for name in ["total_resistance", "heat_flux", "error_code"]}
+    return outputs, row_errors, None
+
+
+def _composite_wall_inputs(header):
+    """T_inner, T_outer and the layer columns of a case file, or an error."""
+    layers = {}
+    for name in header:
+        match = LAYER_COLUMN.match(name)
+        if match and match.group(2) in WALL_LAYER_PARAMS:
+            layers.setdefault(int(match.group(1)), set()).add(match.group(2))
+    n_layers = max(layers) + 1 if layers else 0
+    incomplete = [j for j in range(n_layers) if layers.get(j) != set(WALL_LAYER_PARAMS)]
+    if not n_layers or incomplete:
+        return None, 0, ("Composite wall files need the columns 'layers.<j>.thickness', 'layers.<j>.k_value' and "
+                         "'layers.<j>.area' for j = 0, 1, ... without gaps.")
+    names = ['T_inner', 'T_outer'] + [f"layers.{j}.{name}" for j in range(n_layers) for name in WALL_LAYER_PARAMS]
+    return names, n_layers, None
+
+
+# Calculators for bulk files: required numeric and text inputs (a function of the file
+# header for walls), the chunk evaluator, the scalar outputs it returns per row and the
+# messages for its 'error_code' output, if any. Layer columns of walls cannot come from 'base'.
+BULK_CALCULATORS = {
+    "fin": {
+        "numeric": lambda header: (list(FIN_PARAMS), 0, None),
+        "text": [],
+        "evaluate": _evaluate_with_sweep("fin"),
+        "outputs": ["heat_transfer_rate", "fin_efficiency"],
+        "error_messages": None,
+    },
+    "heat_exchanger": {
+        "numeric": lambda header: (list(HEAT_EXCHANGER_PARAMS), 0, None),
+        "text": ['flow_type'],
+        "evaluate": _evaluate_with_sweep("heat_exchanger"),
+        "outputs": ["NTU", "effectiveness", "q_actual", "T_out_hot", "T_out_cold"],
+        "error_messages": SWEEP_CALCULATORS["heat_exchanger"]["error_messages"],
+    },
+    "composite_wall": {
+        "numeric": _composite_wall_inputs,
+        "text": [],
+        "evaluate": _evaluate_composite_wall,
+        "outputs": ["total_resistance", "heat_flux"],
+        "error_messages": SWEEP_CALCULATORS["composite_wall"]["error_messages"],
+    },
+}
+
+
+def _file_format(path, file_format):
+    if file_format is None:
+        file_format = "parquet" if str(path).lower().endswith((".parquet", ".pq")) else "csv"
+    if file_format not in BULK_FORMATS:
+        return None, f"File format must be one of: {', '.join(BULK_FORMATS)}."
+    if file_format == "parquet" and pyarrow is None:
+        return None, "Parquet files need the optional 'pyarrow' package."
+    return file_format, None
+
+
+def _read_header(path, file_format):
+    if file_format == "parquet":
+        return pyarrow.parquet.ParquetFile(path).schema_arrow.names
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return [name.strip() for name in next(csv.reader(f), [])]
+
+
+def parse_bulk_request(calculator, path, base=None, input_format=None, chunk_rows=DEFAULT_CHUNK_ROWS,
+                       include_inputs=False):
+    """
+    Checks a bulk run before any row is evaluated.
+
+    Args:
+        calculator (str): "fin", "heat_exchanger" or "composite_wall".
+        path (str): CSV or Parquet case file with a header row (column names).
+        base (dict, optional): Values for inputs that are not columns of the file (e.g. a
+                               common 'flow_type' or 'T_inf'); file columns take precedence.
+        input_format (str, optional): "csv" or "parquet"; by default from the file extension.
+        chunk_rows (int, optional): Rows read, evaluated and written per chunk.
+        include_inputs (bool, optional): Also write the inputs of every row to the output.
+
+    Returns:
+        tuple: (plan, error). plan is consumed by run_bulk.
+    """
+    if calculator not in BULK_CALCULATORS:
+        return None, f"Parameter 'calculator' must be one of: {', '.join(BULK_CALCULATORS)}."
+    spec = BULK_CALCULATORS[calculator]
+    base = base or {}
+    if not isinstance(base, dict):
+        return None, "Parameter 'base' must be a dictionary."
+    if not isinstance(chunk_rows, int) or isinstance(chunk_rows, bool) or not 0 < chunk_rows <= MAX_CHUNK_ROWS:
+        return None, f"Parameter 'chunk_rows' must be an integer between 1 and {MAX_CHUNK_ROWS}."
+    input_format, error = _file_format(path, input_format)
+    if error:
+        return None, error
+    try:
+        header = _read_header(path, input_format)
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        return None, f"Cannot read the {input_format} file: {e}"
+    if len(set(header)) != len(header):
+        return None, "Column names in the file must be unique."
+
+    numeric, n_layers, error = spec["numeric"](header)
+    if error:
+        return None, error
+    missing = [name for name in numeric + spec["text"] if name not in header and name not in base]
+    if missing:
+        return None, f"Missing parameters: {', '.join(missing)}"
+    for name in numeric:
+        if name not in header and (isinstance(base[name], bool) or not isinstance(base[name], (int, float))):
+            return None, f"Parameter '{name}' must be a number."
+    for name in spec["text"]:
+        if name not in header and not isinstance(base[name], str):
+            return None, f"Parameter '{name}' must be a string."
+
+    return {
+        "calculator": calculator, "path": path, "input_format": input_format, "header": header,
+        "base": base, "chunk_rows": chunk_rows, "n_layers": n_layers,
+        "numeric": [name for name in numeric if name in header],
+        "text": [name for name in spec["text"] if name in header],
+        "inputs": numeric + spec["text"], "include_inputs": bool(include_inputs),
+    }, None
+
+
+def _parse_numeric(values):
+    """
+    Converts a column of cells to floats.
+
+    Returns:
+        tuple: (values, missing, invalid) with NaN for empty (missing) cells and for cells that
+               are not finite numbers (invalid).
+    """
+    if values.dtype.kind in 'biuf':
+        values = values.astype(float)
+        return values, np.zeros(len(values), dtype=bool), ~np.isfinite(values)
+    cells = np.char.strip(np.where(values == None, "", values).astype(str)) # noqa: E711 (elementwise comparison)
+    missing = cells == ""
+    parsed = np.full(len(cells), np.nan)
+    try:
+        parsed[~missing] = cells[~missing].astype(float)
+    except ValueError: # Find the offending cells one by one
+        for i in np.flatnonzero(~missing):
+            try:
+                parsed[i] = float(cells[i])
+            except ValueError:
+                pass
+    return parsed, missing, ~missing & ~np.isfinite(parsed)
+
+
+def _parse_text(values):
+    cells = np.char.strip(np.where(values == None, "", values).astype(str)) # noqa: E711
+    return cells, cells == ""
+
+
+def _csv_lines(path, chunk_rows):
+    """Yields lists of non-empty data lines (about chunk_rows each) from a memory-mapped CSV."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            size = len(mapped)
+            header_end = mapped.find(b"\n")
+            start = size if header_end < 0 else header_end + 1
+            window = chunk_rows * 64 # Bytes scanned for line ends, grown for long rows
+            released = 0
+            while start < size:
+                end = size
+                while True:
+                    length = min(window, size - start)
+                    scanned = np.frombuffer(mapped, dtype=np.uint8, count=length, offset=start)
+                    line_ends = np.flatnonzero(scanned == 10)
+                    del scanned # The mapping cannot be closed while a view on it exists
+                    if len(line_ends) >= chunk_rows:
+                        end = start + int(line_ends[chunk_rows - 1]) + 1
+                        break
+                    if length == size - start:
+                        break
+                    window *= 2
+                lines = [line for line in mapped[start:end].decode("utf-8").splitlines() if line.strip()]
+                # Pages of the mapping that were read count towards the resident size until
+                # they are released (they stay in the page cache)
+                page_end = end // mmap.PAGESIZE * mmap.PAGESIZE
+                if hasattr(mmap, "MADV_DONTNEED") and page_end > released:
+                    mapped.madvise(mmap.MADV_DONTNEED, released, page_end - released)
+                    released = page_end
+                start = end
+                if lines:
+                    yield lines
+
+
+def _parse_csv_chunk(lines, plan):
+    """Parses CSV lines into (columns, missing, invalid, row_errors) of the used columns."""
+    header = plan["header"]
+    used = sorted(header.index(name) for name in plan["numeric"] + plan["text"])
+    names = [header[i] for i in used]
+    text = set(plan["text"])
+    row_errors = {}
+    try: # Clean chunk: one pass of the C parser
+        records = np.loadtxt(lines, delimiter=",", quotechar='"', comments=None, ndmin=1, usecols=used,
+                             dtype=[(name, f"U{TEXT_WIDTH}" if name in text else "f8") for name in names])
+        cells = {name: records[name] for name in names}
+    except ValueError:
+        try: # Empty or non-numeric cells: read as text and convert per column
+            records = np.loadtxt(lines, delimiter=",", quotechar='"', comments=None, ndmin=2, usecols=used,
+                                 dtype=str)
+            cells = {name: records[:, i] for i, name in enumerate(names)}
+        except ValueError: # Rows with a wrong number of fields
+            rows = list(csv.reader(lines))
+            for i, row in enumerate(rows):
+                if len(row) != len(header):
+                    row_errors[i] = f"Row has {len(row)} fields, expected {len(header)}."
+            cells = {name: np.array([row[j] if len(row) == len(header) else "" for row in rows], dtype=object)
+                     for j, name in zip(used, names)}
+    columns, missing, invalid = {}, {}, {}
+    for name in names:
+        if name in text:
+            columns[name], missing[name] = _parse_text(cells[name])
+            invalid[name] = np.zeros(len(lines), dtype=bool)
+        else:
+            columns[name], missing[name], invalid[name] = _parse_numeric(cells[name])
+    return columns, missing, invalid, row_errors
+
+
+def _parse_parquet_batch(batch, plan):
+    columns, missing, invalid = {}, {}, {}
+    for name in plan["numeric"] + plan["text"]:
+        array = batch.column(name)
+        values = array.to_numpy(zero_copy_only=False)
+        if name in plan["text"]:
+            columns[name], missing[name] = _parse_text(values)
+            invalid[name] = np.zeros(len(values), dtype=bool)
+        else:
+            columns[name], _, invalid[name] = _parse_numeric(values)
+            missing[name] = array.is_null().to_numpy(zero_copy_only=False)
+            invalid[name] &= ~missing[name]
+    return columns, missing, invalid, {}
+
+
+def _iter_chunks(plan):
+    if plan["input_format"] == "parquet":
+        parquet_file = pyarrow.parquet.ParquetFile(plan["path"], memory_map=True)
+        for batch in parquet_file.iter_batches(batch_size=plan["chunk_rows"], columns=plan["numeric"] + plan["text"]):
+            yield _parse_parquet_batch(batch, plan)
+    else:
+        for lines in _csv_lines(plan["path"], plan["chunk_rows"]):
+            yield _parse_csv_chunk(lines, plan)
+
+
+def _row_messages(plan, count, missing, invalid, row_errors):
+    """First error per row in the order of the routes: missing inputs, then non-numbers."""
+    messages = np.full(count, None, dtype=object)
+    for i, message in row_errors.items():
+        messages[i] = message
+    layer_columns = {name for name in missing if name.startswith("layers.")}
+    any_missing = np.zeros(count, dtype=bool)
+    for name, mask in missing.items():
+        if name not in layer_columns:
+            any_missing |= mask
+    for i in np.flatnonzero(any_missing & (messages == None)): # noqa: E711
+        messages[i] = f"Missing parameters: {', '.join(name for name in missing if name not in layer_columns and missing[name][i])}"
+    for j in range(plan["n_layers"]): # A wall ends at its first empty layer; partial layers are errors
+        cells = [f"layers.{j}.{name}" for name in WALL_LAYER_PARAMS]
+        empty = np.stack([missing[name] for name in cells])
+        partial = empty.any(axis=0) & ~empty.all(axis=0)
+        if j + 1 < plan["n_layers"]: # Layers after an empty one must be empty too
+            later = np.stack([~missing[f"layers.{k}.{name}"] for k in range(j + 1, plan["n_layers"])
+                              for name in WALL_LAYER_PARAMS]).any(axis=0)
+            partial |= empty.all(axis=0) & later
+        messages[partial & (messages == None)] = f"Layer {j+1}: 'thickness', 'k_value', and 'area' must be numbers." # noqa: E711
+    for name, mask in invalid.items():
+        match = LAYER_COLUMN.match(name)
+        message = (f"Layer {int(match.group(1)) + 1}: 'thickness', 'k_value', and 'area' must be numbers." if match
+                   else f"Parameter '{name}' must be a number.")
+        messages[mask & (messages == None)] = message # noqa: E711
+    return messages
+
+
+class _CsvWriter:
+    def __init__(self, path, names, text):
+        self.file = open(path, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(names)
+
+    def write(self, columns):
+        self.writer.writerows(zip(*(_to_json_column(values) for values in columns.values())))
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path, names, text):
+        self.path = path
+        self.writer = None
+        self.schema = pyarrow.schema([(name, pyarrow.int64() if name == "row" else
+                                       pyarrow.string() if name in text else pyarrow.float64()) for name in names])
+
+    def write(self, columns):
+        table = pyarrow.table({
+            name: pyarrow.array(values, type=pyarrow.string() if values.dtype.kind in 'OU' else None, from_pandas=True)
+            for name, values in columns.items()
+        })
+        if self.writer is None:
+            self.writer = pyarrow.parquet.ParquetWriter(self.path, self.schema)
+        self.writer.write_table(table.cast(self.schema))
+
+    def close(self):
+        if self.writer is None: # No rows: a file with the columns only
+            self.writer = pyarrow.parquet.ParquetWriter(self.path, self.schema)
+        self.writer.close()
+
+
+def run_bulk(plan, output_path, output_format=None, progress=None):
+    """
+    Evaluates a parsed bulk plan chunk by chunk, appending each chunk's results to the output.
+
+    Args:
+        plan (dict): From parse_bulk_request.
+        output_path (str): CSV or Parquet file to write.
+        output_format (str, optional): "csv" or "parquet"; by default from the file extension.
+        progress (callable, optional): Called as progress(rows, seconds) after every chunk.
+
+    Returns:
+        dict: rows, failed_rows, chunks, seconds, rows_per_second, error_examples (up to
+              MAX_ERROR_EXAMPLES distinct messages), output and output_format. Raises
+              ValueError for an unusable output format.
+    """
+    output_format, error = _file_format(output_path, output_format)
+    if error:
+        raise ValueError(error)
+    spec = BULK_CALCULATORS[plan["calculator"]]
+    names = ["row"] + (plan["inputs"] if plan["include_inputs"] else []) + spec["outputs"] + ["error"]
+    writer = (_ParquetWriter if output_format == "parquet" else _CsvWriter)(output_path, names, spec["text"] + ["error"])
+    started = time.perf_counter()
+    rows, failed_rows, chunks, error_examples = 0, 0, 0, []
+    try:
+        for columns, missing, invalid, row_errors in _iter_chunks(plan):
+            count = len(next(iter(columns.values())))
+            messages = _row_messages(plan, count, missing, invalid, row_errors)
+            for name in plan["inputs"]: # Inputs that are not file columns come from the base
+                if name not in columns:
+                    columns[name] = np.full(count, plan["base"][name], dtype=object if name in spec["text"] else float)
+            outputs, evaluator_errors, error = spec["evaluate"](plan, columns, missing)
+            if error: # A whole-chunk rule (e.g. malformed offsets) fails every row
+                evaluator_errors = [{"row": i, "error": error} for i in range(count)]
+                outputs = {}
+            for e in evaluator_errors:
+                if messages[e["row"]] is None:
+                    messages[e["row"]] = e["error"]
+            if spec["error_messages"] and "error_code" in outputs:
+                for code in np.unique(outputs["error_code"]):
+                    message = spec["error_messages"][int(code)]
+                    if message is not None:
+                        messages[(outputs["error_code"] == code) & (messages == None)] = message # noqa: E711
+            failed = messages != None # noqa: E711
+
+            table = {"row": np.arange(rows, rows + count)}
+            if plan["include_inputs"]:
+                table.update({name: columns[name] for name in plan["inputs"]})
+            for name in spec["outputs"]:
+                table[name] = np.where(failed, np.nan, outputs[name]) if name in outputs else np.full(count, np.nan)
+            table["error"] = messages
+            writer.write(table)
+
+            for message in messages[failed]:
+                if len(error_examples) >= MAX_ERROR_EXAMPLES:
+                    break
+                if message not in error_examples:
+                    error_examples.append(message)
+            rows += count
+            failed_rows += int(failed.sum())
+            chunks += 1
+            if progress is not None:
+                progress(rows, time.perf_counter() - started)
+    finally:
+        writer.close()
+    seconds = time.perf_counter() - started
+    return {
+        "calculator": plan["calculator"], "rows": rows, "failed_rows": failed_rows, "chunks": chunks,
+        "seconds": seconds, "rows_per_second": rows / seconds if seconds > 0 else None,
+        "error_examples": error_examples, "output": output_path, "output_format": output_format,
+    }
+
+
+def _parse_assignment(text):
+    """NAME=VALUE from the command line; VALUE is a number if it parses as one."""
+    name, _, value = text.partition("=")
+    try:
+        return name, float(value)
+    except ValueError:
+        return name, value
+
+
+def main(argv=None):
+    """Command line entry point: python -m app.bulk CALCULATOR INPUT [--output FILE] [--set NAME=VALUE ...]."""
+    parser = argparse.ArgumentParser(
+        prog="python -m app.bulk",
+        description="Evaluate a CSV or Parquet case file (one case per row) and write the results as it goes."
+    )
+    parser.add_argument("calculator", choices=list(BULK_CALCULATORS))
+    parser.add_argument("input", help="Case file (.csv or .parquet) with a header row of input names.")
+    parser.add_argument("--output", default=None,
+                        help="Results file (.csv or .parquet). Defaults to INPUT with a .results.csv suffix.")
+    parser.add_argument("--input-format", choices=BULK_FORMATS, default=None)
+    parser.add_argument("--output-format", choices=BULK_FORMATS, default=None)
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="Rows per chunk.")
+    parser.add_argument("--include-inputs", action="store_true", help="Also write the inputs of every row.")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="Value for an input that is not a column of the file (repeatable).")
+    parser.add_argument("--quiet", action="store_true", help="Do not print progress to stderr.")
+    args = parser.parse_args(argv)
+
+    plan, error = parse_bulk_request(args.calculator, args.input, dict(map(_parse_assignment, args.set)),
+                                     args.input_format, args.chunk_rows, args.include_inputs)
+    if error:
+        print(f"error: {error}", file=sys.stderr)
+        return 2
+    output = args.output or os.path.splitext(args.input)[0] + ".results.csv"
+
+    def progress(rows, seconds):
+        print(f"\r{rows} rows ({rows / seconds:.0f}/s)", end="", file=sys.stderr)
+    try:
+        summary = run_bulk(plan, output, args.output_format, progress=None if args.quiet else progress)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(json.dumps(summary))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
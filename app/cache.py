@@ -0,0 +1,245 @@
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Memoization of serialized calculator responses. Keys are built from the validated inputs
+# of a route, so equal inputs written differently (1 vs 1.0, -0.0 vs 0.0, reordered keys)
+# share an entry, while list order (e.g. wall layers) is significant.
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL = 3600.0 # seconds
+
+
+def _canonical(value):
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        value = float(value)
+        if value == 0.0:
+            return 0.0 # Folds -0.0 into 0.0
+        if math.isnan(value):
+            return "nan"
+        return value
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    raise TypeError(f"Cannot build a cache key from {type(value).__name__}")
+
+
+def make_cache_key(calculator, inputs):
+    """
+    Builds a cache key from a calculator name and its validated inputs.
+
+    Args:
+        calculator (str): Calculator (route) name, keeps different calculators apart.
+        inputs (dict): Validated inputs; numbers, strings, and lists/dicts of them.
+
+    Returns:
+        str: "<calculator>:<sha256 of the canonical JSON form of inputs>".
+    """
+    canonical = json.dumps(_canonical(inputs), sort_keys=True, separators=(',', ':'))
+    return f"{calculator}:{hashlib.sha256(canonical.encode()).hexdigest()}"
+
+
+class MemoryCacheBackend:
+    """In-process LRU store bounded by entry count, total payload bytes and entry age."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict() # key -> (expires_at, payload)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns (payload or None, number of entries evicted while looking it up)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, 0
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                return None, 1
+            self._entries.move_to_end(key)
+            return entry[1], 0
+
+    def set(self, key, payload):
+        """Stores payload (bytes) and returns the number of evicted entries."""
+        if len(payload) > self.max_bytes:
+            return 0
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, payload)
+            self._bytes += len(payload)
+            evicted = 0
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries))) # Least recently used first
+                evicted += 1
+            return evicted
+
+    def _remove(self, key):
+        _, payload = self._entries.pop(key)
+        self._bytes -= len(payload)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def size(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes}
+
+
+class SQLiteCacheBackend:
+    """
+    LRU store in a local SQLite file, shared by every worker process on the host (put the
+    file on /dev/shm to keep it in shared memory). Same limits as MemoryCacheBackend.
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS result_cache ("
+                "key TEXT PRIMARY KEY, payload BLOB NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS result_cache_last_used ON result_cache (last_used)")
+
+    def _connect(self):
+        # One connection per thread; WAL lets readers in other processes proceed during writes
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5.0)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=OFF")
+            self._local.db = db
+        return db
+
+    def get(self, key):
+        db = self._connect()
+        now = time.time()
+        with db:
+            row = db.execute("SELECT payload, expires_at FROM result_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None, 0
+            if row[1] < now:
+                db.execute("DELETE FROM result_cache WHERE key = ?", (key,))
+                return None, 1
+            db.execute("UPDATE result_cache SET last_used = ? WHERE key = ?", (now, key))
+        return bytes(row[0]), 0
+
+    def set(self, key, payload):
+        if len(payload) > self.max_bytes:
+            return 0
+        db = self._connect()
+        now = time.time()
+        with db:
+            db.execute(
+                "INSERT OR REPLACE INTO result_cache (key, payload, size, expires_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now + self.ttl, now)
+            )
+            evicted = db.execute("DELETE FROM result_cache WHERE expires_at < ?", (now,)).rowcount
+            count, total = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM result_cache").fetchone()
+            while count > self.max_entries or total > self.max_bytes:
+                oldest = db.execute("SELECT key, size FROM result_cache ORDER BY last_used LIMIT 1").fetchone()
+                db.execute("DELETE FROM result_cache WHERE key = ?", (oldest[0],))
+                count, total = count - 1, total - oldest[1]
+                evicted += 1
+        return evicted
+
+    def clear(self):
+        db = self._connect()
+        with db:
+            db.execute("DELETE FROM result_cache")
+
+    def size(self):
+        count, total = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM result_cache"
+        ).fetchone()
+        return {"entries": count, "bytes": total}
+
+
+class ResultCache:
+    """
+    Calculator result cache over a pluggable backend (any object with get/set/clear/size
+    like MemoryCacheBackend). Counts hits, misses and evictions for this process.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        payload, evicted = self.backend.get(key)
+        with self._lock:
+            self.evictions += evicted
+            if payload is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return payload
+
+    def set(self, key, payload):
+        evicted = self.backend.set(key, payload)
+        with self._lock:
+            self.evictions += evicted
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "backend": type(self.backend).__name__,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+        stats.update(self.backend.size())
+        return stats
+
+
+def create_result_cache(config=None):
+    """
+    Creates the result cache from configuration (e.g. os.environ):
+        THERMAL_CACHE_BACKEND: "memory" (default), "sqlite" or "none"
+        THERMAL_CACHE_PATH: SQLite file for the "sqlite" backend
+        THERMAL_CACHE_MAX_ENTRIES, THERMAL_CACHE_MAX_BYTES, THERMAL_CACHE_TTL: limits
+
+    Returns:
+        ResultCache or None: None if caching is disabled.
+    """
+    config = os.environ if config is None else config
+    backend = config.get("THERMAL_CACHE_BACKEND", "memory")
+    limits = {
+        "max_entries": int(config.get("THERMAL_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+        "max_bytes": int(config.get("THERMAL_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+        "ttl": float(config.get("THERMAL_CACHE_TTL", DEFAULT_TTL)),
+    }
+    if backend == "none":
+        return None
+    if backend == "sqlite":
+        return ResultCache(SQLiteCacheBackend(config.get("THERMAL_CACHE_PATH", "thermal_cache.sqlite3"), **limits))
+    if backend == "memory":
+        return ResultCache(MemoryCacheBackend(**limits))
+    raise ValueError(f"Unknown THERMAL_CACHE_BACKEND '{backend}'. Use 'memory', 'sqlite' or 'none'.")
@@ -1,6 +1,10 @@
 import numpy as np
 
-def calculate_composite_wall_performance(layers, T_inner, T_outer):
+# Gradients: R_total = sum(t / (k A)) and q = (T_inner - T_outer) / R_total, so
+# dq/dx = -q / R_total * dR_total/dx for every layer property x, with
+# dR_total/dt = 1 / (k A), dR_total/dk = -R_layer / k and dR_total/dA = -R_layer / A.
+
+def calculate_composite_wall_performance(layers, T_inner, T_outer, gradients=False):
     """
     Calculates the heat conduction performance for a composite wall.
 
@@ -9,6 +13,8 @@ def calculate_composite_wall_performance(layers, T_inner, T_outer):
                        and contains 'thickness' (m), 'k_value' (W/mK), and 'area' (m^2).
         T_inner (float): Temperature at the inner surface of the wall (K).
         T_outer (float): Temperature at the outer surface of the wall (K).
+        gradients (bool, optional): Also return the exact partial derivatives of heat_flux
+                                    and total_resistance. Defaults to False.
 
     Returns:
         dict: A dictionary containing:
@@ -16,6 +22,9 @@ def calculate_composite_wall_performance(layers, T_inner, T_outer):
             - heat_flux (float or None): Calculated q_flux. None if R_total is 0 and deltaT is not 0.
             - individual_resistances (list): List of R_layer for each layer.
             - error (str, optional): Error message if R_total is 0 and deltaT is not 0.
+            - gradients (dict, optional): With gradients and valid layers, {"heat_flux": {...},
+              "total_resistance": {...}} with "T_inner" and "T_outer" (floats) and "thickness",
+              "k_value" and "area" (one float per layer); None where undefined.
     """
     individual_resistances = []
     R_total = 0.0
@@ -80,5 +89,183 @@ def calculate_composite_wall_performance(layers, T_inner, T_outer):
     }
     if error_message:
         result["error"] = error_message
+    if gradients:
+        partials = calculate_composite_wall_performance_batch(
+            gradients=True, T_inner=T_inner, T_outer=T_outer, offsets=[0, len(layers)],
+            **{name: [layer[name] for layer in layers] for name in ['thickness', 'k_value', 'area']}
+        )["gradients"]
+        result["gradients"] = {
+            output: {name: (None if np.isnan(value[0]) else float(value[0])) if name in ['T_inner', 'T_outer']
+                     else [None if np.isnan(v) else float(v) for v in value]
+                     for name, value in values.items()}
+            for output, values in partials.items()
+        }
 
     return result
+
+
+# Per-wall status codes returned by calculate_composite_wall_performance_batch
+WALL_OK = 0
+WALL_ERROR_NO_LAYERS = 1
+WALL_ERROR_INVALID_LAYER = 2
+WALL_ERROR_ZERO_RESISTANCE = 3
+
+WALL_ERROR_MESSAGES = {
+    WALL_OK: None,
+    WALL_ERROR_NO_LAYERS: "No layers provided for the wall.",
+    WALL_ERROR_INVALID_LAYER: "k_value and area must be positive, thickness must be non-negative.",
+    WALL_ERROR_ZERO_RESISTANCE: "Total thermal resistance is zero with a non-zero temperature difference. This implies infinite heat flux or direct contact with zero resistance layers.",
+}
+
+
+def layers_to_csr(walls):
+    """
+    Flattens a list of walls (each a list of layer dicts as accepted by
+    calculate_composite_wall_performance) into the CSR layout used by the batch solver.
+
+    Args:
+        walls (list): List of walls, each a list of {'thickness', 'k_value', 'area'} dicts.
+
+    Returns:
+        dict: thickness, k_value and area as concatenated float arrays, and offsets
+              (n_walls + 1 ints) such that wall i owns layers offsets[i]:offsets[i+1].
+    """
+    counts = [len(layers) for layers in walls]
+    layers = [layer for wall in walls for layer in wall]
+    return {
+        "thickness": np.array([layer['thickness'] for layer in layers], dtype=float),
+        "k_value": np.array([layer['k_value'] for layer in layers], dtype=float),
+        "area": np.array([layer['area'] for layer in layers], dtype=float),
+        "offsets": np.concatenate(([0], np.cumsum(counts, dtype=np.int64))),
+    }
+
+
+def _running_sum_per_wall(values, offsets):
+    """
+    Cumulative sum restarting at every wall, one vectorized pass per layer position.
+
+    A global cumsum minus each wall's starting value would let large (or infinite)
+    resistances of one wall cancel away the precision of the walls after it.
+    """
+    running = np.array(values, dtype=float)
+    counts = np.diff(offsets)
+    order = np.argsort(-counts, kind='stable')
+    starts, descending = offsets[:-1][order], counts[order]
+    for position in range(1, int(descending[0]) if len(descending) else 0):
+        active = starts[:np.searchsorted(-descending, -position, side='left')] + position
+        running[active] += running[active - 1]
+    return running
+
+
+def calculate_composite_wall_performance_batch(thickness, k_value, area, offsets, T_inner, T_outer, gradients=False):
+    """
+    Calculates series-conduction performance for many composite walls at once.
+
+    Layers of all walls are stored back to back (CSR style): wall i consists of layers
+    offsets[i] to offsets[i+1] - 1 of the thickness/k_value/area arrays, so walls can
+    have different layer counts. Per-wall sums are done with np.add.reduceat.
+
+    Args:
+        thickness (array_like): Layer thicknesses (m), concatenated over all walls.
+        k_value (array_like): Layer thermal conductivities (W/mK), same layout.
+        area (array_like): Layer areas (m^2), same layout.
+        offsets (array_like): n_walls + 1 non-decreasing layer offsets, offsets[0] == 0
+                              and offsets[-1] == number of layers.
+        T_inner (array_like): Inner surface temperature per wall (K), or a scalar.
+        T_outer (array_like): Outer surface temperature per wall (K), or a scalar.
+        gradients (bool, optional): Also return the partial derivatives of heat_flux and
+                                    total_resistance. Defaults to False.
+
+    Returns:
+        dict: A dictionary containing NumPy arrays:
+            - total_resistance (ndarray): (n_walls,) R_total, NaN for invalid walls.
+            - heat_flux (ndarray): (n_walls,) q_flux, NaN where undefined.
+            - individual_resistances (ndarray): (n_layers,) R_layer in the input layout.
+            - interface_temperatures (ndarray): Ragged temperatures at the inner surface and
+              after every layer, n_layers + n_walls values in total.
+            - interface_offsets (ndarray): (n_walls + 1,) offsets into interface_temperatures.
+            - error_code (ndarray): (n_walls,) status per wall (see WALL_ERROR_MESSAGES).
+            - gradients (dict): With gradients only, {"heat_flux": {...}, "total_resistance":
+              {...}} with (n_walls,) arrays for "T_inner" and "T_outer" and (n_layers,)
+              arrays in the input layout for "thickness", "k_value" and "area". NaN where
+              the output is undefined or not differentiable (zero total resistance).
+    """
+    thickness = np.asarray(thickness, dtype=float)
+    k_value = np.asarray(k_value, dtype=float)
+    area = np.asarray(area, dtype=float)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    n_walls = len(offsets) - 1
+    T_inner = np.broadcast_to(np.asarray(T_inner, dtype=float), (n_walls,))
+    T_outer = np.broadcast_to(np.asarray(T_outer, dtype=float), (n_walls,))
+
+    counts = np.diff(offsets)
+    wall_of_layer = np.repeat(np.arange(n_walls), counts)
+    error_code = np.full(n_walls, WALL_OK, dtype=np.int8)
+    error_code[counts == 0] = WALL_ERROR_NO_LAYERS
+
+    invalid_layer = (k_value <= 0) | (area <= 0) | (thickness < 0)
+    error_code[np.unique(wall_of_layer[invalid_layer])] = WALL_ERROR_INVALID_LAYER
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        individual_resistances = thickness / (k_value * area)
+
+    # reduceat needs in-range start indices; empty walls are masked out afterwards
+    has_layers = counts > 0
+    total_resistance = np.full(n_walls, np.nan)
+    if has_layers.any():
+        total_resistance[has_layers] = np.add.reduceat(individual_resistances, offsets[:-1][has_layers])
+    total_resistance[counts == 0] = 0.0
+    total_resistance[error_code == WALL_ERROR_INVALID_LAYER] = np.nan
+
+    delta_T = T_inner - T_outer
+    heat_flux = np.full(n_walls, np.nan)
+    solved = error_code == WALL_OK
+    zero_resistance = solved & (total_resistance == 0)
+    heat_flux[zero_resistance & (delta_T == 0)] = 0.0
+    error_code[zero_resistance & (delta_T != 0)] = WALL_ERROR_ZERO_RESISTANCE
+    conducting = solved & ~zero_resistance
+    heat_flux[conducting] = delta_T[conducting] / total_resistance[conducting]
+    heat_flux[counts == 0] = 0 # Matches the scalar result for a wall without layers
+
+    # Interface temperatures from the running resistance inside each wall:
+    # T_j = T_inner - q * sum(R_1..R_j), with T_0 = T_inner and T_n = T_outer exactly
+    interface_offsets = offsets + np.arange(n_walls + 1)
+    interface_temperatures = np.empty(len(thickness) + n_walls)
+    interface_temperatures[interface_offsets[:-1]] = T_inner
+    after_layer = np.arange(len(thickness)) + wall_of_layer + 1
+    interface_temperatures[after_layer] = (T_inner[wall_of_layer]
+                                           - heat_flux[wall_of_layer] * _running_sum_per_wall(individual_resistances, offsets))
+    closed = conducting & has_layers
+    interface_temperatures[interface_offsets[1:][closed] - 1] = T_outer[closed]
+
+    results = {
+        "total_resistance": total_resistance,
+        "heat_flux": heat_flux,
+        "individual_resistances": individual_resistances,
+        "interface_temperatures": interface_temperatures,
+        "interface_offsets": interface_offsets,
+        "error_code": error_code,
+    }
+    if gradients:
+        resistance_defined = np.where(has_layers & ~np.isnan(total_resistance), 0.0, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            d_resistance = {
+                "thickness": 1 / (k_value * area),
+                "k_value": -individual_resistances / k_value,
+                "area": -individual_resistances / area,
+            }
+            flux_defined = np.where(conducting, 0.0, np.nan)
+            flux_per_resistance = np.where(conducting, -heat_flux / total_resistance, np.nan)
+            results["gradients"] = {
+                "heat_flux": {
+                    "T_inner": 1 / total_resistance + flux_defined,
+                    "T_outer": -1 / total_resistance + flux_defined,
+                    **{name: value * flux_per_resistance[wall_of_layer] for name, value in d_resistance.items()},
+                },
+                "total_resistance": {
+                    "T_inner": resistance_defined.copy(),
+                    "T_outer": resistance_defined.copy(),
+                    **{name: value + resistance_defined[wall_of_layer] for name, value in d_resistance.items()},
+                },
+            }
+    return results
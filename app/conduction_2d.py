@@ -0,0 +1,325 @@
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+from app.fin_calculator import calculate_rectangular_fin_performance
+
+try: # Optional: algebraic multigrid preconditioner for very large grids
+    import pyamg
+except ImportError:
+    pyamg = None
+
+# Steady 2-D conduction on a rectangular (tensor-product, possibly non-uniform) finite-volume
+# grid. Cells outside the `solid` mask are fluid; their faces with solid cells form the
+# "exposed" boundary. Every boundary face couples its cell to a fixed temperature through a
+# conductance g (Dirichlet: half-cell conduction; convective: film and half cell in series),
+# so the system matrix only depends on geometry, k and h, and changing boundary temperatures
+# only changes the right-hand side. The factorization (or preconditioner) is kept and reused.
+
+BOUNDARY_SIDES = ["left", "right", "bottom", "top"]
+DIRECT_SOLVER_MAX_CELLS = 250000 # "auto" switches to preconditioned CG above this size
+MAX_CELLS_2D = 2000000
+CG_TOLERANCE = 1e-10
+
+
+def _centres(edges):
+    return (edges[:-1] + edges[1:]) / 2
+
+
+def _graded_edges(breakpoints, max_size):
+    """Edges through every breakpoint, each segment split into cells no wider than max_size."""
+    breakpoints = np.unique(np.asarray(breakpoints, dtype=float))
+    pieces = [breakpoints[:1]]
+    for a, b in zip(breakpoints[:-1], breakpoints[1:]):
+        n = max(1, int(np.ceil((b - a) / max_size - 1e-9)))
+        pieces.append(np.linspace(a, b, n + 1)[1:])
+    return np.concatenate(pieces)
+
+
+class ConductionProblem2D:
+    """
+    Assembled 2-D steady conduction problem, solvable for different boundary temperatures.
+
+    Args:
+        x_edges (array-like): (nx+1,) increasing cell edge coordinates along x (m).
+        y_edges (array-like): (ny+1,) increasing cell edge coordinates along y (m).
+        k (float or ndarray): Thermal conductivity (W/mK), scalar or (ny, nx) per cell.
+        boundaries (dict): Side name ("left", "right", "bottom", "top") -> condition dict:
+                           {"type": "dirichlet", "T": ...}, {"type": "convective", "h": ..., "T_inf": ...}
+                           or {"type": "adiabatic"}. Missing sides are adiabatic.
+        solid (ndarray, optional): (ny, nx) boolean mask of solid cells. Defaults to all solid.
+        exposed (dict, optional): Condition on faces between solid and fluid cells (same format
+                                  as a side, without "dirichlet"). Defaults to adiabatic.
+        depth (float, optional): Extent of the domain normal to the x-y plane (m). Defaults to 1.
+        solver (str, optional): "direct" (sparse LU), "iterative" (preconditioned CG) or "auto".
+    """
+
+    def __init__(self, x_edges, y_edges, k, boundaries, solid=None, exposed=None, depth=1.0, solver="auto"):
+        self.x_edges = np.asarray(x_edges, dtype=float)
+        self.y_edges = np.asarray(y_edges, dtype=float)
+        nx, ny = len(self.x_edges) - 1, len(self.y_edges) - 1
+        self.shape = (ny, nx)
+        self.depth = depth
+        self.solid = np.ones(self.shape, dtype=bool) if solid is None else np.asarray(solid, dtype=bool)
+        self.boundaries = {side: dict(boundaries.get(side, {"type": "adiabatic"})) for side in BOUNDARY_SIDES}
+        self.exposed = dict(exposed or {"type": "adiabatic"})
+
+        dx = np.diff(self.x_edges)
+        dy = np.diff(self.y_edges)
+        k = np.broadcast_to(np.asarray(k, dtype=float), self.shape)
+
+        # Cell numbering over the solid cells only
+        self.index = np.full(self.shape, -1, dtype=np.int64)
+        self.n_cells = int(self.solid.sum())
+        self.index[self.solid] = np.arange(self.n_cells)
+
+        # Half-cell resistances towards the x and y faces of every cell (K/W)
+        R_half_x = dx[None, :] / (2 * k * dy[:, None] * depth)
+        R_half_y = dy[:, None] / (2 * k * dx[None, :] * depth)
+        face_x = np.broadcast_to(dy[:, None] * depth, self.shape) # Area of the x faces of each cell
+        face_y = np.broadcast_to(dx[None, :] * depth, self.shape)
+
+        rows, cols, vals = [], [], []
+        # Interior faces between two solid cells
+        for R_half, axis in [(R_half_x, 1), (R_half_y, 0)]:
+            first = [slice(None), slice(None)]
+            second = [slice(None), slice(None)]
+            first[axis] = slice(None, -1)
+            second[axis] = slice(1, None)
+            first, second = tuple(first), tuple(second)
+            both = self.solid[first] & self.solid[second]
+            g = 1 / (R_half[first][both] + R_half[second][both])
+            i, j = self.index[first][both], self.index[second][both]
+            rows += [i, j, i, j]
+            cols += [i, j, j, i]
+            vals += [g, g, -g, -g]
+
+        # Boundary faces: (cell index, conductance, face area, group) per face
+        groups = BOUNDARY_SIDES + ["exposed"]
+        face_cells, face_g, face_area, face_group = [], [], [], []
+
+        def add_faces(mask, R_half, area, group):
+            condition = self.exposed if group == len(BOUNDARY_SIDES) else self.boundaries[groups[group]]
+            kind = condition["type"]
+            if kind == "adiabatic" or not mask.any():
+                return
+            if kind == "dirichlet":
+                g = 1 / R_half[mask]
+            else:
+                g = 1 / (R_half[mask] + 1 / (condition["h"] * area[mask])) if condition["h"] > 0 else np.zeros(mask.sum())
+            face_cells.append(self.index[mask])
+            face_g.append(g)
+            face_area.append(area[mask])
+            face_group.append(np.full(mask.sum(), group))
+
+        edge = np.zeros(self.shape, dtype=bool)
+        for group, (R_half, area, where) in enumerate([
+            (R_half_x, face_x, (slice(None), 0)), (R_half_x, face_x, (slice(None), -1)),
+            (R_half_y, face_y, (0, slice(None))), (R_half_y, face_y, (-1, slice(None))),
+        ]):
+            mask = edge.copy()
+            mask[where] = True
+            add_faces(mask & self.solid, R_half, area, group)
+
+        # Solid cells next to fluid cells, one face per fluid neighbour
+        exposed_group = len(BOUNDARY_SIDES)
+        fluid = ~self.solid
+        for R_half, area, shift, axis in [(R_half_x, face_x, 1, 1), (R_half_x, face_x, -1, 1),
+                                          (R_half_y, face_y, 1, 0), (R_half_y, face_y, -1, 0)]:
+            neighbour_fluid = np.zeros(self.shape, dtype=bool)
+            if axis == 1:
+                if shift == 1:
+                    neighbour_fluid[:, :-1] = fluid[:, 1:]
+                else:
+                    neighbour_fluid[:, 1:] = fluid[:, :-1]
+            else:
+                if shift == 1:
+                    neighbour_fluid[:-1, :] = fluid[1:, :]
+                else:
+                    neighbour_fluid[1:, :] = fluid[:-1, :]
+            add_faces(self.solid & neighbour_fluid, R_half, area, exposed_group)
+
+        empty = np.empty(0)
+        self.face_cells = np.concatenate(face_cells) if face_cells else empty.astype(np.int64)
+        self.face_g = np.concatenate(face_g) if face_g else empty
+        self.face_area = np.concatenate(face_area) if face_area else empty
+        self.face_group = np.concatenate(face_group) if face_group else empty.astype(np.int64)
+        if not (self.face_g > 0).any():
+            raise ValueError("The problem needs at least one Dirichlet or convective boundary with h > 0.")
+
+        rows.append(self.face_cells)
+        cols.append(self.face_cells)
+        vals.append(self.face_g)
+        # Duplicate entries are summed by the COO -> CSR conversion
+        self.matrix = sp.csr_matrix(
+            (np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+            shape=(self.n_cells, self.n_cells)
+        )
+
+        if solver == "auto":
+            solver = "direct" if self.n_cells <= DIRECT_SOLVER_MAX_CELLS else "iterative"
+        self.solver = solver
+        self._solve = None
+
+    def _prepare(self):
+        """Factorizes the matrix (direct) or builds the CG preconditioner (iterative) once."""
+        if self._solve is not None:
+            return
+        if self.solver == "direct":
+            self._solve = spla.factorized(self.matrix.tocsc())
+            return
+        if pyamg is not None:
+            M = pyamg.smoothed_aggregation_solver(self.matrix).aspreconditioner(cycle="V")
+        else:
+            # Incomplete LU of the SPD matrix as a CG preconditioner
+            ilu = spla.spilu(self.matrix.tocsc(), drop_tol=1e-5, fill_factor=20)
+            M = spla.LinearOperator(self.matrix.shape, ilu.solve)
+
+        def solve(rhs):
+            T, info = spla.cg(self.matrix, rhs, rtol=CG_TOLERANCE, atol=0.0, M=M, maxiter=2000)
+            if info != 0:
+                raise RuntimeError("Conjugate gradient did not converge.")
+            return T
+        self._solve = solve
+
+    def solve(self, temperatures=None):
+        """
+        Solves for the temperature field.
+
+        Args:
+            temperatures (dict, optional): Per-boundary temperature overrides, side name or
+                                           "exposed" -> T (Dirichlet T or convective T_inf).
+                                           The factorization is reused across calls.
+
+        Returns:
+            dict: A dictionary containing:
+                - x_coords (ndarray): (nx,) cell centre x coordinates (m).
+                - y_coords (ndarray): (ny,) cell centre y coordinates (m).
+                - temperature (ndarray): (ny, nx) temperatures (K); NaN in fluid cells.
+                - heat_rates (dict): Heat entering the solid through each boundary group (W).
+                - heat_transfer_rate (float): Heat entering through the Dirichlet boundaries (W).
+                - efficiency (float or None): heat_transfer_rate divided by the rate of an ideal
+                  body at the Dirichlet temperature, None unless there is exactly one Dirichlet
+                  temperature and one ambient temperature.
+        """
+        temperatures = temperatures or {}
+        groups = BOUNDARY_SIDES + ["exposed"]
+        conditions = [self.boundaries[side] for side in BOUNDARY_SIDES] + [self.exposed]
+        group_T = np.zeros(len(groups))
+        for g, (name, condition) in enumerate(zip(groups, conditions)):
+            key = "T" if condition["type"] == "dirichlet" else "T_inf"
+            if condition["type"] != "adiabatic":
+                group_T[g] = float(temperatures.get(name, condition[key]))
+
+        face_T = group_T[self.face_group]
+        rhs = np.bincount(self.face_cells, weights=self.face_g * face_T, minlength=self.n_cells)
+        self._prepare()
+        T_cells = self._solve(rhs)
+
+        face_q = self.face_g * (face_T - T_cells[self.face_cells])
+        q_group = np.bincount(self.face_group, weights=face_q, minlength=len(groups))
+        heat_rates = {name: float(q_group[g]) for g, (name, condition) in enumerate(zip(groups, conditions))
+                      if condition["type"] != "adiabatic"}
+        dirichlet = [g for g, condition in enumerate(conditions) if condition["type"] == "dirichlet"]
+        convective = [g for g, condition in enumerate(conditions) if condition["type"] == "convective"]
+        q_total = float(sum(q_group[g] for g in dirichlet))
+
+        efficiency = None
+        if len({group_T[g] for g in dirichlet}) == 1 and len({group_T[g] for g in convective}) == 1:
+            T_ref = group_T[dirichlet[0]]
+            on_convective = np.isin(self.face_group, convective)
+            h = np.array([conditions[g].get("h", 0.0) for g in range(len(groups))])[self.face_group[on_convective]]
+            q_max = float(np.sum(h * self.face_area[on_convective] * (T_ref - face_T[on_convective])))
+            efficiency = q_total / q_max if q_max != 0 else None
+
+        temperature = np.full(self.shape, np.nan)
+        temperature[self.solid] = T_cells
+        return {
+            "x_coords": _centres(self.x_edges),
+            "y_coords": _centres(self.y_edges),
+            "temperature": temperature,
+            "heat_rates": heat_rates,
+            "heat_transfer_rate": q_total,
+            "efficiency": efficiency,
+        }
+
+
+def build_plate_fin_2d(L, thickness, k, h_conv, T_base, T_inf, depth=1.0, nx=200, ny=20,
+                       tip_convection=False, solver="auto"):
+    """
+    2-D model of a straight rectangular plate fin: x runs from the base (x = 0, held at
+    T_base) to the tip, y across the thickness; both faces convect to T_inf.
+
+    Args:
+        L (float): Fin length (m).
+        thickness (float): Fin thickness (m).
+        k, h_conv, T_base, T_inf (float): As in calculate_rectangular_fin_performance.
+        depth (float, optional): Fin width normal to the plane (m). Defaults to 1.
+        nx, ny (int, optional): Cells along the length and across the thickness.
+        tip_convection (bool, optional): Convective instead of adiabatic tip. Defaults to False.
+        solver (str, optional): See ConductionProblem2D.
+
+    Returns:
+        ConductionProblem2D: The assembled problem.
+    """
+    convective = {"type": "convective", "h": h_conv, "T_inf": T_inf}
+    return ConductionProblem2D(
+        np.linspace(0, L, nx + 1), np.linspace(0, thickness, ny + 1), k,
+        {"left": {"type": "dirichlet", "T": T_base}, "bottom": convective, "top": convective,
+         "right": convective if tip_convection else {"type": "adiabatic"}},
+        depth=depth, solver=solver
+    )
+
+
+def solve_plate_fin_2d(L, thickness, k, h_conv, T_base, T_inf, depth=1.0, nx=200, ny=20,
+                       tip_convection=False, solver="auto"):
+    """
+    Solves build_plate_fin_2d and compares it with the 1-D analytic model.
+
+    Returns:
+        dict: The ConductionProblem2D.solve result, plus the 1-D analytic values for the same
+              fin (P = 2 depth, Ac = thickness depth): analytic_heat_transfer_rate and
+              analytic_fin_efficiency. 'efficiency' is directly comparable to fin_efficiency.
+    """
+    problem = build_plate_fin_2d(L, thickness, k, h_conv, T_base, T_inf, depth, nx, ny, tip_convection, solver)
+    results = problem.solve()
+    analytic = calculate_rectangular_fin_performance(2 * depth, thickness * depth, L, k, h_conv, T_base, T_inf, n_points=2)
+    results["analytic_heat_transfer_rate"] = analytic["heat_transfer_rate"]
+    results["analytic_fin_efficiency"] = analytic["fin_efficiency"]
+    return results
+
+
+def build_fin_array_2d(n_fins, fin_length, fin_thickness, fin_pitch, base_thickness, k, h_conv,
+                       T_base, T_inf, depth=1.0, cell_size=None, solver="auto"):
+    """
+    2-D model of a row of plate fins on a shared base plate. The bottom of the base plate is
+    held at T_base, all faces in contact with the fluid convect to T_inf and the two outer
+    edges are adiabatic (symmetry with the rest of the heat sink).
+
+    Args:
+        n_fins (int): Number of fins.
+        fin_length (float): Fin height above the base plate (m).
+        fin_thickness (float): Fin thickness (m).
+        fin_pitch (float): Centre-to-centre fin spacing (m); each fin sits in the middle of its pitch.
+        base_thickness (float): Base plate thickness (m).
+        k, h_conv, T_base, T_inf (float): As in calculate_rectangular_fin_performance.
+        depth (float, optional): Extent normal to the plane (m). Defaults to 1.
+        cell_size (float, optional): Largest cell size (m). Defaults to fin_thickness / 4.
+        solver (str, optional): See ConductionProblem2D.
+
+    Returns:
+        ConductionProblem2D: The assembled problem; solve()['efficiency'] is the overall
+                             surface efficiency of the fins and the exposed base.
+    """
+    cell_size = fin_thickness / 4 if cell_size is None else cell_size
+    left = fin_pitch * np.arange(n_fins) + (fin_pitch - fin_thickness) / 2
+    x_edges = _graded_edges(np.concatenate([[0, n_fins * fin_pitch], left, left + fin_thickness]), cell_size)
+    y_edges = _graded_edges([0, base_thickness, base_thickness + fin_length], cell_size)
+    y_edges = np.append(y_edges, y_edges[-1] + cell_size) # A fluid row above the fin tips, so they are exposed
+
+    xc, yc = _centres(x_edges), _centres(y_edges)
+    in_fin = ((xc[None, :] > left[:, None]) & (xc[None, :] < left[:, None] + fin_thickness)).any(axis=0)
+    solid = (yc[:, None] < base_thickness) | (in_fin[None, :] & (yc[:, None] < base_thickness + fin_length))
+    return ConductionProblem2D(
+        x_edges, y_edges, k, {"bottom": {"type": "dirichlet", "T": T_base}},
+        solid=solid, exposed={"type": "convective", "h": h_conv, "T_inf": T_inf}, depth=depth, solver=solver
+    )
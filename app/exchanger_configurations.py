@@ -0,0 +1,421 @@
+import os
+import threading
+import numpy as np
+from scipy.special import gammainc, gammaln, xlogy
+from app.lookup_table import load_tables
+
+# Heat exchanger flow arrangements for the effectiveness-NTU method. Every configuration
+# maps (NTU, Cr) to the effectiveness, vectorized, with 0 <= Cr <= 1, and back: the inverse
+# gives the NTU needed for a target effectiveness (NaN when the configuration cannot reach
+# it at that Cr). Correlations follow Incropera, Table 11.3 / 11.4.
+#
+# Cross-flow with both fluids unmixed has no closed form; its exact value is Mason's series
+#     eps = 1 / (Cr NTU) * sum_n P(n + 1, NTU) P(n + 1, Cr NTU)
+# (P the regularized lower incomplete gamma function), whose length grows with NTU. It is
+# tabulated once per process over (log(1 + NTU), Cr), which spreads the grid points where
+# the effectiveness changes fastest, and interpolated; NTU above UNMIXED_NTU_MAX and
+# requests for exact values evaluate the series. Its inverse is found by bisection.
+#
+# Cr = 0 (one stream changing phase) gives eps = 1 - exp(-NTU) for every configuration.
+#
+# Each configuration also has its exact partial derivatives d eps / d NTU and d eps / d Cr
+# (closed forms, or the differentiated series for cross-flow unmixed), with the limits at
+# Cr = 1 where the general expressions are 0 / 0. The calculators chain them to gradients
+# with respect to flow rates, heat capacities and UA.
+
+TABLE_TOLERANCE = 5e-5 # Absolute error in effectiveness
+TABLE_VERSION = 1
+UNMIXED_NTU_MAX = 50.0
+UNMIXED_NTU_POINTS, UNMIXED_CR_POINTS = 513, 129 # log(1 + NTU) and Cr axes
+INVERSE_ITERATIONS = 60 # Bisection steps on s = NTU / (1 + NTU)
+INVERSE_NTU_MAX = 1e4 # Upper end of the bisection; targets that need more NTU are NaN
+MAX_SHELL_PASSES = 4
+
+
+def _phase_change(NTU):
+    with np.errstate(over='ignore'): # Rows with negative NTU are rejected by the callers
+        return 1 - np.exp(-NTU)
+
+
+def _phase_change_ntu(effectiveness):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(effectiveness < 1, -np.log1p(-effectiveness), np.nan)
+
+
+def _parallel(NTU, Cr):
+    return -np.expm1(-NTU * (1 + Cr)) / (1 + Cr)
+
+
+def _parallel_derivatives(NTU, Cr):
+    decay = np.exp(-NTU * (1 + Cr))
+    return decay, NTU * decay / (1 + Cr) + np.expm1(-NTU * (1 + Cr)) / (1 + Cr) ** 2
+
+
+def _parallel_ntu(effectiveness, Cr):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(effectiveness * (1 + Cr) < 1, -np.log1p(-effectiveness * (1 + Cr)) / (1 + Cr), np.nan)
+
+
+def _counterflow(NTU, Cr):
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        decay = np.exp(-NTU * (1 - Cr))
+        return np.where(Cr == 1, NTU / (1 + NTU), (1 - decay) / (1 - Cr * decay))
+
+
+def _counterflow_derivatives(NTU, Cr):
+    x = NTU * (1 - Cr)
+    decay = np.exp(-x)
+    transferred = -np.expm1(-x) # 1 - decay
+    # (1 - decay) - x without cancellation for small x
+    excess = np.where(x < 1e-3, -x * x / 2 * (1 - x / 3 + x * x / 12), transferred - x)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        denominator = ((1 - Cr) + Cr * transferred) ** 2 # (1 - Cr decay)^2
+        d_ntu = (1 - Cr) ** 2 * decay / denominator
+        d_cr = decay * excess / denominator
+    balanced = Cr == 1
+    return (np.where(balanced, 1 / (1 + NTU) ** 2, d_ntu),
+            np.where(balanced, -NTU ** 2 / (2 * (1 + NTU) ** 2), d_cr))
+
+
+def _counterflow_ntu(effectiveness, Cr):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        balanced = effectiveness / (1 - effectiveness)
+        general = np.log((effectiveness - 1) / (effectiveness * Cr - 1)) / (Cr - 1)
+        return np.where(effectiveness < 1, np.where(Cr == 1, balanced, general), np.nan)
+
+
+def _one_shell(NTU, Cr):
+    """One shell pass, 2, 4, ... tube passes."""
+    root = np.sqrt(1 + Cr ** 2)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        decay = np.exp(-NTU * root)
+        return np.where(NTU > 0, 2 / (1 + Cr + root * (1 + decay) / (1 - decay)), 0.0)
+
+
+def _sinh_excess(z):
+    """sinh(z) - z without cancellation for small z."""
+    return np.where(z < 0.1, z ** 3 / 6 * (1 + z * z / 20 + z ** 4 / 840), np.sinh(np.minimum(z, 700.0)) - z)
+
+
+def _one_shell_derivatives(NTU, Cr):
+    root = np.sqrt(1 + Cr ** 2)
+    y = NTU * root / 2
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        # eps = 2 / (1 + Cr + root coth(y)); multiplied through by sinh(y) for small y ...
+        sh, ch = np.sinh(np.minimum(y, 20.0)), np.cosh(np.minimum(y, 20.0))
+        scaled = ((1 + Cr) * sh + root * ch) ** 2
+        d_ntu_small = root ** 2 / scaled
+        d_cr_small = -2 * (sh * sh + Cr / root * _sinh_excess(2 * y) / 2) / scaled
+        # ... and written with exp(-2y) for large y, where sinh overflows
+        decay = np.exp(-2 * y)
+        coth, csch2 = (1 + decay) / (1 - decay), 4 * decay / (1 - decay) ** 2
+        denominator = (1 + Cr + root * coth) ** 2
+        d_ntu_large = root ** 2 * csch2 / denominator
+        d_cr_large = -2 * (1 + Cr / root * coth - NTU * Cr / 2 * csch2) / denominator
+    large = y > 20
+    return np.where(large, d_ntu_large, d_ntu_small), np.where(large, d_cr_large, d_cr_small)
+
+
+def _one_shell_ntu(effectiveness, Cr):
+    root = np.sqrt(1 + Cr ** 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        E = (2 / effectiveness - (1 + Cr)) / root
+        return np.where(E > 1, -np.log((E - 1) / (E + 1)) / root, np.where(effectiveness == 0, 0.0, np.nan))
+
+
+def _shell_passes(passes):
+    """N shell passes (2N, 4N, ... tube passes): N one-shell exchangers in counterflow series."""
+    def effectiveness(NTU, Cr):
+        single = _one_shell(NTU / passes, Cr)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = ((1 - single * Cr) / (1 - single)) ** passes
+            general = (ratio - 1) / (ratio - Cr)
+            balanced = passes * single / (1 + (passes - 1) * single)
+        return np.where(Cr == 1, balanced, np.where(single < 1, general, 1.0))
+
+    def derivatives(NTU, Cr):
+        single = _one_shell(NTU / passes, Cr)
+        single_ntu, single_cr = _one_shell_derivatives(NTU / passes, Cr)
+        single_ntu = single_ntu / passes
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            # eps = (R^n - 1) / (R^n - Cr) with R = (1 - single Cr) / (1 - single)
+            R = (1 - single * Cr) / (1 - single)
+            Rn = R ** passes
+            d_eps_d_Rn = (1 - Cr) / (Rn - Cr) ** 2
+            d_Rn_d_single = passes * R ** (passes - 1) * (1 - Cr) / (1 - single) ** 2
+            d_Rn_d_cr = -passes * R ** (passes - 1) * single / (1 - single)
+            general = (d_eps_d_Rn * d_Rn_d_single * single_ntu,
+                       d_eps_d_Rn * (d_Rn_d_single * single_cr + d_Rn_d_cr) + (Rn - 1) / (Rn - Cr) ** 2)
+            # Limits as Cr -> 1 (eps = n single / (1 + (n - 1) single))
+            spread = (1 + (passes - 1) * single) ** 2
+            balanced = (passes * single_ntu / spread,
+                        (passes * single_cr - passes * (passes - 1) / 2 * single ** 2) / spread)
+        near_balanced = 1 - Cr < 1e-8
+        saturated = ~near_balanced & (single >= 1)
+        return tuple(np.where(near_balanced, b, np.where(saturated, 0.0, g)) for b, g in zip(balanced, general))
+
+    def ntu(target, Cr):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            F = ((target * Cr - 1) / (target - 1)) ** (1 / passes)
+            single = np.where(Cr == 1, target / (passes - target * (passes - 1)), (F - 1) / (F - Cr))
+        return np.where(target < 1, passes * _one_shell_ntu(single, Cr), np.nan)
+    return effectiveness, ntu, derivatives
+
+
+def _cmax_mixed(NTU, Cr):
+    """Cross-flow, C_max mixed and C_min unmixed."""
+    return -np.expm1(-Cr * -np.expm1(-NTU)) / Cr
+
+
+def _cmax_mixed_derivatives(NTU, Cr):
+    inner = -np.expm1(-NTU)
+    outer = np.exp(-Cr * inner)
+    return outer * np.exp(-NTU), inner * outer / Cr + np.expm1(-Cr * inner) / Cr ** 2
+
+
+def _cmax_mixed_ntu(effectiveness, Cr):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inner = 1 + np.log1p(-effectiveness * Cr) / Cr
+        return np.where(inner > 0, -np.log(inner), np.nan)
+
+
+def _cmin_mixed(NTU, Cr):
+    """Cross-flow, C_min mixed and C_max unmixed."""
+    return -np.expm1(-(-np.expm1(-Cr * NTU)) / Cr)
+
+
+def _cmin_mixed_derivatives(NTU, Cr):
+    decay = np.exp(-Cr * NTU)
+    outer = np.exp(np.expm1(-Cr * NTU) / Cr) # exp(-(1 - decay) / Cr)
+    return outer * decay, outer * (NTU * decay / Cr + np.expm1(-Cr * NTU) / Cr ** 2)
+
+
+def _cmin_mixed_ntu(effectiveness, Cr):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inner = 1 + Cr * np.log1p(-effectiveness)
+        return np.where((effectiveness < 1) & (inner > 0), -np.log(inner) / Cr, np.nan)
+
+
+def _gamma_window(first, width, x):
+    """P(n + 1, x) for n = first, ..., first + width - 1 per row, by the Poisson recurrence
+    P(n + 1, x) = P(n, x) - x^n e^-x / n! from one gammainc call per row; also returns the
+    Poisson terms x^n e^-x / n! = dP(n + 1, x) / dx for the same n, evaluated in log space
+    (a running product of x / n overflows once x is far above the window)."""
+    n = first[:, None] + np.arange(width)
+    pmf = np.exp(xlogy(n, x[:, None]) - x[:, None] - gammaln(n + 1)) # Underflows to 0, never inf * 0
+    start = gammainc(first + 1, x)
+    return (np.concatenate([start[:, None], start[:, None] - np.cumsum(pmf[:, 1:], axis=1)], axis=1), pmf)
+
+
+def _row_sum(terms):
+    """Left-to-right sum of each row. Unlike np.sum (pairwise), the result does not depend on
+    how many zero terms pad the row, so a row gives the same bits in any batch."""
+    return np.cumsum(terms, axis=1)[:, -1]
+
+
+def unmixed_effectiveness_exact(NTU, Cr, derivatives=False):
+    """
+    Cross-flow with both fluids unmixed, by Mason's series (Cr > 0).
+
+    Terms where both gamma factors are 1 to double precision are counted in bulk, so each
+    row sums a window of about 20 sqrt(Cr NTU) + 40 terms. Once P(n + 1, NTU) is 1 to double
+    precision over the whole window the series sums to Cr NTU exactly, so eps = 1 with zero
+    derivatives; elsewhere eps is clipped to 1. With derivatives=True returns
+    (eps, d eps / d NTU, d eps / d Cr), from the series differentiated term by term (the
+    bulk terms do not change to double precision), clipped to their signs (eps rises with
+    NTU and falls with Cr) against roundoff in the final subtraction.
+    """
+    NTU, Cr = np.broadcast_arrays(np.asarray(NTU, dtype=float), np.asarray(Cr, dtype=float))
+    NTU, Cr = NTU.ravel(), Cr.ravel()
+    small = Cr * NTU
+    first = np.maximum(np.floor(small - 10 * np.sqrt(small) - 10), 0)
+    last = np.ceil(small + 10 * np.sqrt(small) + 40)
+    width = int(np.max(last - first, initial=0)) + 1
+    result, d_ntu, d_cr = np.empty(len(NTU)), np.empty(len(NTU)), np.empty(len(NTU))
+    saturated = np.empty(len(NTU), dtype=bool)
+    step = max(1, 2 ** 20 // width) # Rows per chunk, bounding the (rows, width) term matrices
+    for start in range(0, len(NTU), step):
+        rows = slice(start, start + step)
+        in_window = first[rows, None] + np.arange(width) <= last[rows, None]
+        P_ntu, pmf_ntu = _gamma_window(first[rows], width, NTU[rows])
+        P_small, pmf_small = _gamma_window(first[rows], width, small[rows])
+        terms = np.where(in_window, np.maximum(P_ntu * P_small, 0.0), 0.0)
+        saturated[rows] = np.all(~in_window | (P_ntu >= 1.0), axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result[rows] = (first[rows] + _row_sum(terms)) / small[rows]
+            if derivatives: # eps = S / (Cr NTU), S the series sum
+                d_sum_ntu = _row_sum(np.where(in_window, pmf_ntu * P_small + Cr[rows, None] * P_ntu * pmf_small, 0.0))
+                d_sum_cr = NTU[rows] * _row_sum(np.where(in_window, P_ntu * pmf_small, 0.0))
+                d_ntu[rows] = d_sum_ntu / small[rows] - result[rows] / NTU[rows]
+                d_cr[rows] = d_sum_cr / small[rows] - result[rows] / Cr[rows]
+    result = np.where(NTU > 0, np.where(saturated, 1.0, np.minimum(result, 1.0)), 0.0)
+    if derivatives: # At NTU = 0: eps ~ NTU for every Cr
+        return (result, np.where(NTU > 0, np.where(saturated, 0.0, np.maximum(d_ntu, 0.0)), 1.0),
+                np.where((NTU > 0) & ~saturated, np.minimum(d_cr, 0.0), 0.0))
+    return result
+
+
+def _unmixed_on_grid(log_ntu, Cr):
+    NTU = np.expm1(log_ntu)
+    return np.where(Cr > 0, unmixed_effectiveness_exact(NTU, np.maximum(Cr, 1e-300)).reshape(np.shape(NTU)),
+                    _phase_change(NTU))
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+TABLE_SPECS = {
+    "crossflow_unmixed": ([(0.0, np.log1p(UNMIXED_NTU_MAX), UNMIXED_NTU_POINTS),
+                           (0.0, 1.0, UNMIXED_CR_POINTS)], _unmixed_on_grid),
+}
+
+
+def get_exchanger_tables(path=None):
+    """
+    Returns the effectiveness lookup tables, built on first use or loaded from
+    path / THERMAL_EXCHANGER_TABLES (an .npz written on the first build) if given.
+    """
+    if _tables:
+        return _tables
+    with _tables_lock:
+        if not _tables:
+            _tables.update(load_tables(TABLE_SPECS, TABLE_VERSION, TABLE_TOLERANCE,
+                                       path or os.environ.get("THERMAL_EXCHANGER_TABLES"), "Effectiveness"))
+    return _tables
+
+
+def _unmixed(NTU, Cr, exact=False):
+    if exact:
+        return unmixed_effectiveness_exact(NTU, Cr)
+    effectiveness, inside = get_exchanger_tables()["crossflow_unmixed"].interpolate(np.log1p(NTU), Cr)
+    outside = ~inside
+    if outside.any():
+        effectiveness[outside] = unmixed_effectiveness_exact(NTU[outside], Cr[outside])
+    return effectiveness
+
+
+def _bisect_ntu(effectiveness_function, target, Cr):
+    """NTU with effectiveness_function(NTU, Cr) = target, by bisection on s = NTU / (1 + NTU)."""
+    low, high = np.zeros(len(target)), np.full(len(target), INVERSE_NTU_MAX / (1 + INVERSE_NTU_MAX))
+    limit = high.copy()
+    for _ in range(INVERSE_ITERATIONS):
+        middle = (low + high) / 2
+        below = effectiveness_function(middle / (1 - middle), Cr) < target
+        low = np.where(below, middle, low)
+        high = np.where(below, high, middle)
+    s = (low + high) / 2
+    # A target the configuration does not reach by INVERSE_NTU_MAX leaves high at its start
+    return np.where((target < 1) & (high < limit), s / (1 - s), np.nan)
+
+
+EXCHANGER_CONFIGURATIONS = {
+    "parallel": {
+        "description": "Parallel flow (concentric tube or plate).",
+        "effectiveness": _parallel,
+        "ntu": _parallel_ntu,
+        "derivatives": _parallel_derivatives,
+    },
+    "counterflow": {
+        "description": "Counterflow (concentric tube or plate).",
+        "effectiveness": _counterflow,
+        "ntu": _counterflow_ntu,
+        "derivatives": _counterflow_derivatives,
+    },
+    "shell_and_tube": {
+        "description": "Shell-and-tube, one shell pass and 2, 4, ... tube passes.",
+        "effectiveness": _one_shell,
+        "ntu": _one_shell_ntu,
+        "derivatives": _one_shell_derivatives,
+    },
+    "crossflow_unmixed": {
+        "description": "Single-pass cross-flow, both fluids unmixed (tabulated series solution).",
+        "effectiveness": _unmixed,
+        "ntu": None, # Bisection
+        "derivatives": lambda NTU, Cr: unmixed_effectiveness_exact(NTU, Cr, derivatives=True)[1:],
+        "table": "crossflow_unmixed",
+    },
+    "crossflow_cmax_mixed": {
+        "description": "Single-pass cross-flow, C_max mixed and C_min unmixed.",
+        "effectiveness": _cmax_mixed,
+        "ntu": _cmax_mixed_ntu,
+        "derivatives": _cmax_mixed_derivatives,
+    },
+    "crossflow_cmin_mixed": {
+        "description": "Single-pass cross-flow, C_min mixed and C_max unmixed.",
+        "effectiveness": _cmin_mixed,
+        "ntu": _cmin_mixed_ntu,
+        "derivatives": _cmin_mixed_derivatives,
+    },
+}
+for _passes in range(2, MAX_SHELL_PASSES + 1):
+    _effectiveness, _ntu, _derivatives = _shell_passes(_passes)
+    EXCHANGER_CONFIGURATIONS[f"shell_and_tube_{_passes}_shell"] = {
+        "description": f"Shell-and-tube, {_passes} shell passes and {2 * _passes}, {4 * _passes}, ... tube passes.",
+        "effectiveness": _effectiveness,
+        "ntu": _ntu,
+        "derivatives": _derivatives,
+    }
+
+
+def exchanger_effectiveness(flow_type, NTU, Cr, exact=False):
+    """
+    Effectiveness of a configuration for arrays of NTU (>= 0) and Cr (0 <= Cr <= 1).
+
+    Args:
+        flow_type (str): Name in EXCHANGER_CONFIGURATIONS.
+        NTU, Cr (array_like): Number of transfer units and capacity ratio C_min / C_max.
+        exact (bool, optional): Evaluate tabulated correlations exactly instead.
+
+    Returns:
+        ndarray: Effectiveness per row.
+    """
+    NTU, Cr = (np.ravel(a) for a in np.broadcast_arrays(np.asarray(NTU, dtype=float), np.asarray(Cr, dtype=float)))
+    spec = EXCHANGER_CONFIGURATIONS[flow_type]
+    effectiveness = _phase_change(NTU)
+    rated = Cr > 0
+    if rated.any():
+        if "table" in spec:
+            effectiveness[rated] = spec["effectiveness"](NTU[rated], Cr[rated], exact)
+        else:
+            effectiveness[rated] = spec["effectiveness"](NTU[rated], Cr[rated])
+    return effectiveness
+
+
+def exchanger_effectiveness_derivatives(flow_type, NTU, Cr):
+    """
+    Exact partial derivatives of exchanger_effectiveness.
+
+    Returns:
+        tuple: (d eps / d NTU, d eps / d Cr) per row. At Cr = 0 (phase change, reached only
+               with a zero-flow stream) d eps / d Cr is NaN.
+    """
+    NTU, Cr = (np.ravel(a) for a in np.broadcast_arrays(np.asarray(NTU, dtype=float), np.asarray(Cr, dtype=float)))
+    d_ntu, d_cr = np.exp(-NTU), np.full(len(NTU), np.nan)
+    rated = Cr > 0
+    if rated.any():
+        d_ntu[rated], d_cr[rated] = EXCHANGER_CONFIGURATIONS[flow_type]["derivatives"](NTU[rated], Cr[rated])
+    return d_ntu, d_cr
+
+
+def exchanger_ntu(flow_type, effectiveness, Cr):
+    """
+    Inverse of exchanger_effectiveness: the NTU that reaches a target effectiveness.
+
+    Args:
+        flow_type (str): Name in EXCHANGER_CONFIGURATIONS.
+        effectiveness, Cr (array_like): Target effectiveness (0 <= eps < 1) and capacity ratio.
+
+    Returns:
+        ndarray: NTU per row; NaN where the configuration cannot reach the target at that Cr.
+    """
+    target, Cr = (np.ravel(a) for a in np.broadcast_arrays(np.asarray(effectiveness, dtype=float),
+                                                            np.asarray(Cr, dtype=float)))
+    spec = EXCHANGER_CONFIGURATIONS[flow_type]
+    NTU = _phase_change_ntu(target)
+    rated = Cr > 0
+    if rated.any():
+        if spec["ntu"] is None:
+            NTU[rated] = _bisect_ntu(lambda n, c: exchanger_effectiveness(flow_type, n, c), target[rated], Cr[rated])
+        else:
+            NTU[rated] = spec["ntu"](target[rated], Cr[rated])
+    return np.where(target == 0, 0.0, NTU)
@@ -1,6 +1,21 @@
+import math
 import numpy as np
 
-def calculate_rectangular_fin_performance(P, Ac, L, k, h_conv, T_base, T_inf, n_points=100):
+# Adaptive profiles: T(x) is convex (T'' = m^2 (T - T_inf)), so on an interval of width h the
+# error of linear interpolation is at most h^2/8 * max|T''|, and max|T''| is reached at the
+# end nearer the base. Stepping from the base with h = sqrt(8 * max_error / |T''(x)|) gives
+# the fewest points for which this bound meets max_error: dense where the profile bends
+# (near the base of high-mL fins), two points for nearly isothermal fins.
+ADAPTIVE_MAX_POINTS = 100000
+MAX_PROFILE_VALUES = 10000000 # Rows x n_points of the batch temperature profiles, 80 MB per (N, n_points) array
+
+# Gradients: with x = mL, q_f = delta_T h P L tanh(x)/x and eta_f = tanh(x)/x, so every
+# partial derivative follows from d(tanh(x)/x)/dx = (sech^2 x - tanh(x)/x) / x and
+# dx/d(h, P, k, Ac, L) = x/(2h), x/(2P), -x/(2k), -x/(2Ac), m. The closed forms are
+# evaluated on the same arrays as the outputs, with series near x = 0.
+
+def calculate_rectangular_fin_performance(P, Ac, L, k, h_conv, T_base, T_inf, n_points=100, as_arrays=False,
+                                          max_error=None, max_points=ADAPTIVE_MAX_POINTS, gradients=False):
     """
     Calculates the performance of a rectangular fin with an adiabatic tip.
 
@@ -13,6 +28,14 @@ def calculate_rectangular_fin_performance(P, Ac, L, k, h_conv, T_base, T_inf, n_
         T_base (float): Temperature at the base of the fin (K)
         T_inf (float): Ambient fluid temperature (K)
         n_points (int, optional): Number of points for temperature distribution. Defaults to 100.
+        as_arrays (bool, optional): Return x_coords and temp_dist as float64 ndarrays instead
+                                    of lists (same values). Defaults to False.
+        max_error (float, optional): If given, the profile is sampled adaptively instead of at
+                                     n_points even steps: the fewest points such that linear
+                                     interpolation between them is within max_error (K).
+        max_points (int, optional): Upper limit on the adaptive point count.
+        gradients (bool, optional): Also return the exact partial derivatives of q_f and
+                                    eta_f with respect to every input. Defaults to False.
 
     Returns:
         dict: A dictionary containing:
@@ -20,23 +43,45 @@ def calculate_rectangular_fin_performance(P, Ac, L, k, h_conv, T_base, T_inf, n_
             - temp_dist (list): List of temperatures T(x) corresponding to x_coords.
             - heat_transfer_rate (float): Calculated q_f.
             - fin_efficiency (float): Calculated eta_f.
+            With max_error also:
+            - max_interpolation_error (float): Bound on the interpolation error of the points.
+            - profile_model (dict): T(x) = T_inf + delta_T * cosh(m * (L - x)) / cosh(m * L)
+              as {"type": "cosh", "T_inf", "delta_T", "m", "L"}, for clients that evaluate it.
+            - error (str): Set instead of the profile if max_points cannot meet max_error.
+            With gradients also:
+            - gradients (dict): {"heat_transfer_rate": {input: float}, "fin_efficiency":
+              {input: float}}, inputs named as the arguments (see fin_gradients).
     """
     if k <= 0 or Ac <= 0 or P <= 0: # prevent division by zero or sqrt of negative
         m = 0
     else:
         m = np.sqrt((h_conv * P) / (k * Ac))
 
-    x_coords = np.linspace(0, L, n_points).tolist()
-
-    # Temperature distribution
-    # T(x) = T_inf + (T_base - T_inf) * (cosh(m * (L - x)) / cosh(m * L))
-    # Handle T_base == T_inf case to avoid issues with cosh(0)/cosh(0) if m or L is also 0
-    if T_base == T_inf:
-        temp_dist = [T_inf] * n_points
-    elif m == 0 or L == 0: # Handles cases where m*L might be zero, cosh(0)=1
-        temp_dist = [T_base] * n_points # Uniform temperature
+    if max_error is not None:
+        x_coords, temp_dist, bound = adaptive_fin_profile(m, L, T_base, T_inf, max_error, max_points)
+        if x_coords is None:
+            return {"error": f"More than {max_points} points are needed for max_error={max_error:g} K; "
+                             f"increase max_error or max_points."}
+        if not as_arrays:
+            x_coords, temp_dist = x_coords.tolist(), temp_dist.tolist()
     else:
-        temp_dist = [T_inf + (T_base - T_inf) * (np.cosh(m * (L - x_val)) / np.cosh(m * L)) for x_val in x_coords]
+        x_coords = np.linspace(0, L, n_points)
+        if not as_arrays:
+            x_coords = x_coords.tolist()
+
+        # Temperature distribution
+        # T(x) = T_inf + (T_base - T_inf) * (cosh(m * (L - x)) / cosh(m * L))
+        # Handle T_base == T_inf case to avoid issues with cosh(0)/cosh(0) if m or L is also 0
+        if T_base == T_inf:
+            temp_dist = [T_inf] * n_points
+        elif m == 0 or L == 0: # Handles cases where m*L might be zero, cosh(0)=1
+            temp_dist = [T_base] * n_points # Uniform temperature
+        elif as_arrays: # Same expression, evaluated on the whole array
+            temp_dist = T_inf + (T_base - T_inf) * (np.cosh(m * (L - x_coords)) / np.cosh(m * L))
+        else:
+            temp_dist = [T_inf + (T_base - T_inf) * (np.cosh(m * (L - x_val)) / np.cosh(m * L)) for x_val in x_coords]
+        if as_arrays:
+            temp_dist = np.asarray(temp_dist, dtype=float)
 
     # Heat transfer rate
     # q_f = sqrt(h_conv * P * k * Ac) * (T_base - T_inf) * tanh(m * L)
@@ -67,9 +112,218 @@ def calculate_rectangular_fin_performance(P, Ac, L, k, h_conv, T_base, T_inf, n_
     # If q_f is 0 and T_base != T_inf, but h_conv*P*L is 0, eta_f will be 1.0 by prior rule.
     # If q_f is non-zero and h_conv*P*L is 0, this implies an issue, but caught by denominator_efficiency == 0.
 
+    results = {
+        "x_coords": x_coords,
+        "temp_dist": temp_dist,
+        "heat_transfer_rate": q_f,
+        "fin_efficiency": eta_f,
+    }
+    if max_error is not None:
+        results["max_interpolation_error"] = bound
+        results["profile_model"] = {"type": "cosh", "T_inf": T_inf, "delta_T": T_base - T_inf, "m": float(m), "L": L}
+    if gradients:
+        results["gradients"] = {output: {name: float(value[0]) for name, value in partials.items()}
+                                for output, partials in fin_gradients(P, Ac, L, k, h_conv, T_base, T_inf).items()}
+    return results
+
+def adaptive_fin_profile(m, L, T_base, T_inf, max_error, max_points=ADAPTIVE_MAX_POINTS):
+    """
+    Samples the adiabatic-tip fin profile so that linear interpolation is within max_error.
+
+    Args:
+        m (float): Fin parameter sqrt(h P / (k Ac)) (1/m).
+        L (float): Fin length (m).
+        T_base, T_inf (float): Base and ambient temperatures (K).
+        max_error (float): Allowed interpolation error (K), positive.
+        max_points (int, optional): Give up (return None) beyond this many points.
+
+    Returns:
+        tuple: (x_coords, temp_dist, bound) as float64 arrays and the largest per-interval
+               error bound, or (None, None, None) if max_points is not enough.
+    """
+    if T_base == T_inf or m == 0 or L == 0: # Uniform temperature, as in the fixed-step profile
+        temperature = T_inf if T_base == T_inf else T_base
+        return np.array([0.0, L], dtype=float), np.full(2, temperature, dtype=float), 0.0
+
+    # cosh(m(L - x)) / cosh(mL) written with decaying exponentials (no overflow for large mL)
+    decay = math.exp(-2 * m * L)
+    def ratio(x):
+        return (math.exp(-m * x) + math.exp(-m * (2 * L - x))) / (1 + decay)
+
+    curvature = m * m * abs(T_base - T_inf) # |T''(0)|; |T''(x)| = curvature * ratio(x)
+    x_coords = [0.0]
+    bound = 0.0
+    while x_coords[-1] < L:
+        if len(x_coords) >= max_points:
+            return None, None, None
+        x = x_coords[-1]
+        local = curvature * ratio(x)
+        step = math.sqrt(8 * max_error / local) * (1 - 1e-12) if local > 0 else L - x # Margin for rounding
+        if x + step >= L:
+            step = L - x
+        bound = max(bound, step * step / 8 * local)
+        x_coords.append(L if step == L - x else x + step)
+
+    x_coords = np.array(x_coords)
+    temp_dist = T_inf + (T_base - T_inf) * (np.exp(-m * x_coords) + np.exp(-m * (2 * L - x_coords))) / (1 + decay)
+    return x_coords, temp_dist, bound
+
+def fin_gradients(P, Ac, L, k, h_conv, T_base, T_inf):
+    """
+    Exact partial derivatives of q_f and eta_f (adiabatic tip) with respect to every input.
+
+    Inputs are broadcast and flattened like calculate_rectangular_fin_performance_batch.
+    Derivatives are NaN where the fin is undefined (k, Ac or P not positive), and those of
+    eta_f also where T_base == T_inf (eta_f = 1 there by convention).
+
+    Returns:
+        dict: {"heat_transfer_rate": {input: (N,) array}, "fin_efficiency": {input: (N,) array}}
+              with inputs named as the arguments.
+    """
+    P, Ac, L, k, h_conv, T_base, T_inf = (
+        np.ravel(a) for a in np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (P, Ac, L, k, h_conv, T_base, T_inf)))
+    )
+    valid = (k > 0) & (Ac > 0) & (P > 0)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        k_Ac = np.where(valid, k * Ac, 1.0)
+        m = np.sqrt(h_conv * P / k_Ac)
+        x = m * L
+        small = x < 1e-2
+        ratio = np.where(x > 0, np.tanh(x) / np.where(x > 0, x, 1.0), 1.0) # tanh(x) / x = eta_f
+        decay = np.exp(-2 * x)
+        sech2 = 4 * decay / (1 + decay) ** 2
+        # d ratio / dx = x * curvature; series where the difference cancels
+        curvature = np.where(small, -2 / 3 + 8 * x ** 2 / 15 - 34 * x ** 4 / 105, (sech2 - ratio) / x ** 2)
+
+        theta_b = T_base - T_inf
+        q_scale = theta_b * h_conv * P * L # q_f = q_scale * ratio
+        # d ratio / d ln(h) = x^2 / 2 * curvature, so dq/dh = q_scale / h * (ratio + x^2 curvature / 2)
+        # = theta_b P L (ratio + sech2) / 2, finite at h = 0
+        q_flux_term = (ratio + sech2) / 2
+        q_conduction_term = (ratio - sech2) / 2
+        eta_log = x ** 2 / 2 * curvature # d eta / d ln(h) = d eta / d ln(P) = -d eta / d ln(k) = -d eta / d ln(Ac)
+        q = {
+            "P": theta_b * h_conv * L * q_flux_term,
+            "Ac": q_scale * q_conduction_term / Ac,
+            "L": theta_b * h_conv * P * sech2,
+            "k": q_scale * q_conduction_term / k,
+            "h_conv": theta_b * P * L * q_flux_term,
+            "T_base": h_conv * P * L * ratio,
+            "T_inf": -h_conv * P * L * ratio,
+        }
+        eta = {
+            "P": curvature * h_conv * L ** 2 / (2 * k_Ac),
+            "Ac": -eta_log / Ac,
+            "L": curvature * m ** 2 * L,
+            "k": -eta_log / k,
+            "h_conv": curvature * P * L ** 2 / (2 * k_Ac),
+            "T_base": np.zeros(len(L)),
+            "T_inf": np.zeros(len(L)),
+        }
+    equal = T_base == T_inf
     return {
+        "heat_transfer_rate": {name: np.where(valid, value, np.nan) for name, value in q.items()},
+        "fin_efficiency": {name: np.where(valid & ~equal, value, np.nan) for name, value in eta.items()},
+    }
+
+
+def _linspace_rows(L, n_points):
+    """Row-wise np.linspace(0, L[i], n_points), matching the scalar call bit for bit."""
+    # np.linspace with array endpoints switches every row to its denormal-step code path as
+    # soon as one row has L == 0, so the per-row step is applied here directly.
+    y = np.arange(n_points, dtype=float)
+    if n_points == 1:
+        return (y * L[:, None]).reshape(len(L), 1)
+    div = n_points - 1
+    step = L / div
+    x_coords = y * step[:, None]
+    zero_step = step == 0
+    if zero_step.any(): # Special handling for denormal numbers, as in np.linspace
+        x_coords[zero_step] = (y / div) * L[zero_step][:, None]
+    x_coords[:, -1] = L
+    return x_coords
+
+
+def calculate_rectangular_fin_performance_batch(P, Ac, L, k, h_conv, T_base, T_inf, n_points=100,
+                                                include_profiles=True, gradients=False):
+    """
+    Vectorized version of calculate_rectangular_fin_performance for many fins at once.
+
+    Every parameter may be a scalar or an array; they are broadcast against each other
+    and flattened to N rows. The edge cases of the scalar function (m = 0, L = 0,
+    T_base == T_inf) are applied as masks so the whole batch is evaluated in one pass.
+
+    Args:
+        P, Ac, L, k, h_conv, T_base, T_inf (array_like): Same meaning and units as in
+            calculate_rectangular_fin_performance, one value per fin.
+        n_points (int, optional): Number of points for each temperature distribution. Defaults to 100.
+        include_profiles (bool, optional): If False, x_coords and temp_dist are skipped
+            (None) and only q_f / eta_f are computed. Defaults to True.
+        gradients (bool, optional): Also return the partial derivatives of q_f and eta_f
+            (see fin_gradients). Defaults to False.
+
+    Returns:
+        dict: A dictionary containing NumPy arrays:
+            - x_coords (ndarray): (N, n_points) x-coordinates, or None.
+            - temp_dist (ndarray): (N, n_points) temperatures T(x), or None.
+            - heat_transfer_rate (ndarray): (N,) q_f per fin.
+            - fin_efficiency (ndarray): (N,) eta_f per fin.
+            - gradients (dict): With gradients only, {output: {input: (N,) array}}.
+    """
+    P, Ac, L, k, h_conv, T_base, T_inf = (
+        np.ravel(a) for a in np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (P, Ac, L, k, h_conv, T_base, T_inf)))
+    )
+
+    valid = (k > 0) & (Ac > 0) & (P > 0)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        m = np.where(valid, np.sqrt((h_conv * P) / np.where(valid, k * Ac, 1.0)), 0.0)
+
+        theta_b = T_base - T_inf
+        equal = T_base == T_inf
+        uniform = ~equal & ((m == 0) | (L == 0)) # cosh(0) = 1, tanh(0) = 0
+        active = ~(equal | uniform)
+
+        x_coords = None
+        temp_dist = None
+        if include_profiles:
+            x_coords = _linspace_rows(L, n_points)
+            mL = (m * L)[:, None]
+            temp_dist = T_inf[:, None] + theta_b[:, None] * (np.cosh(m[:, None] * (L[:, None] - x_coords)) / np.cosh(mL))
+            temp_dist = np.where(uniform[:, None], T_base[:, None], temp_dist)
+            temp_dist = np.where(equal[:, None], T_inf[:, None], temp_dist)
+
+        q_f = np.where(active, np.sqrt(h_conv * P * k * Ac) * theta_b * np.tanh(m * L), 0.0)
+
+        denominator_efficiency = h_conv * P * L * theta_b
+        eta_f = np.where(equal | (denominator_efficiency == 0), 1.0,
+                         q_f / np.where(denominator_efficiency == 0, 1.0, denominator_efficiency))
+    eta_f = np.where(eta_f > 0, np.minimum(eta_f, 1.0), eta_f) # clamp positive efficiency at 1
+
+    results = {
         "x_coords": x_coords,
         "temp_dist": temp_dist,
         "heat_transfer_rate": q_f,
         "fin_efficiency": eta_f,
     }
+    if gradients:
+        results["gradients"] = fin_gradients(P, Ac, L, k, h_conv, T_base, T_inf)
+    return results
+
+
+def calculate_fin_batch_from_structured(records, n_points=100, include_profiles=True):
+    """
+    Runs calculate_rectangular_fin_performance_batch on a NumPy structured array.
+
+    Args:
+        records (ndarray): Structured array with fields 'P', 'Ac', 'L', 'k', 'h_conv', 'T_base', 'T_inf'.
+        n_points (int, optional): Number of points for each temperature distribution. Defaults to 100.
+        include_profiles (bool, optional): See calculate_rectangular_fin_performance_batch.
+
+    Returns:
+        dict: Same as calculate_rectangular_fin_performance_batch.
+    """
+    return calculate_rectangular_fin_performance_batch(
+        P=records['P'], Ac=records['Ac'], L=records['L'], k=records['k'],
+        h_conv=records['h_conv'], T_base=records['T_base'], T_inf=records['T_inf'],
+        n_points=n_points, include_profiles=include_profiles
+    )
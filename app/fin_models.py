@@ -0,0 +1,266 @@
+import os
+import threading
+import numpy as np
+from scipy.special import ive, kve
+from app.lookup_table import load_tables
+from app.validation import coerce_numeric_columns, collect_row_errors
+
+# Fin model library: straight rectangular fins (adiabatic or convective tip, infinitely long),
+# cylindrical pins, annular fins of rectangular profile and straight triangular fins. Every
+# model maps its geometry to a fin efficiency eta, fin area A_f and base area A_b; then
+#     q = eta * h * A_f * (T_base - T_inf),    effectiveness = q / (h * A_b * (T_base - T_inf)).
+#
+# The annular and triangular efficiencies are ratios of modified Bessel functions. They
+# depend on one or two dimensionless groups only, so they are tabulated once on a regular
+# grid and served by linear / bilinear interpolation. When a table is built, the exact
+# value is computed at every cell centre (where interpolation error peaks for a smooth
+# function); twice the largest deviation found is the error bound that is reported, and it
+# must stay below TABLE_TOLERANCE. Points outside the table range are evaluated exactly.
+#
+# Bessel functions are used in their exponentially scaled forms (ive, kve), so the ratios
+# stay finite for large arguments.
+
+TABLE_TOLERANCE = 5e-5 # Absolute error in fin efficiency
+TABLE_VERSION = 1
+TRIANGULAR_U_MAX, TRIANGULAR_POINTS = 20.0, 4097 # u = m L
+ANNULAR_U_MAX, ANNULAR_U_POINTS = 10.0, 1025 # u = m (r2c - r1)
+ANNULAR_RATIO_MAX, ANNULAR_RATIO_POINTS = 6.0, 257 # ratio = r2c / r1
+
+COMMON_PARAMS = ['k', 'h_conv', 'T_base', 'T_inf']
+
+
+def _tanh_ratio(u):
+    """tanh(u) / u, with the limit 1 at u = 0."""
+    safe = np.where(u > 0, u, 1.0)
+    return np.where(u > 0, np.tanh(safe) / safe, 1.0)
+
+
+def triangular_efficiency_exact(u):
+    """Straight triangular fin: eta = I1(2u) / (u I0(2u)) with u = m L, m = sqrt(2h / (k t))."""
+    u = np.asarray(u, dtype=float)
+    safe = np.where(u > 0, u, 1.0)
+    return np.where(u > 0, ive(1, 2 * safe) / (safe * ive(0, 2 * safe)), 1.0)
+
+
+def annular_efficiency_exact(u, ratio):
+    """
+    Annular fin of rectangular profile (corrected tip radius r2c = r2 + t/2):
+        eta = 2 x1 / (x2^2 - x1^2) * (K1(x1) I1(x2) - I1(x1) K1(x2)) / (I0(x1) K1(x2) + K0(x1) I1(x2))
+    with x1 = m r1, x2 = m r2c, written in u = x2 - x1 and ratio = x2 / x1. For ratio -> 1
+    the fin becomes straight and eta -> tanh(u) / u.
+    """
+    u, ratio = np.broadcast_arrays(np.asarray(u, dtype=float), np.asarray(ratio, dtype=float))
+    straight = (ratio <= 1.0) | (u <= 0)
+    u_safe = np.where(straight, 1.0, u)
+    x1 = u_safe / np.where(straight, 2.0, ratio - 1.0)
+    x2 = x1 + u_safe
+    # Both products scaled by exp(x1 - x2) so that only decaying exponentials remain
+    decay = np.exp(-2 * u_safe)
+    numerator = kve(1, x1) * ive(1, x2) - ive(1, x1) * kve(1, x2) * decay
+    denominator = ive(0, x1) * kve(1, x2) * decay + kve(0, x1) * ive(1, x2)
+    eta = 2 * x1 / (u_safe * (x1 + x2)) * numerator / denominator
+    return np.where(straight, _tanh_ratio(u), eta)
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+TABLE_SPECS = {
+    "triangular": ([(0.0, TRIANGULAR_U_MAX, TRIANGULAR_POINTS)], triangular_efficiency_exact),
+    "annular": ([(0.0, ANNULAR_U_MAX, ANNULAR_U_POINTS), (1.0, ANNULAR_RATIO_MAX, ANNULAR_RATIO_POINTS)],
+                annular_efficiency_exact),
+}
+
+
+def get_fin_tables(path=None):
+    """
+    Returns the efficiency lookup tables, built on first use (about a second) or loaded from
+    path / THERMAL_FIN_TABLES (an .npz written on the first build) if given.
+    """
+    if _tables:
+        return _tables
+    with _tables_lock:
+        if not _tables:
+            _tables.update(load_tables(TABLE_SPECS, TABLE_VERSION, TABLE_TOLERANCE,
+                                       path or os.environ.get("THERMAL_FIN_TABLES"), "Fin efficiency"))
+    return _tables
+
+
+def _from_table(name, exact_function, coordinates, exact):
+    """Efficiency from the named table, exact outside its range (or everywhere if exact)."""
+    if exact:
+        return exact_function(*coordinates), np.zeros(len(coordinates[0]), dtype=bool)
+    table = get_fin_tables()[name]
+    eta, inside = table.interpolate(*coordinates)
+    outside = ~inside
+    if outside.any():
+        eta[outside] = exact_function(*(c[outside] for c in coordinates))
+    return eta, inside
+
+
+# Geometry models: columns -> (eta, A_f, A_b, rows served from a lookup table or None).
+# Symbols follow Incropera: m = sqrt(hP / (kAc)) for straight fins.
+
+def _rectangular_adiabatic(c, exact):
+    m = np.sqrt(c['h_conv'] * c['P'] / (c['k'] * c['Ac']))
+    return _tanh_ratio(m * c['L']), c['P'] * c['L'], c['Ac'], None
+
+
+def _rectangular_convective_tip(c, exact):
+    m = np.sqrt(c['h_conv'] * c['P'] / (c['k'] * c['Ac']))
+    mL = m * c['L']
+    ratio = np.divide(c['h_conv'], m * c['k'], out=np.zeros_like(m), where=m > 0) # h / (m k)
+    # q = M (sinh mL + (h/mk) cosh mL) / (cosh mL + (h/mk) sinh mL), M = sqrt(hPkAc) theta_b,
+    # divided by the tanh form to avoid overflow of sinh/cosh
+    tanh = np.tanh(mL)
+    area = c['P'] * c['L'] + c['Ac']
+    q_per_theta = np.sqrt(c['h_conv'] * c['P'] * c['k'] * c['Ac']) * (tanh + ratio) / (1 + ratio * tanh)
+    h_area = c['h_conv'] * area
+    eta = np.divide(q_per_theta, h_area, out=np.ones_like(area), where=h_area > 0)
+    return eta, area, c['Ac'], None
+
+
+def _infinite(c, exact):
+    # q = sqrt(hPkAc) theta_b; the area is unbounded, so eta is undefined (NaN)
+    n = len(c['P'])
+    return np.full(n, np.nan), np.full(n, np.inf), c['Ac'], None
+
+
+def _pin(c, exact):
+    # Cylindrical pin with convective tip through the corrected length Lc = L + D/4
+    D = c['D']
+    Lc = c['L'] + D / 4
+    m = np.sqrt(4 * c['h_conv'] / (c['k'] * D))
+    return _tanh_ratio(m * Lc), np.pi * D * Lc, np.pi * D ** 2 / 4, None
+
+
+def _annular(c, exact):
+    t, r1 = c['thickness'], c['r_inner']
+    r2c = c['r_outer'] + t / 2
+    m = np.sqrt(2 * c['h_conv'] / (c['k'] * t))
+    eta, from_table = _from_table("annular", annular_efficiency_exact, [m * (r2c - r1), r2c / r1], exact)
+    return eta, 2 * np.pi * (r2c ** 2 - r1 ** 2), 2 * np.pi * r1 * t, from_table
+
+
+def _triangular(c, exact):
+    t, L, w = c['thickness'], c['L'], c['width']
+    m = np.sqrt(2 * c['h_conv'] / (c['k'] * t))
+    eta, from_table = _from_table("triangular", triangular_efficiency_exact, [m * L], exact)
+    return eta, 2 * w * np.sqrt(L ** 2 + (t / 2) ** 2), w * t, from_table
+
+
+def _positive(*names):
+    return [(lambda c, name=name: c[name] <= 0, f"Parameter '{name}' must be positive.") for name in names]
+
+
+def _non_negative(*names):
+    return [(lambda c, name=name: c[name] < 0, f"Parameter '{name}' must be non-negative.") for name in names]
+
+
+FIN_MODELS = {
+    "rectangular_adiabatic": {
+        "description": "Straight fin of uniform cross-section, adiabatic tip.",
+        "parameters": ['P', 'Ac', 'L'],
+        "evaluate": _rectangular_adiabatic,
+        "rules": _positive('P', 'Ac') + _non_negative('L'),
+    },
+    "rectangular_convective_tip": {
+        "description": "Straight fin of uniform cross-section, convection from the tip.",
+        "parameters": ['P', 'Ac', 'L'],
+        "evaluate": _rectangular_convective_tip,
+        "rules": _positive('P', 'Ac') + _non_negative('L'),
+    },
+    "infinite": {
+        "description": "Infinitely long straight fin of uniform cross-section.",
+        "parameters": ['P', 'Ac'],
+        "evaluate": _infinite,
+        "rules": _positive('P', 'Ac'),
+    },
+    "pin": {
+        "description": "Cylindrical pin fin of diameter D, tip convection by corrected length L + D/4.",
+        "parameters": ['D', 'L'],
+        "evaluate": _pin,
+        "rules": _positive('D') + _non_negative('L'),
+    },
+    "annular": {
+        "description": "Annular fin of rectangular profile on a tube (Bessel solution, corrected tip radius).",
+        "parameters": ['r_inner', 'r_outer', 'thickness'],
+        "evaluate": _annular,
+        "table": "annular",
+        "rules": _positive('r_inner', 'thickness') + [
+            (lambda c: c['r_outer'] < c['r_inner'], "'r_outer' must not be smaller than 'r_inner'.")],
+    },
+    "triangular": {
+        "description": "Straight fin of triangular profile (base thickness t, width w; Bessel solution).",
+        "parameters": ['L', 'thickness', 'width'],
+        "evaluate": _triangular,
+        "table": "triangular",
+        "rules": _positive('thickness', 'width') + _non_negative('L'),
+    },
+}
+
+
+def parse_fin_model_request(data):
+    """
+    Parses and checks a fin model request.
+
+    Args:
+        data (dict): JSON body with 'model' (a FIN_MODELS name), its geometry parameters and
+            k, h_conv, T_base and T_inf, each a number or a list (one entry per fin), and
+            optionally 'exact' (bool) to bypass the lookup tables.
+
+    Returns:
+        tuple: (problem, row_errors, error). problem holds model, columns and exact.
+    """
+    model = data.get('model')
+    if model not in FIN_MODELS:
+        return None, [], f"Parameter 'model' must be one of: {', '.join(FIN_MODELS)}."
+    spec = FIN_MODELS[model]
+    columns, error = coerce_numeric_columns(data, spec["parameters"] + COMMON_PARAMS)
+    if error:
+        return None, [], error
+    exact = data.get('exact', False)
+    if not isinstance(exact, bool):
+        return None, [], "Parameter 'exact' must be true or false."
+
+    rules = [(rule(columns), message) for rule, message in spec["rules"]]
+    rules += [(columns['k'] <= 0, "Thermal conductivity 'k' must be positive."),
+              (columns['h_conv'] < 0, "Parameter 'h_conv' must be non-negative.")]
+    row_errors = collect_row_errors(rules, len(columns['k']))
+    return {"model": model, "columns": columns, "exact": exact}, row_errors, None
+
+
+def evaluate_fin_model(model, columns, exact=False):
+    """
+    Evaluates a fin model for a batch of fins.
+
+    Args:
+        model (str): Name in FIN_MODELS.
+        columns (dict): Equal-length float arrays of the model parameters and COMMON_PARAMS.
+        exact (bool, optional): Evaluate Bessel-based efficiencies exactly instead of from
+                                the lookup tables.
+
+    Returns:
+        dict: A dictionary containing (N,) arrays fin_efficiency, heat_transfer_rate,
+              effectiveness, fin_area and base_area, plus table_rows (rows served from a
+              lookup table) and table_error_bound (bound on their efficiency error, 0 if none).
+    """
+    eta, fin_area, base_area, from_table = FIN_MODELS[model]["evaluate"](columns, exact)
+    theta_b = columns['T_base'] - columns['T_inf']
+    h = columns['h_conv']
+    if model == "infinite":
+        q = np.sqrt(h * columns['P'] * columns['k'] * columns['Ac']) * theta_b
+    else:
+        q = eta * h * fin_area * theta_b
+    with np.errstate(divide='ignore', invalid='ignore'):
+        effectiveness = q / (h * base_area * theta_b)
+    table_rows = int(from_table.sum()) if from_table is not None else 0
+    return {
+        "fin_efficiency": eta,
+        "heat_transfer_rate": q,
+        "effectiveness": effectiveness,
+        "fin_area": fin_area,
+        "base_area": base_area,
+        "table_rows": table_rows,
+        "table_error_bound": get_fin_tables()[FIN_MODELS[model]["table"]].bound if table_rows else 0.0,
+    }
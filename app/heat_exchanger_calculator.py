@@ -1,8 +1,17 @@
 import numpy as np
+from app.exchanger_configurations import (
+    EXCHANGER_CONFIGURATIONS, exchanger_effectiveness, exchanger_effectiveness_derivatives
+)
+
+# Gradients: eps depends on the inputs through NTU = UA / C_min and Cr = C_min / C_max, so
+# the exact d eps / d NTU and d eps / d Cr of the configuration are chained through
+# C = m_dot * Cp on whichever side is C_min, and q_actual = eps * C_min * (T_in_hot - T_in_cold).
+# At C_hot == C_cold the derivative of the branch used by the calculation (C_min = C_cold)
+# is returned.
 
 def calculate_heat_exchanger_performance(m_dot_hot, Cp_hot, T_in_hot,
                                          m_dot_cold, Cp_cold, T_in_cold,
-                                         UA, flow_type):
+                                         UA, flow_type, gradients=False):
     """
     Calculates the performance of a heat exchanger using the NTU-effectiveness method.
 
@@ -14,12 +23,27 @@ def calculate_heat_exchanger_performance(m_dot_hot, Cp_hot, T_in_hot,
         Cp_cold (float): Specific heat capacity of the cold fluid (J/kgK)
         T_in_cold (float): Inlet temperature of the cold fluid (K)
         UA (float): Overall heat transfer coefficient - Area product (W/K)
-        flow_type (str): Type of flow ("parallel" or "counterflow")
+        flow_type (str): Type of flow ("parallel", "counterflow" or another name in
+                         EXCHANGER_CONFIGURATIONS, e.g. "shell_and_tube", "crossflow_unmixed")
+        gradients (bool, optional): Also return "gradients": {"effectiveness": {input: float},
+                                    "q_actual": {input: float}}, the exact partial derivatives
+                                    with respect to the numeric inputs (None where the
+                                    effectiveness is not rated). Defaults to False.
 
     Returns:
         dict: A dictionary containing NTU, effectiveness, q_actual, T_out_hot, T_out_cold,
               and an optional error message.
     """
+    if gradients:
+        results = calculate_heat_exchanger_performance(m_dot_hot, Cp_hot, T_in_hot, m_dot_cold, Cp_cold, T_in_cold,
+                                                       UA, flow_type)
+        partials = calculate_heat_exchanger_performance_batch(m_dot_hot, Cp_hot, T_in_hot, m_dot_cold, Cp_cold,
+                                                              T_in_cold, UA, flow_type, gradients=True)["gradients"]
+        results["gradients"] = {output: {name: None if np.isnan(value[0]) else float(value[0])
+                                         for name, value in values.items()}
+                                for output, values in partials.items()}
+        return results
+
     results = {
         "NTU": None, "effectiveness": None, "q_actual": None,
         "T_out_hot": None, "T_out_cold": None, "error": None
@@ -94,8 +118,10 @@ def calculate_heat_exchanger_performance(m_dot_hot, Cp_hot, T_in_hot,
                 epsilon = 1.0 # This implies perfect heat exchange for this specific condition
             else:
                 epsilon = numerator / denominator
+    elif flow_type in EXCHANGER_CONFIGURATIONS:
+        epsilon = float(exchanger_effectiveness(flow_type, NTU, Cr)[0])
     else:
-        results["error"] = "Invalid flow type specified. Must be 'parallel' or 'counterflow'."
+        results["error"] = f"Invalid flow type specified. Must be one of: {', '.join(EXCHANGER_CONFIGURATIONS)}."
         return results
 
     results["effectiveness"] = epsilon
@@ -133,3 +159,172 @@ def calculate_heat_exchanger_performance(m_dot_hot, Cp_hot, T_in_hot,
         # and cold fluid heats significantly, approaching each other's inlet temps.
 
     return results
+
+
+# Per-row status codes returned by calculate_heat_exchanger_performance_batch
+HX_OK = 0
+HX_ERROR_REVERSED_INLETS = 1 # T_in_hot < T_in_cold, nothing is calculated
+HX_ERROR_NO_FLOW = 2 # Both C_hot and C_cold are zero
+HX_ERROR_INVALID_FLOW_TYPE = 3
+
+HX_ERROR_MESSAGES = {
+    HX_OK: None,
+    HX_ERROR_REVERSED_INLETS: "Hot fluid inlet temperature must be greater than cold fluid inlet temperature.",
+    HX_ERROR_NO_FLOW: "Both hot and cold fluid flow rates are zero. No heat transfer possible.",
+    HX_ERROR_INVALID_FLOW_TYPE: f"Invalid flow type specified. Must be one of: {', '.join(EXCHANGER_CONFIGURATIONS)}.",
+}
+
+
+def calculate_heat_exchanger_performance_batch(m_dot_hot, Cp_hot, T_in_hot,
+                                               m_dot_cold, Cp_cold, T_in_cold,
+                                               UA, flow_type, gradients=False):
+    """
+    Vectorized version of calculate_heat_exchanger_performance for many operating points.
+
+    All inputs may be scalars or arrays (flow_type may be a single string or an array of
+    strings); they are broadcast against each other and flattened to N rows. Each branch
+    of the scalar function becomes a mask, and every row reproduces the scalar result
+    exactly. Values the scalar function leaves as None are NaN here.
+
+    Args:
+        m_dot_hot, Cp_hot, T_in_hot, m_dot_cold, Cp_cold, T_in_cold, UA (array_like):
+            Same meaning and units as in calculate_heat_exchanger_performance.
+        flow_type (str or array_like): A name in EXCHANGER_CONFIGURATIONS per row.
+        gradients (bool, optional): Also return "gradients": {"effectiveness": {input: (N,)},
+            "q_actual": {input: (N,)}} with the numeric inputs named as the arguments. Rows
+            without a rated effectiveness (errors, a stream without flow) are NaN. For
+            tabulated configurations these are the derivatives of the exact solution.
+
+    Returns:
+        dict: A dictionary containing (N,) NumPy arrays NTU, effectiveness, q_actual,
+              T_out_hot, T_out_cold and error_code (see HX_ERROR_MESSAGES).
+    """
+    m_dot_hot, Cp_hot, T_in_hot, m_dot_cold, Cp_cold, T_in_cold, UA, flow_type = (
+        np.ravel(a) for a in np.broadcast_arrays(
+            *(np.asarray(v, dtype=float) for v in (m_dot_hot, Cp_hot, T_in_hot, m_dot_cold, Cp_cold, T_in_cold, UA)),
+            np.asarray(flow_type)
+        )
+    )
+    n_rows = len(UA)
+    NTU = np.full(n_rows, np.nan)
+    effectiveness = np.full(n_rows, np.nan)
+    q_actual = np.full(n_rows, np.nan)
+    error_code = np.full(n_rows, HX_OK, dtype=np.int8)
+
+    reversed_inlets = T_in_hot < T_in_cold
+    error_code[reversed_inlets] = HX_ERROR_REVERSED_INLETS
+
+    C_hot = m_dot_hot * Cp_hot
+    C_cold = m_dot_cold * Cp_cold
+
+    # Default if C_hot is 0 or q_actual is 0; reversed rows stay undefined like the scalar function
+    T_out_hot = np.where(reversed_inlets, np.nan, T_in_hot)
+    T_out_cold = np.where(reversed_inlets, np.nan, T_in_cold)
+
+    no_flow = ~reversed_inlets & (C_hot == 0) & (C_cold == 0)
+    NTU[no_flow] = 0
+    effectiveness[no_flow] = 0
+    q_actual[no_flow] = 0.0
+    error_code[no_flow] = HX_ERROR_NO_FLOW
+
+    one_flow = ~reversed_inlets & ~no_flow & ((C_hot == 0) | (C_cold == 0)) # C_min is 0
+    NTU[one_flow] = np.where(UA[one_flow] > 0, np.inf, 0)
+    effectiveness[one_flow] = 0.0
+    q_actual[one_flow] = 0.0
+
+    rated = ~(reversed_inlets | no_flow | one_flow)
+    C_min = np.where(C_hot < C_cold, C_hot, C_cold)
+    C_max = np.where(C_hot < C_cold, C_cold, C_hot)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        Cr = np.where(rated, C_min / np.where(rated, C_max, 1.0), np.nan)
+        rated_NTU = UA / np.where(rated, C_min, 1.0)
+    NTU[rated] = rated_NTU[rated]
+
+    is_parallel = rated & (flow_type == "parallel")
+    is_counterflow = rated & (flow_type == "counterflow")
+    # The other configurations are evaluated per name by the registry
+    is_configuration = rated & ~(is_parallel | is_counterflow)
+    configuration_names = []
+    if is_configuration.any():
+        configuration_names = [name for name in np.unique(flow_type[is_configuration])
+                               if name in EXCHANGER_CONFIGURATIONS]
+        is_configuration &= np.isin(flow_type, configuration_names)
+    invalid_flow = rated & ~(is_parallel | is_counterflow | is_configuration)
+    error_code[invalid_flow] = HX_ERROR_INVALID_FLOW_TYPE
+
+    # Each correlation is evaluated only on the rows that use it, as in the scalar branches
+    phase_change = (is_parallel | is_counterflow) & (Cr == 0)
+    effectiveness[phase_change] = 1 - np.exp(-NTU[phase_change])
+
+    parallel = is_parallel & (Cr != 0)
+    n, c = NTU[parallel], Cr[parallel]
+    effectiveness[parallel] = (1 - np.exp(-n * (1 + c))) / (1 + c)
+
+    balanced = is_counterflow & (Cr == 1) # C_min == C_max
+    effectiveness[balanced] = NTU[balanced] / (1 + NTU[balanced])
+
+    counterflow = is_counterflow & (Cr != 0) & (Cr != 1)
+    n, c = NTU[counterflow], Cr[counterflow]
+    numerator = 1 - np.exp(-n * (1 - c))
+    denominator = 1 - c * np.exp(-n * (1 - c))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        effectiveness[counterflow] = np.where(denominator == 0, 1.0, numerator / denominator)
+
+    for name in configuration_names:
+        rows = is_configuration & (flow_type == name)
+        effectiveness[rows] = exchanger_effectiveness(name, NTU[rows], Cr[rows])
+
+    solved = is_parallel | is_counterflow | is_configuration
+    q_max = C_min * (T_in_hot - T_in_cold)
+    q_actual[solved] = np.where(T_in_hot[solved] == T_in_cold[solved], 0.0,
+                                effectiveness[solved] * q_max[solved])
+
+    # Outlet temperatures only move for rows with a calculated q_actual and a flowing stream
+    with np.errstate(divide='ignore', invalid='ignore'):
+        hot_flowing = solved & (C_hot > 0)
+        T_out_hot[hot_flowing] = T_in_hot[hot_flowing] - q_actual[hot_flowing] / C_hot[hot_flowing]
+        cold_flowing = solved & (C_cold > 0)
+        T_out_cold[cold_flowing] = T_in_cold[cold_flowing] + q_actual[cold_flowing] / C_cold[cold_flowing]
+
+    results = {
+        "NTU": NTU,
+        "effectiveness": effectiveness,
+        "q_actual": q_actual,
+        "T_out_hot": T_out_hot,
+        "T_out_cold": T_out_cold,
+        "error_code": error_code,
+    }
+    if not gradients:
+        return results
+
+    d_eps_d_ntu = np.full(n_rows, np.nan)
+    d_eps_d_cr = np.full(n_rows, np.nan)
+    for name in np.unique(flow_type[solved]):
+        rows = solved & (flow_type == name)
+        d_eps_d_ntu[rows], d_eps_d_cr[rows] = exchanger_effectiveness_derivatives(name, NTU[rows], Cr[rows])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d_eps = {
+            "C_min": -d_eps_d_ntu * NTU / C_min + d_eps_d_cr / C_max,
+            "C_max": -d_eps_d_cr * Cr / C_max,
+            "UA": d_eps_d_ntu / C_min,
+        }
+    delta_T = T_in_hot - T_in_cold
+    d_q = {
+        "C_min": (d_eps["C_min"] * C_min + effectiveness) * delta_T,
+        "C_max": d_eps["C_max"] * C_min * delta_T,
+        "UA": d_eps["UA"] * C_min * delta_T,
+    }
+    hot_is_min = C_hot < C_cold
+    unrated = np.where(solved, 0.0, np.nan)
+    results["gradients"] = {}
+    for output, partials, d_inlet_hot, d_inlet_cold in [
+            ("effectiveness", d_eps, unrated, unrated),
+            ("q_actual", d_q, effectiveness * C_min + unrated, -effectiveness * C_min + unrated)]:
+        d_hot = np.where(hot_is_min, partials["C_min"], partials["C_max"])
+        d_cold = np.where(hot_is_min, partials["C_max"], partials["C_min"])
+        results["gradients"][output] = {
+            "m_dot_hot": d_hot * Cp_hot, "Cp_hot": d_hot * m_dot_hot, "T_in_hot": d_inlet_hot,
+            "m_dot_cold": d_cold * Cp_cold, "Cp_cold": d_cold * m_dot_cold, "T_in_cold": d_inlet_cold,
+            "UA": partials["UA"],
+        }
+    return results
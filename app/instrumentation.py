@@ -0,0 +1,195 @@
+import bisect
+import cProfile
+import contextvars
+import io
+import marshal
+import os
+import pstats
+import random
+import threading
+import time
+
+# Per-request phase timings and sampling profiles for the routes. A request is split into
+# phases by lap marks: the route calls mark("parse") after reading the body, mark("validate")
+# after checking inputs and mark("compute") after the calculator ran; the time from the last
+# mark to the end of the request is "serialize" (jsonify / binary encoding). Timings are
+# aggregated into fixed-bucket histograms and rendered in the Prometheus text format.
+#
+# When disabled (THERMAL_METRICS=0) no hooks are registered and mark() is a None check.
+
+PHASES = ["parse", "validate", "compute", "serialize"]
+DEFAULT_BUCKETS = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0] # seconds; +Inf is implicit
+PROFILE_SORT_KEYS = ["cumulative", "tottime", "calls", "ncalls"]
+
+_current_request = contextvars.ContextVar("thermal_request_timer", default=None)
+
+
+class _RequestTimer:
+    __slots__ = ("route", "method", "start", "last", "phases", "profiler")
+
+    def __init__(self, route, method, profiler):
+        self.route = route
+        self.method = method
+        self.start = self.last = time.perf_counter()
+        self.phases = {}
+        self.profiler = profiler
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, label_names, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = list(buckets)
+        self._series = {} # labels -> [bucket counts (len(buckets) + 1), sum, count]
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            label_text = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ["+Inf"], counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total!r}")
+            lines.append(f"{self.name}_count{{{label_text}}} {count}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Instrumentation:
+    """
+    Collects request and phase durations, and cProfile samples of a fraction of requests.
+
+    Args:
+        profile_rate (float, optional): Fraction of requests run under cProfile (0 = off).
+        buckets (list, optional): Histogram bucket upper bounds in seconds.
+    """
+
+    def __init__(self, profile_rate=0.0, buckets=DEFAULT_BUCKETS):
+        self.profile_rate = profile_rate
+        self.requests = Histogram("thermal_request_duration_seconds", "Request handling time.",
+                                  ("route", "method", "status"), buckets)
+        self.phases = Histogram("thermal_request_phase_seconds", "Time per request phase.",
+                                ("route", "phase"), buckets)
+        self.profiled_requests = 0
+        self._profile = None # pstats.Stats aggregated over the sampled requests
+        self._lock = threading.Lock()
+
+    def start(self, route, method):
+        """Starts timing the current request; samples it for profiling with probability profile_rate."""
+        profiler = None
+        if self.profile_rate > 0 and random.random() < self.profile_rate:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError: # Another profiler is active in this thread
+                profiler = None
+        _current_request.set(_RequestTimer(route, method, profiler))
+
+    def mark(self, phase):
+        """Attributes the time since the previous mark (or the request start) to phase."""
+        timer = _current_request.get()
+        if timer is not None:
+            now = time.perf_counter()
+            timer.phases[phase] = timer.phases.get(phase, 0.0) + now - timer.last
+            timer.last = now
+
+    def finish(self, status):
+        """Records the current request; the time after the last mark counts as "serialize"."""
+        timer = _current_request.get()
+        if timer is None:
+            return
+        _current_request.set(None)
+        now = time.perf_counter()
+        if timer.profiler is not None:
+            timer.profiler.disable()
+        timer.phases["serialize"] = timer.phases.get("serialize", 0.0) + now - timer.last
+        with self._lock:
+            self.requests.observe((timer.route, timer.method, str(status)), now - timer.start)
+            for phase, seconds in timer.phases.items():
+                self.phases.observe((timer.route, phase), seconds)
+            if timer.profiler is not None:
+                self._add_profile(timer.profiler)
+
+    def discard(self):
+        """Drops the current request's timer (e.g. after an unhandled exception)."""
+        timer = _current_request.get()
+        if timer is not None:
+            _current_request.set(None)
+            if timer.profiler is not None:
+                timer.profiler.disable()
+
+    def _add_profile(self, profiler):
+        profiler.create_stats()
+        if not profiler.stats: # Nothing ran while it was enabled
+            return
+        if self._profile is None:
+            self._profile = pstats.Stats(profiler)
+        else:
+            self._profile.add(profiler)
+        self.profiled_requests += 1
+
+    def render_prometheus(self):
+        """Returns the histograms in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            lines = self.requests.render() + self.phases.render()
+            lines += ["# HELP thermal_profiled_requests_total Requests sampled by the profiler.",
+                      "# TYPE thermal_profiled_requests_total counter",
+                      f"thermal_profiled_requests_total {self.profiled_requests}",
+                      "# HELP thermal_profile_rate Fraction of requests sampled by the profiler.",
+                      "# TYPE thermal_profile_rate gauge",
+                      f"thermal_profile_rate {self.profile_rate!r}"]
+        return "\n".join(lines) + "\n"
+
+    def profile_text(self, sort="cumulative", limit=50):
+        """Returns the aggregated profile as pstats text, or None if no request was sampled."""
+        with self._lock:
+            if self._profile is None:
+                return None
+            stream = io.StringIO()
+            self._profile.stream = stream
+            self._profile.sort_stats(sort).print_stats(limit)
+        return f"{self.profiled_requests} sampled request(s)\n" + stream.getvalue()
+
+    def profile_dump(self):
+        """Returns the aggregated profile in the pstats file format (load with pstats.Stats(path))."""
+        with self._lock:
+            return None if self._profile is None else marshal.dumps(self._profile.stats)
+
+    def clear_profile(self):
+        with self._lock:
+            self._profile = None
+            self.profiled_requests = 0
+
+
+def create_instrumentation(config=None):
+    """
+    Creates the instrumentation from configuration (e.g. os.environ):
+        THERMAL_METRICS: "1" (default) or "0" to disable phase timings and /metrics
+        THERMAL_PROFILE_RATE: fraction of requests to profile, 0 (default) to 1
+
+    Returns:
+        Instrumentation or None: None if disabled.
+    """
+    config = os.environ if config is None else config
+    if config.get("THERMAL_METRICS", "1").lower() in ["0", "false", "no", "none", "off"]:
+        return None
+    profile_rate = float(config.get("THERMAL_PROFILE_RATE", 0.0))
+    if not 0.0 <= profile_rate <= 1.0:
+        raise ValueError("THERMAL_PROFILE_RATE must be between 0 and 1.")
+    return Instrumentation(profile_rate=profile_rate)
@@ -0,0 +1,200 @@
+import numpy as np
+from scipy.optimize import brentq
+from app.sweep import SWEEP_CALCULATORS
+
+try: # Vectorized bracketed root finding (SciPy >= 1.15)
+    from scipy.optimize.elementwise import find_root
+except ImportError:
+    find_root = None
+
+# Inverse design: find the value of one input (UA, a layer thickness, fin length, ...) for
+# which a calculator output reaches a target. The calculators are evaluated through their
+# vectorized sweep evaluators, so many targets are solved together: every iteration of the
+# root finder evaluates all of them in one batch call.
+
+TARGET_KINDS = ["equal", "min", "max"]
+MAX_TARGETS = 100000
+DEFAULT_XRTOL = 1e-12
+
+
+def _objective(calculator, base, variable, output):
+    """Returns g(x) -> output value at input x (vectorized); NaN where the point is invalid."""
+    spec = SWEEP_CALCULATORS[calculator]
+
+    def g(x):
+        x = np.atleast_1d(np.asarray(x, dtype=float))
+        outputs, row_errors, error = spec["evaluate"](base, {variable: x})
+        if error:
+            raise ValueError(error)
+        values = np.array(outputs[output], dtype=float)
+        if row_errors:
+            values[[row["row"] for row in row_errors]] = np.nan
+        if "error_code" in outputs:
+            values[outputs["error_code"] != 0] = np.nan
+        return values
+    return g
+
+
+def parse_solve_request(data):
+    """
+    Parses and checks an inverse design request.
+
+    Args:
+        data (dict): JSON body with
+            - calculator (str): "fin", "heat_exchanger" or "composite_wall".
+            - base (dict): Inputs of the single-point route; the variable overrides its entry.
+            - variable (str): Input to solve for (sweep parameter names, e.g. "UA",
+              "layers.1.thickness").
+            - bounds (list): [lower, upper] search interval of the variable.
+            - target (dict): {"output": name, "value": v} or {"output": name, "values": [...]},
+              and optionally "kind": "equal" (default), "min" (output >= value) or "max"
+              (output <= value).
+
+    Returns:
+        tuple: (problem, error). problem is a dict of keyword arguments for solve_inverse.
+    """
+    calculator = data.get('calculator')
+    if calculator not in SWEEP_CALCULATORS:
+        return None, f"Parameter 'calculator' must be one of: {', '.join(SWEEP_CALCULATORS)}."
+    spec = SWEEP_CALCULATORS[calculator]
+    base = data.get('base', {})
+    if not isinstance(base, dict):
+        return None, "Parameter 'base' must be a dictionary."
+
+    variable = data.get('variable')
+    numeric_parameters = [name for name in spec["parameters"](base) if name != 'flow_type']
+    if variable not in numeric_parameters:
+        return None, f"Parameter 'variable' must be one of: {', '.join(numeric_parameters)}."
+
+    bounds = data.get('bounds')
+    if (not isinstance(bounds, list) or len(bounds) != 2
+            or not all(isinstance(b, (int, float)) for b in bounds) or not bounds[0] < bounds[1]):
+        return None, "Parameter 'bounds' must be a list [lower, upper] of numbers with lower < upper."
+
+    target = data.get('target')
+    if not isinstance(target, dict):
+        return None, "Parameter 'target' must be a dictionary."
+    outputs = [name for name in spec["outputs"] if name != 'error_code']
+    if target.get('output') not in outputs:
+        return None, f"Target 'output' must be one of: {', '.join(outputs)}."
+    kind = target.get('kind', 'equal')
+    if kind not in TARGET_KINDS:
+        return None, f"Target 'kind' must be one of: {', '.join(TARGET_KINDS)}."
+    values = target.get('values', [target.get('value')] if 'value' in target else None)
+    if not isinstance(values, list) or not values or not all(isinstance(v, (int, float)) for v in values):
+        return None, "Target needs a numeric 'value' or a non-empty list of numeric 'values'."
+    if len(values) > MAX_TARGETS:
+        return None, f"At most {MAX_TARGETS} target values can be solved per request."
+
+    # Fail on structural input problems (missing parameters, ...) before searching
+    try:
+        _objective(calculator, base, variable, target['output'])(np.array(bounds, dtype=float))
+    except ValueError as e:
+        return None, str(e)
+
+    return {
+        "calculator": calculator,
+        "base": base,
+        "variable": variable,
+        "bounds": (float(bounds[0]), float(bounds[1])),
+        "output": target['output'],
+        "targets": np.array(values, dtype=float),
+        "kind": kind,
+    }, None
+
+
+def solve_inverse(calculator, base, variable, bounds, output, targets, kind="equal", xrtol=DEFAULT_XRTOL):
+    """
+    Solves output(variable) = target for every target value within bounds.
+
+    A single target uses scipy.optimize.brentq; several targets are solved together with
+    the elementwise (vectorized) bracketed root finder. For "min"/"max" targets the root is
+    the limit of the feasible range, which lies on the side given by 'feasible'; if the
+    whole interval is feasible the bound that is nearest to the target is returned.
+
+    Args:
+        calculator (str): Calculator name (see SWEEP_CALCULATORS).
+        base (dict): Inputs of the single-point route.
+        variable (str): Input to solve for.
+        bounds (tuple): (lower, upper) search interval.
+        output (str): Calculator output to match.
+        targets (ndarray): Target values of the output.
+        kind (str, optional): "equal", "min" or "max". Defaults to "equal".
+        xrtol (float, optional): Relative tolerance on the variable.
+
+    Returns:
+        dict: A dictionary containing:
+            - value (ndarray): Solved variable per target (NaN where unsolved).
+            - outputs (dict): All scalar calculator outputs at the solved values.
+            - feasible (list): "below"/"above" (variable values satisfying a min/max target
+              lie below/above value), "interval" if all of bounds satisfy it, or None.
+            - iterations (ndarray): Root finder iterations per target.
+            - errors (list): [{"row": i, "error": message}, ...] for targets not solved.
+    """
+    g = _objective(calculator, base, variable, output)
+    targets = np.asarray(targets, dtype=float)
+    n = len(targets)
+    lower, upper = bounds
+    g_bounds = g(np.array([lower, upper]))
+    r_lower, r_upper = g_bounds[0] - targets, g_bounds[1] - targets
+
+    value = np.full(n, np.nan)
+    iterations = np.zeros(n, dtype=np.int64)
+    messages = np.full(n, None, dtype=object)
+    feasible = np.full(n, None, dtype=object)
+
+    if not np.isfinite(g_bounds).all():
+        messages[:] = f"'{output}' is undefined at a bound of '{variable}'; narrow the bounds."
+    else:
+        exact_lower, exact_upper = r_lower == 0, r_upper == 0
+        value[exact_lower] = lower
+        value[exact_upper & ~exact_lower] = upper
+        bracketed = np.sign(r_lower) * np.sign(r_upper) < 0
+
+        if kind != "equal":
+            # Which side of the limit satisfies it: output >= target (min) or <= target (max)
+            satisfied_lower = r_lower >= 0 if kind == "min" else r_lower <= 0
+            satisfied_upper = r_upper >= 0 if kind == "min" else r_upper <= 0
+            feasible[bracketed & satisfied_lower] = "below"
+            feasible[bracketed & satisfied_upper] = "above"
+            everywhere = satisfied_lower & satisfied_upper & ~bracketed
+            feasible[everywhere] = "interval"
+            nearest = np.where(np.abs(r_lower) <= np.abs(r_upper), lower, upper)
+            value[everywhere] = nearest[everywhere]
+
+        rows = np.flatnonzero(bracketed)
+        if len(rows) == 1 or (len(rows) and find_root is None):
+            for i in rows:
+                x, info = brentq(lambda x: g(x)[0] - targets[i], lower, upper, xtol=1e-300, rtol=xrtol,
+                                 full_output=True, disp=False)
+                value[i] = x if info.converged else np.nan
+                iterations[i] = info.iterations
+        elif len(rows):
+            res = find_root(lambda x, t: g(x) - t, (lower, upper), args=(targets[rows],),
+                            tolerances={"xrtol": xrtol, "xatol": 0.0})
+            value[rows] = np.where(res.success, res.x, np.nan)
+            iterations[rows] = res.nit
+
+        unsolved = np.isnan(value) & (messages == None) # noqa: E711 (elementwise comparison)
+        messages[unsolved & ~bracketed] = (
+            f"Target is not reachable for '{variable}' in [{lower}, {upper}] "
+            f"('{output}' ranges from {g_bounds[0]:.6g} to {g_bounds[1]:.6g})."
+        )
+        messages[unsolved & bracketed] = "Root finder did not converge; the output may be discontinuous."
+
+    solved = np.flatnonzero(~np.isnan(value))
+    spec = SWEEP_CALCULATORS[calculator]
+    outputs = {name: np.full(n, np.nan) for name in spec["outputs"] if name != 'error_code'}
+    if len(solved):
+        at_root, _, _ = spec["evaluate"](base, {variable: value[solved]})
+        for name in outputs:
+            outputs[name][solved] = at_root[name]
+
+    failed = np.flatnonzero(messages != None) # noqa: E711
+    return {
+        "value": value,
+        "outputs": outputs,
+        "feasible": feasible.tolist(),
+        "iterations": iterations,
+        "errors": [{"row": int(i), "error": messages[i]} for i in failed],
+    }
@@ -0,0 +1,282 @@
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Background execution of slow requests (large calculations, sweeps, PDF exports). A job
+# stores the HTTP-style outcome of its work (status code, mimetype, body), so a finished
+# job can be served exactly like the synchronous route would have answered.
+#
+# The body is spooled to a file in the result directory as the runner produces it (the
+# store only keeps its path and size), so streamed results such as sweeps never sit in
+# memory as a whole; a body larger than max_result_bytes stops the job. Kinds listed as
+# process kinds run in a process pool instead of the job threads, so CPU-bound Python
+# (PDF layout, JSON encoding) does not hold the GIL of the process serving requests.
+
+DEFAULT_WORKERS = 4
+DEFAULT_PROCESS_WORKERS = 2
+DEFAULT_MAX_JOBS = 1000 # Finished jobs kept before the oldest are dropped
+DEFAULT_MAX_RESULT_BYTES = 1 << 30
+JOB_STATES = ["queued", "running", "succeeded", "failed", "cancelled"]
+
+
+class JobResultTooLarge(Exception):
+    """Raised by a runner once the body it is spooling exceeds the result size limit."""
+
+
+def spool_response(chunks, path, max_bytes):
+    """
+    Writes the chunks of a response body to path.
+
+    Returns:
+        int: Bytes written.
+
+    Raises:
+        JobResultTooLarge: The body exceeds max_bytes (the file is removed).
+    """
+    size = 0
+    try:
+        with open(path, "wb") as f:
+            for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise JobResultTooLarge(f"The job result exceeds the limit of {max_bytes} bytes.")
+                f.write(chunk)
+    except BaseException:
+        _remove(path)
+        raise
+    return size
+
+
+def _remove(path):
+    if path is not None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _new_job(kind):
+    return {
+        "id": uuid.uuid4().hex,
+        "kind": kind,
+        "status": "queued",
+        "created_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+        "status_code": None,
+        "mimetype": None,
+        "result_path": None, # Spooled body
+        "result_size": None,
+        "error": None,
+    }
+
+
+class MemoryJobStore:
+    """Job records in a dict of this process; finished jobs beyond max_jobs are dropped oldest first."""
+
+    def __init__(self, max_jobs=DEFAULT_MAX_JOBS):
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, job):
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+            finished = [job_id for job_id, j in self._jobs.items() if j["finished_at"] is not None]
+            for job_id in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+                _remove(self._jobs.pop(job_id)["result_path"])
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+
+class SQLiteJobStore:
+    """Job records in a local SQLite file, visible to every worker process on the host."""
+
+    _COLUMNS = ["id", "kind", "status", "created_at", "started_at", "finished_at",
+                "status_code", "mimetype", "result_path", "result_size", "error"]
+
+    def __init__(self, path, max_jobs=DEFAULT_MAX_JOBS):
+        self.path = path
+        self.max_jobs = max_jobs
+        self._local = threading.local()
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, kind TEXT, status TEXT, "
+                "created_at REAL, started_at REAL, finished_at REAL, status_code INTEGER, "
+                "mimetype TEXT, result_path TEXT, result_size INTEGER, error TEXT)"
+            )
+            columns = [row[1] for row in db.execute("PRAGMA table_info(jobs)")]
+            for column, column_type in [("result_path", "TEXT"), ("result_size", "INTEGER")]:
+                if column not in columns: # Files written before results were spooled
+                    db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+
+    def _connect(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5.0)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    def add(self, job):
+        db = self._connect()
+        with db:
+            db.execute(f"INSERT INTO jobs ({', '.join(self._COLUMNS)}) VALUES ({', '.join('?' * len(self._COLUMNS))})",
+                       [job[c] for c in self._COLUMNS])
+            dropped = db.execute(
+                "SELECT id, result_path FROM jobs WHERE finished_at IS NOT NULL "
+                "ORDER BY created_at LIMIT MAX(0, (SELECT COUNT(*) FROM jobs) - ?)", (self.max_jobs,)
+            ).fetchall()
+            db.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id, _ in dropped])
+        for _, path in dropped:
+            _remove(path)
+
+    def update(self, job_id, **fields):
+        db = self._connect()
+        with db:
+            db.execute(f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in fields)} WHERE id = ?",
+                       [*fields.values(), job_id])
+
+    def get(self, job_id):
+        row = self._connect().execute(f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(zip(self._COLUMNS, row)) if row is not None else None
+
+
+class JobQueue:
+    """
+    Runs jobs on a local thread pool (and process pool) and records them in a job store.
+
+    Args:
+        runner (callable): runner(kind, payload, path, max_bytes) -> (status_code, mimetype,
+                           result size); writes the body to path (see spool_response).
+        kinds (list): Accepted job kinds.
+        store: MemoryJobStore, SQLiteJobStore or any object with add/update/get.
+        workers (int): Number of worker threads.
+        result_dir (str, optional): Directory of the spooled results (default: a
+                                    'thermal_jobs' directory in the system temp directory).
+        max_result_bytes (int): Largest result body a job may produce.
+        process_runner (callable, optional): Picklable module-level function with the
+                                             signature of runner, used for process_kinds.
+        process_kinds (list, optional): Kinds run by process_runner in a process pool.
+        process_workers (int): Size of the process pool (0 runs every kind in the threads).
+    """
+
+    def __init__(self, runner, kinds, store=None, workers=DEFAULT_WORKERS, result_dir=None,
+                 max_result_bytes=DEFAULT_MAX_RESULT_BYTES, process_runner=None, process_kinds=(),
+                 process_workers=DEFAULT_PROCESS_WORKERS):
+        self.runner = runner
+        self.kinds = list(kinds)
+        self.store = store if store is not None else MemoryJobStore()
+        self.result_dir = result_dir or os.path.join(tempfile.gettempdir(), "thermal_jobs")
+        self.max_result_bytes = max_result_bytes
+        os.makedirs(self.result_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thermal-job")
+        self.process_runner = process_runner
+        self.process_kinds = set(process_kinds) if process_runner is not None and process_workers > 0 else set()
+        self._processes = None
+        if self.process_kinds:
+            # Workers start on first use; forkserver avoids forking a multi-threaded web server process
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            self._processes = ProcessPoolExecutor(max_workers=process_workers, mp_context=context)
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, payload):
+        """Queues a job and returns its record (status 'queued')."""
+        job = _new_job(kind)
+        self.store.add(job)
+        future = self._executor.submit(self._run, job["id"], kind, payload)
+        with self._lock:
+            self._futures[job["id"]] = future
+        future.add_done_callback(lambda _: self._forget(job["id"]))
+        return job
+
+    def _forget(self, job_id):
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+    def _run(self, job_id, kind, payload):
+        self.store.update(job_id, status="running", started_at=time.time())
+        path = os.path.join(self.result_dir, job_id)
+        try:
+            if kind in self.process_kinds:
+                status_code, mimetype, size = self._processes.submit(
+                    self.process_runner, kind, payload, path, self.max_result_bytes).result()
+            else:
+                status_code, mimetype, size = self.runner(kind, payload, path, self.max_result_bytes)
+            self.store.update(
+                job_id, status="succeeded" if status_code < 400 else "failed", status_code=status_code,
+                mimetype=mimetype, result_path=path, result_size=size, finished_at=time.time()
+            )
+        except JobResultTooLarge as e:
+            self.store.update(job_id, status="failed", status_code=413, error=str(e), finished_at=time.time())
+        except Exception as e:
+            _remove(path)
+            self.store.update(job_id, status="failed", status_code=500, error=str(e), finished_at=time.time())
+
+    def cancel(self, job_id):
+        """Cancels a job that has not started yet. Returns True on success."""
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is None or not future.cancel():
+            return False
+        self.store.update(job_id, status="cancelled", finished_at=time.time())
+        return True
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=wait, cancel_futures=True)
+
+
+def describe_job(job):
+    """JSON-serializable view of a job record (without the result body)."""
+    info = {name: job[name] for name in ["id", "kind", "status", "created_at", "started_at",
+                                         "finished_at", "status_code", "mimetype", "error"]}
+    info["result_size"] = job["result_size"]
+    return info
+
+
+def create_job_queue(runner, kinds, config=None, process_runner=None, process_kinds=()):
+    """
+    Creates the job queue from configuration (e.g. os.environ):
+        THERMAL_JOB_STORE: "memory" (default) or "sqlite"
+        THERMAL_JOB_DB: SQLite file for the "sqlite" store
+        THERMAL_JOB_DIR: directory of the spooled results (shared by the workers of a host)
+        THERMAL_JOB_WORKERS: worker threads
+        THERMAL_JOB_PROCESSES: worker processes for process_kinds (0: run them in the threads)
+        THERMAL_JOB_MAX_JOBS: finished jobs kept
+        THERMAL_JOB_MAX_RESULT_BYTES: largest result a job may produce
+    """
+    config = os.environ if config is None else config
+    max_jobs = int(config.get("THERMAL_JOB_MAX_JOBS", DEFAULT_MAX_JOBS))
+    store_type = config.get("THERMAL_JOB_STORE", "memory")
+    if store_type == "sqlite":
+        store = SQLiteJobStore(config.get("THERMAL_JOB_DB", "thermal_jobs.sqlite3"), max_jobs=max_jobs)
+    elif store_type == "memory":
+        store = MemoryJobStore(max_jobs=max_jobs)
+    else:
+        raise ValueError(f"Unknown THERMAL_JOB_STORE '{store_type}'. Use 'memory' or 'sqlite'.")
+    return JobQueue(runner, kinds, store=store, workers=int(config.get("THERMAL_JOB_WORKERS", DEFAULT_WORKERS)),
+                    result_dir=config.get("THERMAL_JOB_DIR"),
+                    max_result_bytes=int(config.get("THERMAL_JOB_MAX_RESULT_BYTES", DEFAULT_MAX_RESULT_BYTES)),
+                    process_runner=process_runner, process_kinds=process_kinds,
+                    process_workers=int(config.get("THERMAL_JOB_PROCESSES", DEFAULT_PROCESS_WORKERS)))
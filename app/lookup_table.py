@@ -0,0 +1,96 @@
+import os
+import numpy as np
+
+# Regular-grid lookup tables for smooth functions that are expensive to evaluate (Bessel
+# ratios, series). When a table is built, the exact value is computed at every cell centre,
+# where interpolation error peaks for a smooth function; twice the largest deviation found
+# is the table's error bound. Callers fall back to the exact function off the grid.
+
+
+class LookupTable:
+    """
+    Values of f on a regular grid over 1 or 2 axes with linear / bilinear interpolation.
+
+    Args:
+        axes (list): One (start, stop, points) tuple per dimension.
+        function (callable): Exact f(*coordinates), vectorized.
+        values (ndarray, optional): Precomputed grid values (e.g. loaded from disk).
+        bound (float, optional): Error bound belonging to values.
+    """
+
+    def __init__(self, axes, function, values=None, bound=None):
+        self.axes = [(float(start), float(stop), int(points)) for start, stop, points in axes]
+        self.function = function
+        self.steps = [(stop - start) / (points - 1) for start, stop, points in self.axes]
+        if values is None:
+            grids = np.meshgrid(*(np.linspace(*axis) for axis in self.axes), indexing='ij')
+            values = function(*grids)
+            bound = self._verify(values)
+        self.values = values
+        self.bound = bound
+
+    def _verify(self, values):
+        centres = np.meshgrid(*(np.linspace(start, stop, points)[:-1] + step / 2
+                                for (start, stop, points), step in zip(self.axes, self.steps)), indexing='ij')
+        exact = self.function(*centres)
+        interpolated, _ = self.interpolate(*(c.ravel() for c in centres), values=values)
+        return 2 * float(np.max(np.abs(interpolated - exact.ravel())))
+
+    def interpolate(self, *coordinates, values=None):
+        """Returns (values, inside): interpolated values, NaN where a coordinate is off the grid."""
+        values = self.values if values is None else values
+        inside = np.ones(len(coordinates[0]), dtype=bool)
+        indices, weights = [], []
+        for x, (start, stop, points), step in zip(coordinates, self.axes, self.steps):
+            inside &= (x >= start) & (x <= stop)
+            position = np.clip((x - start) / step, 0, points - 1)
+            index = np.minimum(position.astype(np.int64), points - 2)
+            indices.append(index)
+            weights.append(position - index)
+
+        if len(indices) == 1:
+            (i,), (w,) = indices, weights
+            result = values[i] * (1 - w) + values[i + 1] * w
+        else:
+            (i, j), (wi, wj) = indices, weights
+            result = ((values[i, j] * (1 - wj) + values[i, j + 1] * wj) * (1 - wi)
+                      + (values[i + 1, j] * (1 - wj) + values[i + 1, j + 1] * wj) * wi)
+        return np.where(inside, result, np.nan), inside
+
+
+def load_tables(specs, version, tolerance, path=None, label="Lookup"):
+    """
+    Builds the tables in specs, or loads them from an .npz archive written by an earlier build.
+
+    Args:
+        specs (dict): Table name -> (axes, function), as for LookupTable.
+        version (int): Stored tables with another version (or other axes) are rebuilt.
+        tolerance (float): Largest acceptable error bound.
+        path (str, optional): .npz archive to load from; written when a table was built.
+        label (str, optional): Names the tables in the error message.
+
+    Returns:
+        dict: Table name -> LookupTable.
+
+    Raises:
+        RuntimeError: If a table's error bound exceeds tolerance.
+    """
+    stored = {}
+    if path and os.path.exists(path):
+        with np.load(path) as archive:
+            stored = {name: archive[name] for name in archive.files}
+    tables, changed = {}, False
+    for name, (axes, function) in specs.items():
+        meta = np.array([version, *np.ravel(axes)], dtype=float)
+        if f"{name}_meta" in stored and np.array_equal(stored[f"{name}_meta"], meta):
+            tables[name] = LookupTable(axes, function, stored[f"{name}_values"], float(stored[f"{name}_bound"]))
+        else:
+            tables[name] = LookupTable(axes, function)
+            stored.update({f"{name}_meta": meta, f"{name}_values": tables[name].values,
+                           f"{name}_bound": np.array(tables[name].bound)})
+            changed = True
+        if tables[name].bound > tolerance:
+            raise RuntimeError(f"{label} table '{name}' misses its tolerance ({tables[name].bound:.2e}).")
+    if path and changed:
+        np.savez(path, **stored)
+    return tables
@@ -0,0 +1,414 @@
+import bisect
+import time
+import numpy as np
+from app.sweep import SWEEP_CALCULATORS
+from app.validation import FIN_PARAMS, HEAT_EXCHANGER_PARAMS
+
+# Multi-objective design optimization (NSGA-II). Every generation the whole offspring
+# population is evaluated with one call of the vectorized batch kernels (through the sweep
+# evaluators), so the cost per candidate is a few array operations. Design variables are
+# snapped to a fine grid (GRID_STEPS per bound interval), which makes repeated candidates
+# (e.g. converged offspring) exact duplicates that are served from an evaluation cache.
+
+GRID_STEPS = 2 ** 20
+MAX_POPULATION = 2000
+MAX_EVALUATIONS = 2000000
+DEFAULT_FIN_DENSITY = 2700.0 # kg/m^3 (aluminium), used for 'mass' when the base has no 'rho'
+
+
+def _fin_metrics(columns, outputs, base):
+    mass = base.get('rho', DEFAULT_FIN_DENSITY) * columns['Ac'] * columns['L']
+    return {
+        "heat_transfer_rate": outputs["heat_transfer_rate"],
+        "fin_efficiency": outputs["fin_efficiency"],
+        "mass": mass,
+        "cost": base.get('cost_per_kg', 1.0) * mass,
+        "surface_area": columns['P'] * columns['L'],
+    }
+
+
+def _heat_exchanger_metrics(columns, outputs, base):
+    metrics = {name: outputs[name] for name in ["NTU", "effectiveness", "q_actual", "T_out_hot", "T_out_cold"]}
+    metrics["cost"] = base.get('cost_per_UA', 1.0) * columns['UA']
+    return metrics
+
+
+# Optimizable calculators: numeric design variables and the metrics that can be used as
+# objectives or constraints. 'mass' and 'cost' use the optional base entries 'rho',
+# 'cost_per_kg' and 'cost_per_UA'.
+OPTIMIZER_PROBLEMS = {
+    "fin": {
+        "variables": FIN_PARAMS,
+        "metrics": _fin_metrics,
+        "metric_names": ["heat_transfer_rate", "fin_efficiency", "mass", "cost", "surface_area"],
+        "metric_parameters": ["rho", "cost_per_kg"],
+    },
+    "heat_exchanger": {
+        "variables": HEAT_EXCHANGER_PARAMS,
+        "metrics": _heat_exchanger_metrics,
+        "metric_names": ["NTU", "effectiveness", "q_actual", "T_out_hot", "T_out_cold", "cost"],
+        "metric_parameters": ["cost_per_UA"],
+    },
+}
+
+
+def parse_optimize_request(data):
+    """
+    Parses and checks an optimization request.
+
+    Args:
+        data (dict): JSON body with
+            - calculator (str): "fin" or "heat_exchanger".
+            - base (dict): Fixed inputs of the single-point route (plus 'rho', 'cost_per_kg',
+              'cost_per_UA' for the derived metrics).
+            - variables (dict): Name -> [lower, upper] or {"min", "max", "log": bool}.
+            - objectives (list): [{"metric": name, "sense": "min" | "max"}, ...] (at least one).
+            - constraints (list, optional): [{"metric": name, "min": v} or {"metric", "max": v}].
+            - population (int, optional): Population size. Defaults to 100.
+            - generations (int, optional): Number of generations. Defaults to 50.
+            - seed (int, optional): Random seed.
+
+    Returns:
+        tuple: (problem, error). problem is a dict of keyword arguments for optimize.
+    """
+    calculator = data.get('calculator')
+    if calculator not in OPTIMIZER_PROBLEMS:
+        return None, f"Parameter 'calculator' must be one of: {', '.join(OPTIMIZER_PROBLEMS)}."
+    spec = OPTIMIZER_PROBLEMS[calculator]
+    base = data.get('base', {})
+    if not isinstance(base, dict):
+        return None, "Parameter 'base' must be a dictionary."
+    for name in [name for name in spec["metric_parameters"] if name in base]:
+        value = base[name]
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return None, f"Parameter '{name}' must be a number."
+        if value <= 0:
+            return None, f"Parameter '{name}' must be positive."
+
+    variables = data.get('variables')
+    if not isinstance(variables, dict) or not variables:
+        return None, "Parameter 'variables' must be a non-empty dictionary."
+    parsed_variables = {}
+    for name, bounds in variables.items():
+        if name not in spec["variables"]:
+            return None, f"Unknown design variable '{name}'. Use: {', '.join(spec['variables'])}."
+        log = False
+        if isinstance(bounds, dict):
+            log = bool(bounds.get('log', False))
+            bounds = [bounds.get('min'), bounds.get('max')]
+        if (not isinstance(bounds, list) or len(bounds) != 2
+                or not all(isinstance(b, (int, float)) for b in bounds) or not bounds[0] < bounds[1]):
+            return None, f"Bounds of '{name}' must be [lower, upper] numbers with lower < upper."
+        if log and bounds[0] <= 0:
+            return None, f"Log-scaled variable '{name}' needs positive bounds."
+        parsed_variables[name] = (float(bounds[0]), float(bounds[1]), log)
+
+    metric_names = spec["metric_names"]
+    objectives = data.get('objectives')
+    if not isinstance(objectives, list) or not objectives:
+        return None, "Parameter 'objectives' must be a non-empty list."
+    for objective in objectives:
+        if not isinstance(objective, dict) or objective.get('metric') not in metric_names:
+            return None, f"Each objective needs a 'metric' from: {', '.join(metric_names)}."
+        if objective.get('sense', 'min') not in ['min', 'max']:
+            return None, "Objective 'sense' must be 'min' or 'max'."
+
+    constraints = data.get('constraints', [])
+    if not isinstance(constraints, list):
+        return None, "Parameter 'constraints' must be a list."
+    for constraint in constraints:
+        if not isinstance(constraint, dict) or constraint.get('metric') not in metric_names:
+            return None, f"Each constraint needs a 'metric' from: {', '.join(metric_names)}."
+        limits = [constraint[key] for key in ['min', 'max'] if key in constraint]
+        if not limits or not all(isinstance(v, (int, float)) for v in limits):
+            return None, "Each constraint needs a numeric 'min' and/or 'max'."
+
+    population = data.get('population', 100)
+    generations = data.get('generations', 50)
+    seed = data.get('seed')
+    if not isinstance(population, int) or not 4 <= population <= MAX_POPULATION:
+        return None, f"Parameter 'population' must be an integer between 4 and {MAX_POPULATION}."
+    if not isinstance(generations, int) or generations < 1:
+        return None, "Parameter 'generations' must be a positive integer."
+    if population * (generations + 1) > MAX_EVALUATIONS:
+        return None, f"population * (generations + 1) must not exceed {MAX_EVALUATIONS} evaluations."
+    if seed is not None and not isinstance(seed, int):
+        return None, "Parameter 'seed' must be an integer."
+
+    # Structural problems of the fixed inputs (missing parameters, ...) fail before the run
+    fixed = {name: base.get(name) for name in spec["variables"] if name not in parsed_variables}
+    missing = [name for name, value in fixed.items() if value is None]
+    if missing:
+        return None, f"Missing parameters: {', '.join(missing)}"
+
+    return {
+        "calculator": calculator,
+        "base": base,
+        "variables": parsed_variables,
+        "objectives": [(o['metric'], o.get('sense', 'min')) for o in objectives],
+        "constraints": [(c['metric'], c.get('min'), c.get('max')) for c in constraints],
+        "population": population,
+        "generations": generations,
+        "seed": seed,
+    }, None
+
+
+class _Evaluator:
+    """Evaluates grid-index designs in batches and caches metric rows by grid index."""
+
+    def __init__(self, calculator, base, variables, metric_names):
+        self.calculator = calculator
+        self.base = base
+        self.names = list(variables)
+        self.lower = np.array([variables[n][0] for n in self.names])
+        self.upper = np.array([variables[n][1] for n in self.names])
+        self.log = np.array([variables[n][2] for n in self.names])
+        self.metric_names = metric_names
+        self.cache = {}
+        self.kernel_evaluations = 0
+        self.cache_hits = 0
+
+    def decode(self, grid):
+        """Grid indices (n, d) -> design values (n, d)."""
+        u = grid / GRID_STEPS
+        linear = self.lower + u * (self.upper - self.lower)
+        logarithmic = np.exp(np.log(np.where(self.log, self.lower, 1.0))
+                             + u * (np.log(np.where(self.log, self.upper, 1.0)) - np.log(np.where(self.log, self.lower, 1.0))))
+        return np.where(self.log, logarithmic, linear)
+
+    def __call__(self, grid):
+        """Returns (n, n_metrics) metric values; rows of invalid designs are NaN."""
+        keys = [row.tobytes() for row in grid]
+        values = np.empty((len(grid), len(self.metric_names)))
+        missing = [i for i, key in enumerate(keys) if key not in self.cache]
+        self.cache_hits += len(grid) - len(missing)
+
+        # Duplicates within this batch are evaluated once
+        unique_rows = {}
+        for i in missing:
+            unique_rows.setdefault(keys[i], i)
+        if unique_rows:
+            rows = np.fromiter(unique_rows.values(), dtype=np.int64)
+            self.cache.update(zip(unique_rows, self._evaluate(grid[rows])))
+            self.kernel_evaluations += len(rows)
+        for i, key in enumerate(keys):
+            values[i] = self.cache[key]
+        return values
+
+    def _evaluate(self, grid):
+        x = self.decode(grid)
+        swept = {name: x[:, j] for j, name in enumerate(self.names)}
+        outputs, row_errors, error = SWEEP_CALCULATORS[self.calculator]["evaluate"](self.base, swept)
+        if error:
+            raise ValueError(error)
+        columns = {name: np.broadcast_to(np.asarray(swept.get(name, self.base.get(name)), dtype=float), (len(x),))
+                   for name in OPTIMIZER_PROBLEMS[self.calculator]["variables"]}
+        metrics = OPTIMIZER_PROBLEMS[self.calculator]["metrics"](columns, outputs, self.base)
+        values = np.column_stack([np.broadcast_to(metrics[name], (len(x),)) for name in self.metric_names]).astype(float)
+        invalid = np.zeros(len(x), dtype=bool)
+        invalid[[row["row"] for row in row_errors]] = True
+        if "error_code" in outputs:
+            invalid |= outputs["error_code"] != 0
+        values[invalid] = np.nan
+        return values
+
+
+def _nondominated_ranks_2d(F):
+    """
+    _nondominated_ranks for two objectives in O(n log n): in (f1, f2) order a point only
+    can be dominated by earlier points, and the f2 values at the end of the fronts built
+    so far increase from front to front, so the point's front is found by bisection.
+    """
+    order = np.lexsort((F[:, 1], F[:, 0]))
+    ranks = np.empty(len(F), dtype=np.int64)
+    last_f2 = [] # f2 of the last point added to each front
+    last_point = []
+    for i, (f1, f2) in zip(order.tolist(), F[order].tolist()):
+        k = bisect.bisect_right(last_f2, f2) # First front whose last point does not dominate
+        if k > 0 and last_point[k - 1] == (f1, f2): # Equal points do not dominate each other
+            k -= 1
+        if k == len(last_f2):
+            last_f2.append(f2)
+            last_point.append((f1, f2))
+        else:
+            last_f2[k] = f2
+            last_point[k] = (f1, f2)
+        ranks[i] = k
+    return ranks
+
+
+def _nondominated_ranks(F):
+    """Pareto front index of every row of F (minimization), 0 = non-dominated."""
+    if F.shape[1] == 2:
+        return _nondominated_ranks_2d(F)
+    n = len(F)
+    # [i, j]: i dominates j. Built one objective at a time, which keeps every pass over
+    # contiguous (n, n) arrays instead of reducing a short trailing axis.
+    no_worse = np.ones((n, n), dtype=bool)
+    better = np.zeros((n, n), dtype=bool)
+    for j in range(F.shape[1]):
+        column = F[:, j]
+        no_worse &= column[:, None] <= column[None, :]
+        better |= column[:, None] < column[None, :]
+    dominates = no_worse & better
+    dominated_by = dominates.sum(axis=0)
+    ranks = np.full(n, -1, dtype=np.int64)
+    front = np.flatnonzero(dominated_by == 0)
+    rank = 0
+    while front.size:
+        ranks[front] = rank
+        dominated_by -= dominates[front].sum(axis=0)
+        dominated_by[front] = -1
+        front = np.flatnonzero(dominated_by == 0)
+        rank += 1
+    return ranks
+
+
+def _crowding_distance(F, ranks):
+    distance = np.zeros(len(F))
+    for rank in np.unique(ranks):
+        members = np.flatnonzero(ranks == rank)
+        if len(members) <= 2:
+            distance[members] = np.inf
+            continue
+        for j in range(F.shape[1]):
+            order = members[np.argsort(F[members, j], kind='stable')]
+            span = F[order[-1], j] - F[order[0], j]
+            distance[order[[0, -1]]] = np.inf
+            if span > 0:
+                distance[order[1:-1]] += (F[order[2:], j] - F[order[:-2], j]) / span
+    return distance
+
+
+def _rank_population(F, violation):
+    """
+    Constrained NSGA-II ranking: feasible designs by Pareto front, infeasible ones after
+    all feasible fronts, ordered by total constraint violation.
+    """
+    ranks = np.empty(len(F), dtype=np.int64)
+    feasible = violation == 0
+    n_fronts = 0
+    if feasible.any():
+        ranks[feasible] = _nondominated_ranks(F[feasible])
+        n_fronts = ranks[feasible].max() + 1
+    if (~feasible).any():
+        _, dense = np.unique(violation[~feasible], return_inverse=True)
+        ranks[~feasible] = n_fronts + dense
+    crowding = np.where(feasible, _crowding_distance(np.where(feasible[:, None], F, 0.0), np.where(feasible, ranks, -1)), 0.0)
+    return ranks, crowding
+
+
+def _tournament(rng, ranks, crowding, n):
+    a = rng.integers(0, len(ranks), n)
+    b = rng.integers(0, len(ranks), n)
+    a_wins = (ranks[a] < ranks[b]) | ((ranks[a] == ranks[b]) & (crowding[a] >= crowding[b]))
+    return np.where(a_wins, a, b)
+
+
+def _offspring(rng, parents_u, eta_c=15.0, eta_m=20.0, p_crossover=0.9):
+    """Simulated binary crossover and polynomial mutation on unit-cube designs."""
+    n, d = parents_u.shape
+    p1, p2 = parents_u[0::2], parents_u[1::2]
+    u = rng.random(p1.shape)
+    beta = np.where(u <= 0.5, (2 * u) ** (1 / (eta_c + 1)), (1 / (2 * (1 - u))) ** (1 / (eta_c + 1)))
+    cross = (rng.random(p1.shape) < 0.5) & (rng.random((len(p1), 1)) < p_crossover)
+    c1 = np.where(cross, 0.5 * ((1 + beta) * p1 + (1 - beta) * p2), p1)
+    c2 = np.where(cross, 0.5 * ((1 - beta) * p1 + (1 + beta) * p2), p2)
+    children = np.concatenate([c1, c2])[:n]
+
+    mutate = rng.random(children.shape) < 1.0 / d
+    r = rng.random(children.shape)
+    delta = np.where(r < 0.5, (2 * r) ** (1 / (eta_m + 1)) - 1, 1 - (2 * (1 - r)) ** (1 / (eta_m + 1)))
+    children = np.where(mutate, children + delta * np.minimum(children, 1 - children).clip(min=0.05), children)
+    return np.clip(children, 0.0, 1.0)
+
+
+def optimize(calculator, base, variables, objectives, constraints=(), population=100, generations=50, seed=None):
+    """
+    Runs NSGA-II on a calculator.
+
+    Args:
+        calculator (str): "fin" or "heat_exchanger".
+        base (dict): Fixed inputs.
+        variables (dict): Name -> (lower, upper, log).
+        objectives (list): (metric, "min" | "max") pairs.
+        constraints (list, optional): (metric, min or None, max or None) triples.
+        population (int, optional): Population size.
+        generations (int, optional): Number of generations.
+        seed (int, optional): Random seed.
+
+    Returns:
+        dict: A dictionary containing:
+            - pareto_front (list): Feasible non-dominated designs of the final population,
+              each {"variables": {...}, "metrics": {...}}, sorted by the first objective.
+            - evaluations (int): Candidate evaluations (including cache hits).
+            - kernel_evaluations (int): Candidates actually computed.
+            - cache_hits (int): Candidates served from the evaluation cache.
+            - elapsed (float): Run time (s).
+            - evaluations_per_second (float): evaluations / elapsed.
+    """
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    metric_names = OPTIMIZER_PROBLEMS[calculator]["metric_names"]
+    evaluator = _Evaluator(calculator, base, variables, metric_names)
+    objective_columns = [metric_names.index(m) for m, _ in objectives]
+    signs = np.array([1.0 if sense == "min" else -1.0 for _, sense in objectives])
+
+    def assess(grid):
+        values = evaluator(grid)
+        F = values[:, objective_columns] * signs
+        violation = np.zeros(len(grid))
+        for metric, low, high in constraints:
+            column = values[:, metric_names.index(metric)]
+            scale = max(abs(low if low is not None else high), 1e-300)
+            if low is not None:
+                violation += np.maximum(low - column, 0) / scale
+            if high is not None:
+                violation += np.maximum(column - high, 0) / scale
+        invalid = np.isnan(values).any(axis=1) | np.isnan(violation)
+        violation[invalid] = np.inf
+        F[invalid] = np.inf
+        return values, F, violation
+
+    def to_grid(u):
+        return np.rint(u * GRID_STEPS).astype(np.int64)
+
+    grid = to_grid(rng.random((population, len(variables))))
+    values, F, violation = assess(grid)
+    ranks, crowding = _rank_population(F, violation)
+    evaluations = population
+
+    for _ in range(generations):
+        parents = _tournament(rng, ranks, crowding, population + population % 2)
+        children = to_grid(_offspring(rng, grid[parents] / GRID_STEPS))[:population]
+        child_values, child_F, child_violation = assess(children)
+        evaluations += population
+
+        # Elitist survival from parents + offspring by (rank, -crowding)
+        grid = np.concatenate([grid, children])
+        values = np.concatenate([values, child_values])
+        F = np.concatenate([F, child_F])
+        violation = np.concatenate([violation, child_violation])
+        ranks, crowding = _rank_population(F, violation)
+        survivors = np.lexsort((-crowding, ranks))[:population]
+        grid, values, F, violation = grid[survivors], values[survivors], F[survivors], violation[survivors]
+        ranks, crowding = ranks[survivors], crowding[survivors]
+
+    front = np.flatnonzero((ranks == 0) & (violation == 0))
+    _, first = np.unique(grid[front], axis=0, return_index=True)
+    front = front[first]
+    front = front[np.argsort(F[front, 0], kind='stable')]
+    x = evaluator.decode(grid[front])
+    elapsed = time.perf_counter() - start
+    return {
+        "pareto_front": [
+            {"variables": dict(zip(evaluator.names, x[i].tolist())),
+             "metrics": dict(zip(metric_names, values[row].tolist()))}
+            for i, row in enumerate(front)
+        ],
+        "evaluations": evaluations,
+        "kernel_evaluations": evaluator.kernel_evaluations,
+        "cache_hits": evaluator.cache_hits,
+        "elapsed": elapsed,
+        "evaluations_per_second": evaluations / elapsed if elapsed > 0 else None,
+    }
@@ -73,4 +73,6 @@ def generate_thermal_report_pdf(data):
     pdf.set_font("Arial", "I", 8)
     pdf.cell(0, 10, f"Report generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", 0, 1, "C")
 
-    return pdf.output(dest='S').encode('latin-1')
+    output = pdf.output(dest='S')
+    # PyFPDF returns a latin-1 str, fpdf2 (see requirements.txt) returns a bytearray
+    return output.encode('latin-1') if isinstance(output, str) else bytes(output)
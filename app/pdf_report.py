@@ -0,0 +1,505 @@
+import math
+import zlib
+from datetime import datetime
+from fpdf.fonts import CORE_FONTS_CHARWIDTHS
+from app.sweep import parse_sweep_request, sweep_table
+
+# Multi-page PDF reports for batch and sweep results. Unlike generate_thermal_report_pdf
+# (one fpdf2 document built in memory), the document is written object by object: each page
+# is laid out, compressed and yielded as soon as it is full, so a report over a table of
+# rows read from a generator needs memory for one page, plus one xref offset per object.
+#
+# Only the PDF core fonts are used (Helvetica, not embedded); their glyph widths come from
+# fpdf2's metrics and, like the font objects and the page layout, are shared by all reports.
+
+PAGE_SIZES = {"portrait": (595.28, 841.89), "landscape": (841.89, 595.28)} # A4 in points
+MARGIN = 42.52 # 15 mm
+LANDSCAPE_COLUMNS = 8 # Tables with more columns are laid out on landscape pages
+ROW_HEIGHT = 1.4 # Table row height as a multiple of the font size
+MAX_PLOT_POINTS = 2000 # Longer series are reduced to a min/max envelope
+PRODUCER = "ThermalSim Suite"
+MAX_REPORT_ROWS = 200000
+
+# name -> (resource name, PDF base font, fpdf2 metrics key)
+FONTS = {
+    "regular": ("F1", "Helvetica", "helvetica"),
+    "bold": ("F2", "Helvetica-Bold", "helveticaB"),
+    "italic": ("F3", "Helvetica-Oblique", "helveticaI"),
+}
+_WIDTHS = {name: CORE_FONTS_CHARWIDTHS[key] for name, (_, _, key) in FONTS.items()}
+
+# Fixed object numbers; pages and content streams are numbered from FIRST_FREE_OBJECT on
+CATALOG_OBJECT, PAGES_OBJECT = 1, 2
+FONT_OBJECTS = {name: 3 + i for i, name in enumerate(FONTS)}
+FIRST_FREE_OBJECT = 3 + len(FONTS)
+_RESOURCES = "<< /Font << {} >> >>".format(
+    " ".join(f"/{FONTS[name][0]} {number} 0 R" for name, number in FONT_OBJECTS.items())
+)
+
+
+def text_width(text, font="regular", size=10.0):
+    """Width of text in points when set in one of FONTS at the given size."""
+    widths = _WIDTHS[font]
+    return sum(widths.get(char, 500) for char in text) * size / 1000.0
+
+
+def _pdf_string(text):
+    """PDF literal string body: Latin-1 (unmappable characters become '?'), ( ) \\ escaped."""
+    text = text.encode('latin-1', 'replace').decode('latin-1')
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").replace("\r", "").replace("\n", " ")
+
+
+def format_value(value):
+    """Formats a table cell: floats with 6 significant digits, None (missing) as '-'."""
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.6g}" if math.isfinite(value) else "-"
+    return str(value)
+
+
+def _fit(text, width, font, size):
+    """Shortens text with '..' until it fits into width."""
+    if text_width(text, font, size) <= width:
+        return text
+    while text and text_width(text + "..", font, size) > width:
+        text = text[:-1]
+    return text + ".."
+
+
+class StreamingPDFWriter:
+    """
+    Writes a PDF incrementally: begin() returns the header and the shared font objects,
+    add_page() a compressed content stream with its page object, and close() the page tree,
+    catalog, cross-reference table and trailer. Every call returns the bytes to append.
+    """
+
+    def __init__(self):
+        self._offset = 0
+        self._offsets = {} # object number -> byte offset
+        self._next_object = FIRST_FREE_OBJECT
+        self._pages = [] # page object numbers, in order
+
+    def _object(self, number, body):
+        self._offsets[number] = self._offset
+        chunk = f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+        self._offset += len(chunk)
+        return chunk
+
+    def _allocate(self):
+        number = self._next_object
+        self._next_object += 1
+        return number
+
+    def begin(self):
+        chunk = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+        self._offset = len(chunk)
+        for name, number in FONT_OBJECTS.items():
+            font = f"<< /Type /Font /Subtype /Type1 /BaseFont /{FONTS[name][1]} /Encoding /WinAnsiEncoding >>"
+            chunk += self._object(number, font.encode())
+        return chunk
+
+    def add_page(self, content, size):
+        data = zlib.compress(content.encode('latin-1'), 6)
+        stream_number, page_number = self._allocate(), self._allocate()
+        self._pages.append(page_number)
+        chunk = self._object(stream_number, f"<< /Length {len(data)} /Filter /FlateDecode >>\nstream\n".encode()
+                             + data + b"\nendstream")
+        page = (f"<< /Type /Page /Parent {PAGES_OBJECT} 0 R /MediaBox [0 0 {size[0]:.2f} {size[1]:.2f}] "
+                f"/Resources {_RESOURCES} /Contents {stream_number} 0 R >>")
+        return chunk + self._object(page_number, page.encode())
+
+    def close(self, title=""):
+        kids = " ".join(f"{number} 0 R" for number in self._pages)
+        chunk = self._object(PAGES_OBJECT, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._pages)} >>".encode())
+        chunk += self._object(CATALOG_OBJECT, f"<< /Type /Catalog /Pages {PAGES_OBJECT} 0 R >>".encode())
+        info_number = self._allocate()
+        created = datetime.now().strftime('%Y%m%d%H%M%S')
+        info = f"<< /Title ({_pdf_string(title)}) /Producer ({PRODUCER}) /CreationDate (D:{created}) >>"
+        chunk += self._object(info_number, info.encode('latin-1'))
+
+        xref_offset = self._offset
+        lines = [f"xref\n0 {self._next_object}\n", "0000000000 65535 f \n"]
+        lines += [f"{self._offsets[number]:010d} 00000 n \n" for number in range(1, self._next_object)]
+        lines.append(f"trailer\n<< /Size {self._next_object} /Root {CATALOG_OBJECT} 0 R /Info {info_number} 0 R >>\n"
+                     f"startxref\n{xref_offset}\n%%EOF\n")
+        return chunk + "".join(lines).encode()
+
+
+class _Page:
+    """Content stream of one page; y is measured from the top edge like in the layout code."""
+
+    def __init__(self, size):
+        self.size = size
+        self.ops = []
+
+    def text(self, x, y, text, font="regular", size=10.0, align="left"):
+        if align == "right":
+            x -= text_width(text, font, size)
+        elif align == "center":
+            x -= text_width(text, font, size) / 2
+        self.ops.append(f"BT /{FONTS[font][0]} {size:g} Tf {x:.2f} {self.size[1] - y:.2f} Td ({_pdf_string(text)}) Tj ET")
+
+    def line(self, x1, y1, x2, y2, width=0.5):
+        h = self.size[1]
+        self.ops.append(f"{width:g} w {x1:.2f} {h - y1:.2f} m {x2:.2f} {h - y2:.2f} l S")
+
+    def rect(self, x, y, w, h, fill_gray=None):
+        op = f"{x:.2f} {self.size[1] - y - h:.2f} {w:.2f} {h:.2f} re"
+        self.ops.append(f"{fill_gray:g} g {op} f 0 g" if fill_gray is not None else f"0.5 w {op} S")
+
+    def polyline(self, points, width=1.0, rgb=(0.8, 0.2, 0.1)):
+        h = self.size[1]
+        path = [f"{x:.2f} {h - y:.2f} {'m' if i == 0 else 'l'}" for i, (x, y) in enumerate(points)]
+        self.ops.append(f"q {rgb[0]:g} {rgb[1]:g} {rgb[2]:g} RG {width:g} w 1 j\n" + "\n".join(path) + " S Q")
+
+    def content(self):
+        return "\n".join(self.ops)
+
+
+def _nice_ticks(low, high, count=6):
+    """Tick positions at 1/2/5 x 10^k steps covering [low, high]."""
+    if not (math.isfinite(low) and math.isfinite(high)) or high <= low:
+        return [low]
+    raw = (high - low) / count
+    magnitude = 10 ** math.floor(math.log10(raw))
+    step = next(m * magnitude for m in (1, 2, 5, 10) if m * magnitude >= raw)
+    first = math.ceil(low / step - 1e-9)
+    return [i * step for i in range(first, int(math.floor(high / step + 1e-9)) + 1)]
+
+
+def _tick_labels(ticks):
+    """Labels with just enough digits to tell neighbouring ticks apart."""
+    step = ticks[1] - ticks[0] if len(ticks) > 1 else 1.0
+    largest = max(abs(tick) for tick in ticks)
+    if largest == 0 or 1e-3 <= largest < 1e6:
+        decimals = max(0, -math.floor(math.log10(step)))
+        return [f"{tick:.{decimals}f}" for tick in ticks]
+    digits = max(0, math.floor(math.log10(largest)) - math.floor(math.log10(step)))
+    return [f"{tick:.{digits}e}" for tick in ticks]
+
+
+def _envelope(x, y, max_points):
+    """Reduces a long series to the first, min, max and last point of each of max_points / 4 buckets."""
+    n = len(x)
+    if n <= max_points:
+        return list(zip(x, y))
+    buckets = max_points // 4
+    points = []
+    for b in range(buckets):
+        start, stop = b * n // buckets, (b + 1) * n // buckets
+        indices = range(start, stop)
+        i_min = min(indices, key=y.__getitem__)
+        i_max = max(indices, key=y.__getitem__)
+        for i in sorted({start, i_min, i_max, stop - 1}):
+            points.append((x[i], y[i]))
+    return points
+
+
+def _draw_plot(page, plot, top, height):
+    """Draws an x-y line plot with axes, ticks and labels in the band [top, top + height]."""
+    width = page.size[0]
+    left, right = MARGIN + 45, width - MARGIN - 10
+    title_y, plot_top, plot_bottom = top + 12, top + 22, top + height - 30
+    x, y = [float(v) for v in plot["x"]], [float(v) for v in plot["y"]]
+    finite = [(a, b) for a, b in zip(x, y) if math.isfinite(a) and math.isfinite(b)]
+    page.text(width / 2, title_y, plot.get("title", ""), "bold", 11, "center")
+    page.rect(left, plot_top, right - left, plot_bottom - plot_top)
+    if not finite:
+        page.text(width / 2, (plot_top + plot_bottom) / 2, "No data", "italic", 9, "center")
+        return
+
+    x_low, x_high = min(a for a, _ in finite), max(a for a, _ in finite)
+    y_low, y_high = min(b for _, b in finite), max(b for _, b in finite)
+    if x_high == x_low:
+        x_low, x_high = x_low - 0.5, x_high + 0.5
+    if y_high == y_low:
+        y_low, y_high = y_low - 0.5, y_high + 0.5
+    pad = 0.05 * (y_high - y_low)
+    y_low, y_high = y_low - pad, y_high + pad
+
+    def px(value):
+        return left + (value - x_low) / (x_high - x_low) * (right - left)
+
+    def py(value):
+        return plot_bottom - (value - y_low) / (y_high - y_low) * (plot_bottom - plot_top)
+
+    x_ticks, y_ticks = _nice_ticks(x_low, x_high), _nice_ticks(y_low, y_high)
+    for tick, label in zip(x_ticks, _tick_labels(x_ticks)):
+        page.line(px(tick), plot_bottom, px(tick), plot_bottom + 3)
+        page.text(px(tick), plot_bottom + 11, label, "regular", 7, "center")
+    for tick, label in zip(y_ticks, _tick_labels(y_ticks)):
+        page.line(left - 3, py(tick), left, py(tick))
+        page.text(left - 5, py(tick) + 2.5, label, "regular", 7, "right")
+    page.text((left + right) / 2, plot_bottom + 23, plot.get("x_label", ""), "regular", 8, "center")
+    page.text(MARGIN, plot_top - 4, plot.get("y_label", ""), "regular", 8)
+
+    xs, ys = zip(*finite)
+    page.polyline([(px(a), py(b)) for a, b in _envelope(xs, ys, MAX_PLOT_POINTS)])
+
+
+class _Layout:
+    """Places blocks top to bottom and starts a new page (with header and footer) when one is full."""
+
+    def __init__(self, writer, title, orientation):
+        self.writer = writer
+        self.title = title
+        self.size = PAGE_SIZES[orientation]
+        self.page = None
+        self.y = 0.0
+        self.page_number = 0
+
+    @property
+    def bottom(self):
+        return self.size[1] - MARGIN - 12 # Footer line below
+
+    def new_page(self):
+        """Returns the bytes of the finished page (if any) and starts the next one."""
+        chunk = self.finish_page()
+        self.page = _Page(self.size)
+        self.page_number += 1
+        self.y = MARGIN
+        if self.page_number > 1: # Running header on continuation pages
+            self.page.text(MARGIN, self.y + 8, self.title, "italic", 8)
+            self.page.line(MARGIN, self.y + 12, self.size[0] - MARGIN, self.y + 12, 0.3)
+            self.y += 22
+        return chunk
+
+    def finish_page(self):
+        if self.page is None:
+            return b""
+        self.page.text(self.size[0] / 2, self.size[1] - MARGIN + 6, f"Page {self.page_number}", "italic", 8, "center")
+        chunk = self.writer.add_page(self.page.content(), self.size)
+        self.page = None
+        return chunk
+
+    def reserve(self, height):
+        """Returns the bytes of a finished page if height does not fit on the current one."""
+        if self.page is not None and self.y + height <= self.bottom:
+            return b""
+        return self.new_page()
+
+
+def _key_value_rows(values):
+    if isinstance(values, dict):
+        return list(values.items())
+    return [tuple(item) if isinstance(item, (list, tuple)) else (item.get('name'), item.get('value'))
+            for item in values]
+
+
+def iter_report_pdf(report):
+    """
+    Lays out a report and yields the PDF in chunks of about one page.
+
+    Args:
+        report (dict): A dictionary containing:
+            - calculator_name (str, optional): Report title.
+            - inputs, outputs (list or dict, optional): [(name, value), ...] pairs (or
+              {"name", "value"} dicts, or a dict) listed as key/value blocks.
+            - plots (list, optional): [{"x": [...], "y": [...], "title", "x_label",
+              "y_label"}, ...] drawn as vector line plots, e.g. a fin temperature profile.
+            - table (dict, optional): {"columns": [names], "rows": iterable of row lists}.
+              The rows may be a generator; they are consumed one page at a time and the
+              column header is repeated on every page.
+            - notes (str, optional): Text printed after the table.
+
+    Yields:
+        bytes: Consecutive pieces of the PDF file (never empty).
+    """
+    for chunk in _iter_report_chunks(report):
+        if chunk:
+            yield chunk
+
+
+def _iter_report_chunks(report):
+    title = report.get('calculator_name') or 'Thermal Calculation Report'
+    table = report.get('table')
+    columns = [str(name) for name in table["columns"]] if table else []
+    orientation = "landscape" if len(columns) > LANDSCAPE_COLUMNS else "portrait"
+
+    writer = StreamingPDFWriter()
+    yield writer.begin()
+    layout = _Layout(writer, title, orientation)
+    layout.new_page()
+    width = layout.size[0] - 2 * MARGIN
+    layout.page.text(layout.size[0] / 2, layout.y + 14, title, "bold", 16, "center")
+    layout.y += 30
+
+    for heading, key in [("Input Parameters:", 'inputs'), ("Calculated Results:", 'outputs')]:
+        rows = _key_value_rows(report.get(key) or [])
+        if not rows:
+            continue
+        yield layout.reserve(34)
+        layout.page.text(MARGIN, layout.y + 12, heading, "bold", 12)
+        layout.y += 20
+        for name, value in rows:
+            yield layout.reserve(14)
+            layout.page.text(MARGIN + 8, layout.y + 10, f"{name}: {format_value(value)}", "regular", 10)
+            layout.y += 14
+        layout.y += 8
+
+    for plot in report.get('plots') or []:
+        height = min(260.0, layout.bottom - MARGIN - 22)
+        yield layout.reserve(height)
+        _draw_plot(layout.page, plot, layout.y, height)
+        layout.y += height + 10
+
+    if table:
+        yield from _iter_table(layout, columns, table["rows"], width)
+
+    notes = report.get('notes')
+    if notes:
+        yield layout.reserve(40)
+        layout.page.text(MARGIN, layout.y + 12, "Notes:", "bold", 12)
+        layout.y += 20
+        for line in _wrap(str(notes), width, "italic", 10):
+            yield layout.reserve(13)
+            layout.page.text(MARGIN, layout.y + 10, line, "italic", 10)
+            layout.y += 13
+
+    yield layout.reserve(16)
+    created = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    layout.page.text(layout.size[0] / 2, layout.y + 12, f"Report generated on: {created}", "italic", 8, "center")
+    yield layout.finish_page()
+    yield writer.close(title)
+
+
+def _iter_table(layout, columns, rows, width):
+    n = max(1, len(columns))
+    column_width = width / n
+    # The largest font (at most 8 pt) that fits a 12-character number into a column
+    size = max(4.0, min(8.0, (column_width - 4) / (12 * 0.556)))
+    row_height = size * ROW_HEIGHT
+    header = [_fit(name, column_width - 4, "bold", size) for name in columns]
+    right_edges = [MARGIN + (i + 1) * column_width - 2 for i in range(n)]
+
+    def start_table_page(new_page):
+        chunk = layout.new_page() if new_page else b""
+        page = layout.page
+        page.rect(MARGIN, layout.y, width, row_height + 2, fill_gray=0.88)
+        for text, right in zip(header, right_edges):
+            page.text(right, layout.y + row_height - 1, text, "bold", size, "right")
+        layout.y += row_height + 2
+        return chunk
+
+    yield start_table_page(layout.y + 3 * row_height > layout.bottom)
+    font = FONTS["regular"][0]
+    page_height = layout.size[1]
+    cells = [] # Text operators of the current page's rows, set in one text object
+    for row in rows:
+        if layout.y + row_height > layout.bottom:
+            layout.page.ops.append(f"BT /{font} {size:g} Tf\n" + "\n".join(cells) + "\nET")
+            cells = []
+            yield start_table_page(True)
+        baseline = page_height - (layout.y + row_height - 2)
+        for value, right in zip(row, right_edges):
+            text = _fit(format_value(value), column_width - 4, "regular", size)
+            cells.append(f"1 0 0 1 {right - text_width(text, 'regular', size):.2f} {baseline:.2f} Tm "
+                         f"({_pdf_string(text)}) Tj")
+        layout.y += row_height
+    if cells:
+        layout.page.ops.append(f"BT /{font} {size:g} Tf\n" + "\n".join(cells) + "\nET")
+    layout.y += 8
+
+
+def _wrap(text, width, font, size):
+    """Greedy word wrap of text (paragraphs split on newlines) into lines of at most width points."""
+    lines = []
+    for paragraph in text.splitlines() or [""]:
+        line = ""
+        for word in paragraph.split(" "):
+            candidate = f"{line} {word}" if line else word
+            if line and text_width(candidate, font, size) > width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return lines
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def parse_report_request(data):
+    """
+    Parses and checks a report request.
+
+    Args:
+        data (dict): JSON body with the keys of iter_report_pdf (calculator_name, inputs,
+            outputs, plots, table with a list of rows, notes), or instead of 'table' a
+            'sweep' holding the body of a POST /sweep request whose results are tabulated.
+
+    Returns:
+        tuple: (report, error). report is the argument of iter_report_pdf.
+    """
+    report = {name: data[name] for name in ['calculator_name', 'inputs', 'outputs', 'notes'] if name in data}
+    # Checked here: once the route has started streaming the PDF, errors can no longer become a 400
+    for name in ['calculator_name', 'notes']:
+        if report.get(name) is not None and not isinstance(report[name], str):
+            return None, f"Parameter '{name}' must be a string."
+    for name in ['inputs', 'outputs']:
+        if name in report and not isinstance(report[name], (list, dict)):
+            return None, f"'{name}' must be a list or a dictionary."
+        if isinstance(report.get(name), list) and not all(
+                (isinstance(item, list) and len(item) == 2) or (isinstance(item, dict) and 'name' in item)
+                for item in report[name]):
+            return None, f"Every entry of '{name}' must be a [label, value] pair or a dictionary with 'name' and 'value'."
+
+    plots = data.get('plots', [])
+    if not isinstance(plots, list) or not all(isinstance(plot, dict) for plot in plots):
+        return None, "Parameter 'plots' must be a list of dictionaries."
+    for i, plot in enumerate(plots):
+        x, y = plot.get('x'), plot.get('y')
+        if not isinstance(x, list) or not isinstance(y, list) or len(x) != len(y):
+            return None, f"Plot {i+1}: 'x' and 'y' must be lists of the same length."
+        if not all(_is_number(v) for v in x) or not all(v is None or _is_number(v) for v in y):
+            return None, f"Plot {i+1}: 'x' must contain numbers and 'y' numbers or null."
+        report.setdefault('plots', []).append({
+            "x": x, "y": [math.nan if v is None else v for v in y],
+            **{key: str(plot.get(key, "")) for key in ['title', 'x_label', 'y_label']},
+        })
+
+    if 'table' in data and 'sweep' in data:
+        return None, "Give either 'table' or 'sweep', not both."
+    if 'table' in data:
+        table = data['table']
+        columns = table.get('columns') if isinstance(table, dict) else None
+        rows = table.get('rows') if isinstance(table, dict) else None
+        if not isinstance(columns, list) or not columns or not isinstance(rows, list):
+            return None, "Parameter 'table' must be a dictionary with a non-empty list 'columns' and a list 'rows'."
+        if len(rows) > MAX_REPORT_ROWS:
+            return None, f"A report table can have at most {MAX_REPORT_ROWS} rows."
+        if not all(isinstance(row, list) and len(row) == len(columns) for row in rows):
+            return None, f"Every table row must be a list of {len(columns)} values."
+        report['table'] = {"columns": columns, "rows": rows}
+    elif 'sweep' in data:
+        if not isinstance(data['sweep'], dict):
+            return None, "Parameter 'sweep' must be a dictionary (the body of a /sweep request)."
+        plan, error = parse_sweep_request(data['sweep'])
+        if error:
+            return None, f"Sweep: {error}"
+        if plan["n_points"] > MAX_REPORT_ROWS:
+            return None, f"A report table can have at most {MAX_REPORT_ROWS} rows; the sweep has {plan['n_points']}."
+        columns, rows = sweep_table(plan)
+        report['table'] = {"columns": columns, "rows": rows}
+        report.setdefault('calculator_name', f"Parameter Sweep: {plan['calculator']}")
+    return report, None
+
+
+def write_report_pdf(report, file):
+    """
+    Writes a report (see iter_report_pdf) to a path or a binary file object.
+
+    Returns:
+        int: Number of bytes written.
+    """
+    if isinstance(file, str):
+        with open(file, "wb") as f:
+            return write_report_pdf(report, f)
+    written = 0
+    for chunk in iter_report_pdf(report):
+        file.write(chunk)
+        written += len(chunk)
+    return written
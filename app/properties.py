@@ -0,0 +1,214 @@
+import csv
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import numpy as np
+
+# Temperature-dependent material and fluid properties: k(T), Cp(T) and, for fluids, the
+# dynamic viscosity mu(T). Sources are JSON files ({"materials": {name: {"phase", "source",
+# "T": [...], "k": [...], "Cp": [...], "mu": [...]}}}) or CSV files with one row per
+# (material, T) and columns material, T, k, Cp and optionally mu and phase.
+#
+# The sources are compiled once into a single (rows, 4) float64 array [T, k, Cp, mu], one
+# contiguous, T-sorted block per material, saved as .npy next to a JSON index and opened
+# with mmap_mode='r': worker processes map the same file, so the operating system keeps
+# one copy in its page cache however many workers there are. The compiled files are
+# named after a digest of the sources and rebuilt when a source changes.
+#
+# Lookups locate T with a binary search (np.searchsorted, O(log n) per query) and
+# interpolate linearly; viscosity, which changes by orders of magnitude over a table, is
+# interpolated linearly in log(mu). Temperatures outside a material's table give NaN.
+
+DEFAULT_SOURCES = [os.path.join(os.path.dirname(__file__), "data", "properties.json")]
+PROPERTY_NAMES = ['k', 'Cp', 'mu']
+COLUMNS = ['T'] + PROPERTY_NAMES
+COMPILED_VERSION = 1
+
+
+def _read_json_source(path):
+    with open(path) as f:
+        materials = json.load(f)["materials"]
+    return {name: {"phase": spec.get("phase", "solid"), "source": spec.get("source", path),
+                   "columns": {column: spec.get(column) for column in COLUMNS}}
+            for name, spec in materials.items()}
+
+
+def _read_csv_source(path):
+    materials = {}
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            name = row["material"].strip()
+            entry = materials.setdefault(name, {"phase": (row.get("phase") or "solid").strip(), "source": path,
+                                                "columns": {column: [] for column in COLUMNS}})
+            for column in COLUMNS:
+                value = (row.get(column) or "").strip()
+                entry["columns"][column].append(float(value) if value else float('nan'))
+    return materials
+
+
+def read_property_sources(paths):
+    """
+    Reads and checks property sources; later sources replace materials of earlier ones.
+
+    Returns:
+        dict: Material name -> {"phase", "source", "columns": {"T", "k", "Cp", "mu"}}, with
+              every column a float array sorted by T (NaN for a missing property).
+
+    Raises:
+        ValueError: If a table is malformed (fewer than two points, repeated or
+                    non-positive temperatures, non-positive property values).
+    """
+    materials = {}
+    for path in paths:
+        read = _read_csv_source if path.lower().endswith(".csv") else _read_json_source
+        materials.update(read(path))
+    for name, entry in materials.items():
+        T = np.asarray(entry["columns"]["T"], dtype=float)
+        if T.ndim != 1 or len(T) < 2:
+            raise ValueError(f"Property table '{name}' needs at least two temperatures.")
+        order = np.argsort(T)
+        columns = {"T": T[order]}
+        for column in PROPERTY_NAMES:
+            values = entry["columns"].get(column)
+            values = np.full(len(T), np.nan) if values is None else np.asarray(values, dtype=float)
+            if values.shape != T.shape:
+                raise ValueError(f"Property table '{name}': '{column}' must have one value per temperature.")
+            columns[column] = values[order]
+        if np.any(columns["T"] <= 0) or np.any(np.diff(columns["T"]) <= 0):
+            raise ValueError(f"Property table '{name}': temperatures must be positive and distinct.")
+        if any(np.any(columns[column] <= 0) for column in PROPERTY_NAMES):
+            raise ValueError(f"Property table '{name}': property values must be positive.")
+        entry["columns"] = columns
+    return materials
+
+
+def compile_property_sources(paths, cache_dir):
+    """
+    Compiles the sources into cache_dir (unless already there) and returns the paths of the
+    .npy array and its JSON index. Files are written under temporary names and renamed, so
+    workers starting together never read a partial file.
+    """
+    digest = hashlib.sha256(str(COMPILED_VERSION).encode())
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(os.path.abspath(path).encode() + b"\0" + f.read())
+    stem = os.path.join(cache_dir, f"properties-{digest.hexdigest()[:16]}")
+    array_path, index_path = stem + ".npy", stem + ".json"
+    if os.path.exists(array_path) and os.path.exists(index_path):
+        return array_path, index_path
+
+    materials = read_property_sources(paths)
+    blocks, index, start = [], {}, 0
+    for name, entry in materials.items():
+        block = np.column_stack([entry["columns"][column] for column in COLUMNS])
+        blocks.append(block)
+        index[name] = {"start": start, "stop": start + len(block), "phase": entry["phase"],
+                       "source": entry["source"],
+                       "properties": [c for c in PROPERTY_NAMES if not np.isnan(entry["columns"][c]).any()]}
+        start += len(block)
+    values = np.concatenate(blocks) if blocks else np.empty((0, len(COLUMNS)))
+
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=cache_dir, suffix=".npy")
+    with os.fdopen(fd, "wb") as f:
+        np.save(f, values)
+    os.replace(temporary, array_path)
+    fd, temporary = tempfile.mkstemp(dir=cache_dir, suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump({"columns": COLUMNS, "materials": index}, f)
+    os.replace(temporary, index_path)
+    return array_path, index_path
+
+
+class PropertyDatabase:
+    """
+    Vectorized property lookups over a compiled (memory-mapped) property array.
+
+    Args:
+        values (ndarray): (rows, 4) array [T, k, Cp, mu], one T-sorted block per material.
+        index (dict): Material name -> {"start", "stop", "phase", "source", "properties"}.
+    """
+
+    def __init__(self, values, index):
+        self.values = values
+        self.index = index
+
+    @classmethod
+    def open(cls, array_path, index_path):
+        with open(index_path) as f:
+            index = json.load(f)["materials"]
+        return cls(np.load(array_path, mmap_mode='r'), index)
+
+    def materials(self):
+        """Returns a summary (phase, source, properties, T range) of every material."""
+        return {name: {"phase": entry["phase"], "source": entry["source"], "properties": entry["properties"],
+                       "T_min": float(self.values[entry["start"], 0]),
+                       "T_max": float(self.values[entry["stop"] - 1, 0])}
+                for name, entry in self.index.items()}
+
+    def check(self, material, name):
+        """Returns an error message if material does not exist or lacks property name, else None."""
+        if material not in self.index:
+            return f"Unknown material '{material}'. Available: {', '.join(self.index)}."
+        if name not in self.index[material]["properties"]:
+            return f"Material '{material}' has no '{name}' data."
+        return None
+
+    def temperature_range(self, material):
+        entry = self.index[material]
+        return float(self.values[entry["start"], 0]), float(self.values[entry["stop"] - 1, 0])
+
+    def lookup(self, material, name, T):
+        """
+        Interpolates property name ('k', 'Cp' or 'mu') of material at temperatures T.
+
+        Returns:
+            ndarray: Values with the shape of T; NaN outside the material's table.
+
+        Raises:
+            KeyError: If the material or property is unknown (see check).
+        """
+        error = self.check(material, name)
+        if error:
+            raise KeyError(error)
+        entry = self.index[material]
+        block = self.values[entry["start"]:entry["stop"]]
+        table_T, table_values = block[:, 0], block[:, COLUMNS.index(name)]
+        T = np.asarray(T, dtype=float)
+        i = np.clip(np.searchsorted(table_T, T, side='right') - 1, 0, len(table_T) - 2)
+        with np.errstate(invalid='ignore'):
+            w = (T - table_T[i]) / (table_T[i + 1] - table_T[i])
+        if name == 'mu':
+            result = np.exp(np.log(table_values[i]) * (1 - w) + np.log(table_values[i + 1]) * w)
+        else:
+            result = table_values[i] * (1 - w) + table_values[i + 1] * w
+        return np.where((T >= table_T[0]) & (T <= table_T[-1]), result, np.nan)
+
+
+_database = None
+_database_lock = threading.Lock()
+
+
+def get_property_database(config=None):
+    """
+    Returns the process-wide property database, compiled on first use. Configuration
+    (e.g. os.environ):
+        THERMAL_PROPERTY_SOURCES: JSON / CSV files separated by os.pathsep
+                                  (default: app/data/properties.json)
+        THERMAL_PROPERTY_CACHE: directory for the compiled files
+                                (default: <system temp dir>/thermal_properties)
+    """
+    global _database
+    if _database is not None:
+        return _database
+    with _database_lock:
+        if _database is None:
+            config = os.environ if config is None else config
+            sources = config.get("THERMAL_PROPERTY_SOURCES")
+            paths = sources.split(os.pathsep) if sources else DEFAULT_SOURCES
+            cache_dir = config.get("THERMAL_PROPERTY_CACHE") or os.path.join(tempfile.gettempdir(),
+                                                                             "thermal_properties")
+            _database = PropertyDatabase.open(*compile_property_sources(paths, cache_dir))
+    return _database
@@ -0,0 +1,235 @@
+import numpy as np
+from app.heat_exchanger_calculator import calculate_heat_exchanger_performance
+from app.composite_wall_calculator import calculate_composite_wall_performance
+from app.properties import get_property_database
+from app.validation import HEAT_EXCHANGER_FLOW_TYPES
+
+# Variable-property versions of the heat exchanger and composite wall calculators. The
+# constant-property calculators are run repeatedly: properties are looked up at the
+# current estimate of each stream's (or layer's) mean temperature, the calculator gives
+# new outlet (or interface) temperatures, and the properties are looked up again at the
+# new mean temperatures, until no property changes by more than the relative tolerance.
+#
+# Heat exchanger: Cp of each stream at (T_in + T_out) / 2, first guess at the inlets.
+# Composite wall: k of each layer at the mean of its two surface temperatures, first guess
+# at the mean wall temperature. Layers may give a constant 'k_value' instead of a material.
+
+DEFAULT_TOLERANCE = 1e-6 # Relative change of every property between iterations
+DEFAULT_MAX_ITERATIONS = 50
+
+
+def _lookup(database, material, name, T):
+    """(value, error): property name of material at T, or an error outside its table."""
+    value = float(database.lookup(material, name, T))
+    if np.isnan(value):
+        T_min, T_max = database.temperature_range(material)
+        return None, f"Temperature {T:.2f} K is outside the '{material}' property table ({T_min:g} - {T_max:g} K)."
+    return value, None
+
+
+def _converged(new, old, tolerance):
+    return old is not None and all(abs(a - b) <= tolerance * abs(a) for a, b in zip(new, old))
+
+
+def solve_heat_exchanger_with_properties(m_dot_hot, T_in_hot, hot_fluid, m_dot_cold, T_in_cold, cold_fluid,
+                                         UA, flow_type, tolerance=DEFAULT_TOLERANCE,
+                                         max_iterations=DEFAULT_MAX_ITERATIONS, database=None):
+    """
+    Heat exchanger performance with Cp(T) of both fluids from the property database.
+
+    Args:
+        m_dot_hot, T_in_hot, m_dot_cold, T_in_cold, UA, flow_type: As for
+            calculate_heat_exchanger_performance.
+        hot_fluid, cold_fluid (str): Material names in the property database.
+        tolerance (float, optional): Relative Cp change at which the iteration stops.
+        max_iterations (int, optional): Calculator runs before giving up (converged is then False).
+        database (PropertyDatabase, optional): Defaults to get_property_database().
+
+    Returns:
+        dict: The calculator results of the last iteration plus Cp_hot / Cp_cold (used in
+              it), T_mean_hot / T_mean_cold, mu_hot / mu_cold at those temperatures (None
+              without viscosity data), iterations and converged; or {"error": message}.
+    """
+    database = database or get_property_database()
+    T_mean_hot, T_mean_cold = T_in_hot, T_in_cold
+    properties, results, converged = None, None, False
+    for iteration in range(1, max_iterations + 1):
+        Cp_hot, error = _lookup(database, hot_fluid, 'Cp', T_mean_hot)
+        if error:
+            return {"error": error}
+        Cp_cold, error = _lookup(database, cold_fluid, 'Cp', T_mean_cold)
+        if error:
+            return {"error": error}
+        if _converged((Cp_hot, Cp_cold), properties, tolerance):
+            converged = True
+            break
+        properties = (Cp_hot, Cp_cold)
+        results = calculate_heat_exchanger_performance(m_dot_hot, Cp_hot, T_in_hot, m_dot_cold, Cp_cold, T_in_cold,
+                                                       UA, flow_type)
+        if results.get("error"):
+            return {"error": results["error"]}
+        T_mean_hot = (T_in_hot + results["T_out_hot"]) / 2
+        T_mean_cold = (T_in_cold + results["T_out_cold"]) / 2
+
+    viscosity = {}
+    for key, fluid, T in [("mu_hot", hot_fluid, T_mean_hot), ("mu_cold", cold_fluid, T_mean_cold)]:
+        viscosity[key] = None if database.check(fluid, 'mu') else _lookup(database, fluid, 'mu', T)[0]
+    return {
+        **results,
+        "Cp_hot": properties[0], "Cp_cold": properties[1],
+        "T_mean_hot": T_mean_hot, "T_mean_cold": T_mean_cold,
+        **viscosity,
+        "iterations": iteration - 1 if converged else max_iterations, # Calculator runs
+        "converged": converged,
+    }
+
+
+def solve_composite_wall_with_properties(layers, T_inner, T_outer, tolerance=DEFAULT_TOLERANCE,
+                                         max_iterations=DEFAULT_MAX_ITERATIONS, database=None):
+    """
+    Composite wall performance with k(T) of each layer from the property database.
+
+    Args:
+        layers (list): Dictionaries with 'thickness' (m), 'area' (m^2) and either 'material'
+                       (a name in the property database) or a constant 'k_value' (W/mK).
+        T_inner, T_outer (float): Surface temperatures (K).
+        tolerance, max_iterations, database: As for solve_heat_exchanger_with_properties.
+
+    Returns:
+        dict: The calculator results of the last iteration plus layer_k (used in it),
+              interface_temperatures (T_inner, ..., T_outer), layer_mean_temperatures,
+              iterations and converged; or {"error": message}.
+    """
+    database = database or get_property_database()
+    mean_temperatures = [(T_inner + T_outer) / 2] * len(layers)
+    layer_k, results, converged = None, None, False
+    for iteration in range(1, max_iterations + 1):
+        k_values = []
+        for i, (layer, T) in enumerate(zip(layers, mean_temperatures)):
+            if 'material' not in layer:
+                k_values.append(layer['k_value'])
+                continue
+            k, error = _lookup(database, layer['material'], 'k', T)
+            if error:
+                return {"error": f"Layer {i+1}: {error}"}
+            k_values.append(k)
+        if _converged(k_values, layer_k, tolerance):
+            converged = True
+            break
+        layer_k = k_values
+        results = calculate_composite_wall_performance(
+            [{'thickness': layer['thickness'], 'k_value': k, 'area': layer['area']} for layer, k in zip(layers, k_values)],
+            T_inner, T_outer
+        )
+        if results.get("error"):
+            return {"error": results["error"]}
+        # Surface temperatures drop by Q R across each layer
+        interfaces = T_inner - results["heat_flux"] * np.concatenate([[0.0], np.cumsum(results["individual_resistances"])])
+        interfaces[-1] = T_outer
+        mean_temperatures = ((interfaces[:-1] + interfaces[1:]) / 2).tolist()
+
+    return {
+        **results,
+        "layer_k": layer_k,
+        "interface_temperatures": interfaces.tolist(),
+        "layer_mean_temperatures": mean_temperatures,
+        "iterations": iteration - 1 if converged else max_iterations, # Calculator runs
+        "converged": converged,
+    }
+
+
+def _parse_settings(data):
+    tolerance = data.get('tolerance', DEFAULT_TOLERANCE)
+    if not isinstance(tolerance, (int, float)) or isinstance(tolerance, bool) or not 0 < tolerance < 1:
+        return None, "Parameter 'tolerance' must be a number between 0 and 1."
+    max_iterations = data.get('max_iterations', DEFAULT_MAX_ITERATIONS)
+    if not isinstance(max_iterations, int) or isinstance(max_iterations, bool) or not 1 <= max_iterations <= 1000:
+        return None, "Parameter 'max_iterations' must be an integer between 1 and 1000."
+    return {"tolerance": float(tolerance), "max_iterations": max_iterations}, None
+
+
+def parse_heat_exchanger_properties_request(data, database=None):
+    """
+    Parses a variable-property heat exchanger request: the /calculate_heat_exchanger inputs
+    with 'hot_fluid' and 'cold_fluid' (materials with Cp data) in place of Cp_hot and
+    Cp_cold, and optionally 'tolerance' and 'max_iterations'.
+
+    Returns:
+        tuple: (problem, error). problem holds the keyword arguments of
+               solve_heat_exchanger_with_properties.
+    """
+    database = database or get_property_database()
+    names = ['m_dot_hot', 'T_in_hot', 'm_dot_cold', 'T_in_cold', 'UA']
+    missing_params = [name for name in names + ['hot_fluid', 'cold_fluid', 'flow_type'] if name not in data]
+    if missing_params:
+        return None, f"Missing parameters: {', '.join(missing_params)}"
+    problem = {}
+    for name in names:
+        value = data[name]
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return None, f"Parameter '{name}' must be a number."
+        if name not in ['T_in_hot', 'T_in_cold'] and value < 0:
+            return None, f"Parameter '{name}' must be non-negative."
+        problem[name] = float(value)
+    for name in ['hot_fluid', 'cold_fluid']:
+        error = database.check(data[name], 'Cp') if isinstance(data[name], str) else f"Parameter '{name}' must be a string."
+        if not error and database.index[data[name]]["phase"] == "solid":
+            error = f"Parameter '{name}': '{data[name]}' is a solid, not a fluid."
+        if error:
+            return None, error
+        problem[name] = data[name]
+    if data['flow_type'] not in HEAT_EXCHANGER_FLOW_TYPES:
+        return None, f"Parameter 'flow_type' must be one of: {', '.join(HEAT_EXCHANGER_FLOW_TYPES)}."
+    problem['flow_type'] = data['flow_type']
+    settings, error = _parse_settings(data)
+    if error:
+        return None, error
+    return {**problem, **settings}, None
+
+
+def parse_composite_wall_properties_request(data, database=None):
+    """
+    Parses a variable-property composite wall request: the /calculate_composite_wall inputs
+    where each layer gives 'material' (a material with k data) or 'k_value', and optionally
+    'tolerance' and 'max_iterations'.
+
+    Returns:
+        tuple: (problem, error). problem holds the keyword arguments of
+               solve_composite_wall_with_properties.
+    """
+    database = database or get_property_database()
+    layers_data = data.get('layers')
+    if not isinstance(layers_data, list) or not layers_data:
+        return None, "Parameter 'layers' must be a non-empty list."
+    if not all(isinstance(layer, dict) for layer in layers_data):
+        return None, "Each item in 'layers' must be a dictionary."
+    layers = []
+    for i, layer in enumerate(layers_data):
+        thickness, area = layer.get('thickness'), layer.get('area')
+        if not all(isinstance(val, (int, float)) for val in [thickness, area]):
+            return None, f"Layer {i+1}: 'thickness' and 'area' must be numbers."
+        if thickness < 0:
+            return None, f"Layer {i+1}: 'thickness' must be non-negative."
+        if area <= 0:
+            return None, f"Layer {i+1}: 'area' must be positive."
+        validated = {'thickness': float(thickness), 'area': float(area)}
+        if 'material' in layer:
+            error = (database.check(layer['material'], 'k') if isinstance(layer['material'], str)
+                     else "'material' must be a string.")
+            if error:
+                return None, f"Layer {i+1}: {error}"
+            validated['material'] = layer['material']
+        else:
+            k_value = layer.get('k_value')
+            if not isinstance(k_value, (int, float)) or k_value <= 0:
+                return None, f"Layer {i+1}: give a 'material' or a positive 'k_value'."
+            validated['k_value'] = float(k_value)
+        layers.append(validated)
+
+    T_inner, T_outer = data.get('T_inner'), data.get('T_outer')
+    if not all(isinstance(temp, (int, float)) for temp in [T_inner, T_outer]):
+        return None, "'T_inner' and 'T_outer' must be numbers."
+    settings, error = _parse_settings(data)
+    if error:
+        return None, error
+    return {"layers": layers, "T_inner": float(T_inner), "T_outer": float(T_outer), **settings}, None
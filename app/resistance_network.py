@@ -0,0 +1,297 @@
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+from scipy.sparse.csgraph import connected_components
+
+# Steady thermal resistance networks: nodes joined by resistances (conduction through a
+# layer, surface convection, contact), some nodes held at fixed temperatures and heat
+# sources at others. Kirchhoff's law at every free node gives G_ff T_f = Q_f + G_fd T_d,
+# with G the conductance (Laplacian) matrix split into free (f) and fixed (d) nodes.
+#
+# G_ff only depends on the resistances, so it is factorized once (SuperLU with a minimum
+# degree ordering of G + G^T and no pivoting: the matrix is symmetric and diagonally
+# dominant) and the factorization is reused for any fixed temperatures and heat sources;
+# each further solve is a forward / back substitution. New resistance values on the same
+# branches are scattered into the assembled matrix through a stored index map.
+#
+# A layer stack in series (first node at T_inner, last at T_outer) gives the
+# calculate_composite_wall_performance result; see series_network.
+
+# Parameters of each resistance type; R in K/W
+RESISTANCE_TYPES = {
+    "conduction": ['thickness', 'k', 'area'], # R = thickness / (k area)
+    "convection": ['h', 'area'], # R = 1 / (h area)
+    "contact": ['R_contact', 'area'], # R = R_contact / area, R_contact in m^2K/W
+    "resistance": ['R'], # Given directly
+}
+MAX_NETWORK_NODES = 1000000
+MAX_NETWORK_BRANCHES = 4000000
+
+
+def branch_resistance(kind, params):
+    """
+    Resistance (K/W) of one branch of the given type.
+
+    Args:
+        kind (str): A RESISTANCE_TYPES key.
+        params (dict): Its parameters; values may be floats or arrays.
+    """
+    if kind == "conduction":
+        return params['thickness'] / (params['k'] * params['area'])
+    if kind == "convection":
+        return 1 / (params['h'] * params['area'])
+    if kind == "contact":
+        return params['R_contact'] / params['area']
+    return params['R']
+
+
+class ResistanceNetwork:
+    """
+    Assembled resistance network, solvable for different fixed temperatures and heat sources.
+
+    Args:
+        n_nodes (int): Number of nodes, numbered 0 to n_nodes - 1.
+        node_from, node_to (array-like): (n_branches,) end nodes of every branch.
+        resistance (array-like): (n_branches,) positive branch resistances (K/W). Parallel
+                                 branches between the same nodes are allowed.
+        fixed_nodes (array-like): Nodes held at a fixed temperature; every connected part
+                                  of the network needs at least one.
+        names (list, optional): Node names, used in error messages.
+
+    Raises:
+        ValueError: If the network is malformed.
+    """
+
+    def __init__(self, n_nodes, node_from, node_to, resistance, fixed_nodes, names=None):
+        self.n_nodes = int(n_nodes)
+        self.node_from = np.asarray(node_from, dtype=np.int64)
+        self.node_to = np.asarray(node_to, dtype=np.int64)
+        self.fixed_nodes = np.asarray(fixed_nodes, dtype=np.int64)
+        nodes = np.concatenate([self.node_from, self.node_to, self.fixed_nodes])
+        if self.node_from.shape != self.node_to.shape or self.node_from.ndim != 1:
+            raise ValueError("node_from and node_to must be 1-D arrays of the same length.")
+        if nodes.size and (nodes.min() < 0 or nodes.max() >= self.n_nodes):
+            raise ValueError(f"Node indices must be between 0 and {self.n_nodes - 1}.")
+        if np.any(self.node_from == self.node_to):
+            raise ValueError("A resistance must join two different nodes.")
+        if len(np.unique(self.fixed_nodes)) != len(self.fixed_nodes):
+            raise ValueError("A node is fixed more than once.")
+
+        self.is_fixed = np.zeros(self.n_nodes, dtype=bool)
+        self.is_fixed[self.fixed_nodes] = True
+        self.free_nodes = np.flatnonzero(~self.is_fixed)
+        # Position of every node among the free (or fixed) nodes
+        self.position = np.empty(self.n_nodes, dtype=np.int64)
+        self.position[self.free_nodes] = np.arange(len(self.free_nodes))
+        self.position[self.fixed_nodes] = np.arange(len(self.fixed_nodes))
+
+        graph = sp.coo_matrix((np.ones(len(self.node_from)), (self.node_from, self.node_to)),
+                              shape=(self.n_nodes, self.n_nodes))
+        n_parts, part = connected_components(graph, directed=False)
+        grounded = np.zeros(n_parts, dtype=bool)
+        grounded[part[self.fixed_nodes]] = True
+        if not grounded.all():
+            floating = np.flatnonzero(~grounded[part])
+            example = f"'{names[floating[0]]}'" if names is not None else str(floating[0])
+            raise ValueError(f"{len(floating)} node(s), e.g. node {example}, are not connected to any "
+                             "fixed-temperature node.")
+
+        # Matrix entries per branch: diagonal terms for free ends, off-diagonal terms between
+        # two free ends (G_ff), and couplings of free ends to fixed ends (G_fd)
+        i, j = self.node_from, self.node_to
+        free_i, free_j = ~self.is_fixed[i], ~self.is_fixed[j]
+        both = free_i & free_j
+        self._ff_branches = np.concatenate([np.flatnonzero(free_i), np.flatnonzero(free_j),
+                                            np.flatnonzero(both), np.flatnonzero(both)])
+        self._ff_sign = np.concatenate([np.ones(free_i.sum() + free_j.sum()), -np.ones(2 * both.sum())])
+        rows = self.position[np.concatenate([i[free_i], j[free_j], i[both], j[both]])]
+        cols = self.position[np.concatenate([i[free_i], j[free_j], j[both], i[both]])]
+        self._fd_branches = np.concatenate([np.flatnonzero(free_i & ~free_j), np.flatnonzero(free_j & ~free_i)])
+        fd_rows = self.position[np.concatenate([i[free_i & ~free_j], j[free_j & ~free_i]])]
+        fd_cols = self.position[np.concatenate([j[free_i & ~free_j], i[free_j & ~free_i]])]
+
+        # CSC pattern of G_ff and the slot of every (branch, term) entry in its data array;
+        # duplicates (parallel branches, diagonal sums) share a slot
+        n_free = len(self.free_nodes)
+        keys = cols * n_free + rows
+        unique_keys, self._ff_slot = np.unique(keys, return_inverse=True)
+        unique_cols = unique_keys // n_free
+        self._ff_indices = unique_keys % n_free
+        self._ff_indptr = np.searchsorted(unique_cols, np.arange(n_free + 1))
+        self._fd_rows, self._fd_cols = fd_rows, fd_cols
+        self.set_resistances(resistance)
+
+    def set_resistances(self, resistance):
+        """
+        Replaces the branch resistances (same branches) and refactorizes G_ff on the
+        assembled sparsity pattern.
+        """
+        resistance = np.asarray(resistance, dtype=float)
+        if resistance.shape != self.node_from.shape:
+            raise ValueError("There must be one resistance per branch.")
+        if not np.all(np.isfinite(resistance) & (resistance > 0)):
+            raise ValueError("Resistances must be positive and finite.")
+        self.resistance = resistance
+        self.conductance = 1 / resistance
+        n_free = len(self.free_nodes)
+        data = np.bincount(self._ff_slot, weights=self._ff_sign * self.conductance[self._ff_branches],
+                           minlength=len(self._ff_indices))
+        self.matrix = sp.csc_matrix((data, self._ff_indices, self._ff_indptr), shape=(n_free, n_free))
+        self.coupling = sp.csr_matrix((self.conductance[self._fd_branches], (self._fd_rows, self._fd_cols)),
+                                      shape=(n_free, len(self.fixed_nodes)))
+        self._lu = spla.splu(self.matrix, permc_spec="MMD_AT_PLUS_A", diag_pivot_thresh=0.0,
+                             options={"SymmetricMode": True}) if n_free else None
+
+    def solve(self, temperatures, sources=None):
+        """
+        Solves for all node temperatures and branch heat flows. The factorization is reused.
+
+        Args:
+            temperatures (array-like): Temperatures of the fixed nodes (K), in fixed_nodes order.
+            sources (array-like, optional): (n_nodes,) heat generated at every node (W); entries
+                                            at fixed nodes are ignored. Defaults to none.
+
+        Returns:
+            dict: A dictionary containing:
+                - temperature (ndarray): (n_nodes,) node temperatures (K).
+                - heat_flow (ndarray): (n_branches,) heat flowing from node_from to node_to (W).
+                - fixed_heat_rates (ndarray): Heat entering the network at each fixed node (W).
+                - energy_balance (float): Sum of fixed_heat_rates and the sources at free
+                  nodes; zero up to round-off.
+        """
+        T_fixed = np.broadcast_to(np.asarray(temperatures, dtype=float), self.fixed_nodes.shape)
+        Q = np.zeros(self.n_nodes) if sources is None else np.asarray(sources, dtype=float)
+        temperature = np.empty(self.n_nodes)
+        temperature[self.fixed_nodes] = T_fixed
+        if self._lu is not None:
+            temperature[self.free_nodes] = self._lu.solve(Q[self.free_nodes] + self.coupling @ T_fixed)
+
+        heat_flow = (temperature[self.node_from] - temperature[self.node_to]) * self.conductance
+        outflow = (np.bincount(self.node_from, weights=heat_flow, minlength=self.n_nodes)
+                   - np.bincount(self.node_to, weights=heat_flow, minlength=self.n_nodes))
+        fixed_heat_rates = outflow[self.fixed_nodes]
+        return {
+            "temperature": temperature,
+            "heat_flow": heat_flow,
+            "fixed_heat_rates": fixed_heat_rates,
+            "energy_balance": float(fixed_heat_rates.sum() + Q[self.free_nodes].sum()),
+        }
+
+
+def series_network(layers):
+    """
+    Network of a layer stack in series: node 0 (inner surface) to node len(layers) (outer
+    surface), fixed in that order. solve([T_inner, T_outer]) gives heat_flow equal to the
+    heat_flux of calculate_composite_wall_performance and the same interface temperatures.
+
+    Args:
+        layers (list): Dictionaries with 'thickness' (m, positive), 'k_value' (W/mK) and 'area' (m^2).
+    """
+    resistance = [branch_resistance("conduction", {'thickness': layer['thickness'], 'k': layer['k_value'],
+                                                   'area': layer['area']}) for layer in layers]
+    n = len(layers)
+    return ResistanceNetwork(n + 1, np.arange(n), np.arange(1, n + 1), resistance, [0, n])
+
+
+def _number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def parse_resistance_network_request(data):
+    """
+    Parses a network request:
+        nodes: list of {"name", optional "T" (fixed temperature, K) or "Q" (heat source, W)}
+        resistances: list of {"from", "to", "type", ...parameters of RESISTANCE_TYPES[type]}
+        cases (optional): list of {"temperatures": {name: T}, "sources": {name: Q}} overrides,
+                          solved with the same factorization
+
+    Returns:
+        tuple: (problem, error). problem holds the node names, the ResistanceNetwork
+               arguments (n_nodes, node_from, node_to, resistance, fixed_nodes, names), the fixed
+               temperatures, the sources and the cases as (temperatures, sources) arrays.
+    """
+    nodes, branches = data.get('nodes'), data.get('resistances')
+    if not isinstance(nodes, list) or not nodes or not all(isinstance(node, dict) for node in nodes):
+        return None, "Parameter 'nodes' must be a non-empty list of dictionaries."
+    if not isinstance(branches, list) or not branches or not all(isinstance(branch, dict) for branch in branches):
+        return None, "Parameter 'resistances' must be a non-empty list of dictionaries."
+    if len(nodes) > MAX_NETWORK_NODES or len(branches) > MAX_NETWORK_BRANCHES:
+        return None, f"A network must not exceed {MAX_NETWORK_NODES} nodes and {MAX_NETWORK_BRANCHES} resistances."
+
+    names, fixed_nodes, fixed_T = [], [], []
+    sources = np.zeros(len(nodes))
+    for i, node in enumerate(nodes):
+        name = node.get('name')
+        if not isinstance(name, str):
+            return None, f"Node {i+1}: 'name' must be a string."
+        names.append(name)
+        if 'T' in node and 'Q' in node:
+            return None, f"Node '{name}': give a fixed temperature 'T' or a heat source 'Q', not both."
+        if 'T' in node:
+            if not _number(node['T']):
+                return None, f"Node '{name}': 'T' must be a number."
+            fixed_nodes.append(i)
+            fixed_T.append(float(node['T']))
+        elif 'Q' in node:
+            if not _number(node['Q']):
+                return None, f"Node '{name}': 'Q' must be a number."
+            sources[i] = node['Q']
+    index = {name: i for i, name in enumerate(names)}
+    if len(index) != len(names):
+        return None, "Node names must be unique."
+    if not fixed_nodes:
+        return None, "At least one node needs a fixed temperature 'T'."
+
+    node_from, node_to, resistance = [], [], []
+    for b, branch in enumerate(branches):
+        ends = [branch.get('from'), branch.get('to')]
+        unknown = [end for end in ends if end not in index]
+        if unknown:
+            return None, f"Resistance {b+1}: unknown node '{unknown[0]}'."
+        if ends[0] == ends[1]:
+            return None, f"Resistance {b+1}: 'from' and 'to' must be different nodes."
+        kind = branch.get('type', 'resistance')
+        if kind not in RESISTANCE_TYPES:
+            return None, f"Resistance {b+1}: 'type' must be one of: {', '.join(RESISTANCE_TYPES)}."
+        params = {name: branch.get(name) for name in RESISTANCE_TYPES[kind]}
+        missing = [name for name, value in params.items() if value is None]
+        if missing:
+            return None, f"Resistance {b+1}: missing parameters: {', '.join(missing)}"
+        if not all(_number(value) and value > 0 for value in params.values()):
+            return None, f"Resistance {b+1}: {', '.join(params)} must be positive numbers."
+        node_from.append(index[ends[0]])
+        node_to.append(index[ends[1]])
+        resistance.append(branch_resistance(kind, params))
+
+    if not isinstance(data.get('cases', []), list):
+        return None, "Parameter 'cases' must be a list."
+    cases = []
+    for c, case in enumerate(data.get('cases', [])):
+        if not isinstance(case, dict) or not set(case) <= {'temperatures', 'sources'}:
+            return None, f"Case {c+1}: must be a dictionary with 'temperatures' and/or 'sources'."
+        case_T, case_sources = np.array(fixed_T), sources.copy()
+        for key, target in [('temperatures', 'T'), ('sources', 'Q')]:
+            overrides = case.get(key, {})
+            if not isinstance(overrides, dict):
+                return None, f"Case {c+1}: '{key}' must map node names to numbers."
+            for name, value in overrides.items():
+                if name not in index or not _number(value):
+                    return None, f"Case {c+1}: '{key}' must map node names to numbers ('{name}')."
+                is_fixed = 'T' in nodes[index[name]]
+                if is_fixed != (target == 'T'):
+                    return None, (f"Case {c+1}: node '{name}' " +
+                                  ("has no fixed temperature." if target == 'T' else "has a fixed temperature."))
+                if target == 'T':
+                    case_T[fixed_nodes.index(index[name])] = value
+                else:
+                    case_sources[index[name]] = value
+        cases.append((case_T, case_sources))
+
+    return {
+        "names": names,
+        "network": {"n_nodes": len(nodes), "node_from": node_from, "node_to": node_to,
+                    "resistance": resistance, "fixed_nodes": fixed_nodes, "names": names},
+        "temperatures": np.array(fixed_T),
+        "sources": sources,
+        "cases": cases,
+    }, None
@@ -0,0 +1,187 @@
+import io
+import json
+import math
+import struct
+import numpy as np
+
+try: # Optional: Arrow IPC responses
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+# Binary alternatives to JSON for the routes that return large arrays (temperature profiles
+# and fields). The arrays are written straight from NumPy, without the .tolist() and float
+# to text conversion of jsonify. Clients pick the format with the Accept header and the
+# float precision with the ?dtype= query argument.
+#
+# application/octet-stream layout (all little-endian):
+#     bytes 0-3   magic b"TSCB"
+#     bytes 4-7   uint32 header length H
+#     bytes 8-    H bytes of UTF-8 JSON: {"version", "metadata", "arrays": [{"name", "dtype",
+#                 "shape", "offset", "nbytes"}, ...]}, space-padded so data starts 8-aligned
+#     then        the raw C-order array buffers, each at 8 + H + "offset" and 8-aligned, so they
+#                 can be wrapped in JS typed arrays without copying
+#
+# application/x-npy is a single-record structured array: one field per array (with its
+# shape) and per scalar, so np.load(...)[0]['temp_dist'] gives the profile back. Nested dicts
+# get dotted field names ("heat_rates.left"); lists (a network's nodes, optimizer cases) are
+# one JSON string field each, json.loads(record['nodes']), so the header stays small.
+#
+# application/vnd.apache.arrow.stream is one record batch with one row; each array is a
+# fixed-size list column, shapes and scalars are in the schema metadata.
+
+JSON_MIMETYPE = "application/json"
+OCTET_MIMETYPE = "application/octet-stream"
+NPY_MIMETYPE = "application/x-npy"
+ARROW_MIMETYPE = "application/vnd.apache.arrow.stream"
+RESPONSE_MIMETYPES = [JSON_MIMETYPE, OCTET_MIMETYPE, NPY_MIMETYPE, ARROW_MIMETYPE]
+RESPONSE_DTYPES = {"float64": "<f8", "float32": "<f4"}
+
+BINARY_MAGIC = b"TSCB"
+BINARY_VERSION = 1
+
+
+def negotiate_response_format(accept_mimetypes, dtype=None):
+    """
+    Picks the response mimetype from the request's Accept header.
+
+    Args:
+        accept_mimetypes: The request's MIMEAccept (request.accept_mimetypes).
+        dtype (str, optional): Requested float dtype, "float64" (default) or "float32".
+
+    Returns:
+        tuple: (mimetype, error). JSON is used when the client accepts none of the formats;
+               error is set when it asked for Arrow without pyarrow installed, or for an
+               unknown dtype.
+    """
+    if dtype is not None and dtype not in RESPONSE_DTYPES:
+        return None, f"Parameter 'dtype' must be one of: {', '.join(RESPONSE_DTYPES)}."
+    mimetype = accept_mimetypes.best_match(RESPONSE_MIMETYPES, default=JSON_MIMETYPE)
+    if mimetype == ARROW_MIMETYPE and pyarrow is None:
+        return None, "Arrow responses need the optional 'pyarrow' package."
+    return mimetype, None
+
+
+def _json_safe(value):
+    if isinstance(value, dict):
+        return {str(k): _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None # JSON.parse has no NaN/Infinity
+    return value
+
+
+def _prepare_arrays(arrays, dtype):
+    """Floats are cast to the requested dtype, integers to int32 (no BigInt arrays in JS)."""
+    prepared = {}
+    for name, array in arrays.items():
+        array = np.asarray(array)
+        if array.dtype.kind in 'biu':
+            prepared[name] = np.ascontiguousarray(array, dtype='<i4')
+        else:
+            prepared[name] = np.ascontiguousarray(array, dtype=RESPONSE_DTYPES[dtype])
+    return prepared
+
+
+def _flatten_metadata(metadata, prefix=""):
+    """Yields (dotted name, value) pairs for the dict keys; lists are kept whole."""
+    for name, value in metadata.items():
+        if isinstance(value, dict):
+            yield from _flatten_metadata(value, f"{prefix}{name}.")
+        else:
+            yield f"{prefix}{name}", value
+
+
+def encode_octet_stream(arrays, metadata):
+    entries = []
+    offset = 0
+    for name, array in arrays.items():
+        entries.append({"name": name, "dtype": array.dtype.name, "shape": list(array.shape),
+                        "offset": offset, "nbytes": array.nbytes})
+        offset += -(-array.nbytes // 8) * 8
+
+    header = json.dumps({"version": BINARY_VERSION, "metadata": _json_safe(metadata), "arrays": entries},
+                        separators=(',', ':')).encode()
+    header += b" " * (-len(header) % 8)
+    data_start = 8 + len(header)
+
+    body = bytearray(data_start + offset)
+    body[:8] = BINARY_MAGIC + struct.pack("<I", len(header))
+    body[8:data_start] = header
+    for entry, array in zip(entries, arrays.values()):
+        start = data_start + entry["offset"]
+        body[start:start + array.nbytes] = array.tobytes()
+    return bytes(body)
+
+
+def encode_npy(arrays, metadata):
+    fields, values = [], []
+    for name, array in arrays.items():
+        fields.append((name, array.dtype.str, array.shape))
+        values.append(array)
+    for name, value in _flatten_metadata(metadata):
+        if isinstance(value, (list, tuple)):
+            value = json.dumps(_json_safe(value), separators=(',', ':'))
+        if isinstance(value, str):
+            fields.append((name, f"<U{max(1, len(value))}"))
+        else:
+            fields.append((name, "<f8"))
+            value = np.nan if value is None else float(value)
+        values.append(value)
+    record = np.zeros(1, dtype=fields)
+    for (name, *_), value in zip(fields, values):
+        record[name][0] = value
+    buffer = io.BytesIO()
+    np.save(buffer, record, allow_pickle=False)
+    return buffer.getvalue()
+
+
+def encode_arrow(arrays, metadata):
+    columns = [pyarrow.FixedSizeListArray.from_arrays(pyarrow.array(array.ravel()), max(1, array.size))
+               if array.size else pyarrow.array([[]], type=pyarrow.list_(pyarrow.from_numpy_dtype(array.dtype)))
+               for array in arrays.values()]
+    schema_metadata = {
+        "metadata": json.dumps(_json_safe(metadata)),
+        "shapes": json.dumps({name: list(array.shape) for name, array in arrays.items()}),
+    }
+    batch = pyarrow.RecordBatch.from_arrays(columns, names=list(arrays)).replace_schema_metadata(schema_metadata)
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def encode_response(mimetype, arrays, metadata, dtype=None):
+    """
+    Encodes arrays and scalar metadata in one of the binary formats.
+
+    Args:
+        mimetype (str): OCTET_MIMETYPE, NPY_MIMETYPE or ARROW_MIMETYPE.
+        arrays (dict): Name -> ndarray.
+        metadata (dict): Name -> JSON-serializable scalar (or dict/list of them).
+        dtype (str, optional): "float64" (default) or "float32" for the float arrays.
+
+    Returns:
+        bytes: The response body.
+    """
+    arrays = _prepare_arrays(arrays, dtype or "float64")
+    encoders = {OCTET_MIMETYPE: encode_octet_stream, NPY_MIMETYPE: encode_npy, ARROW_MIMETYPE: encode_arrow}
+    return encoders[mimetype](arrays, metadata)
+
+
+def decode_octet_stream(body):
+    """Inverse of encode_octet_stream: returns (arrays dict, metadata dict)."""
+    if body[:4] != BINARY_MAGIC:
+        raise ValueError("Not a thermal binary response.")
+    (header_length,) = struct.unpack("<I", body[4:8])
+    header = json.loads(body[8:8 + header_length])
+    arrays = {
+        entry["name"]: np.frombuffer(body, dtype=np.dtype(entry["dtype"]).newbyteorder("<"),
+                                     count=int(np.prod(entry["shape"])), offset=8 + header_length + entry["offset"]
+                                     ).reshape(entry["shape"])
+        for entry in header["arrays"]
+    }
+    return arrays, header["metadata"]
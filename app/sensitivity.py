@@ -0,0 +1,153 @@
+import warnings
+import numpy as np
+from app.sweep import SWEEP_CALCULATORS, _to_json_column
+
+# Local sensitivity analysis from the analytic gradients of the batch kernels: one
+# vectorized call returns every output and its partial derivatives with respect to every
+# numeric input at all points (instead of 2 x n_inputs finite-difference evaluations per
+# point). Derivatives are also reported as elasticities, (dy/dx) * x / y, i.e. the relative
+# change of the output per relative change of the input, which makes inputs with different
+# units comparable; the inputs are ranked by their mean absolute elasticity over the points.
+
+MAX_SENSITIVITY_POINTS = 100000
+
+# Outputs with analytic gradients, per calculator
+SENSITIVITY_OUTPUTS = {
+    "fin": ["heat_transfer_rate", "fin_efficiency"],
+    "heat_exchanger": ["effectiveness", "q_actual"],
+    "composite_wall": ["heat_flux", "total_resistance"],
+}
+
+
+def _differentiable_parameters(calculator, base):
+    return [name for name in SWEEP_CALCULATORS[calculator]["parameters"](base) if name != 'flow_type']
+
+
+def _base_value(base, name):
+    """Base input for a sweep parameter name ('layers.1.k_value' looks into the layer list)."""
+    if name.startswith('layers.'):
+        _, j, field = name.split('.')
+        return base['layers'][int(j)].get(field)
+    return base.get(name)
+
+
+def parse_sensitivity_request(data):
+    """
+    Parses a sensitivity request:
+        calculator: "fin", "heat_exchanger" or "composite_wall"
+        base: inputs of the single-point route (as for /sweep)
+        points: optional, input name -> list of values (one per point, same length for
+                all names) overriding the base; names as for /sweep, e.g. 'layers.1.k_value'
+        outputs: optional subset of SENSITIVITY_OUTPUTS[calculator]
+        parameters: optional subset of the numeric inputs to report
+
+    Returns:
+        tuple: (plan, error). plan is consumed by sensitivity_report.
+    """
+    calculator = data.get('calculator')
+    if calculator not in SWEEP_CALCULATORS:
+        return None, f"Parameter 'calculator' must be one of: {', '.join(SWEEP_CALCULATORS)}."
+    base = data.get('base', {})
+    if not isinstance(base, dict):
+        return None, "Parameter 'base' must be a dictionary."
+    known = SWEEP_CALCULATORS[calculator]["parameters"](base)
+
+    points = data.get('points', {})
+    if not isinstance(points, dict):
+        return None, "Parameter 'points' must be a dictionary of input name -> list of values."
+    unknown = [name for name in points if name not in known]
+    if unknown:
+        return None, f"Unknown inputs for '{calculator}': {', '.join(unknown)}"
+    if not all(isinstance(values, list) and values for values in points.values()):
+        return None, "Each entry of 'points' must be a non-empty list of values."
+    lengths = {len(values) for values in points.values()}
+    if len(lengths) > 1:
+        return None, "All entries of 'points' must have the same length."
+    n_points = lengths.pop() if lengths else 1
+    if n_points > MAX_SENSITIVITY_POINTS:
+        return None, f"At most {MAX_SENSITIVITY_POINTS} points can be analysed per request."
+    swept = {}
+    for name, values in points.items():
+        if name == 'flow_type':
+            swept[name] = np.array(values, dtype=object)
+        elif all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            swept[name] = np.array(values, dtype=float)
+        else:
+            return None, f"Values of '{name}' in 'points' must be numbers."
+    if all(name == 'flow_type' for name in swept): # The row count comes from a numeric column
+        present = [name for name in known if name != 'flow_type' and not name.startswith('layers.') and name in base]
+        name = present[0] if present else known[0]
+        swept[name] = [base.get(name)] * n_points
+
+    outputs = data.get('outputs', SENSITIVITY_OUTPUTS[calculator])
+    if (not isinstance(outputs, list) or not outputs
+            or not all(output in SENSITIVITY_OUTPUTS[calculator] for output in outputs)):
+        return None, f"Parameter 'outputs' must list some of: {', '.join(SENSITIVITY_OUTPUTS[calculator])}."
+    differentiable = _differentiable_parameters(calculator, base)
+    parameters = data.get('parameters', differentiable)
+    if not isinstance(parameters, list) or not parameters or not all(name in differentiable for name in parameters):
+        return None, f"Parameter 'parameters' must list some of: {', '.join(differentiable)}."
+
+    # Whole-request rules (missing inputs, malformed layers) are reported before evaluating
+    _, _, error = SWEEP_CALCULATORS[calculator]["evaluate"](base, {name: values[:1] for name, values in swept.items()})
+    if error:
+        return None, error
+    return {"calculator": calculator, "base": base, "points": swept, "n_points": n_points,
+            "outputs": outputs, "parameters": parameters}, None
+
+
+def sensitivity_report(plan):
+    """
+    Evaluates the outputs, gradients and elasticities of a parsed sensitivity plan.
+
+    Returns:
+        dict: n_points, parameters, outputs, the input values of every parameter per point,
+              per output: values, gradients and elasticities ({parameter: per-point list})
+              and a ranking of the parameters by mean absolute elasticity, plus the
+              per-row validation errors. Undefined values are None.
+    """
+    calculator = SWEEP_CALCULATORS[plan["calculator"]]
+    results, row_errors, error = calculator["evaluate"](plan["base"], plan["points"], gradients=True)
+    if error: # Only possible if a value in 'points' breaks a whole-request rule
+        raise ValueError(error)
+    n_points = plan["n_points"]
+    invalid = np.zeros(n_points, dtype=bool)
+    invalid[[e["row"] for e in row_errors]] = True
+    if "error_code" in results:
+        invalid |= results["error_code"] != 0
+
+    inputs = {name: np.broadcast_to(np.asarray(plan["points"].get(name, _base_value(plan["base"], name)), dtype=float),
+                                    (n_points,))
+              for name in plan["parameters"]}
+    report = {
+        "calculator": plan["calculator"], "n_points": n_points,
+        "parameters": plan["parameters"], "outputs": plan["outputs"],
+        "inputs": {name: _to_json_column(values) for name, values in inputs.items()},
+        "sensitivities": {},
+        "row_errors": row_errors,
+    }
+    for output in plan["outputs"]:
+        value = np.where(invalid, np.nan, np.asarray(results[output], dtype=float))
+        gradients, elasticities, ranking = {}, {}, []
+        for name in plan["parameters"]:
+            gradient = np.where(invalid, np.nan, results["gradients"][output][name])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                elasticity = gradient * inputs[name] / value
+            elasticity[~np.isfinite(elasticity)] = np.nan
+            gradients[name] = _to_json_column(gradient)
+            elasticities[name] = _to_json_column(elasticity)
+            with warnings.catch_warnings(): # All-NaN columns give NaN (null) statistics
+                warnings.simplefilter("ignore", RuntimeWarning)
+                mean_abs, max_abs = np.nanmean(np.abs(elasticity)), np.nanmax(np.abs(elasticity))
+            ranking.append({"parameter": name,
+                            "mean_abs_elasticity": None if np.isnan(mean_abs) else float(mean_abs),
+                            "max_abs_elasticity": None if np.isnan(max_abs) else float(max_abs)})
+        ranking.sort(key=lambda entry: -1.0 if entry["mean_abs_elasticity"] is None else entry["mean_abs_elasticity"],
+                     reverse=True)
+        report["sensitivities"][output] = {
+            "values": _to_json_column(value),
+            "gradients": gradients,
+            "elasticities": elasticities,
+            "ranking": ranking,
+        }
+    return report
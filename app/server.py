@@ -0,0 +1,329 @@
+import argparse
+import json
+import os
+import signal
+import socket
+import sys
+import time
+
+# Multi-process serving mode: python -m app.server --workers 4 --port 8000
+#
+# The master process imports the application, builds the lookup tables, opens the
+# property database and runs every calculator route once (warm-up) before it forks, so
+# modules, tables and the allocations made while warming up are shared copy-on-write by
+# all workers instead of being rebuilt in each. It then opens the listening socket and
+# forks the workers. Each worker creates its own application (create_app(ready=False)),
+# checks it with a request, reports its cold-start time and memory to the master, marks
+# itself ready (/readyz turns 200) and serves the shared socket with werkzeug's WSGI
+# server. The master restarts workers that exit and stops them on SIGTERM / SIGINT.
+#
+# The result cache, job store, parallel sweeps and metrics are per worker. With more than
+# one worker, set THERMAL_JOB_STORE=sqlite and THERMAL_SWEEP_STORE=sqlite so any worker can
+# answer /jobs/<id> and /sweep/parallel/<id>, and THERMAL_CACHE_BACKEND=sqlite to share
+# cached results.
+#
+# Another WSGI server can use the factory directly, e.g.
+#     gunicorn --preload --workers 4 --bind :8000 "app.server:preloaded_app()"
+
+DEFAULT_WORKERS = 2
+DEFAULT_THREADS = 4 # Request threads per worker
+LISTEN_BACKLOG = 128
+
+# Every calculator route once, with small inputs; a failure stops the server from starting
+WARMUP_FIN = {"P": 0.04, "Ac": 1e-4, "L": 0.05, "k": 200.0, "h_conv": 25.0, "T_base": 373.15, "T_inf": 298.15}
+WARMUP_HX = {"m_dot_hot": 0.5, "Cp_hot": 4180.0, "T_in_hot": 363.15, "m_dot_cold": 0.8, "Cp_cold": 4180.0,
+             "T_in_cold": 288.15, "UA": 2500.0}
+WARMUP_WALL = {"layers": [{"thickness": 0.012, "k_value": 0.17, "area": 10.0},
+                          {"thickness": 0.1, "k_value": 0.04, "area": 10.0}], "T_inner": 293.15, "T_outer": 263.15}
+WARMUP_FIN_MODELS = {
+    "rectangular_adiabatic": {"P": 0.04, "Ac": 1e-4, "L": 0.05},
+    "rectangular_convective_tip": {"P": 0.04, "Ac": 1e-4, "L": 0.05},
+    "infinite": {"P": 0.04, "Ac": 1e-4},
+    "pin": {"D": 0.005, "L": 0.05},
+    "annular": {"r_inner": 0.01, "r_outer": 0.03, "thickness": 0.001},
+    "triangular": {"L": 0.05, "thickness": 0.002, "width": 1.0},
+}
+
+
+def _warmup_requests():
+    from app.exchanger_configurations import EXCHANGER_CONFIGURATIONS
+    common = {name: WARMUP_FIN[name] for name in ['k', 'h_conv', 'T_base', 'T_inf']}
+    requests = [
+        ("/calculate_fin", dict(WARMUP_FIN, n_points=100)),
+        ("/calculate_fin", dict(WARMUP_FIN, max_error=0.01)),
+        ("/calculate_fin/batch", {name: [value] * 4 for name, value in WARMUP_FIN.items()}),
+        ("/calculate_heat_exchanger/batch", dict(WARMUP_HX, flow_type="counterflow")),
+        ("/calculate_heat_exchanger/ntu", {"flow_type": "crossflow_unmixed", "effectiveness": [0.5], "Cr": [0.5]}),
+        ("/calculate_heat_exchanger/properties", {"m_dot_hot": 0.5, "T_in_hot": 420.0, "hot_fluid": "engine_oil",
+                                                  "m_dot_cold": 0.8, "T_in_cold": 290.0, "cold_fluid": "water",
+                                                  "UA": 2500.0, "flow_type": "counterflow"}),
+        ("/calculate_composite_wall", WARMUP_WALL),
+        ("/calculate_composite_wall/batch", {"thickness": [0.012, 0.1], "k_value": [0.17, 0.04], "area": 10.0,
+                                             "offsets": [0, 2], "T_inner": 293.15, "T_outer": 263.15}),
+        ("/calculate_composite_wall/properties", {"layers": [{"thickness": 0.1, "area": 1.0, "material": "mineral_wool"}],
+                                                  "T_inner": 500.0, "T_outer": 300.0}),
+        ("/calculate_fin_transient", dict(WARMUP_FIN, rho=2700.0, cp=900.0, t_end=10.0, dt=1.0, n_cells=20)),
+        ("/calculate_wall_transient", {"layers": [dict(layer, rho=1000.0, cp=1000.0) for layer in WARMUP_WALL["layers"]],
+                                       "T_inner": 293.15, "T_outer": 263.15, "t_end": 10.0, "dt": 1.0, "n_cells": 20}),
+        ("/calculate_conduction_2d", dict(common, geometry="plate_fin", L=0.05, thickness=0.002, nx=20, ny=4)),
+        ("/calculate_resistance_network", {
+            "nodes": [{"name": "in", "T": 293.15}, {"name": "a", "Q": 1.0}, {"name": "out", "T": 263.15}],
+            "resistances": [{"from": "in", "to": "a", "type": "convection", "h": 8.0, "area": 1.0},
+                            {"from": "a", "to": "out", "type": "contact", "R_contact": 0.5, "area": 1.0}],
+        }),
+        ("/uncertainty", {"calculator": "fin", "base": WARMUP_FIN, "samples": 1000, "sampling": "sobol",
+                          "distributions": {"h_conv": {"type": "normal", "mean": 25.0, "std": 2.0}}}),
+        ("/sensitivity", {"calculator": "heat_exchanger", "base": WARMUP_HX,
+                          "points": {"flow_type": list(EXCHANGER_CONFIGURATIONS)}}),
+        ("/export_pdf", {"calculator_name": "Warm-up", "inputs": [["a", 1.0]], "outputs": [["b", 2.0]]}),
+        ("/export_report", {"calculator_name": "Warm-up", "table": {"columns": ["x", "y"], "rows": [[1.0, 2.0]]},
+                            "plots": [{"x": [0.0, 1.0], "y": [1.0, 0.0]}]}),
+    ]
+    requests += [("/calculate_heat_exchanger", dict(WARMUP_HX, flow_type=name)) for name in EXCHANGER_CONFIGURATIONS]
+    requests += [("/calculate_fin_model", dict(common, model=name, **params))
+                 for name, params in WARMUP_FIN_MODELS.items()]
+    return requests
+
+
+def memory_usage():
+    """
+    Memory of this process in bytes: rss, and on Linux pss (proportional set size: shared
+    pages divided among the processes sharing them), shared and private.
+    """
+    usage = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = {line.split(":")[0]: int(line.split()[1]) * 1024 for line in f if line.endswith("kB\n")}
+        usage = {
+            "rss_bytes": fields["Rss"],
+            "pss_bytes": fields["Pss"],
+            "shared_bytes": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+            "private_bytes": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+        }
+    except (OSError, KeyError, ValueError):
+        import resource
+        usage = {"rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024} # Peak RSS
+    return usage
+
+
+def preload():
+    """
+    Imports the application, builds the lookup tables and runs the warm-up requests.
+
+    Returns:
+        dict: import_seconds, tables_seconds and warmup_seconds.
+
+    Raises:
+        RuntimeError: If a warm-up request fails.
+    """
+    start = time.perf_counter()
+    from app import create_app
+    import app.app # noqa: F401 (imports every calculator module, NumPy, SciPy and fpdf)
+    imported = time.perf_counter()
+
+    from app.fin_models import get_fin_tables
+    from app.exchanger_configurations import get_exchanger_tables
+    from app.properties import get_property_database
+    get_fin_tables()
+    get_exchanger_tables()
+    get_property_database()
+    tables = time.perf_counter()
+
+    # A throwaway application without cache, metrics or persistent jobs runs each route once
+    warmup_app = create_app({"THERMAL_CACHE_BACKEND": "none", "THERMAL_METRICS": "0", "THERMAL_JOB_STORE": "memory",
+                             "THERMAL_JOB_PROCESSES": "0"})
+    with warmup_app.test_client() as client:
+        for path, body in _warmup_requests():
+            response = client.post(path, json=body)
+            if response.status_code != 200:
+                raise RuntimeError(f"Warm-up request to {path} failed ({response.status_code}): "
+                                   f"{response.get_data(as_text=True)[:200]}")
+    warmed = time.perf_counter()
+    return {"import_seconds": imported - start, "tables_seconds": tables - imported,
+            "warmup_seconds": warmed - tables}
+
+
+def preloaded_app(config=None):
+    """Preloads and returns a ready application, for WSGI servers that fork after loading it."""
+    from app import create_app
+    preload_report = preload()
+    app = create_app(config)
+    app.extensions["thermal"]["startup"] = {"preload": preload_report}
+    return app
+
+
+def _serve_worker(listener, threads, preload_report, report_fd, started):
+    """Runs in a forked worker: creates the application, reports, then serves until SIGTERM."""
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # The master handles Ctrl-C and sends SIGTERM
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    app = create_app(ready=False)
+    with app.test_client() as client:
+        client.get("/healthz")
+    startup = {"preload": preload_report, "worker_start_seconds": time.perf_counter() - started,
+               "memory": memory_usage()}
+    app.extensions["thermal"].update(ready=True, startup=startup)
+    os.write(report_fd, (json.dumps({"pid": os.getpid(), **startup}) + "\n").encode())
+    os.close(report_fd)
+
+    host, port = listener.getsockname()[:2]
+    server = make_server(host, port, app, threaded=threads > 1, fd=listener.fileno())
+    server.serve_forever()
+
+
+class _Stopping(Exception):
+    pass
+
+
+class PreforkServer:
+    """
+    Master process of the prefork mode.
+
+    Args:
+        host, port: Address to listen on.
+        workers (int): Worker processes.
+        threads (int): Request threads per worker (1 = one request at a time).
+        preload_app (bool): Preload and warm up before forking (see preload).
+        log (callable): Receives status lines.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8000, workers=DEFAULT_WORKERS, threads=DEFAULT_THREADS,
+                 preload_app=True, log=None):
+        self.host, self.port = host, port
+        self.workers = workers
+        self.threads = threads
+        self.preload_app = preload_app
+        self.log = log or (lambda line: print(line, file=sys.stderr, flush=True))
+        self.children = {} # pid -> worker slot
+        self.reports = []
+        self.preload_report = {}
+        self._stopping = False
+
+    def _spawn(self, slot):
+        started = time.perf_counter()
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0: # Worker
+            os.close(read_fd)
+            code = 0
+            try:
+                _serve_worker(self.listener, self.threads, self.preload_report, write_fd, started)
+            except SystemExit as e:
+                code = e.code or 0
+            except BaseException as e: # Report and exit without running the master's cleanup
+                print(f"worker {os.getpid()} failed: {e!r}", file=sys.stderr, flush=True)
+                code = 1
+            os._exit(code)
+        os.close(write_fd)
+        self.children[pid] = slot
+        return pid, read_fd
+
+    def _read_report(self, read_fd):
+        data = b""
+        while not data.endswith(b"\n"):
+            chunk = os.read(read_fd, 65536)
+            if not chunk:
+                break
+            data += chunk
+        os.close(read_fd)
+        return json.loads(data) if data else None
+
+    def _stop(self, signum, frame):
+        self._stopping = True
+        raise _Stopping() # Interrupts os.waitpid, which is otherwise retried after the handler
+
+    def start(self):
+        """Preloads, binds and forks the workers; returns the startup report (one entry per worker)."""
+        master_start = time.perf_counter()
+        if self.preload_app:
+            self.preload_report = preload()
+            self.log(f"preloaded in {sum(self.preload_report.values()):.2f} s "
+                     f"(imports {self.preload_report['import_seconds']:.2f} s, "
+                     f"tables {self.preload_report['tables_seconds']:.2f} s, "
+                     f"warm-up {self.preload_report['warmup_seconds']:.2f} s)")
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((self.host, self.port))
+        self.listener.listen(LISTEN_BACKLOG)
+        self.port = self.listener.getsockname()[1]
+
+        pending = [self._spawn(slot) for slot in range(self.workers)]
+        self.reports = [report for report in (self._read_report(fd) for _, fd in pending) if report]
+        for report in self.reports:
+            memory = report["memory"]
+            self.log(f"worker {report['pid']} ready in {report['worker_start_seconds']:.3f} s, "
+                     f"rss {memory['rss_bytes'] / 2**20:.1f} MiB"
+                     + (f", pss {memory['pss_bytes'] / 2**20:.1f} MiB, private {memory['private_bytes'] / 2**20:.1f} MiB"
+                        if "pss_bytes" in memory else ""))
+        self.log(f"serving on http://{self.host}:{self.port} with {len(self.reports)} worker(s), "
+                 f"ready {time.perf_counter() - master_start:.2f} s after start")
+        return {"preload": self.preload_report, "workers": self.reports}
+
+    def run(self):
+        """Supervises the workers until SIGTERM / SIGINT, restarting any that exit."""
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        while not self._stopping:
+            try:
+                pid, status = os.waitpid(-1, 0)
+            except (_Stopping, ChildProcessError):
+                break
+            slot = self.children.pop(pid, None)
+            if slot is not None and not self._stopping:
+                self.log(f"worker {pid} exited with status {status}; restarting")
+                self._read_report(self._spawn(slot)[1])
+        self.shutdown()
+
+    def shutdown(self):
+        """Stops the workers (SIGTERM) and waits for them."""
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in list(self.children):
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+            self.children.pop(pid, None)
+        self.listener.close()
+
+
+def main(argv=None):
+    """Command line entry point: python -m app.server [--workers N] [--port PORT]."""
+    parser = argparse.ArgumentParser(prog="python -m app.server",
+                                     description="Serve the calculators with pre-forked, warmed-up workers.")
+    parser.add_argument("--host", default=os.environ.get("THERMAL_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("THERMAL_PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("THERMAL_WORKERS", DEFAULT_WORKERS)))
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("THERMAL_THREADS", DEFAULT_THREADS)),
+                        help="Request threads per worker.")
+    parser.add_argument("--no-preload", action="store_true",
+                        help="Skip imports, tables and warm-up in the master (each worker loads lazily).")
+    parser.add_argument("--report", default=None, help="Write the startup report (JSON) to this file.")
+    args = parser.parse_args(argv)
+    if args.workers < 1 or args.threads < 1:
+        parser.error("--workers and --threads must be at least 1")
+    if not hasattr(os, "fork"):
+        parser.error("the prefork server needs os.fork (Linux / macOS)")
+
+    if args.workers > 1 and os.environ.get("THERMAL_JOB_STORE", "memory") == "memory":
+        print("warning: jobs are kept per worker; set THERMAL_JOB_STORE=sqlite to share them", file=sys.stderr)
+    if args.workers > 1 and os.environ.get("THERMAL_SWEEP_STORE", "memory") == "memory":
+        print("warning: parallel sweeps are kept per worker; set THERMAL_SWEEP_STORE=sqlite to share them",
+              file=sys.stderr)
+    server = PreforkServer(args.host, args.port, args.workers, args.threads, preload_app=not args.no_preload)
+    report = server.start()
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    server.run()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
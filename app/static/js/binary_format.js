@@ -0,0 +1,24 @@
+// Decoder for the application/octet-stream responses of the calculator routes
+// (see app/response_formats.py): "TSCB" magic, uint32 header length, JSON header, then
+// 8-aligned little-endian array buffers that are wrapped as typed arrays without copying.
+const THERMAL_BINARY_ACCEPT = 'application/octet-stream';
+
+function decodeThermalBinary(buffer) {
+    const view = new DataView(buffer);
+    const magic = String.fromCharCode(view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3));
+    if (magic !== 'TSCB') {
+        throw new Error('Unexpected binary response format.');
+    }
+    const headerLength = view.getUint32(4, true);
+    const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)));
+    const dataStart = 8 + headerLength;
+    const typedArrays = { float64: Float64Array, float32: Float32Array, int32: Int32Array };
+
+    const arrays = {};
+    header.arrays.forEach(entry => {
+        const ArrayType = typedArrays[entry.dtype];
+        const length = entry.shape.reduce((a, b) => a * b, 1);
+        arrays[entry.name] = { data: new ArrayType(buffer, dataStart + entry.offset, length), shape: entry.shape };
+    });
+    return { arrays, metadata: header.metadata };
+}
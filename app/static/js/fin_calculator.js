@@ -8,6 +8,7 @@ document.addEventListener('DOMContentLoaded', function () {
     let tempDistChart = null;
     let currentInputs = {}; // To store inputs for PDF export
     let currentOutputs = {}; // To store outputs for PDF export
+    const PROFILE_MAX_ERROR = 0.01; // K
 
     finForm.addEventListener('submit', async function (event) {
         event.preventDefault();
@@ -55,18 +56,32 @@ document.addEventListener('DOMContentLoaded', function () {
             return;
         }
 
-        const payload = currentInputs; // Use the stored inputs for the fetch payload
+        // Adaptive profile: points are placed where the curve bends, linear interpolation
+        // between them (as drawn by the chart) stays within PROFILE_MAX_ERROR kelvin
+        const payload = { ...currentInputs, max_error: PROFILE_MAX_ERROR };
 
         try {
+            // Profiles come back as raw float64 buffers (typed arrays); errors are still JSON
             const response = await fetch('/calculate_fin', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
+                    'Accept': `${THERMAL_BINARY_ACCEPT}, application/json;q=0.9`,
                 },
                 body: JSON.stringify(payload),
             });
 
-            const data = await response.json();
+            let data;
+            if (response.headers.get('Content-Type') === THERMAL_BINARY_ACCEPT) {
+                const decoded = decodeThermalBinary(await response.arrayBuffer());
+                data = {
+                    ...decoded.metadata,
+                    x_coords: decoded.arrays.x_coords.data,
+                    temp_dist: decoded.arrays.temp_dist.data
+                };
+            } else {
+                data = await response.json();
+            }
 
             if (response.ok) {
                 heatTransferRateEl.textContent = data.heat_transfer_rate.toFixed(4);
@@ -87,12 +102,13 @@ document.addEventListener('DOMContentLoaded', function () {
                 tempDistChart = new Chart(ctx, {
                     type: 'line',
                     data: {
-                        labels: data.x_coords.map(x => x.toFixed(3)),
+                        // Points are unevenly spaced, so they are placed on a linear x axis
                         datasets: [{
                             label: 'Temperature Distribution',
-                            data: data.temp_dist.map(t => t.toFixed(2)),
+                            data: Array.from(data.x_coords, (x, i) => ({ x: x, y: data.temp_dist[i] })),
                             borderColor: 'rgb(75, 192, 192)',
-                            tension: 0.1,
+                            pointRadius: 0,
+                            tension: 0,
                             fill: false
                         }]
                     },
@@ -100,6 +116,7 @@ document.addEventListener('DOMContentLoaded', function () {
                         responsive: true,
                         scales: {
                             x: {
+                                type: 'linear',
                                 title: {
                                     display: true,
                                     text: 'Distance along fin (m)'
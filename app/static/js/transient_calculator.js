@@ -0,0 +1,190 @@
+document.addEventListener('DOMContentLoaded', function () {
+    const transientForm = document.getElementById('transientForm');
+    const modelSelect = document.getElementById('model');
+    const finInputs = document.getElementById('finInputs');
+    const wallInputs = document.getElementById('wallInputs');
+    const layersContainer = document.getElementById('layers-container');
+    const addLayerBtn = document.getElementById('addLayerBtn');
+    const layerTemplate = document.getElementById('layerTemplate');
+
+    const finalHeatRateEl = document.getElementById('finalHeatRate');
+    const steadyValueEl = document.getElementById('steadyValue');
+    const errorMessagesEl = document.getElementById('errorMessages');
+    const profileCtx = document.getElementById('profileChart').getContext('2d');
+    const heatRateCtx = document.getElementById('heatRateChart').getContext('2d');
+    let profileChart = null;
+    let heatRateChart = null;
+
+    const finParams = ['P', 'Ac', 'L', 'k', 'rho', 'cp', 'h_conv', 'T_base', 'T_inf'];
+    const layerParams = ['thickness', 'k_value', 'area', 'rho', 'cp'];
+
+    function addLayer() {
+        const newLayer = layerTemplate.cloneNode(true);
+        newLayer.style.display = 'block';
+        newLayer.id = `layer-${layersContainer.children.length + 1}`;
+        newLayer.querySelector('.layer-number').textContent = layersContainer.children.length + 1;
+        newLayer.querySelector('.removeLayerBtn').addEventListener('click', function () {
+            layersContainer.removeChild(newLayer);
+            layersContainer.querySelectorAll('.layer-number').forEach((span, index) => {
+                span.textContent = index + 1;
+            });
+        });
+        layersContainer.appendChild(newLayer);
+    }
+
+    addLayerBtn.addEventListener('click', addLayer);
+    addLayer();
+
+    modelSelect.addEventListener('change', function () {
+        const isFin = modelSelect.value === 'fin';
+        finInputs.style.display = isFin ? 'block' : 'none';
+        wallInputs.style.display = isFin ? 'none' : 'block';
+    });
+
+    function clearResults() {
+        finalHeatRateEl.textContent = '---';
+        steadyValueEl.textContent = '---';
+        if (profileChart) {
+            profileChart.destroy();
+            profileChart = null;
+        }
+        if (heatRateChart) {
+            heatRateChart.destroy();
+            heatRateChart = null;
+        }
+    }
+
+    function buildPayload() {
+        const payload = {
+            t_end: parseFloat(document.getElementById('t_end').value),
+            dt: parseFloat(document.getElementById('dt').value),
+            n_cells: parseInt(document.getElementById('n_cells').value, 10),
+            n_snapshots: parseInt(document.getElementById('n_snapshots').value, 10),
+            scheme: document.getElementById('scheme').value
+        };
+        if (Object.values(payload).some(v => typeof v === 'number' && isNaN(v))) {
+            throw new Error('Time stepping fields must be valid numbers.');
+        }
+        const T_initial = parseFloat(document.getElementById('T_initial').value);
+        if (!isNaN(T_initial)) {
+            payload.T_initial = T_initial;
+        }
+
+        if (modelSelect.value === 'fin') {
+            finParams.forEach(name => {
+                payload[name] = parseFloat(document.getElementById(name).value);
+                if (isNaN(payload[name])) {
+                    throw new Error(`${name} must be a valid number.`);
+                }
+            });
+            return payload;
+        }
+
+        payload.T_inner = parseFloat(document.getElementById('T_inner').value);
+        payload.T_outer = parseFloat(document.getElementById('T_outer').value);
+        if (isNaN(payload.T_inner) || isNaN(payload.T_outer)) {
+            throw new Error('Inner and Outer Temperatures must be valid numbers.');
+        }
+        payload.layers = Array.from(layersContainer.children).map((layerDiv, i) => {
+            const layer = {};
+            layerParams.forEach(name => {
+                layer[name] = parseFloat(layerDiv.querySelector(`.layer-${name}`).value);
+                if (isNaN(layer[name])) {
+                    throw new Error(`Layer ${i + 1}: All fields must be valid numbers.`);
+                }
+            });
+            return layer;
+        });
+        if (payload.layers.length === 0) {
+            throw new Error('At least one layer must be added.');
+        }
+        return payload;
+    }
+
+    transientForm.addEventListener('submit', async function (event) {
+        event.preventDefault();
+        errorMessagesEl.textContent = '';
+        clearResults();
+
+        const isFin = modelSelect.value === 'fin';
+        let payload;
+        try {
+            payload = buildPayload();
+        } catch (error) {
+            errorMessagesEl.textContent = error.message;
+            return;
+        }
+
+        try {
+            const response = await fetch(isFin ? '/calculate_fin_transient' : '/calculate_wall_transient', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify(payload),
+            });
+
+            const data = await response.json();
+
+            if (!response.ok) {
+                errorMessagesEl.textContent = `Error: ${data.error || 'Simulation failed.'}`;
+                return;
+            }
+
+            const heatRate = isFin ? data.base_heat_rate : data.inner_heat_rate;
+            finalHeatRateEl.textContent = heatRate[heatRate.length - 1].toFixed(4);
+            if (isFin) {
+                steadyValueEl.textContent = `q_f = ${data.steady_heat_transfer_rate.toFixed(4)} W`;
+            } else {
+                steadyValueEl.textContent = data.steady_heat_flux !== null
+                    ? `q_flux = ${data.steady_heat_flux.toFixed(4)} W/m^2` : 'N/A';
+            }
+
+            // One line per snapshot; hue runs from blue (t = 0) to red (t_end)
+            profileChart = new Chart(profileCtx, {
+                type: 'line',
+                data: {
+                    labels: data.x_coords.map(x => x.toFixed(4)),
+                    datasets: data.temperatures.map((row, i) => ({
+                        label: `t = ${data.times[i].toPrecision(4)} s`,
+                        data: row,
+                        borderColor: `hsl(${240 - 240 * i / Math.max(1, data.times.length - 1)}, 70%, 50%)`,
+                        pointRadius: 0,
+                        fill: false
+                    }))
+                },
+                options: {
+                    responsive: true,
+                    scales: {
+                        x: { title: { display: true, text: isFin ? 'Distance along fin (m)' : 'Depth from inner surface (m)' } },
+                        y: { title: { display: true, text: 'Temperature (K)' } }
+                    }
+                }
+            });
+
+            heatRateChart = new Chart(heatRateCtx, {
+                type: 'line',
+                data: {
+                    labels: data.times.map(t => t.toPrecision(4)),
+                    datasets: [{
+                        label: isFin ? 'Heat rate into fin base (W)' : 'Heat rate at inner surface (W)',
+                        data: heatRate,
+                        borderColor: 'rgb(75, 192, 192)',
+                        tension: 0.1,
+                        fill: false
+                    }]
+                },
+                options: {
+                    responsive: true,
+                    scales: {
+                        x: { title: { display: true, text: 'Time (s)' } },
+                        y: { title: { display: true, text: 'Heat rate (W)' } }
+                    }
+                }
+            });
+        } catch (error) {
+            console.error('Fetch error:', error);
+            errorMessagesEl.textContent = 'An error occurred while fetching data. Please check the console.';
+        }
+    });
+});
@@ -0,0 +1,400 @@
+import json
+import sys
+import warnings
+import numpy as np
+from scipy.stats import qmc
+from app.fin_calculator import calculate_rectangular_fin_performance_batch, MAX_PROFILE_VALUES
+from app.heat_exchanger_calculator import calculate_heat_exchanger_performance_batch, HX_ERROR_MESSAGES
+from app.composite_wall_calculator import calculate_composite_wall_performance_batch, WALL_ERROR_MESSAGES
+from app.validation import (
+    FIN_PARAMS, HEAT_EXCHANGER_PARAMS, WALL_LAYER_PARAMS,
+    validate_fin_columns, validate_heat_exchanger_columns, validate_composite_wall_columns, validate_n_points
+)
+
+DEFAULT_CHUNK_SIZE = 10000
+MAX_CHUNK_SIZE = 100000
+SWEEP_DESIGNS = ["full_factorial", "latin_hypercube", "sobol"]
+# A Latin hypercube is stratified over all of its points, so it is drawn whole when the
+# request is parsed (samples x parameters unit floats, 80 MB at this cap); Sobol points
+# are generated per chunk from the seed and their offset, so only the chunk exists at once.
+MAX_LATIN_HYPERCUBE_VALUES = 10000000
+MAX_SAMPLES = 100000000
+
+
+def _evaluate_fin(base, swept, gradients=False):
+    """Validates and evaluates one chunk of fin design points (with gradients, also their
+    partial derivatives under outputs["gradients"], keyed by output and parameter name)."""
+    data = dict(base)
+    data.update(swept)
+    columns, row_errors, error = validate_fin_columns(data)
+    if error:
+        return None, [], error
+    include_profiles = bool(base.get('include_profiles', False))
+    n_points_error = validate_n_points(base.get('n_points', 100), len(columns['L']),
+                                       MAX_PROFILE_VALUES if include_profiles else None)
+    if n_points_error:
+        return None, [], n_points_error
+    results = calculate_rectangular_fin_performance_batch(
+        n_points=base.get('n_points', 100), include_profiles=include_profiles,
+        gradients=gradients, **columns
+    )
+    outputs = {
+        "heat_transfer_rate": results["heat_transfer_rate"],
+        "fin_efficiency": results["fin_efficiency"],
+    }
+    if results["temp_dist"] is not None:
+        outputs["temp_dist"] = results["temp_dist"]
+    if gradients:
+        outputs["gradients"] = results["gradients"]
+    return outputs, row_errors, None
+
+
+def _evaluate_heat_exchanger(base, swept, gradients=False):
+    """Validates and evaluates one chunk of heat exchanger operating points."""
+    data = dict(base)
+    data.update(swept)
+    if isinstance(data.get('flow_type'), np.ndarray):
+        data['flow_type'] = data['flow_type'].tolist()
+    columns, row_errors, error = validate_heat_exchanger_columns(data)
+    if error:
+        return None, [], error
+    results = calculate_heat_exchanger_performance_batch(gradients=gradients, **columns)
+    outputs = {name: results[name] for name in ["NTU", "effectiveness", "q_actual", "T_out_hot", "T_out_cold", "error_code"]}
+    if gradients:
+        outputs["gradients"] = results["gradients"]
+    return outputs, row_errors, None
+
+
+def _evaluate_composite_wall(base, swept, gradients=False):
+    """
+    Validates and evaluates one chunk of wall variants. Layer properties are swept
+    with names like 'layers.0.thickness'; every variant has the base layer count, and
+    gradients with respect to layer properties use the same names.
+    """
+    layers = base.get('layers')
+    if not isinstance(layers, list) or not layers or not all(isinstance(layer, dict) for layer in layers):
+        return None, [], "Parameter 'layers' must be a non-empty list of dictionaries."
+    n_rows = len(next(iter(swept.values())))
+    n_layers = len(layers)
+
+    data = {}
+    for name in WALL_LAYER_PARAMS:
+        layer_columns = []
+        for j, layer in enumerate(layers):
+            value = swept.get(f"layers.{j}.{name}", layer.get(name))
+            if isinstance(value, bool) or not isinstance(value, (int, float, np.ndarray)):
+                return None, [], f"Layer {j+1}: 'thickness', 'k_value', and 'area' must be numbers."
+            layer_columns.append(np.broadcast_to(np.asarray(value, dtype=float), (n_rows,)))
+        # Row-major (wall, layer) layout, i.e. the CSR layout with n_layers layers per wall
+        data[name] = np.stack(layer_columns, axis=1).ravel()
+    data['offsets'] = np.arange(n_rows + 1, dtype=np.int64) * n_layers
+    for name in ['T_inner', 'T_outer']:
+        data[name] = swept.get(name, base.get(name))
+
+    columns, row_errors, error = validate_composite_wall_columns(data)
+    if error:
+        return None, [], error
+    results = calculate_composite_wall_performance_batch(gradients=gradients, **columns)
+    outputs = {
+        "total_resistance": results["total_resistance"],
+        "heat_flux": results["heat_flux"],
+        "error_code": results["error_code"],
+    }
+    if gradients:
+        outputs["gradients"] = {}
+        for output, partials in results["gradients"].items():
+            named = {name: partials[name] for name in ['T_inner', 'T_outer']}
+            for name in WALL_LAYER_PARAMS:
+                per_layer = partials[name].reshape(n_rows, n_layers)
+                named.update({f"layers.{j}.{name}": per_layer[:, j] for j in range(n_layers)})
+            outputs["gradients"][output] = named
+    return outputs, row_errors, None
+
+
+def _composite_wall_parameters(base):
+    layers = base.get('layers') if isinstance(base.get('layers'), list) else []
+    return ['T_inner', 'T_outer'] + [f"layers.{j}.{name}" for j in range(len(layers)) for name in WALL_LAYER_PARAMS]
+
+
+# Sweepable calculators: parameter names (given the base inputs), a chunk evaluator, the
+# scalar outputs it returns per row and the messages for its 'error_code' output, if any
+SWEEP_CALCULATORS = {
+    "fin": {
+        "parameters": lambda base: list(FIN_PARAMS),
+        "evaluate": _evaluate_fin,
+        "outputs": ["heat_transfer_rate", "fin_efficiency"],
+        "error_messages": None,
+    },
+    "heat_exchanger": {
+        "parameters": lambda base: HEAT_EXCHANGER_PARAMS + ['flow_type'],
+        "evaluate": _evaluate_heat_exchanger,
+        "outputs": ["NTU", "effectiveness", "q_actual", "T_out_hot", "T_out_cold", "error_code"],
+        "error_messages": HX_ERROR_MESSAGES,
+    },
+    "composite_wall": {
+        "parameters": _composite_wall_parameters,
+        "evaluate": _evaluate_composite_wall,
+        "outputs": ["total_resistance", "heat_flux", "error_code"],
+        "error_messages": WALL_ERROR_MESSAGES,
+    },
+}
+
+
+def build_axis(name, spec):
+    """
+    Builds the values of one swept parameter.
+
+    Args:
+        name (str): Parameter name (used in error messages).
+        spec (list or dict): Either an explicit list of values, or a dict with
+            - {"type": "values", "values": [...]}
+            - {"type": "linspace", "start": a, "stop": b, "num": n}
+            - {"type": "logspace", "start": a, "stop": b, "num": n}, log-spaced between the
+              values a and b (both positive), i.e. np.geomspace.
+
+    Returns:
+        tuple: (axis, error). axis is a dict with 'type', 'values' and, for ranges,
+               'start'/'stop' (used by Latin hypercube sampling).
+    """
+    if isinstance(spec, list):
+        spec = {"type": "values", "values": spec}
+    if not isinstance(spec, dict):
+        return None, f"Sweep of '{name}' must be a list of values or a range specification."
+
+    axis_type = spec.get('type', 'values')
+    if axis_type == 'values':
+        values = spec.get('values')
+        if not isinstance(values, list) or not values:
+            return None, f"Sweep of '{name}' must list at least one value."
+        if all(isinstance(v, str) for v in values):
+            return {"type": "values", "values": np.array(values)}, None
+        if not all(isinstance(v, (int, float)) for v in values):
+            return None, f"Sweep values of '{name}' must all be numbers or all be strings."
+        return {"type": "values", "values": np.array(values, dtype=float)}, None
+
+    if axis_type in ['linspace', 'logspace']:
+        start, stop, num = spec.get('start'), spec.get('stop'), spec.get('num')
+        if not all(isinstance(v, (int, float)) for v in [start, stop]):
+            return None, f"Sweep of '{name}': 'start' and 'stop' must be numbers."
+        if not isinstance(num, int) or num <= 0:
+            return None, f"Sweep of '{name}': 'num' must be a positive integer."
+        if axis_type == 'logspace':
+            if start <= 0 or stop <= 0:
+                return None, f"Sweep of '{name}': logspace 'start' and 'stop' must be positive."
+            values = np.geomspace(start, stop, num)
+        else:
+            values = np.linspace(start, stop, num)
+        return {"type": axis_type, "values": values, "start": float(start), "stop": float(stop)}, None
+
+    return None, f"Sweep of '{name}': unknown type '{axis_type}'. Use 'values', 'linspace' or 'logspace'."
+
+
+def parse_sweep_request(data):
+    """
+    Parses and checks a sweep request.
+
+    Args:
+        data (dict): JSON body with
+            - calculator (str): "fin", "heat_exchanger" or "composite_wall".
+            - base (dict): Inputs of the single-point route; swept parameters override them.
+            - parameters (dict): Parameter name -> axis specification (see build_axis).
+            - design (str, optional): "full_factorial" (default), "latin_hypercube" or "sobol"
+              (scrambled Sobol sequence).
+            - samples (int): Number of points for "latin_hypercube" and "sobol", at most
+              MAX_SAMPLES, and at most MAX_LATIN_HYPERCUBE_VALUES / number of parameters
+              for "latin_hypercube". A full factorial design has the product of the axis
+              lengths as its number of points, also at most MAX_SAMPLES.
+            - seed (int, optional): Non-negative random seed for "latin_hypercube" and "sobol".
+            - chunk_size (int, optional): Points evaluated (and streamed) per chunk.
+
+    Returns:
+        tuple: (plan, error). plan is a dict consumed by iter_sweep_chunks.
+    """
+    calculator = data.get('calculator')
+    if calculator not in SWEEP_CALCULATORS:
+        return None, f"Parameter 'calculator' must be one of: {', '.join(SWEEP_CALCULATORS)}."
+    base = data.get('base', {})
+    if not isinstance(base, dict):
+        return None, "Parameter 'base' must be a dictionary."
+    parameters = data.get('parameters')
+    if not isinstance(parameters, dict) or not parameters:
+        return None, "Parameter 'parameters' must be a non-empty dictionary."
+
+    known = SWEEP_CALCULATORS[calculator]["parameters"](base)
+    unknown = [name for name in parameters if name not in known]
+    if unknown:
+        return None, f"Unknown sweep parameters for '{calculator}': {', '.join(unknown)}"
+
+    axes = {}
+    for name, spec in parameters.items():
+        axis, error = build_axis(name, spec)
+        if error:
+            return None, error
+        axes[name] = axis
+
+    design = data.get('design', 'full_factorial')
+    if design not in SWEEP_DESIGNS:
+        return None, f"Parameter 'design' must be one of: {', '.join(SWEEP_DESIGNS)}."
+    if design != 'full_factorial':
+        max_samples = MAX_SAMPLES if design == 'sobol' else MAX_LATIN_HYPERCUBE_VALUES // len(axes)
+        n_points = data.get('samples')
+        if not isinstance(n_points, int) or isinstance(n_points, bool) or not 0 < n_points <= max_samples:
+            return None, f"Parameter 'samples' must be an integer between 1 and {max_samples} for a {design} design."
+        seed = data.get('seed')
+        if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool) or seed < 0):
+            return None, "Parameter 'seed' must be a non-negative integer."
+    else:
+        n_points = int(np.prod([len(axis["values"]) for axis in axes.values()], dtype=object))
+        if n_points > MAX_SAMPLES: # Points are decoded from an int64 flat index
+            return None, f"A full factorial sweep can have at most {MAX_SAMPLES} points; this one has {n_points}."
+
+    chunk_size = data.get('chunk_size', DEFAULT_CHUNK_SIZE)
+    if not isinstance(chunk_size, int) or not 0 < chunk_size <= MAX_CHUNK_SIZE:
+        return None, f"Parameter 'chunk_size' must be an integer between 1 and {MAX_CHUNK_SIZE}."
+    if calculator == 'fin' and base.get('include_profiles'): # Profiles are (chunk rows, n_points) per chunk
+        error = validate_n_points(base.get('n_points', 100), min(chunk_size, n_points), MAX_PROFILE_VALUES)
+        if error:
+            return None, error
+
+    plan = {
+        "calculator": calculator, "base": base, "axes": axes, "design": design,
+        "n_points": n_points, "chunk_size": chunk_size, "unit_sample": None, "seed": None,
+    }
+    if design == 'latin_hypercube':
+        # One stratified sample per point and dimension (n_points x n_params unit floats)
+        plan["unit_sample"] = qmc.LatinHypercube(d=len(axes), seed=seed).random(n_points)
+    elif design == 'sobol':
+        # Every chunk (in any process) regenerates the same scrambling from a fixed seed
+        plan["seed"] = seed if seed is not None else np.random.SeedSequence().entropy
+
+    # Run the rules of the calculator on the first point so malformed inputs fail before streaming starts
+    _, _, error = SWEEP_CALCULATORS[calculator]["evaluate"](base, design_points(plan, 0, 1))
+    if error:
+        return None, error
+    return plan, None
+
+
+def _latin_hypercube_values(axis, u):
+    """Maps unit-interval samples (Latin hypercube or Sobol) onto an axis (uniform, log-uniform or a discrete choice)."""
+    if axis["type"] == "linspace":
+        return axis["start"] + u * (axis["stop"] - axis["start"])
+    if axis["type"] == "logspace":
+        return np.exp(np.log(axis["start"]) + u * (np.log(axis["stop"]) - np.log(axis["start"])))
+    values = axis["values"]
+    return values[np.minimum((u * len(values)).astype(np.int64), len(values) - 1)]
+
+
+def design_points(plan, offset, count):
+    """
+    Returns the swept input columns of design points offset to offset + count - 1.
+    Full-factorial points are decoded from their flat index and Sobol points are drawn
+    from their position in the sequence, so any window of those designs can be produced
+    without building the rest of it.
+    """
+    stop = min(offset + count, plan["n_points"])
+    if plan["design"] != "full_factorial":
+        if plan["design"] == "sobol":
+            sampler = qmc.Sobol(d=len(plan["axes"]), scramble=True, seed=plan["seed"])
+            if offset > 0: # fast_forward(0) is rejected
+                sampler.fast_forward(offset)
+            with warnings.catch_warnings(): # Chunks that are not powers of two are still valid points
+                warnings.simplefilter("ignore", UserWarning)
+                u = sampler.random(stop - offset)
+        else:
+            u = plan["unit_sample"][offset:stop]
+        return {name: _latin_hypercube_values(axis, u[:, i]) for i, (name, axis) in enumerate(plan["axes"].items())}
+
+    shape = [len(axis["values"]) for axis in plan["axes"].values()]
+    index = np.unravel_index(np.arange(offset, stop, dtype=np.int64), shape) # Last parameter varies fastest
+    return {name: axis["values"][idx] for (name, axis), idx in zip(plan["axes"].items(), index)}
+
+
+def iter_design_points(plan):
+    """Yields (offset, columns) for consecutive chunks of design points."""
+    for offset in range(0, plan["n_points"], plan["chunk_size"]):
+        yield offset, design_points(plan, offset, plan["chunk_size"])
+
+
+def _to_json_column(values):
+    """Converts an output column to a JSON-safe list (NaN -> None)."""
+    if isinstance(values, list):
+        return values
+    column = np.asarray(values)
+    if column.dtype.kind == 'f':
+        column = column.astype(object)
+        column[np.isnan(np.asarray(values, dtype=float))] = None
+    return column.tolist()
+
+
+def iter_sweep_chunks(plan):
+    """
+    Evaluates a parsed sweep plan chunk by chunk.
+
+    Yields:
+        dict: offset, count, the swept input columns, the calculator outputs (invalid rows
+              set to None) and the per-row validation errors of the chunk.
+    """
+    calculator = SWEEP_CALCULATORS[plan["calculator"]]
+    for offset, swept in iter_design_points(plan):
+        outputs, row_errors, error = calculator["evaluate"](plan["base"], swept)
+        count = len(next(iter(swept.values())))
+        if error: # Only possible if a swept value breaks a whole-chunk rule
+            row_errors = [{"row": i, "error": error} for i in range(count)]
+            outputs = {}
+        if "error_code" in outputs:
+            outputs["error"] = [calculator["error_messages"][code] for code in outputs.pop("error_code").tolist()]
+        invalid = [e["row"] for e in row_errors]
+        chunk_outputs = {}
+        for name, values in outputs.items():
+            column = _to_json_column(values)
+            for i in invalid:
+                column[i] = None
+            chunk_outputs[name] = column
+        yield {
+            "offset": offset,
+            "count": count,
+            "inputs": {name: _to_json_column(values) for name, values in swept.items()},
+            "outputs": chunk_outputs,
+            "row_errors": [{"row": offset + e["row"], "error": e["error"]} for e in row_errors],
+        }
+
+
+def iter_sweep_ndjson(plan):
+    """
+    Streams a sweep as NDJSON: a header line, one line per evaluated chunk and a
+    summary line. Only one chunk is held in memory at a time.
+    """
+    yield json.dumps({
+        "calculator": plan["calculator"], "design": plan["design"],
+        "parameters": list(plan["axes"]), "total": plan["n_points"],
+    }) + "\n"
+    n_errors = 0
+    for chunk in iter_sweep_chunks(plan):
+        n_errors += len(chunk["row_errors"])
+        yield json.dumps(chunk) + "\n"
+    yield json.dumps({"done": True, "total": plan["n_points"], "failed_rows": n_errors}) + "\n"
+
+
+def sweep_table(plan):
+    """
+    Sweep results as a table for reports: one column per swept parameter and per output
+    ("error" instead of the error code).
+
+    Returns:
+        tuple: (columns, rows). rows is a generator of row lists, evaluated chunk by chunk.
+    """
+    outputs = ["error" if name == "error_code" else name for name in SWEEP_CALCULATORS[plan["calculator"]]["outputs"]]
+    columns = list(plan["axes"]) + outputs
+
+    def rows():
+        for chunk in iter_sweep_chunks(plan):
+            values = list(chunk["inputs"].values())
+            values += [chunk["outputs"].get(name, [None] * chunk["count"]) for name in outputs]
+            yield from zip(*values)
+    return columns, rows()
+
+
+if __name__ == '__main__':
+    # python -m app.sweep request.json: multi-process run of the same request body as POST /sweep
+    from app.sweep_executor import main
+    sys.exit(main())
@@ -0,0 +1,600 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import pickle
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, CancelledError
+from multiprocessing import shared_memory
+import numpy as np
+from app.sweep import SWEEP_CALCULATORS, design_points, parse_sweep_request
+
+# Runs large sweeps (see app/sweep.py) over a process pool. Every output column lives in
+# a shared-memory block that workers write into directly, so only (offset, count) pairs
+# travel between processes instead of pickled result arrays.
+#
+# The routes find running and finished sweeps by id in a registry. The memory registry only
+# knows the sweeps started by its own process. The SQLite registry shares them between the
+# worker processes of app.server: the process that started a sweep publishes its progress
+# to the database and, once it has completed, writes the result columns to .npy files
+# under a shared directory and releases the shared memory. Any worker can then report
+# progress, stream the results (memory-mapped) and cancel: a cancel request for a sweep
+# running elsewhere is recorded and acted on by its owner within SWEEP_POLL_SECONDS.
+
+MAX_RETAINED_SWEEPS = 8 # Finished sweeps kept for result download before the oldest is released
+MAX_PARALLEL_POINTS = 50000000
+SHARED_MEMORY_DIR = "/dev/shm"
+SHARED_MEMORY_FRACTION = 0.5 # Largest share of the free shared memory one sweep may allocate
+SWEEP_POLL_SECONDS = 0.5 # How often an owner checks for cancel requests from other workers
+
+_cancel_event = None # Set in each worker process by _init_worker
+
+
+def _init_worker(cancel_event):
+    global _cancel_event
+    _cancel_event = cancel_event
+
+
+def _attach(buffers):
+    """Maps shared-memory blocks described by {name: (shm_name, dtype, shape)} to arrays."""
+    handles, arrays = [], {}
+    for name, (shm_name, dtype, shape) in buffers.items():
+        # Pool workers share the parent's resource tracker, and the parent unlinks the block in close()
+        shm = shared_memory.SharedMemory(name=shm_name)
+        handles.append(shm)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    return handles, arrays
+
+
+def _run_chunk(plan, buffers, offset, count):
+    """
+    Worker task: evaluates design points offset to offset + count - 1 and writes the
+    outputs into the shared result buffers.
+
+    Returns:
+        tuple: (offset, count, failed_rows, skipped). skipped is True if the sweep was
+               cancelled before the chunk started.
+    """
+    if _cancel_event is not None and _cancel_event.is_set():
+        return offset, count, 0, True
+
+    handles, arrays = _attach(buffers)
+    try:
+        if "unit_sample" in arrays:
+            plan = dict(plan, unit_sample=arrays["unit_sample"])
+        calculator = SWEEP_CALCULATORS[plan["calculator"]]
+        swept = design_points(plan, offset, count)
+        count = len(next(iter(swept.values())))
+        stop = offset + count
+        outputs, row_errors, error = calculator["evaluate"](plan["base"], swept)
+
+        valid = arrays["valid"][offset:stop]
+        if error: # A swept value broke a whole-chunk rule
+            valid[:] = 0
+            for name in calculator["outputs"]:
+                arrays[name][offset:stop] = -1 if name == "error_code" else np.nan
+            return offset, count, count, False
+
+        valid[:] = 1
+        invalid = np.array([e["row"] for e in row_errors], dtype=np.int64)
+        valid[invalid] = 0
+        for name in calculator["outputs"]:
+            arrays[name][offset:stop] = outputs[name]
+            arrays[name][offset + invalid] = -1 if name == "error_code" else np.nan
+        return offset, count, len(invalid), False
+    finally:
+        arrays = None
+        for shm in handles:
+            shm.close()
+
+
+def result_buffer_bytes(plan):
+    """Shared memory allocated by ParallelSweep.start for a plan: the output columns, 'valid' and the unit sample."""
+    outputs = SWEEP_CALCULATORS[plan["calculator"]]["outputs"]
+    per_point = sum(1 if name == "error_code" else 8 for name in outputs) + 1
+    sample = plan["unit_sample"].nbytes if plan["unit_sample"] is not None else 0
+    return plan["n_points"] * per_point + sample
+
+
+def check_parallel_sweep(plan):
+    """
+    Checks that the result buffers of a plan fit: at most MAX_PARALLEL_POINTS points and
+    SHARED_MEMORY_FRACTION of the free shared memory (writes past it would kill the process
+    with SIGBUS rather than fail the allocation).
+
+    Returns:
+        str: Error message, or None.
+    """
+    if plan["n_points"] > MAX_PARALLEL_POINTS:
+        return f"A parallel sweep can have at most {MAX_PARALLEL_POINTS} points; this one has {plan['n_points']}."
+    if os.path.isdir(SHARED_MEMORY_DIR):
+        needed, free = result_buffer_bytes(plan), shutil.disk_usage(SHARED_MEMORY_DIR).free
+        if needed > SHARED_MEMORY_FRACTION * free:
+            return (f"The results of this sweep need {needed} bytes of shared memory; "
+                    f"only {int(SHARED_MEMORY_FRACTION * free)} can be used.")
+    return None
+
+
+class ParallelSweep:
+    """
+    A sweep plan (from parse_sweep_request) evaluated in chunks over a ProcessPoolExecutor.
+
+    Results are collected in shared memory: one float64 column per calculator output
+    (int8 for 'error_code', -1 on rows that failed validation) and an int8 'valid' column.
+    Progress can be polled from any thread and the sweep can be cancelled; chunks that
+    have not started yet are then skipped.
+    """
+
+    def __init__(self, plan, workers=None, chunk_size=None):
+        self.plan = plan
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size or plan["chunk_size"]
+        self.id = uuid.uuid4().hex
+        self.state = "pending"
+        self.error = None
+        self.completed_points = 0
+        self.failed_rows = 0
+        self.completed_chunks = 0
+        self.total_chunks = -(-plan["n_points"] // self.chunk_size)
+        self.started_at = None
+        self.finished_at = None
+        self._shm = {}
+        self._buffers = {}
+        self._futures = []
+        self._executor = None
+        self._cancel_event = None
+        self._monitor = None
+        self._lock = threading.Lock()
+        self.on_update = None # Called with the sweep after every chunk and once it has finished
+
+    def _allocate(self, name, dtype, shape):
+        size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        self._shm[name] = shm
+        self._buffers[name] = (shm.name, np.dtype(dtype).str, shape)
+        return np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+    def start(self):
+        """Allocates the result buffers and dispatches every chunk to the process pool."""
+        error = check_parallel_sweep(self.plan)
+        if error:
+            raise ValueError(error)
+        n_points = self.plan["n_points"]
+        for name in SWEEP_CALCULATORS[self.plan["calculator"]]["outputs"]:
+            self._allocate(name, np.int8 if name == "error_code" else np.float64, (n_points,))
+        self._allocate("valid", np.int8, (n_points,))[:] = 0
+        # Workers only fill scalar output columns, so fin profiles are never computed
+        worker_plan = dict(self.plan, unit_sample=None, base=dict(self.plan["base"], include_profiles=False))
+        if self.plan["unit_sample"] is not None:
+            self._allocate("unit_sample", np.float64, self.plan["unit_sample"].shape)[:] = self.plan["unit_sample"]
+
+        # forkserver avoids forking a multi-threaded web server process directly
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        self._cancel_event = context.Event()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=context,
+            initializer=_init_worker, initargs=(self._cancel_event,)
+        )
+        self.started_at = time.perf_counter()
+        self.state = "running"
+        self._futures = [
+            self._executor.submit(_run_chunk, worker_plan, self._buffers, offset, self.chunk_size)
+            for offset in range(0, n_points, self.chunk_size)
+        ]
+        for future in self._futures:
+            future.add_done_callback(self._chunk_done)
+        self._monitor = threading.Thread(target=self._wait_for_chunks, daemon=True)
+        self._monitor.start()
+        return self
+
+    def _chunk_done(self, future):
+        try:
+            offset, count, failed_rows, skipped = future.result()
+        except CancelledError:
+            return
+        except Exception as e:
+            with self._lock:
+                if self.state == "running":
+                    self.state = "failed"
+                    self.error = str(e)
+            self.cancel(_state=None)
+            return
+        if not skipped:
+            with self._lock:
+                self.completed_points += count
+                self.failed_rows += failed_rows
+                self.completed_chunks += 1
+            if self.on_update is not None:
+                self.on_update(self)
+
+    def _wait_for_chunks(self):
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            if self.state == "running":
+                self.state = "completed"
+            self.finished_at = time.perf_counter()
+        if self.on_update is not None:
+            self.on_update(self)
+
+    def cancel(self, _state="cancelled"):
+        """Stops dispatching chunks; chunks already running finish, the rest are skipped."""
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+        for future in self._futures:
+            future.cancel()
+        with self._lock:
+            if _state and self.state in ["pending", "running"]:
+                self.state = _state
+
+    def wait(self, timeout=None):
+        """Blocks until all chunks have finished or were skipped. Returns True if done."""
+        if self._monitor is not None:
+            self._monitor.join(timeout)
+            return not self._monitor.is_alive()
+        return True
+
+    @property
+    def done(self):
+        return self.state in ["completed", "cancelled", "failed"] and self.finished_at is not None
+
+    def progress(self):
+        """Returns a JSON-serializable progress report."""
+        with self._lock:
+            end = self.finished_at or time.perf_counter()
+            elapsed = end - self.started_at if self.started_at is not None else 0.0
+            return {
+                "id": self.id,
+                "state": self.state,
+                "calculator": self.plan["calculator"],
+                "total": self.plan["n_points"],
+                "completed": self.completed_points,
+                "failed_rows": self.failed_rows,
+                "chunks_completed": self.completed_chunks,
+                "chunks_total": self.total_chunks,
+                "workers": self.workers,
+                "elapsed_seconds": elapsed,
+                "points_per_second": self.completed_points / elapsed if elapsed > 0 else 0.0,
+                "error": self.error,
+            }
+
+    def results(self, copy=True):
+        """
+        Returns the output columns (and the 'valid' mask) as NumPy arrays. With copy=False
+        the arrays are views of the shared buffers and become invalid after close().
+        """
+        names = SWEEP_CALCULATORS[self.plan["calculator"]]["outputs"] + ["valid"]
+        arrays = {}
+        for name in names:
+            shm_name, dtype, shape = self._buffers[name]
+            view = np.ndarray(shape, dtype=dtype, buffer=self._shm[name].buf)
+            arrays[name] = view.copy() if copy else view
+        return arrays
+
+    def close(self):
+        """Cancels the sweep if it is still running and releases the shared memory."""
+        if not self.done:
+            self.cancel()
+            self.wait()
+        for shm in self._shm.values():
+            shm.close()
+            shm.unlink()
+        self._shm = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def iter_parallel_sweep_ndjson(sweep, chunk_size=None):
+    """Streams the results of a completed ParallelSweep in the NDJSON format of /sweep."""
+    plan = sweep.plan
+    calculator = SWEEP_CALCULATORS[plan["calculator"]]
+    chunk_size = chunk_size or plan["chunk_size"]
+    arrays = sweep.results(copy=False)
+    yield json.dumps({
+        "calculator": plan["calculator"], "design": plan["design"],
+        "parameters": list(plan["axes"]), "total": plan["n_points"],
+    }) + "\n"
+    for offset in range(0, plan["n_points"], chunk_size):
+        stop = min(offset + chunk_size, plan["n_points"])
+        valid = arrays["valid"][offset:stop].astype(bool)
+        outputs = {}
+        for name in calculator["outputs"]:
+            values = arrays[name][offset:stop]
+            if name == "error_code":
+                outputs["error"] = [calculator["error_messages"][code] if ok else None
+                                    for code, ok in zip(values.tolist(), valid)]
+                continue
+            column = values.astype(object)
+            column[np.isnan(values) | ~valid] = None
+            outputs[name] = column.tolist()
+        inputs = {name: values.tolist() for name, values in design_points(plan, offset, stop - offset).items()}
+        yield json.dumps({"offset": offset, "count": stop - offset, "inputs": inputs, "outputs": outputs,
+                          "invalid_rows": (offset + np.flatnonzero(~valid)).tolist()}) + "\n"
+    yield json.dumps({"done": True, "total": plan["n_points"], "failed_rows": sweep.failed_rows}) + "\n"
+
+
+class MemorySweepRegistry:
+    """Parallel sweeps started by this process, by id; finished ones beyond max_sweeps are released oldest first."""
+
+    def __init__(self, max_sweeps=MAX_RETAINED_SWEEPS):
+        self.max_sweeps = max_sweeps
+        self._sweeps = {}
+        self._lock = threading.Lock()
+
+    def start(self, plan, workers=None):
+        """Starts a ParallelSweep and registers it for progress/result lookups by id."""
+        sweep = ParallelSweep(plan, workers=workers).start()
+        with self._lock:
+            self._sweeps[sweep.id] = sweep
+            finished = [s for s in self._sweeps.values() if s.done]
+            # Release the oldest finished sweeps once too many are being kept around
+            for old in finished[:max(0, len(self._sweeps) - self.max_sweeps)]:
+                del self._sweeps[old.id]
+                old.close()
+        return sweep
+
+    def get(self, sweep_id):
+        with self._lock:
+            return self._sweeps.get(sweep_id)
+
+    def release(self, sweep_id):
+        """Cancels (if needed) and forgets a sweep. Returns False if the id is unknown."""
+        with self._lock:
+            sweep = self._sweeps.pop(sweep_id, None)
+        if sweep is None:
+            return False
+        sweep.close()
+        return True
+
+
+class StoredSweep:
+    """
+    A sweep as recorded in a SQLiteSweepRegistry. Offers the read side of ParallelSweep
+    (progress as last published, results once completed, plan).
+    """
+
+    def __init__(self, record, plan):
+        self.id = record["id"]
+        self.plan = plan
+        self.owner_pid = record["owner_pid"]
+        self.result_dir = record["result_dir"]
+        self._progress = json.loads(record["progress"])
+        if self._progress["state"] in ["pending", "running"] and not _process_alive(self.owner_pid):
+            self._progress.update(state="failed", error="The worker process running the sweep has exited.")
+        self.state = self._progress["state"]
+        self.failed_rows = self._progress["failed_rows"]
+
+    @property
+    def done(self):
+        return self.state in ["completed", "cancelled", "failed"]
+
+    def progress(self):
+        return dict(self._progress)
+
+    def results(self, copy=True):
+        """The output columns and 'valid' mask of a completed sweep, memory-mapped from its result files."""
+        names = SWEEP_CALCULATORS[self.plan["calculator"]]["outputs"] + ["valid"]
+        arrays = {name: np.load(os.path.join(self.result_dir, f"{name}.npy"), mmap_mode="r") for name in names}
+        return {name: np.array(values) for name, values in arrays.items()} if copy else arrays
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SQLiteSweepRegistry:
+    """
+    Parallel sweeps recorded in a local SQLite file with their results under result_dir,
+    so every worker process on the host can look them up (see the module comment).
+    """
+
+    _COLUMNS = ["id", "owner_pid", "created_at", "state", "progress", "plan", "result_dir", "cancel_requested"]
+
+    def __init__(self, path, result_dir, max_sweeps=MAX_RETAINED_SWEEPS):
+        self.path = path
+        self.result_dir = result_dir
+        self.max_sweeps = max_sweeps
+        self._sweeps = {} # Sweeps running in this process, for cancelling
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        os.makedirs(result_dir, exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS sweeps (id TEXT PRIMARY KEY, owner_pid INTEGER, created_at REAL, "
+                "state TEXT, progress TEXT, plan BLOB, result_dir TEXT, cancel_requested INTEGER)"
+            )
+
+    def _connect(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5.0)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    def start(self, plan, workers=None):
+        """Starts a ParallelSweep in this process and records it for every worker."""
+        self._expire()
+        sweep = ParallelSweep(plan, workers=workers)
+        progress = sweep.progress()
+        with self._connect() as db:
+            db.execute(f"INSERT INTO sweeps ({', '.join(self._COLUMNS)}) VALUES ({', '.join('?' * len(self._COLUMNS))})",
+                       [sweep.id, os.getpid(), time.time(), progress["state"], json.dumps(progress),
+                        pickle.dumps(plan, protocol=pickle.HIGHEST_PROTOCOL), None, 0])
+        with self._lock:
+            self._sweeps[sweep.id] = sweep
+        sweep.on_update = self._publish
+        self._publish(sweep.start())
+        threading.Thread(target=self._watch, args=(sweep,), daemon=True).start()
+        return sweep
+
+    def _publish(self, sweep):
+        """Records the progress of a sweep running here; a finished sweep moves to its result files."""
+        progress = sweep.progress()
+        if not sweep.done:
+            with self._connect() as db:
+                db.execute("UPDATE sweeps SET state = ?, progress = ? WHERE id = ? AND state IN ('pending', 'running')",
+                           (progress["state"], json.dumps(progress), sweep.id))
+            return
+        result_dir = None
+        if progress["state"] == "completed":
+            result_dir = os.path.join(self.result_dir, sweep.id)
+            os.makedirs(result_dir, exist_ok=True)
+            for name, values in sweep.results(copy=False).items():
+                np.save(os.path.join(result_dir, f"{name}.npy"), values)
+        with self._connect() as db:
+            recorded = db.execute("UPDATE sweeps SET state = ?, progress = ?, result_dir = ? WHERE id = ?",
+                                  (progress["state"], json.dumps(progress), result_dir, sweep.id)).rowcount
+        if not recorded and result_dir: # Released while the results were being written
+            shutil.rmtree(result_dir, ignore_errors=True)
+        with self._lock:
+            self._sweeps.pop(sweep.id, None)
+        sweep.close()
+
+    def _watch(self, sweep):
+        """Cancels a sweep running here once another worker has asked for it."""
+        while not sweep.wait(timeout=SWEEP_POLL_SECONDS):
+            row = self._connect().execute("SELECT cancel_requested FROM sweeps WHERE id = ?", (sweep.id,)).fetchone()
+            if row is None or row[0]:
+                sweep.cancel()
+
+    def _record(self, sweep_id):
+        row = self._connect().execute(f"SELECT {', '.join(self._COLUMNS)} FROM sweeps WHERE id = ?",
+                                      (sweep_id,)).fetchone()
+        return dict(zip(self._COLUMNS, row)) if row is not None else None
+
+    def get(self, sweep_id):
+        """
+        The recorded StoredSweep (or None), also for sweeps running in this process: their
+        shared memory is released as soon as they finish, so results are only read from files.
+        """
+        record = self._record(sweep_id)
+        return StoredSweep(record, pickle.loads(record["plan"])) if record is not None else None
+
+    def release(self, sweep_id):
+        """
+        Cancels (if needed) and forgets a sweep started by any worker. Returns False if the
+        id is unknown. A sweep running in another process is stopped by its owner, which
+        then finds the record gone and discards the sweep.
+        """
+        record = self._record(sweep_id)
+        if record is None:
+            return False
+        with self._connect() as db:
+            db.execute("DELETE FROM sweeps WHERE id = ?", (sweep_id,))
+        with self._lock:
+            sweep = self._sweeps.get(sweep_id)
+        if sweep is not None:
+            sweep.cancel()
+        if record["result_dir"]:
+            shutil.rmtree(record["result_dir"], ignore_errors=True)
+        return True
+
+    def _expire(self):
+        """Deletes the oldest finished sweeps beyond max_sweeps, with their result files."""
+        db = self._connect()
+        with db:
+            expired = db.execute(
+                "SELECT id, result_dir FROM sweeps WHERE state IN ('completed', 'cancelled', 'failed') "
+                "ORDER BY created_at LIMIT MAX(0, (SELECT COUNT(*) FROM sweeps) - ? + 1)", (self.max_sweeps,)
+            ).fetchall()
+            db.executemany("DELETE FROM sweeps WHERE id = ?", [(sweep_id,) for sweep_id, _ in expired])
+        for _, result_dir in expired:
+            if result_dir:
+                shutil.rmtree(result_dir, ignore_errors=True)
+
+
+def create_sweep_registry(config=None):
+    """
+    Creates the parallel sweep registry from configuration (e.g. os.environ):
+        THERMAL_SWEEP_STORE: "memory" (default) or "sqlite"
+        THERMAL_SWEEP_DB: SQLite file for the "sqlite" registry
+        THERMAL_SWEEP_DIR: Directory for the result files of the "sqlite" registry
+        THERMAL_SWEEP_MAX_SWEEPS: finished sweeps kept
+    """
+    config = os.environ if config is None else config
+    max_sweeps = int(config.get("THERMAL_SWEEP_MAX_SWEEPS", MAX_RETAINED_SWEEPS))
+    store_type = config.get("THERMAL_SWEEP_STORE", "memory")
+    if store_type == "sqlite":
+        return SQLiteSweepRegistry(config.get("THERMAL_SWEEP_DB", "thermal_sweeps.sqlite3"),
+                                   config.get("THERMAL_SWEEP_DIR", "thermal_sweeps"), max_sweeps=max_sweeps)
+    if store_type == "memory":
+        return MemorySweepRegistry(max_sweeps=max_sweeps)
+    raise ValueError(f"Unknown THERMAL_SWEEP_STORE '{store_type}'. Use 'memory' or 'sqlite'.")
+
+
+def _write_results(sweep, path):
+    """Writes inputs and outputs of a finished sweep to .npz or .csv (chunked)."""
+    plan = sweep.plan
+    arrays = sweep.results(copy=False)
+    if path.endswith(".npz"):
+        inputs = design_points(plan, 0, plan["n_points"])
+        np.savez(path, **{f"input_{name}": values for name, values in inputs.items()}, **arrays)
+        return
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        names = list(arrays)
+        writer.writerow(list(plan["axes"]) + names)
+        for offset in range(0, plan["n_points"], plan["chunk_size"]):
+            stop = min(offset + plan["chunk_size"], plan["n_points"])
+            inputs = design_points(plan, offset, stop - offset)
+            columns = [inputs[name].tolist() for name in plan["axes"]] + [arrays[name][offset:stop].tolist() for name in names]
+            writer.writerows(zip(*columns))
+
+
+def main(argv=None):
+    """Command line entry point: python -m app.sweep request.json [--workers N] [--output FILE]."""
+    parser = argparse.ArgumentParser(
+        prog="python -m app.sweep",
+        description="Run a parameter sweep (same JSON body as POST /sweep) on all CPU cores."
+    )
+    parser.add_argument("request", help="Path to the sweep request JSON file, or '-' for stdin.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Design points per task.")
+    parser.add_argument("--output", default=None, help="Write results to a .npz or .csv file.")
+    parser.add_argument("--quiet", action="store_true", help="Do not print progress to stderr.")
+    args = parser.parse_args(argv)
+
+    with (sys.stdin if args.request == "-" else open(args.request)) as f:
+        data = json.load(f)
+    if args.chunk_size:
+        data["chunk_size"] = args.chunk_size
+    plan, error = parse_sweep_request(data)
+    error = error or check_parallel_sweep(plan)
+    if error:
+        print(f"error: {error}", file=sys.stderr)
+        return 2
+
+    with ParallelSweep(plan, workers=args.workers).start() as sweep:
+        try:
+            while not sweep.wait(timeout=0.5):
+                if not args.quiet:
+                    p = sweep.progress()
+                    print(f"\r{p['completed']}/{p['total']} points ({p['points_per_second']:.0f}/s)",
+                          end="", file=sys.stderr)
+        except KeyboardInterrupt:
+            sweep.cancel()
+            sweep.wait()
+        report = sweep.progress()
+        if not args.quiet:
+            print(file=sys.stderr)
+        if args.output and report["state"] == "completed":
+            _write_results(sweep, args.output)
+        print(json.dumps(report))
+    return 0 if report["state"] == "completed" else 1
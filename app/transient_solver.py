@@ -0,0 +1,229 @@
+import numpy as np
+from scipy.linalg.lapack import dpttrf, dpttrs
+from app.fin_calculator import calculate_rectangular_fin_performance
+from app.composite_wall_calculator import calculate_composite_wall_performance
+
+# Transient 1-D conduction on a finite-volume mesh. Each cell i has a heat capacity C_i and
+# the cells are coupled by face conductances G (W/K), which gives the system
+#     C dT/dt = -A T + b
+# with A tridiagonal. The theta scheme (theta = 1/2: Crank-Nicolson, theta = 1: implicit
+# Euler) leads to the same symmetric tridiagonal matrix every step for a fixed dt, so it is
+# factorized once and only the forward/back substitution runs per step.
+
+SCHEMES = {"crank_nicolson": 0.5, "implicit": 1.0}
+MAX_CELLS = 200000
+MAX_STEPS = 100000
+MAX_SNAPSHOTS = 1000
+MAX_SNAPSHOT_VALUES = 10000000 # Snapshots x cells kept (and returned) per run, 80 MB as float64
+
+
+def _snapshot_steps(t_end, dt, n_snapshots, snapshot_times):
+    """Step indices at which the temperature field is kept (always includes the last step)."""
+    n_steps = int(round(t_end / dt))
+    if snapshot_times is not None:
+        steps = np.rint(np.asarray(snapshot_times, dtype=float) / dt).astype(np.int64)
+    else:
+        steps = np.rint(np.linspace(0, n_steps, n_snapshots)).astype(np.int64)
+    steps = np.unique(np.clip(steps, 0, n_steps))
+    return n_steps, steps
+
+
+def _march(C, G_face, A_boundary, b, T0, dt, theta, n_steps, save_steps, probe):
+    """
+    Integrates C dT/dt = -A T + b with the theta scheme.
+
+    Args:
+        C (ndarray): (N,) cell heat capacities (J/K).
+        G_face (ndarray): (N-1,) conductances between neighbouring cells (W/K).
+        A_boundary (ndarray): (N,) extra diagonal conductance (boundaries, convection) (W/K).
+        b (ndarray): (N,) source term, conductance times fixed temperature (W).
+        T0 (ndarray): (N,) initial temperatures (K).
+        dt (float): Time step (s).
+        theta (float): 0.5 for Crank-Nicolson, 1.0 for implicit Euler.
+        n_steps (int): Number of time steps.
+        save_steps (ndarray): Sorted step indices at which to keep a snapshot.
+        probe (callable): probe(T) -> value recorded with every snapshot.
+
+    Returns:
+        tuple: (snapshots (n_snapshots, N) ndarray, list of probe values).
+    """
+    A_diag = A_boundary.copy()
+    A_diag[:-1] += G_face
+    A_diag[1:] += G_face
+
+    def factorize(step, weight):
+        # C/step + weight A is symmetric positive definite: LDL^T factorization (LAPACK ?pttrf)
+        d, e, info = dpttrf(C / step + weight * A_diag, -weight * G_face)
+        if info != 0:
+            raise ValueError("Transient system matrix is not positive definite.")
+        return d, e
+
+    # With M = C/dt + theta A the step (M T' = (C/dt - (1 - theta) A) T + b) can be written as
+    #     T' = M^-1 (C/(theta dt) T + b) - ((1 - theta)/theta) T
+    # which avoids a tridiagonal product per step.
+    d, e = factorize(dt, theta)
+    scale = C / (theta * dt)
+    carry = (1 - theta) / theta
+
+    # Crank-Nicolson does not damp the stiff modes excited by the sudden boundary change;
+    # the first two steps are replaced by four implicit Euler half steps (Rannacher start-up).
+    startup_steps = 2 if theta < 1 else 0
+    if startup_steps:
+        d_half, e_half = factorize(dt / 2, 1.0)
+        scale_half = C / (dt / 2)
+
+    snapshots = np.empty((len(save_steps), len(C)))
+    probes = []
+    save_index = 0
+    T = np.array(T0, dtype=float)
+    rhs = np.empty(len(C))
+    for step in range(n_steps + 1):
+        if save_index < len(save_steps) and save_steps[save_index] == step:
+            snapshots[save_index] = T
+            probes.append(probe(T))
+            save_index += 1
+        if step == n_steps:
+            break
+        if step < startup_steps:
+            for _ in range(2):
+                np.multiply(scale_half, T, out=rhs)
+                rhs += b
+                T, info = dpttrs(d_half, e_half, rhs)
+            continue
+        np.multiply(scale, T, out=rhs)
+        rhs += b
+        T_next, info = dpttrs(d, e, rhs)
+        if carry:
+            T_next -= carry * T
+        T = T_next
+    return snapshots, probes
+
+
+def simulate_fin_transient(P, Ac, L, k, rho, cp, h_conv, T_base, T_inf, t_end, dt,
+                           T_initial=None, n_cells=100, scheme="crank_nicolson",
+                           n_snapshots=11, snapshot_times=None):
+    """
+    Simulates the warm-up/cool-down of a rectangular fin with an adiabatic tip after its
+    base is brought to T_base at t = 0.
+
+    Args:
+        P, Ac, L, k, h_conv, T_base, T_inf (float): As in calculate_rectangular_fin_performance.
+        rho (float): Density of the fin material (kg/m^3).
+        cp (float): Specific heat of the fin material (J/kgK).
+        t_end (float): Simulated time (s).
+        dt (float): Time step (s).
+        T_initial (float, optional): Uniform initial fin temperature (K). Defaults to T_inf.
+        n_cells (int, optional): Number of finite volumes along the fin. Defaults to 100.
+        scheme (str, optional): "crank_nicolson" or "implicit". Defaults to "crank_nicolson".
+        n_snapshots (int, optional): Evenly spaced snapshots kept (including t = 0 and t_end).
+        snapshot_times (list, optional): Explicit snapshot times (s); overrides n_snapshots.
+
+    Returns:
+        dict: A dictionary containing:
+            - x_coords (ndarray): Cell centre positions (m).
+            - times (ndarray): Snapshot times (s).
+            - temperatures (ndarray): (n_snapshots, n_cells) cell temperatures (K).
+            - base_heat_rate (ndarray): Heat entering the fin at the base per snapshot (W).
+            - steady_heat_transfer_rate (float): q_f of the steady analytic model.
+    """
+    dx = L / n_cells
+    n_steps, save_steps = _snapshot_steps(t_end, dt, n_snapshots, snapshot_times)
+
+    C = np.full(n_cells, rho * cp * Ac * dx)
+    G_face = np.full(n_cells - 1, k * Ac / dx)
+    G_base = 2 * k * Ac / dx # Base temperature acts half a cell from the first centre
+    G_conv = h_conv * P * dx
+    A_boundary = np.full(n_cells, G_conv)
+    A_boundary[0] += G_base
+    b = np.full(n_cells, G_conv * T_inf)
+    b[0] += G_base * T_base
+    T0 = np.full(n_cells, T_inf if T_initial is None else T_initial, dtype=float)
+
+    snapshots, probes = _march(
+        C, G_face, A_boundary, b, T0, dt, SCHEMES[scheme], n_steps, save_steps,
+        probe=lambda T: G_base * (T_base - T[0])
+    )
+    steady = calculate_rectangular_fin_performance(P, Ac, L, k, h_conv, T_base, T_inf, n_points=2)
+    return {
+        "x_coords": (np.arange(n_cells) + 0.5) * dx,
+        "times": save_steps * dt,
+        "temperatures": snapshots,
+        "base_heat_rate": np.array(probes),
+        "steady_heat_transfer_rate": steady["heat_transfer_rate"],
+    }
+
+
+def simulate_wall_transient(layers, T_inner, T_outer, t_end, dt, T_initial=None, n_cells=200,
+                            scheme="crank_nicolson", n_snapshots=11, snapshot_times=None):
+    """
+    Simulates transient conduction through a composite wall after its surfaces are brought
+    to T_inner and T_outer at t = 0.
+
+    Args:
+        layers (list): Layer dicts with 'thickness' (m), 'k_value' (W/mK), 'area' (m^2),
+                       'rho' (kg/m^3) and 'cp' (J/kgK), from the inner to the outer surface.
+                       Zero-thickness layers have no resistance or capacity and are skipped.
+        T_inner (float): Inner surface temperature for t > 0 (K).
+        T_outer (float): Outer surface temperature for t > 0 (K).
+        t_end (float): Simulated time (s).
+        dt (float): Time step (s).
+        T_initial (float, optional): Uniform initial wall temperature (K). Defaults to T_outer.
+        n_cells (int, optional): Total number of finite volumes, spread over the layers in
+                                 proportion to their thickness (at least one per layer).
+        scheme (str, optional): "crank_nicolson" or "implicit". Defaults to "crank_nicolson".
+        n_snapshots (int, optional): Evenly spaced snapshots kept (including t = 0 and t_end).
+        snapshot_times (list, optional): Explicit snapshot times (s); overrides n_snapshots.
+
+    Returns:
+        dict: A dictionary containing:
+            - x_coords (ndarray): Cell centre depths from the inner surface (m).
+            - layer_index (ndarray): Index of the layer each cell belongs to.
+            - times (ndarray): Snapshot times (s).
+            - temperatures (ndarray): (n_snapshots, n_cells) cell temperatures (K).
+            - inner_heat_rate (ndarray): Heat entering at the inner surface per snapshot (W).
+            - outer_heat_rate (ndarray): Heat leaving at the outer surface per snapshot (W).
+            - steady_heat_flux (float): heat_flux of the steady series model.
+    """
+    solid = [(i, layer) for i, layer in enumerate(layers) if layer['thickness'] > 0]
+    thickness = np.array([layer['thickness'] for _, layer in solid])
+    cells_per_layer = np.maximum(1, np.rint(n_cells * thickness / thickness.sum())).astype(np.int64)
+
+    layer_of_cell = np.repeat(np.arange(len(solid)), cells_per_layer)
+    dx = np.repeat(thickness / cells_per_layer, cells_per_layer)
+    k = np.repeat([layer['k_value'] for _, layer in solid], cells_per_layer)
+    area = np.repeat([layer['area'] for _, layer in solid], cells_per_layer)
+    rho_cp = np.repeat([layer['rho'] * layer['cp'] for _, layer in solid], cells_per_layer)
+
+    # Half-cell resistances; a face between two cells (also across a layer interface) has both halves in series
+    R_half = dx / (2 * k * area)
+    G_face = 1 / (R_half[:-1] + R_half[1:])
+    G_inner = 1 / R_half[0]
+    G_outer = 1 / R_half[-1]
+
+    C = rho_cp * area * dx
+    A_boundary = np.zeros(len(C))
+    A_boundary[0] += G_inner
+    A_boundary[-1] += G_outer
+    b = np.zeros(len(C))
+    b[0] += G_inner * T_inner
+    b[-1] += G_outer * T_outer
+    T0 = np.full(len(C), T_outer if T_initial is None else T_initial, dtype=float)
+
+    n_steps, save_steps = _snapshot_steps(t_end, dt, n_snapshots, snapshot_times)
+    snapshots, probes = _march(
+        C, G_face, A_boundary, b, T0, dt, SCHEMES[scheme], n_steps, save_steps,
+        probe=lambda T: (G_inner * (T_inner - T[0]), G_outer * (T[-1] - T_outer))
+    )
+    steady = calculate_composite_wall_performance(
+        [{key: layer[key] for key in ['thickness', 'k_value', 'area']} for layer in layers], T_inner, T_outer
+    )
+    probes = np.array(probes).reshape(-1, 2)
+    return {
+        "x_coords": np.cumsum(dx) - dx / 2,
+        "layer_index": np.array([i for i, _ in solid])[layer_of_cell],
+        "times": save_steps * dt,
+        "temperatures": snapshots,
+        "inner_heat_rate": probes[:, 0],
+        "outer_heat_rate": probes[:, 1],
+        "steady_heat_flux": steady["heat_flux"],
+    }
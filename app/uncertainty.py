@@ -0,0 +1,330 @@
+import json
+import warnings
+import numpy as np
+from scipy.special import ndtri
+from scipy.stats import qmc
+from app.sweep import SWEEP_CALCULATORS
+
+# Monte Carlo uncertainty propagation through the batch kernels. Uncertain inputs get a
+# distribution; samples are drawn chunk by chunk as unit-interval points (pseudo-random, or
+# a scrambled Sobol sequence for faster convergence of the mean), mapped through the
+# inverse CDF of each distribution and evaluated in one vectorized call per chunk with the
+# sweep evaluators (same validation as /sweep; rejected samples are counted, not used).
+#
+# Statistics are accumulated per chunk and the chunk is dropped, so memory does not grow
+# with the sample count:
+# - mean / standard deviation: Welford's update, merged chunk-wise (Chan et al.)
+# - percentiles and histograms: a fixed number of equal-width bins over the observed range.
+#   When a sample falls outside it, the range doubles and pairs of bins merge. Percentiles
+#   are interpolated within a bin, so their error is at most one bin width (reported as
+#   percentile_resolution). The sequential P^2 estimator would need a Python-level update
+#   per sample, which does not fit vectorized chunks.
+
+DISTRIBUTIONS = {
+    "normal": ['mean', 'std'],
+    "uniform": ['low', 'high'],
+    "triangular": ['low', 'mode', 'high'],
+    "lognormal": ['mu', 'sigma'], # Of the underlying normal: exp(mu + sigma Z)
+}
+SAMPLING_METHODS = ["random", "sobol"]
+DEFAULT_SAMPLES = 10000
+MAX_SAMPLES = 100000000
+DEFAULT_CHUNK_SIZE = 65536 # A power of two keeps the balance of Sobol points per chunk
+MAX_CHUNK_SIZE = 1048576
+DEFAULT_PERCENTILES = [2.5, 5, 25, 50, 75, 95, 97.5]
+DEFAULT_HISTOGRAM_BINS = 20
+MAX_HISTOGRAM_BINS = 1000
+SKETCH_BINS = 32768 # Bins of the streaming histogram per output
+U_EPSILON = 1e-12 # Unit samples are kept inside (0, 1) so inverse CDFs stay finite
+
+# Outputs summarised per calculator (the scalar outputs of SWEEP_CALCULATORS, without error codes)
+UNCERTAINTY_OUTPUTS = {name: [output for output in calculator["outputs"] if output != "error_code"]
+                       for name, calculator in SWEEP_CALCULATORS.items()}
+
+
+def inverse_cdf(distribution, u):
+    """
+    Maps unit-interval samples u to a distribution.
+
+    Args:
+        distribution (dict): {"type": one of DISTRIBUTIONS, ...its parameters}.
+        u (ndarray): Samples in (0, 1).
+    """
+    kind = distribution["type"]
+    if kind == "normal":
+        return distribution["mean"] + distribution["std"] * ndtri(u)
+    if kind == "uniform":
+        return distribution["low"] + u * (distribution["high"] - distribution["low"])
+    if kind == "lognormal":
+        return np.exp(distribution["mu"] + distribution["sigma"] * ndtri(u))
+    low, mode, high = distribution["low"], distribution["mode"], distribution["high"]
+    split = (mode - low) / (high - low) # CDF at the mode
+    with np.errstate(invalid='ignore'):
+        return np.where(u < split, low + np.sqrt(u * (high - low) * (mode - low)),
+                        high - np.sqrt((1 - u) * (high - low) * (high - mode)))
+
+
+def parse_distribution(name, spec):
+    """(distribution, error): checks one input distribution specification."""
+    if not isinstance(spec, dict) or spec.get('type') not in DISTRIBUTIONS:
+        return None, f"Distribution of '{name}' must be a dictionary with 'type' one of: {', '.join(DISTRIBUTIONS)}."
+    params = DISTRIBUTIONS[spec['type']]
+    missing = [param for param in params if param not in spec]
+    if missing:
+        return None, f"Distribution of '{name}': missing parameters: {', '.join(missing)}"
+    if not all(isinstance(spec[param], (int, float)) and not isinstance(spec[param], bool) for param in params):
+        return None, f"Distribution of '{name}': {', '.join(params)} must be numbers."
+    distribution = {"type": spec['type'], **{param: float(spec[param]) for param in params}}
+    if spec['type'] in ['normal', 'lognormal'] and distribution[params[1]] < 0:
+        return None, f"Distribution of '{name}': '{params[1]}' must be non-negative."
+    if spec['type'] == 'uniform' and not distribution['low'] < distribution['high']:
+        return None, f"Distribution of '{name}': 'low' must be smaller than 'high'."
+    if spec['type'] == 'triangular' and not (distribution['low'] <= distribution['mode'] <= distribution['high']
+                                             and distribution['low'] < distribution['high']):
+        return None, f"Distribution of '{name}': needs low <= mode <= high and low < high."
+    return distribution, None
+
+
+class RunningMoments:
+    """Count, mean, variance, min and max of a stream, updated one chunk at a time."""
+
+    def __init__(self):
+        self.count, self.mean, self.m2 = 0, 0.0, 0.0
+        self.min, self.max = np.inf, -np.inf
+
+    def update(self, values):
+        n = len(values)
+        if n == 0:
+            return
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        total = self.count + n
+        delta = mean - self.mean
+        # Welford / Chan merge of (count, mean, M2) of the stream and of the chunk
+        self.mean += delta * n / total
+        self.m2 += m2 + delta ** 2 * self.count * n / total
+        self.count = total
+        self.min, self.max = min(self.min, float(values.min())), max(self.max, float(values.max()))
+
+    def std(self):
+        """Sample standard deviation, None for fewer than two values."""
+        return float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else None
+
+
+class StreamingHistogram:
+    """
+    Fixed-size histogram over a range that grows (doubling, merging bin pairs) to cover
+    every value seen; percentiles are read from it to within one bin width.
+    """
+
+    def __init__(self, n_bins=SKETCH_BINS):
+        self.n_bins = n_bins
+        self.counts = np.zeros(n_bins, dtype=np.int64)
+        self.low, self.width = None, None # Range [low, low + n_bins width)
+
+    def _grow(self, to_left):
+        merged = self.counts.reshape(-1, 2).sum(axis=1)
+        padding = np.zeros(self.n_bins // 2, dtype=np.int64)
+        if to_left:
+            self.low -= self.n_bins * self.width
+            self.counts = np.concatenate([padding, merged])
+        else:
+            self.counts = np.concatenate([merged, padding])
+        self.width *= 2
+
+    def update(self, values):
+        if len(values) == 0:
+            return
+        v_min, v_max = float(values.min()), float(values.max())
+        if self.low is None:
+            span = v_max - v_min
+            scale = max(abs(v_min), abs(v_max), np.finfo(float).tiny)
+            self.width = max(span, scale * 1e-9) * 1.0001 / self.n_bins
+            self.low = v_min - (self.n_bins * self.width - span) / 2
+        while v_min < self.low:
+            self._grow(to_left=True)
+        while v_max >= self.low + self.n_bins * self.width:
+            self._grow(to_left=False)
+        index = np.minimum(((values - self.low) / self.width).astype(np.int64), self.n_bins - 1)
+        self.counts += np.bincount(index, minlength=self.n_bins)
+
+    def percentiles(self, q, v_min, v_max):
+        """Percentiles q (0-100), interpolated linearly within a bin and clipped to [v_min, v_max]."""
+        cumulative = np.cumsum(self.counts)
+        target = np.asarray(q, dtype=float) / 100 * cumulative[-1]
+        i = np.minimum(np.searchsorted(cumulative, target, side='left'), self.n_bins - 1)
+        before = np.where(i > 0, cumulative[i - 1], 0)
+        fraction = np.where(self.counts[i] > 0, (target - before) / np.maximum(self.counts[i], 1), 0.0)
+        return np.clip(self.low + (i + fraction) * self.width, v_min, v_max)
+
+    def histogram(self, bins):
+        """(counts, edges) of `bins` groups of adjacent bins spanning the occupied bins."""
+        occupied = np.flatnonzero(self.counts)
+        first, last = occupied[0], occupied[-1] + 1
+        bounds = first + np.round(np.linspace(0, last - first, min(bins, last - first) + 1)).astype(np.int64)
+        counts = np.add.reduceat(self.counts[:last], bounds[:-1])
+        return counts, self.low + bounds * self.width
+
+
+def parse_uncertainty_request(data):
+    """
+    Parses an uncertainty request:
+        calculator: "fin", "heat_exchanger" or "composite_wall"
+        base: inputs of the single-point route (as for /sweep)
+        distributions: input name -> {"type", ...parameters} (see DISTRIBUTIONS); names as
+                       for /sweep, e.g. 'h_conv' or 'layers.1.k_value'
+        samples, sampling ("random" or "sobol"), seed, chunk_size: optional
+        percentiles (list of 0-100), histogram_bins, outputs (subset), report_every: optional
+
+    Returns:
+        tuple: (plan, error). plan is consumed by iter_uncertainty.
+    """
+    calculator = data.get('calculator')
+    if calculator not in SWEEP_CALCULATORS:
+        return None, f"Parameter 'calculator' must be one of: {', '.join(SWEEP_CALCULATORS)}."
+    base = data.get('base', {})
+    if not isinstance(base, dict):
+        return None, "Parameter 'base' must be a dictionary."
+    specs = data.get('distributions')
+    if not isinstance(specs, dict) or not specs:
+        return None, "Parameter 'distributions' must be a non-empty dictionary."
+    known = SWEEP_CALCULATORS[calculator]["parameters"](base)
+    unknown = [name for name in specs if name not in known or name == 'flow_type']
+    if unknown:
+        return None, f"Unknown uncertain inputs for '{calculator}': {', '.join(unknown)}"
+    distributions = {}
+    for name, spec in specs.items():
+        distribution, error = parse_distribution(name, spec)
+        if error:
+            return None, error
+        distributions[name] = distribution
+
+    settings = {}
+    for name, default, low, high in [('samples', DEFAULT_SAMPLES, 2, MAX_SAMPLES),
+                                     ('chunk_size', DEFAULT_CHUNK_SIZE, 1, MAX_CHUNK_SIZE),
+                                     ('histogram_bins', DEFAULT_HISTOGRAM_BINS, 1, MAX_HISTOGRAM_BINS),
+                                     ('report_every', None, 1, MAX_SAMPLES)]:
+        value = data.get(name, default)
+        if value is not None and (not isinstance(value, int) or isinstance(value, bool) or not low <= value <= high):
+            return None, f"Parameter '{name}' must be an integer between {low} and {high}."
+        settings[name] = value
+    sampling = data.get('sampling', 'random')
+    if sampling not in SAMPLING_METHODS:
+        return None, f"Parameter 'sampling' must be one of: {', '.join(SAMPLING_METHODS)}."
+    seed = data.get('seed')
+    if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool) or seed < 0):
+        return None, "Parameter 'seed' must be a non-negative integer."
+    percentiles = data.get('percentiles', DEFAULT_PERCENTILES)
+    if (not isinstance(percentiles, list) or not percentiles
+            or not all(isinstance(p, (int, float)) and 0 <= p <= 100 for p in percentiles)):
+        return None, "Parameter 'percentiles' must be a non-empty list of numbers between 0 and 100."
+    outputs = data.get('outputs', UNCERTAINTY_OUTPUTS[calculator])
+    if (not isinstance(outputs, list) or not outputs
+            or not all(output in UNCERTAINTY_OUTPUTS[calculator] for output in outputs)):
+        return None, f"Parameter 'outputs' must list some of: {', '.join(UNCERTAINTY_OUTPUTS[calculator])}."
+
+    plan = {"calculator": calculator, "base": base, "distributions": distributions, "sampling": sampling,
+            "seed": seed, "percentiles": [float(p) for p in percentiles], "outputs": outputs, **settings}
+    # Run the rules of the calculator on the distribution medians so malformed inputs fail early
+    _, _, error = SWEEP_CALCULATORS[calculator]["evaluate"](base, _sample(distributions, np.full((1, len(distributions)), 0.5)))
+    if error:
+        return None, error
+    return plan, None
+
+
+def _sample(distributions, u):
+    return {name: inverse_cdf(distribution, u[:, i]) for i, (name, distribution) in enumerate(distributions.items())}
+
+
+def _unit_samples(plan):
+    """Yields (count, u) chunks of unit-interval samples, one column per uncertain input."""
+    d = len(plan["distributions"])
+    if plan["sampling"] == "sobol":
+        sampler = qmc.Sobol(d=d, scramble=True, seed=plan["seed"])
+    else:
+        rng = np.random.default_rng(plan["seed"])
+    for offset in range(0, plan["samples"], plan["chunk_size"]):
+        count = min(plan["chunk_size"], plan["samples"] - offset)
+        if plan["sampling"] == "sobol":
+            with warnings.catch_warnings(): # Non-power-of-two (last) chunks are still valid points
+                warnings.simplefilter("ignore", UserWarning)
+                u = sampler.random(count)
+        else:
+            u = rng.random((count, d))
+        yield count, np.clip(u, U_EPSILON, 1 - U_EPSILON)
+
+
+def _statistics(plan, moments, sketches, evaluated, rejected, failure_examples):
+    outputs = {}
+    for name in plan["outputs"]:
+        m = moments[name]
+        if m.count == 0:
+            outputs[name] = {"count": 0}
+            continue
+        counts, edges = sketches[name].histogram(plan["histogram_bins"])
+        outputs[name] = {
+            "count": m.count, "mean": m.mean, "std": m.std(), "min": m.min, "max": m.max,
+            # Standard error of the mean for independent samples; Sobol sampling converges faster
+            "standard_error": m.std() / np.sqrt(m.count) if m.count > 1 else None,
+            "percentiles": [{"p": p, "value": value} for p, value in
+                            zip(plan["percentiles"], sketches[name].percentiles(plan["percentiles"], m.min, m.max).tolist())],
+            "percentile_resolution": sketches[name].width,
+            "histogram": {"counts": counts.tolist(), "edges": edges.tolist()},
+        }
+    return {"evaluated": evaluated, "rejected": rejected, "failure_examples": failure_examples, "outputs": outputs}
+
+
+def iter_uncertainty(plan):
+    """
+    Runs the Monte Carlo propagation chunk by chunk.
+
+    Yields:
+        dict: Statistics after every report_every samples (if set) and a final one with
+              "done": True. Each has evaluated / rejected sample counts, up to five distinct
+              failure messages and, per output, count, mean, std, min, max, standard_error,
+              percentiles ([{"p", "value"}]), percentile_resolution and histogram (counts
+              and edges).
+    """
+    calculator = SWEEP_CALCULATORS[plan["calculator"]]
+    moments = {name: RunningMoments() for name in plan["outputs"]}
+    sketches = {name: StreamingHistogram() for name in plan["outputs"]}
+    evaluated, rejected, failure_examples = 0, 0, []
+    next_report = plan["report_every"]
+    for count, u in _unit_samples(plan):
+        outputs, row_errors, error = calculator["evaluate"](plan["base"], _sample(plan["distributions"], u))
+        if error: # Only possible if a sampled value breaks a whole-chunk rule
+            outputs, row_errors = {}, [{"row": i, "error": error} for i in range(count)]
+        valid = np.ones(count, dtype=bool)
+        valid[[e["row"] for e in row_errors]] = False
+        if "error_code" in outputs:
+            codes = outputs["error_code"]
+            for code in np.unique(codes[valid & (codes != 0)]).tolist():
+                row_errors.append({"error": calculator["error_messages"][code]})
+            valid &= codes == 0
+        for e in row_errors:
+            if len(failure_examples) < 5 and e["error"] not in failure_examples:
+                failure_examples.append(e["error"])
+        for name in plan["outputs"]:
+            values = np.asarray(outputs[name], dtype=float)[valid] if outputs else np.empty(0)
+            values = values[np.isfinite(values)]
+            moments[name].update(values)
+            sketches[name].update(values)
+        evaluated += count
+        rejected += count - int(valid.sum())
+        if next_report is not None and evaluated >= next_report and evaluated < plan["samples"]:
+            next_report += plan["report_every"]
+            yield _statistics(plan, moments, sketches, evaluated, rejected, failure_examples)
+    yield {**_statistics(plan, moments, sketches, evaluated, rejected, failure_examples), "done": True}
+
+
+def run_uncertainty(plan):
+    """Runs the whole propagation and returns the final statistics of iter_uncertainty."""
+    for statistics in iter_uncertainty(plan):
+        pass
+    return statistics
+
+
+def iter_uncertainty_ndjson(plan):
+    """Streams iter_uncertainty as NDJSON, one line per report."""
+    for statistics in iter_uncertainty(plan):
+        yield json.dumps(statistics) + "\n"
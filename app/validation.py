@@ -0,0 +1,293 @@
+import numpy as np
+from app.exchanger_configurations import EXCHANGER_CONFIGURATIONS
+
+# Column-wise (vectorized) versions of the input rules enforced by the single-point
+# calculator routes in app.py. Structural problems (missing or non-numeric columns)
+# reject the whole batch; physical constraints are reported per row.
+
+FIN_PARAMS = ['P', 'Ac', 'L', 'k', 'h_conv', 'T_base', 'T_inf']
+
+
+def coerce_numeric_columns(data, names):
+    """
+    Converts JSON columns (lists of numbers, or scalars broadcast to every row) to float arrays.
+
+    Args:
+        data (dict): Mapping of parameter name to a list of numbers or a single number.
+        names (list): Parameter names that must be present.
+
+    Returns:
+        tuple: (columns, error) where columns is a dict of equal-length 1-D float arrays
+               and error is None, or columns is None and error is a message string.
+    """
+    missing_params = [name for name in names if name not in data]
+    if missing_params:
+        return None, f"Missing parameters: {', '.join(missing_params)}"
+
+    arrays = {}
+    for name in names:
+        value = data[name]
+        if isinstance(value, (int, float)):
+            arrays[name] = np.asarray(value, dtype=float)
+            continue
+        if not isinstance(value, (list, tuple, np.ndarray)):
+            return None, f"Parameter '{name}' must be a number or a list of numbers."
+        column = np.asarray(value)
+        # Booleans pass the isinstance(value, (int, float)) check of the single-point routes, so allow them here too
+        if column.ndim != 1 or column.dtype.kind not in 'biuf':
+            return None, f"Parameter '{name}' must be a number or a list of numbers."
+        arrays[name] = column.astype(float)
+
+    lengths = {a.shape[0] for a in arrays.values() if a.ndim == 1}
+    if len(lengths) > 1:
+        return None, "All list parameters must have the same length."
+    n_rows = lengths.pop() if lengths else 1
+    if n_rows == 0:
+        return None, "Batch must contain at least one row."
+
+    return {name: np.broadcast_to(a, (n_rows,)) for name, a in arrays.items()}, None
+
+
+def collect_row_errors(rules, n_rows):
+    """
+    Evaluates vectorized validation rules and keeps the first failing message per row.
+
+    Args:
+        rules (list): List of (mask, message) pairs; mask is a boolean array marking invalid rows.
+        n_rows (int): Number of rows in the batch.
+
+    Returns:
+        list: [{"row": i, "error": message}, ...] for every invalid row, in row order.
+    """
+    messages = np.full(n_rows, None, dtype=object)
+    for mask, message in rules:
+        messages[np.asarray(mask) & (messages == None)] = message # noqa: E711 (elementwise comparison)
+    failed = np.flatnonzero(messages != None) # noqa: E711
+    return [{"row": int(i), "error": messages[i]} for i in failed]
+
+
+def validate_n_points(n_points, n_rows=1, max_values=None):
+    """
+    Returns an error message if n_points is not a positive integer, or if the (n_rows,
+    n_points) profile arrays would exceed max_values entries; else None.
+    """
+    if not isinstance(n_points, int) or isinstance(n_points, bool) or n_points <= 0:
+        return "Parameter 'n_points' must be a positive integer."
+    if max_values is not None and n_rows * n_points > max_values:
+        return (f"Rows x n_points must not exceed {max_values} ({n_rows} x {n_points} requested); "
+                "request fewer points or set 'include_profiles' to false.")
+    return None
+
+
+def validate_fin_columns(data):
+    """
+    Validates a columnar batch of fin inputs with the rules of the /calculate_fin route.
+
+    Args:
+        data (dict): JSON body with the FIN_PARAMS columns.
+
+    Returns:
+        tuple: (columns, row_errors, error). error is a message if the batch as a whole is
+               malformed; otherwise row_errors lists the rows violating physical constraints.
+    """
+    columns, error = coerce_numeric_columns(data, FIN_PARAMS)
+    if error:
+        return None, [], error
+
+    row_errors = collect_row_errors([
+        (columns['Ac'] <= 0, "Cross-sectional area 'Ac' must be positive."),
+        (columns['P'] <= 0, "Perimeter 'P' must be positive."),
+        (columns['k'] <= 0, "Thermal conductivity 'k' must be positive."),
+    ], len(columns['P']))
+    return columns, row_errors, None
+
+
+HEAT_EXCHANGER_PARAMS = ['m_dot_hot', 'Cp_hot', 'T_in_hot', 'm_dot_cold', 'Cp_cold', 'T_in_cold', 'UA']
+HEAT_EXCHANGER_FLOW_TYPES = list(EXCHANGER_CONFIGURATIONS)
+
+
+def validate_heat_exchanger_columns(data):
+    """
+    Validates a columnar batch of heat exchanger inputs with the rules of the
+    /calculate_heat_exchanger route.
+
+    Args:
+        data (dict): JSON body with the HEAT_EXCHANGER_PARAMS columns and 'flow_type'
+                     (a single string or a list of strings).
+
+    Returns:
+        tuple: (columns, row_errors, error), as for validate_fin_columns. columns also
+               contains 'flow_type' as an array of strings.
+    """
+    if 'flow_type' not in data:
+        return None, [], "Missing parameters: flow_type"
+    columns, error = coerce_numeric_columns(data, HEAT_EXCHANGER_PARAMS)
+    if error:
+        return None, [], error
+    n_rows = len(columns['UA'])
+
+    flow_type = data['flow_type']
+    if isinstance(flow_type, str):
+        flow_type = [flow_type] * n_rows
+    if not isinstance(flow_type, list) or len(flow_type) != n_rows:
+        return None, [], "Parameter 'flow_type' must be a string or a list with one entry per row."
+    columns['flow_type'] = np.array([f if isinstance(f, str) else "" for f in flow_type])
+
+    rules = [
+        (columns[name] < 0, f"Parameter '{name}' must be non-negative.")
+        for name in HEAT_EXCHANGER_PARAMS if name not in ['T_in_hot', 'T_in_cold']
+    ]
+    rules.append((~np.isin(columns['flow_type'], HEAT_EXCHANGER_FLOW_TYPES),
+                  f"Parameter 'flow_type' must be one of: {', '.join(HEAT_EXCHANGER_FLOW_TYPES)}."))
+    return columns, collect_row_errors(rules, n_rows), None
+
+
+
+def validate_exchanger_ntu_columns(data):
+    """
+    Validates an effectiveness-NTU inverse request (target effectiveness -> required NTU).
+
+    Args:
+        data (dict): JSON body with 'flow_type' (one name for all rows), 'effectiveness'
+                     and 'Cr', each a number or a list with one entry per row.
+
+    Returns:
+        tuple: (columns, row_errors, error), as for validate_fin_columns. columns also
+               contains 'flow_type' as a string.
+    """
+    flow_type = data.get('flow_type')
+    if flow_type not in HEAT_EXCHANGER_FLOW_TYPES:
+        return None, [], f"Parameter 'flow_type' must be one of: {', '.join(HEAT_EXCHANGER_FLOW_TYPES)}."
+    columns, error = coerce_numeric_columns(data, ['effectiveness', 'Cr'])
+    if error:
+        return None, [], error
+    columns['flow_type'] = flow_type
+    row_errors = collect_row_errors([
+        ((columns['effectiveness'] < 0) | (columns['effectiveness'] >= 1),
+         "Parameter 'effectiveness' must be at least 0 and less than 1."),
+        ((columns['Cr'] < 0) | (columns['Cr'] > 1), "Parameter 'Cr' must be between 0 and 1."),
+    ], len(columns['Cr']))
+    return columns, row_errors, None
+
+WALL_LAYER_PARAMS = ['thickness', 'k_value', 'area']
+
+
+def validate_composite_wall_columns(data):
+    """
+    Validates a CSR-style batch of composite walls with the rules of the
+    /calculate_composite_wall route.
+
+    Args:
+        data (dict): JSON body with concatenated 'thickness', 'k_value' and 'area' layer
+                     lists, an 'offsets' list (n_walls + 1 integers) and 'T_inner' /
+                     'T_outer' (one number per wall, or a single number).
+
+    Returns:
+        tuple: (columns, row_errors, error), as for validate_fin_columns. Row errors are
+               per wall and name the first offending layer within that wall.
+    """
+    missing_params = [name for name in WALL_LAYER_PARAMS + ['offsets', 'T_inner', 'T_outer'] if name not in data]
+    if missing_params:
+        return None, [], f"Missing parameters: {', '.join(missing_params)}"
+
+    offsets = np.asarray(data['offsets'])
+    if offsets.ndim != 1 or offsets.dtype.kind not in 'iu' or len(offsets) < 2:
+        return None, [], "Parameter 'offsets' must be a list of at least two integers."
+    if offsets[0] != 0 or np.any(np.diff(offsets) < 0):
+        return None, [], "Parameter 'offsets' must start at 0 and be non-decreasing."
+    n_walls = len(offsets) - 1
+
+    layers, error = coerce_numeric_columns(data, WALL_LAYER_PARAMS)
+    if error:
+        return None, [], error
+    if any(np.ndim(data[name]) != 0 and len(data[name]) != offsets[-1] for name in WALL_LAYER_PARAMS):
+        return None, [], "Layer lists must contain exactly offsets[-1] entries."
+    layers = {name: np.broadcast_to(a, (int(offsets[-1]),)) for name, a in layers.items()}
+
+    temperatures, error = coerce_numeric_columns(data, ['T_inner', 'T_outer'])
+    if error:
+        return None, [], "'T_inner' and 'T_outer' must be numbers or lists of numbers."
+    if len(temperatures['T_inner']) not in (1, n_walls):
+        return None, [], "'T_inner' and 'T_outer' must have one entry per wall."
+
+    counts = np.diff(offsets)
+    layer_errors = collect_row_errors([
+        (layers['thickness'] < 0, "'thickness' must be non-negative."),
+        (layers['k_value'] <= 0, "'k_value' must be positive."),
+        (layers['area'] <= 0, "'area' must be positive."),
+    ], len(layers['thickness']))
+
+    # Keep the first failing layer of each wall, numbered within its wall like the single-wall route
+    wall_messages = {int(w): "Parameter 'layers' must be a non-empty list." for w in np.flatnonzero(counts == 0)}
+    for layer_error in layer_errors:
+        wall = int(np.searchsorted(offsets, layer_error["row"], side='right') - 1)
+        if wall not in wall_messages:
+            wall_messages[wall] = f"Layer {layer_error['row'] - offsets[wall] + 1}: {layer_error['error']}"
+    row_errors = [{"row": wall, "error": wall_messages[wall]} for wall in sorted(wall_messages)]
+
+    columns = dict(layers)
+    columns['offsets'] = offsets.astype(np.int64)
+    columns['T_inner'] = np.broadcast_to(temperatures['T_inner'], (n_walls,))
+    columns['T_outer'] = np.broadcast_to(temperatures['T_outer'], (n_walls,))
+    return columns, row_errors, None
+
+
+def validate_transient_settings(data, default_cells, max_cells, max_steps, max_snapshots, schemes,
+                                max_snapshot_values=None):
+    """
+    Validates the time-stepping options shared by the transient routes.
+
+    Args:
+        data (dict): JSON body with 't_end', 'dt' and the optional 'n_cells', 'scheme',
+                     'n_snapshots', 'snapshot_times' and 'T_initial'.
+        default_cells (int): n_cells used when the body does not set it.
+        max_cells, max_steps, max_snapshots (int): Limits of the solver.
+        schemes (iterable): Accepted scheme names.
+        max_snapshot_values (int, optional): Limit of n_snapshots x n_cells, the size of
+                                             the returned temperature field.
+
+    Returns:
+        tuple: (settings, error) where settings holds the keyword arguments of the
+               simulate_* functions and error is None, or settings is None and error is a message.
+    """
+    t_end = data.get('t_end')
+    dt = data.get('dt')
+    if not all(isinstance(val, (int, float)) for val in [t_end, dt]):
+        return None, "'t_end' and 'dt' must be numbers."
+    if dt <= 0 or t_end <= 0:
+        return None, "'t_end' and 'dt' must be positive."
+    if round(t_end / dt) > max_steps:
+        return None, f"t_end / dt must not exceed {max_steps} time steps."
+
+    n_cells = data.get('n_cells', default_cells)
+    if not isinstance(n_cells, int) or not 2 <= n_cells <= max_cells:
+        return None, f"Parameter 'n_cells' must be an integer between 2 and {max_cells}."
+
+    scheme = data.get('scheme', 'crank_nicolson')
+    if scheme not in schemes:
+        return None, f"Parameter 'scheme' must be one of: {', '.join(schemes)}."
+
+    T_initial = data.get('T_initial')
+    if T_initial is not None and not isinstance(T_initial, (int, float)):
+        return None, "Parameter 'T_initial' must be a number."
+
+    settings = {'t_end': float(t_end), 'dt': float(dt), 'n_cells': n_cells, 'scheme': scheme,
+                'T_initial': None if T_initial is None else float(T_initial)}
+    snapshot_times = data.get('snapshot_times')
+    if snapshot_times is not None:
+        if (not isinstance(snapshot_times, list) or not snapshot_times
+                or not all(isinstance(t, (int, float)) for t in snapshot_times)):
+            return None, "Parameter 'snapshot_times' must be a non-empty list of numbers."
+        if len(snapshot_times) > max_snapshots:
+            return None, f"At most {max_snapshots} snapshots can be requested."
+        settings['snapshot_times'] = [float(t) for t in snapshot_times]
+    else:
+        n_snapshots = data.get('n_snapshots', 11)
+        if not isinstance(n_snapshots, int) or not 2 <= n_snapshots <= max_snapshots:
+            return None, f"Parameter 'n_snapshots' must be an integer between 2 and {max_snapshots}."
+        settings['n_snapshots'] = n_snapshots
+    n_snapshots = len(snapshot_times) if snapshot_times is not None else n_snapshots
+    if max_snapshot_values is not None and n_snapshots * n_cells > max_snapshot_values:
+        return None, (f"n_snapshots x n_cells must not exceed {max_snapshot_values} "
+                      f"({n_snapshots} x {n_cells} requested); request fewer snapshots or cells.")
+    return settings, None
@@ -0,0 +1,11 @@
+import pytest
+from app.app import create_app
+
+
+@pytest.fixture
+def client(tmp_path):
+    # Jobs run in the worker threads of the test process, with their results under tmp_path
+    app = create_app({"THERMAL_CACHE_BACKEND": "none", "THERMAL_JOB_PROCESSES": "0",
+                      "THERMAL_JOB_DIR": str(tmp_path / "jobs")})
+    with app.test_client() as client:
+        yield client
@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+from app.composite_wall_calculator import (
+    WALL_ERROR_MESSAGES, calculate_composite_wall_performance, calculate_composite_wall_performance_batch,
+    layers_to_csr
+)
+from app.exchanger_configurations import EXCHANGER_CONFIGURATIONS
+from app.fin_calculator import calculate_rectangular_fin_performance, calculate_rectangular_fin_performance_batch
+from app.heat_exchanger_calculator import (
+    calculate_heat_exchanger_performance, calculate_heat_exchanger_performance_batch
+)
+
+# Every batch kernel documents that its rows reproduce the single-point calculator; the
+# inputs include the edge cases the kernels handle with masks.
+
+FIN_PARAMS = ['P', 'Ac', 'L', 'k', 'h_conv', 'T_base', 'T_inf']
+HX_PARAMS = ['m_dot_hot', 'Cp_hot', 'T_in_hot', 'm_dot_cold', 'Cp_cold', 'T_in_cold', 'UA']
+
+
+def _nan_for_none(value):
+    return np.nan if value is None else value
+
+
+def _fin_columns(rng, n):
+    columns = {
+        'P': rng.uniform(0.01, 0.2, n), 'Ac': rng.uniform(1e-6, 1e-3, n), 'L': rng.uniform(0.001, 0.3, n),
+        'k': rng.uniform(1.0, 400.0, n), 'h_conv': rng.uniform(5.0, 500.0, n),
+        'T_base': rng.uniform(300.0, 500.0, n), 'T_inf': rng.uniform(250.0, 350.0, n),
+    }
+    columns['L'][0] = 0.0 # uniform temperature
+    columns['h_conv'][1] = 0.0 # m = 0
+    columns['T_inf'][2] = columns['T_base'][2] # no temperature difference
+    return columns
+
+
+def test_fin_batch_matches_scalar():
+    columns = _fin_columns(np.random.default_rng(1), 64)
+    batch = calculate_rectangular_fin_performance_batch(n_points=37, gradients=True, **columns)
+    for i in range(64):
+        scalar = calculate_rectangular_fin_performance(*(columns[name][i] for name in FIN_PARAMS), n_points=37,
+                                                       as_arrays=True, gradients=True)
+        np.testing.assert_array_equal(batch["x_coords"][i], scalar["x_coords"])
+        np.testing.assert_array_equal(batch["temp_dist"][i], scalar["temp_dist"])
+        assert batch["heat_transfer_rate"][i] == scalar["heat_transfer_rate"]
+        assert batch["fin_efficiency"][i] == scalar["fin_efficiency"]
+        for output, partials in scalar["gradients"].items():
+            for name, value in partials.items():
+                np.testing.assert_array_equal(batch["gradients"][output][name][i], _nan_for_none(value))
+
+
+def test_fin_batch_without_profiles():
+    columns = _fin_columns(np.random.default_rng(2), 16)
+    with_profiles = calculate_rectangular_fin_performance_batch(**columns)
+    without = calculate_rectangular_fin_performance_batch(include_profiles=False, **columns)
+    assert without["x_coords"] is None and without["temp_dist"] is None
+    np.testing.assert_array_equal(without["heat_transfer_rate"], with_profiles["heat_transfer_rate"])
+    np.testing.assert_array_equal(without["fin_efficiency"], with_profiles["fin_efficiency"])
+
+
+@pytest.mark.parametrize("flow_type", list(EXCHANGER_CONFIGURATIONS))
+def test_heat_exchanger_batch_matches_scalar(flow_type):
+    rng = np.random.default_rng(3)
+    n = 40
+    columns = {
+        'm_dot_hot': rng.uniform(0.05, 2.0, n), 'Cp_hot': rng.uniform(1000.0, 4200.0, n),
+        'T_in_hot': rng.uniform(350.0, 450.0, n), 'm_dot_cold': rng.uniform(0.05, 2.0, n),
+        'Cp_cold': rng.uniform(1000.0, 4200.0, n), 'T_in_cold': rng.uniform(280.0, 340.0, n),
+        'UA': rng.uniform(10.0, 20000.0, n),
+    }
+    columns['T_in_hot'][0] = 270.0 # reversed inlets
+    columns['m_dot_cold'][1] = 0.0 # one stream without flow
+    columns['m_dot_hot'][2], columns['Cp_hot'][2] = columns['m_dot_cold'][2], columns['Cp_cold'][2] # Cr = 1
+    batch = calculate_heat_exchanger_performance_batch(flow_type=flow_type, **columns)
+    for i in range(n):
+        scalar = calculate_heat_exchanger_performance(*(columns[name][i] for name in HX_PARAMS), flow_type)
+        for name in ["NTU", "effectiveness", "q_actual", "T_out_hot", "T_out_cold"]:
+            np.testing.assert_array_equal(batch[name][i], _nan_for_none(scalar[name]), err_msg=f"{name}, row {i}")
+
+
+def test_composite_wall_batch_matches_scalar():
+    rng = np.random.default_rng(4)
+    walls = [[{"thickness": float(rng.uniform(0.005, 0.2)), "k_value": float(rng.uniform(0.03, 50.0)),
+               "area": float(rng.uniform(0.5, 5.0))} for _ in range(rng.integers(1, 6))] for _ in range(48)]
+    walls[0][0]["thickness"] = 0.0 # surface layer without resistance
+    T_inner = rng.uniform(290.0, 400.0, len(walls))
+    T_outer = rng.uniform(250.0, 300.0, len(walls))
+    batch = calculate_composite_wall_performance_batch(T_inner=T_inner, T_outer=T_outer, gradients=True,
+                                                       **layers_to_csr(walls))
+    offsets = batch["interface_offsets"]
+    layer_offsets = layers_to_csr(walls)["offsets"]
+    for i, layers in enumerate(walls):
+        scalar = calculate_composite_wall_performance(layers, T_inner[i], T_outer[i], gradients=True)
+        np.testing.assert_allclose(batch["total_resistance"][i], scalar["total_resistance"], rtol=1e-14)
+        np.testing.assert_allclose(batch["heat_flux"][i], scalar["heat_flux"], rtol=1e-14)
+        np.testing.assert_array_equal(batch["individual_resistances"][layer_offsets[i]:layer_offsets[i + 1]],
+                                      scalar["individual_resistances"])
+        interface = batch["interface_temperatures"][offsets[i]:offsets[i + 1]]
+        assert interface[0] == T_inner[i]
+        np.testing.assert_allclose(interface[-1], T_outer[i], rtol=1e-12)
+        for output, partials in scalar["gradients"].items():
+            for name in ["thickness", "k_value", "area"]:
+                np.testing.assert_allclose(batch["gradients"][output][name][layer_offsets[i]:layer_offsets[i + 1]],
+                                           partials[name], rtol=1e-14)
+
+
+def test_composite_wall_batch_error_codes():
+    walls = [[], [{"thickness": 0.1, "k_value": -1.0, "area": 1.0}], [{"thickness": 0.0, "k_value": 1.0, "area": 1.0}]]
+    batch = calculate_composite_wall_performance_batch(T_inner=350.0, T_outer=300.0, **layers_to_csr(walls))
+    for code, layers in zip(batch["error_code"], walls):
+        scalar = calculate_composite_wall_performance(layers, 350.0, 300.0)
+        assert WALL_ERROR_MESSAGES[code] == scalar["error"]
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from app.exchanger_configurations import (
+    EXCHANGER_CONFIGURATIONS, TABLE_TOLERANCE, exchanger_effectiveness, exchanger_effectiveness_derivatives,
+    exchanger_ntu, unmixed_effectiveness_exact
+)
+
+FLOW_TYPES = list(EXCHANGER_CONFIGURATIONS)
+
+NTU_GRID, CR_GRID = (a.ravel() for a in np.meshgrid(np.geomspace(0.05, 8.0, 25), [0.0, 0.1, 0.35, 0.6, 0.85, 1.0]))
+
+
+@pytest.mark.parametrize("flow_type", FLOW_TYPES)
+def test_ntu_inverts_effectiveness(flow_type):
+    effectiveness = exchanger_effectiveness(flow_type, NTU_GRID, CR_GRID)
+    NTU = exchanger_ntu(flow_type, effectiveness, CR_GRID)
+    # Only compare where eps still moves with NTU; near saturation the inverse is ill-conditioned
+    d_ntu, _ = exchanger_effectiveness_derivatives(flow_type, NTU_GRID, CR_GRID)
+    resolvable = d_ntu > 1e-6
+    assert resolvable.sum() > len(NTU_GRID) // 2
+    np.testing.assert_allclose(NTU[resolvable], NTU_GRID[resolvable], rtol=1e-6)
+
+
+@pytest.mark.parametrize("flow_type", FLOW_TYPES)
+def test_ntu_of_unreachable_targets_is_nan(flow_type):
+    # At Cr = 1 a parallel-flow exchanger cannot exceed 0.5; none reaches an effectiveness of 1
+    NTU = exchanger_ntu(flow_type, [1.0, 0.99999], [0.5, 1.0])
+    assert np.isnan(NTU[0])
+    if flow_type == "parallel":
+        assert np.isnan(NTU[1])
+
+
+@pytest.mark.parametrize("flow_type", FLOW_TYPES)
+def test_derivatives_match_finite_differences(flow_type):
+    NTU, Cr = (a.ravel() for a in np.meshgrid(np.geomspace(0.1, 6.0, 12), [0.15, 0.5, 0.8]))
+    step = 1e-6
+    exact = "table" in EXCHANGER_CONFIGURATIONS[flow_type] # derivatives are those of the exact solution
+    d_ntu, d_cr = exchanger_effectiveness_derivatives(flow_type, NTU, Cr)
+    ntu_difference = (exchanger_effectiveness(flow_type, NTU + step, Cr, exact)
+                      - exchanger_effectiveness(flow_type, NTU - step, Cr, exact)) / (2 * step)
+    cr_difference = (exchanger_effectiveness(flow_type, NTU, Cr + step, exact)
+                     - exchanger_effectiveness(flow_type, NTU, Cr - step, exact)) / (2 * step)
+    np.testing.assert_allclose(d_ntu, ntu_difference, rtol=1e-5, atol=1e-8)
+    np.testing.assert_allclose(d_cr, cr_difference, rtol=1e-5, atol=1e-8)
+
+
+@pytest.mark.parametrize("flow_type", FLOW_TYPES)
+def test_derivatives_at_balanced_capacities(flow_type):
+    # The general expressions are 0 / 0 at Cr = 1, so short steps lose every digit; a one-sided
+    # difference over a larger step with Richardson extrapolation checks the limits instead
+    NTU = np.geomspace(0.1, 6.0, 12)
+    step = 1e-3
+    exact = "table" in EXCHANGER_CONFIGURATIONS[flow_type]
+    effectiveness = exchanger_effectiveness(flow_type, NTU, 1.0, exact)
+    one_step, two_steps = ((effectiveness - exchanger_effectiveness(flow_type, NTU, 1.0 - h, exact)) / h
+                           for h in (step, 2 * step))
+    d_ntu, d_cr = exchanger_effectiveness_derivatives(flow_type, NTU, 1.0)
+    assert np.isfinite(d_ntu).all()
+    np.testing.assert_allclose(d_cr, 2 * one_step - two_steps, rtol=1e-4, atol=1e-8)
+
+
+@pytest.mark.parametrize("flow_type", FLOW_TYPES)
+def test_phase_change_limit(flow_type):
+    NTU = np.geomspace(0.01, 20.0, 9)
+    np.testing.assert_allclose(exchanger_effectiveness(flow_type, NTU, 0.0), 1 - np.exp(-NTU))
+    d_ntu, d_cr = exchanger_effectiveness_derivatives(flow_type, NTU, 0.0)
+    np.testing.assert_allclose(d_ntu, np.exp(-NTU))
+    assert np.isnan(d_cr).all()
+
+
+def test_unmixed_table_within_tolerance():
+    NTU, Cr = (a.ravel() for a in np.meshgrid(np.geomspace(0.01, 40.0, 40), np.linspace(0.02, 1.0, 15)))
+    tabulated = exchanger_effectiveness("crossflow_unmixed", NTU, Cr)
+    np.testing.assert_allclose(tabulated, unmixed_effectiveness_exact(NTU, Cr), rtol=0, atol=TABLE_TOLERANCE)
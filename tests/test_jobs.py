@@ -0,0 +1,154 @@
+import os
+import sqlite3
+import threading
+import time
+import pytest
+from app.jobs import JobQueue, JobResultTooLarge, MemoryJobStore, SQLiteJobStore, _new_job, spool_response
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteJobStore(str(tmp_path / "jobs.sqlite3"), max_jobs=3)
+    return MemoryJobStore(max_jobs=3)
+
+
+def _wait(queue, job_id, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while queue.get(job_id)["status"] in ["queued", "running"]:
+        assert time.monotonic() < deadline, "job did not finish"
+        time.sleep(0.01)
+    return queue.get(job_id)
+
+
+def test_store_round_trip(store):
+    job = _new_job("fin")
+    store.add(job)
+    assert store.get(job["id"]) == job
+    store.update(job["id"], status="succeeded", status_code=200, mimetype="application/json",
+                 result_path="/tmp/result", result_size=12, finished_at=123.5)
+    stored = store.get(job["id"])
+    assert stored == {**job, "status": "succeeded", "status_code": 200, "mimetype": "application/json",
+                      "result_path": "/tmp/result", "result_size": 12, "finished_at": 123.5}
+    assert store.get("unknown") is None
+
+
+def test_store_drops_oldest_finished_jobs_and_their_results(store, tmp_path):
+    jobs = []
+    for i in range(5):
+        job = _new_job("fin")
+        job["created_at"] += i # distinct order for the SQLite store
+        path = tmp_path / job["id"]
+        path.write_bytes(b"{}")
+        store.add(job)
+        store.update(job["id"], status="succeeded", result_path=str(path), finished_at=time.time())
+        jobs.append(job)
+    running = _new_job("sweep")
+    running["created_at"] += 5
+    store.add(running)
+    kept = [job for job in jobs if store.get(job["id"]) is not None]
+    assert len(kept) == 2 and kept == jobs[-2:]
+    assert store.get(running["id"])["status"] == "queued"
+    assert [(tmp_path / job["id"]).exists() for job in jobs] == [False, False, False, True, True]
+
+
+def test_sqlite_store_migrates_old_files(tmp_path):
+    path = str(tmp_path / "old.sqlite3")
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE jobs (id TEXT PRIMARY KEY, kind TEXT, status TEXT, created_at REAL, "
+                   "started_at REAL, finished_at REAL, status_code INTEGER, mimetype TEXT, error TEXT)")
+    store = SQLiteJobStore(path)
+    job = _new_job("fin")
+    store.add(job)
+    store.update(job["id"], result_path="/tmp/result", result_size=3)
+    assert store.get(job["id"])["result_size"] == 3
+
+
+def test_spool_response_limit(tmp_path):
+    path = str(tmp_path / "body")
+    assert spool_response([b"abc", b"de"], path, max_bytes=5) == 5
+    with open(path, "rb") as f:
+        assert f.read() == b"abcde"
+    with pytest.raises(JobResultTooLarge):
+        spool_response([b"abc", b"def"], path, max_bytes=5)
+    assert not os.path.exists(path)
+
+
+def test_queue_records_outcomes(store, tmp_path):
+    def runner(kind, payload, path, max_bytes):
+        if kind == "broken":
+            raise RuntimeError("runner failed")
+        return 200, "text/plain", spool_response([payload["body"]], path, max_bytes)
+
+    queue = JobQueue(runner, ["echo", "broken"], store=store, workers=2, result_dir=str(tmp_path / "results"),
+                     max_result_bytes=8)
+    try:
+        done = _wait(queue, queue.submit("echo", {"body": b"hello"})["id"])
+        assert (done["status"], done["status_code"], done["result_size"]) == ("succeeded", 200, 5)
+        with open(done["result_path"], "rb") as f:
+            assert f.read() == b"hello"
+
+        too_large = _wait(queue, queue.submit("echo", {"body": b"0123456789"})["id"])
+        assert (too_large["status"], too_large["status_code"], too_large["result_path"]) == ("failed", 413, None)
+
+        failed = _wait(queue, queue.submit("broken", {})["id"])
+        assert (failed["status"], failed["status_code"], failed["error"]) == ("failed", 500, "runner failed")
+    finally:
+        queue.shutdown()
+
+
+def test_queue_cancels_queued_jobs(tmp_path):
+    release = threading.Event()
+
+    def runner(kind, payload, path, max_bytes):
+        release.wait(10)
+        return 200, "text/plain", spool_response([b"ok"], path, max_bytes)
+
+    queue = JobQueue(runner, ["wait"], workers=1, result_dir=str(tmp_path))
+    try:
+        first, second = queue.submit("wait", {}), queue.submit("wait", {})
+        assert queue.cancel(second["id"])
+        assert queue.get(second["id"])["status"] == "cancelled"
+        release.set()
+        assert _wait(queue, first["id"])["status"] == "succeeded"
+        assert not queue.cancel(first["id"])
+    finally:
+        queue.shutdown()
+
+
+def test_job_routes_round_trip(client):
+    payload = {"P": 0.05, "Ac": 1e-4, "L": [0.01, 0.05], "k": 200.0, "h_conv": 25.0, "T_base": 373.15,
+               "T_inf": 293.15, "n_points": 5}
+    response = client.post("/jobs", json={"kind": "fin_batch", "payload": payload})
+    assert response.status_code == 202
+    status_url, result_url = response.get_json()["status_url"], response.get_json()["result_url"]
+
+    deadline = time.monotonic() + 30.0
+    while client.get(status_url).get_json()["status"] in ["queued", "running"]:
+        assert time.monotonic() < deadline, "job did not finish"
+        time.sleep(0.01)
+    assert client.get(status_url).get_json()["status"] == "succeeded"
+
+    result = client.get(result_url)
+    assert result.status_code == 200
+    assert result.get_json() == client.post("/calculate_fin/batch", json=payload).get_json()
+
+
+def test_job_routes_reject_bad_requests(client):
+    assert client.post("/jobs", json={"kind": "nothing", "payload": {}}).status_code == 400
+    assert client.post("/jobs", json={"kind": "fin", "payload": [1]}).status_code == 400
+    assert client.get("/jobs/unknown").status_code == 404
+    assert client.get("/jobs/unknown/result").status_code == 404
+    assert client.delete("/jobs/unknown").status_code == 404
+
+
+def test_failed_job_keeps_the_route_error(client):
+    response = client.post("/jobs", json={"kind": "fin_batch", "payload": {"P": 0.05}})
+    job_id = response.get_json()["id"]
+    deadline = time.monotonic() + 30.0
+    while client.get(f"/jobs/{job_id}").get_json()["status"] in ["queued", "running"]:
+        assert time.monotonic() < deadline, "job did not finish"
+        time.sleep(0.01)
+    result = client.get(f"/jobs/{job_id}/result")
+    assert result.status_code == 400
+    assert result.get_json()["error"].startswith("Missing parameters:")
@@ -0,0 +1,104 @@
+import copy
+import pytest
+from app.fin_calculator import MAX_PROFILE_VALUES
+from app.optimizer import MAX_POPULATION
+from app.sweep import MAX_SAMPLES
+
+# Each case changes one field of a valid request body; the route must answer 400 with an error
+# that names the problem, before any computation starts.
+
+FIN_BASE = {"P": 0.05, "Ac": 1e-4, "L": 0.05, "k": 200.0, "h_conv": 25.0, "T_base": 373.15, "T_inf": 293.15}
+HX_BASE = {"m_dot_hot": 0.5, "Cp_hot": 4180.0, "T_in_hot": 360.0, "m_dot_cold": 0.8, "Cp_cold": 4180.0,
+           "T_in_cold": 290.0, "UA": 2500.0, "flow_type": "counterflow"}
+
+VALID_REQUESTS = {
+    "/sweep": {"calculator": "fin", "base": FIN_BASE, "parameters": {"L": {"type": "linspace", "start": 0.01,
+                                                                           "stop": 0.1, "num": 5}}},
+    "/optimize": {"calculator": "fin", "base": {**FIN_BASE, "rho": 2700.0, "cost_per_kg": 3.0},
+                  "variables": {"L": [0.01, 0.1]}, "objectives": [{"metric": "heat_transfer_rate", "sense": "max"}],
+                  "population": 8, "generations": 2, "seed": 1},
+    "/calculate_fin/batch": {**FIN_BASE, "L": [0.01, 0.05, 0.1], "n_points": 10},
+    "/calculate_heat_exchanger/batch": {**HX_BASE, "UA": [500.0, 2500.0]},
+    "/calculate_composite_wall/batch": {"thickness": [0.1, 0.05, 0.2], "k_value": [0.8, 0.04, 1.4],
+                                        "area": [1.0, 1.0, 2.0], "offsets": [0, 2, 3], "T_inner": 293.15,
+                                        "T_outer": [263.15, 253.15]},
+}
+
+INVALID_REQUESTS = [
+    ("/sweep", {"calculator": "pump"}, "Parameter 'calculator' must be one of"),
+    ("/sweep", {"base": [1, 2]}, "Parameter 'base' must be a dictionary."),
+    ("/sweep", {"parameters": {}}, "Parameter 'parameters' must be a non-empty dictionary."),
+    ("/sweep", {"parameters": {"UA": [1.0, 2.0]}}, "Unknown sweep parameters for 'fin': UA"),
+    ("/sweep", {"parameters": {"L": [0.01, "long"]}}, "must all be numbers or all be strings"),
+    ("/sweep", {"design": "grid"}, "Parameter 'design' must be one of"),
+    ("/sweep", {"design": "sobol"}, "Parameter 'samples' must be an integer"),
+    ("/sweep", {"design": "latin_hypercube", "samples": 10, "seed": -1}, "must be a non-negative integer"),
+    ("/sweep", {"chunk_size": 0}, "Parameter 'chunk_size' must be an integer"),
+    ("/sweep", {"parameters": {name: {"type": "linspace", "start": 1.0, "stop": 2.0, "num": 1000}
+                               for name in ["P", "Ac", "k", "h_conv"]}}, f"at most {MAX_SAMPLES} points"),
+    ("/sweep", {"base": {**FIN_BASE, "include_profiles": True, "n_points": 10 ** 7}}, "Rows x n_points"),
+    ("/sweep", {"base": {**FIN_BASE, "k": "copper"}}, "'k'"),
+    ("/optimize", {"calculator": "pump"}, "Parameter 'calculator' must be one of"),
+    ("/optimize", {"variables": {}}, "Parameter 'variables' must be a non-empty dictionary."),
+    ("/optimize", {"variables": {"UA": [1.0, 2.0]}}, "Unknown design variable 'UA'"),
+    ("/optimize", {"variables": {"L": [0.1, 0.01]}}, "Bounds of 'L' must be [lower, upper]"),
+    ("/optimize", {"variables": {"L": {"min": 0.0, "max": 0.1, "log": True}}}, "needs positive bounds"),
+    ("/optimize", {"objectives": []}, "Parameter 'objectives' must be a non-empty list."),
+    ("/optimize", {"objectives": [{"metric": "speed"}]}, "Each objective needs a 'metric'"),
+    ("/optimize", {"objectives": [{"metric": "mass", "sense": "up"}]}, "Objective 'sense' must be"),
+    ("/optimize", {"constraints": [{"metric": "mass"}]}, "numeric 'min' and/or 'max'"),
+    ("/optimize", {"population": MAX_POPULATION + 1}, "Parameter 'population' must be an integer"),
+    ("/optimize", {"generations": 0}, "Parameter 'generations' must be a positive integer."),
+    ("/optimize", {"population": MAX_POPULATION, "generations": 10 ** 6}, "must not exceed"),
+    ("/optimize", {"seed": "abc"}, "Parameter 'seed' must be an integer."),
+    ("/optimize", {"base": {**FIN_BASE, "rho": -1.0}}, "Parameter 'rho' must be positive."),
+    ("/optimize", {"base": {**FIN_BASE, "cost_per_kg": "cheap"}}, "Parameter 'cost_per_kg' must be a number."),
+    ("/calculate_fin/batch", {"k": [200.0, -1.0, 200.0]}, "1 row(s) failed validation."),
+    ("/calculate_fin/batch", {"k": [200.0, 150.0]}, "All list parameters must have the same length."),
+    ("/calculate_fin/batch", {"n_points": 0}, "Parameter 'n_points' must be a positive integer."),
+    ("/calculate_fin/batch", {"n_points": True}, "Parameter 'n_points' must be a positive integer."),
+    ("/calculate_fin/batch", {"L": [0.05] * 1000, "n_points": MAX_PROFILE_VALUES // 1000 + 1}, "Rows x n_points"),
+    ("/calculate_heat_exchanger/batch", {"flow_type": 3}, "Parameter 'flow_type' must be"),
+    ("/calculate_heat_exchanger/batch", {"UA": [500.0, -1.0]}, "row(s) failed validation"),
+    ("/calculate_composite_wall/batch", {"offsets": [0, 3, 2]}, "must start at 0 and be non-decreasing"),
+    ("/calculate_composite_wall/batch", {"offsets": [0.0, 3.0]}, "Parameter 'offsets' must be a list"),
+    ("/calculate_composite_wall/batch", {"k_value": [0.8, -0.04, 1.4]}, "wall(s) failed validation"),
+]
+
+
+def _request(route, changes):
+    body = copy.deepcopy(VALID_REQUESTS[route])
+    body.update(changes)
+    return body
+
+
+@pytest.mark.parametrize("route", list(VALID_REQUESTS))
+def test_valid_requests_pass(client, route):
+    response = client.post(route, json=VALID_REQUESTS[route])
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+
+@pytest.mark.parametrize("route, changes, message", INVALID_REQUESTS)
+def test_invalid_requests_are_rejected(client, route, changes, message):
+    response = client.post(route, json=_request(route, changes))
+    assert response.status_code == 400
+    assert message in response.get_json()["error"]
+
+
+@pytest.mark.parametrize("route", list(VALID_REQUESTS))
+def test_empty_body_is_rejected(client, route):
+    response = client.post(route, json={})
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "No input data provided"
+
+
+@pytest.mark.parametrize("route, name", [
+    ("/sweep", "k"), ("/optimize", "k"), ("/calculate_fin/batch", "L"),
+    ("/calculate_heat_exchanger/batch", "flow_type"), ("/calculate_composite_wall/batch", "offsets"),
+])
+def test_missing_parameters_are_named(client, route, name):
+    body = copy.deepcopy(VALID_REQUESTS[route])
+    del (body["base"] if "base" in body else body)[name]
+    response = client.post(route, json=body)
+    assert response.status_code == 400
+    assert response.get_json()["error"] == f"Missing parameters: {name}"
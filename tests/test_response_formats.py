@@ -0,0 +1,24 @@
+import io
+import json
+import numpy as np
+from app.response_formats import NPY_MIMETYPE, OCTET_MIMETYPE, decode_octet_stream, encode_response
+
+
+def test_npy_keeps_list_metadata_in_one_field():
+    nodes = [{"name": f"node_{i}", "temperature": 300.0 + i} for i in range(2000)]
+    metadata = {"nodes": nodes, "heat_rates": {"left": 1.5, "right": None}, "solver": "direct"}
+    body = encode_response(NPY_MIMETYPE, {"temperature": np.linspace(300.0, 350.0, 4)}, metadata)
+    record = np.load(io.BytesIO(body), allow_pickle=False)[0]
+    assert record.dtype.names == ("temperature", "nodes", "heat_rates.left", "heat_rates.right", "solver")
+    assert json.loads(record["nodes"]) == nodes
+    assert record["heat_rates.left"] == 1.5 and np.isnan(record["heat_rates.right"])
+    np.testing.assert_array_equal(record["temperature"], np.linspace(300.0, 350.0, 4))
+
+
+def test_octet_stream_round_trip():
+    arrays = {"temp_dist": np.linspace(300.0, 350.0, 6).reshape(2, 3), "error_code": np.array([0, 3])}
+    body = encode_response(OCTET_MIMETYPE, arrays, {"count": 2, "cases": [1.0, float("nan")]}, dtype="float32")
+    decoded, metadata = decode_octet_stream(body)
+    np.testing.assert_array_equal(decoded["temp_dist"], arrays["temp_dist"].astype(np.float32))
+    np.testing.assert_array_equal(decoded["error_code"], arrays["error_code"])
+    assert metadata == {"count": 2, "cases": [1.0, None]}